@@ -0,0 +1 @@
+"""性能基准测试（不随包发布）"""
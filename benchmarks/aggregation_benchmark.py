@@ -0,0 +1,295 @@
+"""
+缺陷聚合的可扩展性基准测试
+
+用合成缺陷测量DefectAggregator.aggregate_defects在不同规模下的表现：
+- wall_time: 聚合耗时（秒）
+- peak_memory_mb: 聚合过程中的峰值内存（tracemalloc，单独运行一次以免影响计时）
+- quality: 与生成标注比较的去重和聚类质量
+    - dedup_precision: 被去除的缺陷中确实是重复报告的比例
+    - dedup_recall: 重复报告中被去除的比例
+    - lost_findings: 所有报告都被去除的真实问题数量（过度合并）
+    - cluster_precision/recall/f1: 按缺陷对计算的聚类质量，
+      标注分组为同一文件中的同一规则
+
+结果保存为JSON，--compare指定以前的结果时报告耗时、内存和质量的退化，
+存在退化时以非零状态退出，可在发布前运行：
+
+    python -m benchmarks.aggregation_benchmark
+    python -m benchmarks.aggregation_benchmark --sizes 1000 10000 --compare old.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.tools.defect_aggregator import DefectAggregator
+
+from .defect_generator import PROFILES, SyntheticDefects, generate_defects
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# 耗时和内存的允许增长比例
+DEFAULT_TOLERANCE = 0.25
+# 耗时差异低于该值（秒）时视为噪声
+TIME_NOISE_FLOOR = 0.05
+# 质量指标的允许下降值
+QUALITY_TOLERANCE = 0.01
+
+_QUALITY_METRICS = (
+    "dedup_precision",
+    "dedup_recall",
+    "cluster_precision",
+    "cluster_recall",
+    "cluster_f1",
+)
+
+
+def _pairs(count: int) -> int:
+    return count * (count - 1) // 2
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 1.0
+
+
+def evaluate_quality(
+    synthetic: SyntheticDefects, result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """将聚合结果与生成标注比较
+
+    输出聚类中的缺陷就是输入的缺陷字典，按对象身份对应到标注。
+    """
+    position = {id(defect): i for i, defect in enumerate(synthetic.defects)}
+
+    kept: List[int] = []
+    cluster_of: List[int] = []
+    for cluster_index, cluster in enumerate(result.get("clusters", [])):
+        for defect in cluster["defects"]:
+            kept.append(position[id(defect)])
+            cluster_of.append(cluster_index)
+
+    findings = synthetic.findings
+    kept_findings = {findings[i] for i in kept}
+    kept_set = set(kept)
+    removed = [i for i in range(len(synthetic.defects)) if i not in kept_set]
+    correct_removals = sum(1 for i in removed if findings[i] in kept_findings)
+
+    # 按缺陷对计算聚类的精确率和召回率
+    groups = [synthetic.groups[i] for i in kept]
+    together = sum(_pairs(n) for n in Counter(zip(cluster_of, groups)).values())
+    predicted = sum(_pairs(n) for n in Counter(cluster_of).values())
+    actual = sum(_pairs(n) for n in Counter(groups).values())
+    precision = _ratio(together, predicted)
+    recall = _ratio(together, actual)
+
+    return {
+        "findings": synthetic.finding_count,
+        "duplicates": synthetic.duplicate_count,
+        "removed": len(removed),
+        "dedup_precision": round(_ratio(correct_removals, len(removed)), 4),
+        "dedup_recall": round(_ratio(correct_removals, synthetic.duplicate_count), 4),
+        "lost_findings": synthetic.finding_count - len(kept_findings),
+        "cluster_precision": round(precision, 4),
+        "cluster_recall": round(recall, 4),
+        "cluster_f1": round(
+            (
+                2 * precision * recall / (precision + recall)
+                if precision + recall
+                else 0.0
+            ),
+            4,
+        ),
+    }
+
+
+def run_benchmark(
+    size: int,
+    profile: str = "mixed",
+    seed: int = 42,
+    measure_memory: bool = True,
+) -> Dict[str, Any]:
+    """运行单个规模的基准测试"""
+    synthetic = generate_defects(size, profile=profile, seed=seed)
+
+    gc.collect()
+    start = time.perf_counter()
+    result = DefectAggregator().aggregate_defects(synthetic.defects)
+    wall_time = time.perf_counter() - start
+
+    peak_memory_mb = None
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            DefectAggregator().aggregate_defects(synthetic.defects)
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "size": size,
+        "profile": profile,
+        "wall_time": round(wall_time, 4),
+        "throughput": round(size / wall_time, 1) if wall_time else None,
+        "peak_memory_mb": (
+            round(peak_memory_mb, 2) if peak_memory_mb is not None else None
+        ),
+        "total_defects": result["total_defects"],
+        "clusters": len(result["clusters"]),
+        "deduplication_rate": round(result["deduplication_rate"], 4),
+        "quality": evaluate_quality(synthetic, result),
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    from src.tools import defect_similarity
+
+    numpy = defect_similarity.np
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": numpy.__version__ if numpy is not None else None,
+    }
+
+
+def run_suite(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    profile: str = "mixed",
+    seed: int = 42,
+    measure_memory: bool = True,
+    log=print,
+) -> Dict[str, Any]:
+    """按规模依次运行基准测试"""
+    results = []
+    for size in sizes:
+        row = run_benchmark(size, profile, seed, measure_memory)
+        results.append(row)
+        if log:
+            quality = row["quality"]
+            memory = (
+                f"{row['peak_memory_mb']:.1f}MB"
+                if row["peak_memory_mb"] is not None
+                else "-"
+            )
+            log(
+                f"{profile:>6} {size:>7}: {row['wall_time']:.3f}s, {memory}, "
+                f"{row['total_defects']}条/{row['clusters']}个聚类, "
+                f"去重P/R={quality['dedup_precision']:.3f}/"
+                f"{quality['dedup_recall']:.3f}, "
+                f"聚类F1={quality['cluster_f1']:.3f}"
+            )
+
+    return {
+        "benchmark": "defect_aggregation",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "config": {"profile": profile, "seed": seed, "sizes": list(sizes)},
+        "results": results,
+    }
+
+
+def compare_results(
+    current: Dict[str, Any],
+    previous: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """比较两次结果，返回退化描述（按规模和缺陷分布对应）"""
+    previous_rows = {
+        (row["profile"], row["size"]): row for row in previous.get("results", [])
+    }
+    regressions = []
+    for row in current.get("results", []):
+        old = previous_rows.get((row["profile"], row["size"]))
+        if old is None:
+            continue
+        label = f"{row['profile']}/{row['size']}"
+
+        if (
+            row["wall_time"] > old["wall_time"] * (1 + tolerance)
+            and row["wall_time"] - old["wall_time"] > TIME_NOISE_FLOOR
+        ):
+            regressions.append(
+                f"{label}: 耗时 {old['wall_time']:.3f}s -> {row['wall_time']:.3f}s"
+            )
+
+        if (
+            row.get("peak_memory_mb") is not None
+            and old.get("peak_memory_mb") is not None
+            and row["peak_memory_mb"] > old["peak_memory_mb"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{label}: 峰值内存 {old['peak_memory_mb']:.1f}MB -> "
+                f"{row['peak_memory_mb']:.1f}MB"
+            )
+
+        for metric in _QUALITY_METRICS:
+            before = old["quality"].get(metric)
+            after = row["quality"].get(metric)
+            if before is not None and after is not None:
+                if after < before - QUALITY_TOLERANCE:
+                    regressions.append(f"{label}: {metric} {before:.3f} -> {after:.3f}")
+
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="缺陷聚合的可扩展性基准测试")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="缺陷数量"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES) + ["mixed"],
+        default="mixed",
+        help="缺陷分布",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", type=Path, help="结果JSON路径")
+    parser.add_argument("--compare", type=Path, help="用于比较的以前的结果JSON")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="耗时和内存的允许增长比例",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="不测量峰值内存（节省一次运行）"
+    )
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.profile, args.seed, not args.no_memory)
+
+    output = args.output or RESULTS_DIR / (
+        f"aggregation-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"结果已保存: {output}")
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_results(report, previous, args.tolerance)
+        if regressions:
+            print("发现性能或质量退化:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"与 {args.compare} 相比没有退化")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
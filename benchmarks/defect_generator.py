@@ -0,0 +1,376 @@
+"""
+合成缺陷生成器
+
+按pylint、eslint、clang-tidy的常见规则及其大致出现频率生成缺陷字典，
+字段与analyze_code_defects输出的缺陷一致。每条真实问题（finding）可能被
+重复报告（同一工具重复运行或多个工具交叉报告），重复报告为完全相同的副本
+或带附加说明、行号相差1的变体。
+
+生成结果同时给出标注：
+- finding: 缺陷所属的真实问题编号，用于评估去重
+- group: 缺陷的根因分组（同一文件中的同一规则），用于评估聚类
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# 规则定义: (权重, 规则ID, 类型, 严重程度, 消息模板, 变体后缀)
+_PYLINT_RULES = (
+    (
+        25,
+        "C0116",
+        "convention",
+        "low",
+        "Missing function or method docstring",
+        "missing-function-docstring",
+    ),
+    (15, "C0301", "convention", "low", "Line too long ({number}/100)", "line-too-long"),
+    (12, "W0612", "warning", "medium", "Unused variable '{name}'", "unused-variable"),
+    (10, "W0611", "warning", "medium", "Unused import {module}", "unused-import"),
+    (
+        8,
+        "C0103",
+        "convention",
+        "low",
+        'Variable name "{name}" doesn\'t conform to snake_case naming style',
+        "invalid-name",
+    ),
+    (
+        6,
+        "E1101",
+        "error",
+        "high",
+        "Instance of '{cls}' has no '{name}' member",
+        "no-member",
+    ),
+    (
+        5,
+        "R0913",
+        "refactor",
+        "medium",
+        "Too many arguments ({small}/5)",
+        "too-many-arguments",
+    ),
+    (
+        5,
+        "W0718",
+        "warning",
+        "medium",
+        "Catching too general exception Exception",
+        "broad-exception-caught",
+    ),
+    (4, "E0602", "error", "high", "Undefined variable '{name}'", "undefined-variable"),
+    (
+        3,
+        "R1705",
+        "refactor",
+        "low",
+        'Unnecessary "else" after "return", remove the "else" and de-indent the code inside it',
+        "no-else-return",
+    ),
+    (3, "W0613", "warning", "medium", "Unused argument '{name}'", "unused-argument"),
+    (
+        2,
+        "W1514",
+        "warning",
+        "medium",
+        "Using open without explicitly specifying an encoding",
+        "unspecified-encoding",
+    ),
+    (
+        2,
+        "C0114",
+        "convention",
+        "low",
+        "Missing module docstring",
+        "missing-module-docstring",
+    ),
+)
+
+_ESLINT_RULES = (
+    (
+        22,
+        "no-unused-vars",
+        "warning",
+        "medium",
+        "'{name}' is assigned a value but never used.",
+        "no-unused-vars",
+    ),
+    (15, "semi", "error", "high", "Missing semicolon.", "semi"),
+    (12, "quotes", "warning", "medium", "Strings must use singlequote.", "quotes"),
+    (
+        10,
+        "indent",
+        "warning",
+        "medium",
+        "Expected indentation of {small} spaces but found {small2}.",
+        "indent",
+    ),
+    (
+        9,
+        "prefer-const",
+        "warning",
+        "medium",
+        "'{name}' is never reassigned. Use 'const' instead.",
+        "prefer-const",
+    ),
+    (8, "no-undef", "error", "high", "'{name}' is not defined.", "no-undef"),
+    (
+        7,
+        "eqeqeq",
+        "warning",
+        "medium",
+        "Expected '===' and instead saw '=='.",
+        "eqeqeq",
+    ),
+    (
+        6,
+        "no-console",
+        "warning",
+        "medium",
+        "Unexpected console statement.",
+        "no-console",
+    ),
+    (
+        6,
+        "@typescript-eslint/no-explicit-any",
+        "warning",
+        "medium",
+        "Unexpected any. Specify a different type.",
+        "no-explicit-any",
+    ),
+    (
+        5,
+        "react-hooks/exhaustive-deps",
+        "warning",
+        "medium",
+        "React Hook useEffect has a missing dependency: '{name}'. Either include it or remove the dependency array.",
+        "exhaustive-deps",
+    ),
+)
+
+_CLANG_RULES = (
+    (
+        18,
+        "clang-diagnostic-unused-variable",
+        "warning",
+        "medium",
+        "unused variable '{name}'",
+        "-Wunused-variable",
+    ),
+    (
+        14,
+        "clang-diagnostic-sign-compare",
+        "warning",
+        "medium",
+        "comparison of integers of different signs: 'int' and 'size_t'",
+        "-Wsign-compare",
+    ),
+    (
+        12,
+        "clang-diagnostic-unused-parameter",
+        "warning",
+        "medium",
+        "unused parameter '{name}'",
+        "-Wunused-parameter",
+    ),
+    (
+        12,
+        "readability-identifier-naming",
+        "warning",
+        "low",
+        "invalid case style for variable '{name}'",
+        "readability-identifier-naming",
+    ),
+    (
+        10,
+        "cppcoreguidelines-avoid-magic-numbers",
+        "warning",
+        "low",
+        "{number} is a magic number; consider replacing it with a named constant",
+        "cppcoreguidelines-avoid-magic-numbers",
+    ),
+    (
+        8,
+        "modernize-use-nullptr",
+        "warning",
+        "low",
+        "use nullptr",
+        "modernize-use-nullptr",
+    ),
+    (
+        8,
+        "performance-unnecessary-value-param",
+        "warning",
+        "medium",
+        "the parameter '{name}' is copied for each invocation but only used as a const reference; consider making it a const reference",
+        "performance-unnecessary-value-param",
+    ),
+    (
+        6,
+        "bugprone-narrowing-conversions",
+        "warning",
+        "medium",
+        "narrowing conversion from 'size_t' to signed type 'int' is implementation-defined",
+        "bugprone-narrowing-conversions",
+    ),
+    (
+        4,
+        "clang-analyzer-core.NullDereference",
+        "error",
+        "high",
+        "Dereference of null pointer (loaded from variable '{name}')",
+        "clang-analyzer-core.NullDereference",
+    ),
+)
+
+
+@dataclass(frozen=True)
+class ToolProfile:
+    """单个分析工具的缺陷分布"""
+
+    tool: str
+    extension: str
+    category: str
+    rules: Tuple[Tuple[Any, ...], ...]
+    # 真实问题被重复报告的概率
+    duplicate_rate: float
+
+
+PROFILES: Dict[str, ToolProfile] = {
+    "pylint": ToolProfile("pylint", ".py", "python_quality", _PYLINT_RULES, 0.15),
+    "eslint": ToolProfile("eslint", ".ts", "code_style", _ESLINT_RULES, 0.10),
+    "clang": ToolProfile("clang-tidy", ".cpp", "static_analysis", _CLANG_RULES, 0.25),
+}
+
+# mixed配置中各工具的比例
+MIXED_WEIGHTS = {"pylint": 0.5, "eslint": 0.3, "clang": 0.2}
+
+_WORDS = (
+    "user",
+    "config",
+    "result",
+    "data",
+    "item",
+    "value",
+    "index",
+    "buffer",
+    "count",
+    "handler",
+    "request",
+    "response",
+    "cache",
+    "node",
+    "path",
+    "token",
+    "offset",
+    "state",
+    "payload",
+    "context",
+)
+_SUFFIXES = ("", "_id", "_list", "_map", "_count", "_tmp", "2", "_new")
+_MODULES = ("os", "sys", "json", "re", "typing", "pathlib", "logging", "itertools")
+_CLASSES = ("Session", "Parser", "Client", "Response", "Node", "Config")
+
+# 每个文件的平均缺陷数与最大行号
+DEFECTS_PER_FILE = 25
+MAX_LINE = 400
+
+
+@dataclass
+class SyntheticDefects:
+    """生成的缺陷及其标注"""
+
+    defects: List[Dict[str, Any]] = field(default_factory=list)
+    findings: List[int] = field(default_factory=list)
+    groups: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def finding_count(self) -> int:
+        return len(set(self.findings))
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self.defects) - self.finding_count
+
+
+def _render(template: str, rng: random.Random) -> str:
+    name = rng.choice(_WORDS) + rng.choice(_SUFFIXES)
+    return template.format(
+        name=name,
+        module=rng.choice(_MODULES),
+        cls=rng.choice(_CLASSES),
+        number=rng.randint(101, 240),
+        small=rng.randint(6, 12),
+        small2=rng.randint(0, 8),
+    )
+
+
+def generate_defects(
+    count: int,
+    profile: str = "mixed",
+    seed: int = 42,
+    duplicate_rate: Optional[float] = None,
+) -> SyntheticDefects:
+    """生成指定数量的合成缺陷
+
+    Args:
+        count: 缺陷数量（包括重复报告）
+        profile: pylint、eslint、clang或mixed
+        seed: 随机种子，相同参数生成相同结果
+        duplicate_rate: 覆盖各工具默认的重复报告概率
+
+    Returns:
+        缺陷及其标注
+    """
+    if profile == "mixed":
+        profiles = [PROFILES[name] for name in MIXED_WEIGHTS]
+        profile_weights = list(MIXED_WEIGHTS.values())
+    elif profile in PROFILES:
+        profiles = [PROFILES[profile]]
+        profile_weights = [1.0]
+    else:
+        raise ValueError(f"未知的缺陷分布: {profile}")
+
+    rng = random.Random(seed)
+    file_count = max(1, count // DEFECTS_PER_FILE)
+    result = SyntheticDefects()
+    finding = 0
+
+    while len(result.defects) < count:
+        tool = rng.choices(profiles, weights=profile_weights)[0]
+        weight_list = [rule[0] for rule in tool.rules]
+        _, rule_id, issue_type, severity, template, symbol = rng.choices(
+            tool.rules, weights=weight_list
+        )[0]
+        file = f"src/module_{rng.randrange(file_count)}{tool.extension}"
+        defect = {
+            "file": file,
+            "tool": tool.tool,
+            "type": issue_type,
+            "severity": severity,
+            "message": _render(template, rng),
+            "line": rng.randint(1, MAX_LINE),
+            "column": rng.randint(1, 80),
+            "rule_id": rule_id,
+            "category": tool.category,
+        }
+        reports = [defect]
+
+        rate = tool.duplicate_rate if duplicate_rate is None else duplicate_rate
+        while rng.random() < rate and len(reports) < 4:
+            duplicate = dict(defect)
+            if rng.random() < 0.5:
+                # 其他工具或配置报告的变体：附带规则名、行号相差1
+                duplicate["message"] = f"{defect['message']} ({symbol})"
+                duplicate["line"] = max(1, defect["line"] + rng.choice((-1, 0, 1)))
+            reports.append(duplicate)
+
+        for report in reports[: count - len(result.defects)]:
+            result.defects.append(report)
+            result.findings.append(finding)
+            result.groups.append((file, rule_id))
+        finding += 1
+
+    return result
@@ -23,6 +23,9 @@ from ..midware.logging import LoggingMiddleware
 from ..midware.memory_adapter import MemoryMiddlewareFactory
 from ..midware.performance_monitor import PerformanceMonitorMiddleware
 from ..midware.security import SecurityMiddleware
+from ..tools.analysis_cache import set_cache_agent
+from ..tools.workspace_watcher import (watch_workspace,
+                                      workspace_watch_enabled)
 
 
 def list_agents():
@@ -110,6 +113,17 @@ def create_agent_with_config(
         source_content = get_default_coding_instructions()
         agent_md.write_text(source_content)
 
+    # 代码分析结果缓存存放在 ~/.deepagents/AGENT_NAME/cache/
+    set_cache_agent(assistant_id)
+
+    # 工作区文件索引由文件监视器增量维护，会话中的项目扫描不再重新遍历目录；
+    # 首次建立索引在后台进行，不阻塞启动
+    if workspace_watch_enabled():
+        try:
+            watch_workspace(os.getcwd())
+        except OSError as e:
+            console.print(f"[yellow]⚠ 工作区监视启动失败: {e}[/yellow]")
+
     # 长期记忆后端 - rooted at agent directory
     # 处理 /memories/ files 和 /agent.md
     # virtual_mode放置路径遍历攻击
@@ -100,6 +100,7 @@ COMMANDS = {
     "info": "Show system information and platform features",
     "services": "Manage Windows services (Windows only)",
     "svc": "Manage Windows services (Windows only)",
+    "perf analyzers": "Show per-analyzer latency and outcome statistics",
     "quit": "Exit the CLI",
     "exit": "Exit the CLI",
 }
@@ -10,6 +10,7 @@ from langgraph.checkpoint.memory import InMemorySaver
 
 from ..agents.agent import get_current_assistant_id
 from ..config.config import COLORS, DEEP_AGENTS_ASCII, console
+from ..tools.workspace_watcher import switch_workspace
 from ..ui.dynamicCli import typewriter
 from ..ui.ui import TokenTracker, show_interactive_help
 from .memory_commands import (MemoryManager, handle_memory_backup,
@@ -71,6 +72,9 @@ def handle_command(command: str, agent, token_tracker: TokenTracker) -> str | bo
     if command_name == "memory":
         return handle_memory_command(agent, command_args)
 
+    if command_name == "perf":
+        return handle_perf_command(command_args)
+
     # 使用震动效果显示未知命令错误
     typewriter.error_shake(f"Unknown command: /{cmd}")
     console.print("[dim]Type /help for available commands.[/dim]")
@@ -564,6 +568,12 @@ def handle_cd_command(args: list[str]) -> bool:
         # Change working directory
         os.chdir(resolved_path)
 
+        # 会话启用了工作区监视时，改为监视新的工作目录
+        try:
+            switch_workspace(resolved_path)
+        except OSError as e:
+            console.print(f"[yellow]⚠ 工作区监视切换失败: {e}[/yellow]")
+
         # Show success animation with new directory info
         current_dir = Path.cwd()
         typewriter.success(f" Changed directory to: {current_dir}")
@@ -1034,6 +1044,71 @@ def manage_windows_service(action: str, service_name: str) -> bool:
         return True
 
 
+def handle_perf_command(args: list[str]) -> bool:
+    """处理 /perf 命令，显示性能统计。"""
+    from ..tools.analyzer_metrics import get_analyzer_metrics
+
+    subcommand = args[0] if args else "analyzers"
+    metrics = get_analyzer_metrics()
+
+    if subcommand == "analyzers":
+        show_analyzer_stats(metrics.snapshot())
+    elif subcommand == "reset":
+        metrics.reset()
+        typewriter.success("✅ 分析器统计已清空")
+    else:
+        typewriter.info("用法: /perf analyzers | /perf reset")
+    return True
+
+
+def show_analyzer_stats(rows: list[dict]) -> None:
+    """以表格显示各分析器的耗时分布和结果事件（按总耗时排序）。"""
+    from rich.table import Table
+
+    if not rows:
+        typewriter.info("本次会话还没有运行过代码分析")
+        return
+
+    def fmt_time(value) -> str:
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    table = Table(title="Analyzer Performance", show_lines=False)
+    table.add_column("Tool", style=COLORS["primary"])
+    table.add_column("Language")
+    table.add_column("Files", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Run p50/p95", justify="right")
+    table.add_column("Parse p50/p95", justify="right")
+    table.add_column("Spawn", justify="right")
+    table.add_column("Issues avg", justify="right")
+    table.add_column("Cache", justify="right")
+    table.add_column("Timeout", justify="right")
+    table.add_column("Error", justify="right")
+    table.add_column("Fallback", justify="right")
+
+    for row in rows:
+        events = row["events"]
+        run, parse, spawn = row["run"], row["parse"], row["spawn"]
+        table.add_row(
+            row["tool"],
+            row["language"],
+            str(events.get("files", 0)),
+            f"{row['total']['sum']:.2f}s",
+            f"{fmt_time(run['p50'])}/{fmt_time(run['p95'])}",
+            f"{fmt_time(parse['p50'])}/{fmt_time(parse['p95'])}",
+            f"{spawn['count']}×{fmt_time(spawn['avg'])}" if spawn["count"] else "-",
+            f"{row['issues']['avg']:.1f}",
+            str(events.get("cache_hits", 0)),
+            str(events.get("timeouts", 0)),
+            str(events.get("errors", 0)),
+            str(events.get("fallbacks", 0)),
+        )
+
+    console.print()
+    console.print(table)
+    console.print()
+
+
 def handle_memory_command(agent, args: list[str]) -> bool:
     """Handle /memory command for agent memory management.
 
@@ -3,6 +3,7 @@
 import json
 import sys
 import threading
+from pathlib import Path
 
 # 跨平台兼容的终端模块导入
 try:
@@ -18,6 +19,7 @@ from langchain_core.messages import HumanMessage, ToolMessage
 from langgraph.types import Command
 from rich import box
 from rich.markdown import Markdown
+from rich.markup import escape
 from rich.panel import Panel
 
 from ..config.config import COLORS, console
@@ -233,9 +235,8 @@ def execute_task(
     captured_output_tokens = 0
     current_todos = None  # 跟踪当前待办事项列表状态
 
-    status = console.status(
-        f"[bold {COLORS['thinking']}]Agent is thinking...", spinner="dots"
-    )
+    thinking_text = f"[bold {COLORS['thinking']}]Agent is thinking..."
+    status = console.status(thinking_text, spinner="dots")
     status.start()
     spinner_active = True
 
@@ -310,7 +311,8 @@ def execute_task(
 
             for chunk in agent.stream(
                 stream_input,
-                stream_mode=["messages", "updates"],  # Dual-mode for HITL support
+                # messages/updates用于内容和HITL，custom用于工具上报的进度
+                stream_mode=["messages", "updates", "custom"],
                 subgraphs=True,
                 config=config,
                 durability="exit",
@@ -409,6 +411,19 @@ def execute_task(
                                 render_todo_list(new_todos)
                                 console.print()
 
+                # 处理CUSTOM stream - 长时间运行的工具逐个文件上报分析进度
+                elif current_stream_mode == "custom":
+                    if (
+                        isinstance(data, dict)
+                        and data.get("type") == "analysis_progress"
+                    ):
+                        file_name = Path(data.get("file", "")).name
+                        status.update(
+                            f"[bold {COLORS['thinking']}]Analyzing "
+                            f"{data.get('completed')}/{data.get('total')} files"
+                            f"[/] [dim]{escape(file_name)}[/]"
+                        )
+
                 # Handle MESSAGES stream - for content and tool calls
                 elif current_stream_mode == "messages":
                     # Messages stream returns (message, metadata) tuples
@@ -424,6 +439,8 @@ def execute_task(
                         tool_status = getattr(message, "status", "success")
                         tool_content = format_tool_message_content(message.content)
                         record = file_op_tracker.complete_with_message(message)
+                        # 工具结束后恢复默认的状态文字（可能被进度覆盖）
+                        status.update(thinking_text)
 
                         if tool_name == "shell" and tool_status != "success":
                             flush_summary_buffer()
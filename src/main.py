@@ -14,12 +14,13 @@ from .interface.input import create_prompt_session
 from .tools.network_tools import tavily_client
 # 从统一的工具导出模块导入工具
 from .tools.tools import (analyze_code_complexity, analyze_code_defects,
-                          analyze_existing_logs, batch_format_professional,
-                          compile_project, execute_test_suite_tool,
-                          explore_project_structure, format_code_professional,
+                          analyze_existing_logs, analyze_project_defects,
+                          batch_format_professional, compile_project,
+                          execute_test_suite_tool, explore_project_structure,
+                          format_code_professional,
                           generate_validation_tests_tool, http_request,
                           run_and_monitor, run_tests_with_error_capture,
-                          web_search)
+                          summarize_directory_tree, web_search)
 from .ui.dynamicCli import typewriter
 from .ui.ui import TokenTracker, show_help
 
@@ -200,6 +201,7 @@ async def main(assistant_id: str, session_state):
 
     # 添加静态分析工具
     tools.append(analyze_code_defects)
+    tools.append(analyze_project_defects)
 
     # 添加动态分析工具
     tools.append(compile_project)
@@ -210,6 +212,7 @@ async def main(assistant_id: str, session_state):
     # 添加项目探索工具
     tools.append(analyze_code_complexity)
     tools.append(explore_project_structure)
+    tools.append(summarize_directory_tree)
 
     # 添加代码格式化工具
     tools.append(format_code_professional)
@@ -16,6 +16,13 @@ from langchain.agents.middleware.types import (AgentMiddleware, AgentState,
 from typing_extensions import NotRequired, TypedDict
 
 
+def _workspace_index(path: Path):
+    """项目扫描共用的工作区索引"""
+    from ..tools.workspace_index import get_workspace_index
+
+    return get_workspace_index(path)
+
+
 class ContextEnhancementState(AgentState):
     """上下文增强中间件的状态"""
 
@@ -129,11 +136,10 @@ class ContextEnhancementMiddleware(AgentMiddleware):
         detected_languages = set()
 
         try:
-            for file_path in path.rglob("*"):
-                if file_path.is_file():
-                    for lang, extensions in language_extensions.items():
-                        if any(str(file_path).endswith(ext) for ext in extensions):
-                            detected_languages.add(lang)
+            file_types = _workspace_index(path).stats()["file_types"]
+            for lang, extensions in language_extensions.items():
+                if any(ext in file_types for ext in extensions):
+                    detected_languages.add(lang)
         except Exception:
             pass
 
@@ -157,7 +163,9 @@ class ContextEnhancementMiddleware(AgentMiddleware):
         detected_frameworks = []
 
         try:
-            for file_path in path.rglob("*.json"):
+            index = _workspace_index(path)
+            for indexed_file in index.files(extensions={".json"}):
+                file_path = Path(indexed_file.path)
                 if file_path.is_file():
                     content = file_path.read_text(encoding="utf-8").lower()
                     for framework, (filename, keyword) in frameworks.items():
@@ -165,7 +173,8 @@ class ContextEnhancementMiddleware(AgentMiddleware):
                             detected_frameworks.append(framework)
 
             # 检查Python文件中的框架
-            for file_path in path.rglob("*.py"):
+            for indexed_file in index.files(extensions={".py"}):
+                file_path = Path(indexed_file.path)
                 if file_path.is_file():
                     content = file_path.read_text(encoding="utf-8").lower()
                     for framework, (filename, keyword) in frameworks.items():
@@ -217,17 +226,7 @@ class ContextEnhancementMiddleware(AgentMiddleware):
         """获取最近修改的文件"""
         recent_files = []
         try:
-            files = []
-            for file_path in path.rglob("*"):
-                if file_path.is_file() and not file_path.name.startswith("."):
-                    try:
-                        mtime = file_path.stat().st_mtime
-                        files.append((mtime, str(file_path.relative_to(path))))
-                    except OSError:
-                        continue
-
-            files.sort(reverse=True)
-            recent_files = [file for _, file in files[:10]]
+            recent_files = _workspace_index(path).recent_files(10)
         except Exception:
             pass
 
@@ -237,28 +236,16 @@ class ContextEnhancementMiddleware(AgentMiddleware):
         """获取项目统计信息"""
         stats = {}
         try:
-            file_count = 0
-            total_size = 0
-            file_types = {}
-
-            for file_path in path.rglob("*"):
-                if file_path.is_file():
-                    file_count += 1
-                    try:
-                        size = file_path.stat().st_size
-                        total_size += size
-
-                        ext = file_path.suffix.lower()
-                        if ext:
-                            file_types[ext] = file_types.get(ext, 0) + 1
-                    except OSError:
-                        continue
-
+            index_stats = _workspace_index(path).stats()
             stats = {
-                "file_count": file_count,
-                "total_size_mb": round(total_size / (1024 * 1024), 2),
+                "file_count": index_stats["file_count"],
+                "total_size_mb": round(index_stats["total_size"] / (1024 * 1024), 2),
                 "file_types": dict(
-                    sorted(file_types.items(), key=lambda x: x[1], reverse=True)[:10]
+                    sorted(
+                        index_stats["file_types"].items(),
+                        key=lambda x: x[1],
+                        reverse=True,
+                    )[:10]
                 ),
             }
         except Exception:
@@ -94,6 +94,12 @@ class PerformanceCollector:
             else:
                 stats["errors"] += 1
 
+    def get_analyzer_stats(self) -> List[Dict[str, Any]]:
+        """获取各分析器（工具+语言）的耗时分布和结果事件，按总耗时排序"""
+        from ..tools.analyzer_metrics import get_analyzer_metrics
+
+        return get_analyzer_metrics().snapshot()
+
     def get_summary(self, time_window_minutes: int = 60) -> Dict[str, Any]:
         """获取性能摘要"""
         with self._lock:
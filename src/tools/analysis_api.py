@@ -0,0 +1,272 @@
+"""
+代码分析的内部类型化API
+
+@tool包装函数面向LLM，输入输出都是JSON字符串。工具之间组合时不再经过
+工具调用和JSON往返（dumps→loads→dumps），而是调用这里的普通函数：
+- analyze_defects: 静态分析+增量/基线过滤+聚合，返回DefectReport
+- aggregate: 聚合缺陷（可使用工作区的增量状态），返回AggregationReport
+- extract_defects: 从工具输入的多种JSON结构中取出缺陷列表
+
+结果对象保存分析结果、问题视图等原始对象，只在@tool包装函数中通过
+to_dict()转换并序列化一次。
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .defect_aggregator import MAX_RENDERED_CLUSTERS, DefectAggregator
+from .issue_table import FIELDS, IssueTable, IssueView
+from .multilang_code_analyzers import (AnalysisResult,
+                                       MultiLanguageAnalyzerFactory)
+
+TOOLCHAIN_VERSION = "1.0.0"
+
+
+class AnalysisError(Exception):
+    """文件无法分析（不存在、语言不支持或没有可用的分析器）"""
+
+
+@dataclass
+class AggregationReport:
+    """缺陷聚合结果"""
+
+    result: Dict[str, Any]
+    # 使用工作区增量状态时为True
+    incremental: bool = False
+
+    @property
+    def total_defects(self) -> int:
+        return self.result.get("total_defects", 0)
+
+    @property
+    def clusters(self) -> List[Dict[str, Any]]:
+        return self.result.get("clusters", [])
+
+    @property
+    def omitted_clusters(self) -> int:
+        """未输出完整内容的聚类数量"""
+        return self.result.get("omitted_clusters", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.result
+
+
+@dataclass
+class DefectReport:
+    """单个文件的缺陷分析结果"""
+
+    file_path: str
+    analysis: AnalysisResult
+    # 经过增量/基线过滤后的问题
+    issues: IssueView
+    aggregation: AggregationReport
+    incremental: Optional[Dict[str, Any]] = None
+    baseline: Optional[Dict[str, Any]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为analyze_code_defects的输出结构"""
+        analysis = self.analysis
+        return {
+            "success": True,
+            "file_path": self.file_path,
+            "analysis": {
+                "file_path": analysis.file_path,
+                "language": analysis.language,
+                "tool_name": analysis.tool_name,
+                "issues": self.issues.to_defects(),
+                "score": analysis.score,
+                "execution_time": analysis.execution_time,
+                "success": analysis.success,
+            },
+            "aggregation": self.aggregation.to_dict(),
+            "incremental": self.incremental,
+            "baseline": self.baseline,
+            "metadata": self.metadata,
+        }
+
+
+def extract_defects(data: Any) -> List[Any]:
+    """从工具输入中取出缺陷列表
+
+    支持直接的缺陷列表、{"defects_found": [...]}、{"defects": [...]}
+    以及DetectionAgent的{"analysis_results": {"analysis": {"defects_found": [...]}}}。
+
+    Raises:
+        ValueError: 输入既不是对象也不是数组
+    """
+    if isinstance(data, dict):
+        if "analysis_results" in data:
+            # 来自DetectionAgent的格式
+            return data["analysis_results"]["analysis"]["defects_found"]
+        if "defects_found" in data:
+            return data["defects_found"]
+        return data.get("defects", [])
+    if isinstance(data, list):
+        return data
+    raise ValueError("无效的输入格式，期望JSON对象或数组")
+
+
+def aggregate(
+    defects: Sequence[Any],
+    workspace: Optional[str] = None,
+    top_n: Optional[int] = MAX_RENDERED_CLUSTERS,
+    include_remaining: bool = False,
+) -> AggregationReport:
+    """聚合缺陷
+
+    Args:
+        defects: 缺陷字典列表或IssueTable/IssueView
+        workspace: 可选的工作区路径，提供时复用该工作区保存的聚类状态并在聚合后保存
+        top_n: 输出完整内容的聚类数量，None表示全部输出
+        include_remaining: 是否附带其余聚类的简要信息
+
+    Returns:
+        聚合结果
+    """
+    if workspace:
+        from .incremental_aggregator import get_incremental_aggregator
+
+        aggregator = get_incremental_aggregator(workspace)
+        with aggregator.lock:
+            result = aggregator.aggregate_defects(defects, top_n, include_remaining)
+            aggregator.save()
+        return AggregationReport(result, incremental=True)
+
+    # 字段都是标准缺陷字段时转为紧凑的列存储
+    if isinstance(defects, list):
+        standard_fields = set(FIELDS)
+        if all(isinstance(d, Mapping) and d.keys() <= standard_fields for d in defects):
+            defects = IssueTable.from_defects(defects)
+
+    return AggregationReport(
+        DefectAggregator().aggregate_defects(defects, top_n, include_remaining)
+    )
+
+
+def _filter_incremental(
+    file_path: str, issues: IssueView, base_ref: Optional[str]
+) -> Tuple[IssueView, Dict[str, Any]]:
+    """只保留git变更行范围内的问题，返回(问题, 增量信息)"""
+    from .incremental_analysis import get_file_changes, line_in_ranges
+
+    changes = get_file_changes(Path(file_path), base_ref)
+    if changes is None:
+        return issues, {"error": "无法获取git变更，已返回完整分析结果"}
+
+    total_issues = len(issues)
+    ranges = changes["ranges"]
+    issues = (
+        issues.where(lambda row: line_in_ranges(row["line"], ranges))
+        if changes["changed"]
+        else issues[:0]
+    )
+    return issues, {
+        "base_ref": changes["base_ref"],
+        "changed": changes["changed"],
+        "changed_ranges": ranges,
+        "total_issues": total_issues,
+        "filtered_out": total_issues - len(issues),
+    }
+
+
+def _filter_baseline(
+    file_path: str, issues: IssueView, update: bool
+) -> Tuple[IssueView, Dict[str, Any]]:
+    """只保留基线中没有的问题，返回(问题, 基线信息)"""
+    from .defect_baseline import MAX_FIXED_DETAILS, compare_with_baseline
+
+    comparison = compare_with_baseline(Path(file_path), issues, update=update)
+    if comparison is None:
+        return issues, {"error": "缺陷基线不可用，已返回完整分析结果"}
+
+    return issues.take(comparison["new_indices"]), {
+        "created": comparison["created"],
+        "updated": comparison["updated"],
+        "new": len(comparison["new_indices"]),
+        "fixed": len(comparison["fixed"]),
+        "unchanged": comparison["unchanged"],
+        "fixed_defects": comparison["fixed"][:MAX_FIXED_DETAILS],
+    }
+
+
+def analyze_defects(
+    file_path: str,
+    language: Optional[str] = None,
+    incremental: bool = False,
+    base_ref: Optional[str] = None,
+    baseline: bool = False,
+    update_baseline: bool = False,
+) -> DefectReport:
+    """分析单个文件的缺陷并聚合
+
+    Args:
+        file_path: 文件路径
+        language: 可选的语言标识符，默认按扩展名检测
+        incremental: 是否只保留相对git基准变更的行范围内的问题
+        base_ref: 增量模式的git基准引用
+        baseline: 是否只保留相对缺陷基线新增的问题
+        update_baseline: 比较后是否用当前结果更新基线（隐含baseline=True）
+
+    Returns:
+        缺陷分析结果
+
+    Raises:
+        AnalysisError: 文件无法分析
+    """
+    analysis = MultiLanguageAnalyzerFactory.analyze_file(file_path, language)
+    if analysis is None:
+        raise AnalysisError(f"Cannot analyze file: {file_path}")
+
+    # 问题以列存储保存，聚合直接读取行视图，只在输出时生成字典
+    issues = IssueTable.from_results([analysis]).view()
+
+    # 基线按文件的全部问题比较和更新，增量过滤只作用于输出的新增问题，
+    # 否则变更范围外未变化的问题会被当作已修复，并从基线中丢失
+    baseline_info = None
+    if (baseline or update_baseline) and not analysis.success:
+        # 分析失败时问题列表为空，比较会把基线中的问题全部当作已修复
+        baseline_info = {"error": f"分析未成功，未与缺陷基线比较: {analysis.error}"}
+    elif baseline or update_baseline:
+        issues, baseline_info = _filter_baseline(file_path, issues, update_baseline)
+
+    incremental_info = None
+    if incremental or base_ref:
+        issues, incremental_info = _filter_incremental(file_path, issues, base_ref)
+
+    if len(issues):
+        try:
+            aggregation = aggregate(issues)
+        except Exception:
+            # 聚合失败时返回基础分析结果
+            aggregation = AggregationReport(
+                {
+                    "total_defects": len(issues),
+                    "clusters": [],
+                    "recommendations": ["缺陷聚合失败，请查看原始分析结果"],
+                }
+            )
+    else:
+        aggregation = AggregationReport(
+            {
+                "total_defects": 0,
+                "clusters": [],
+                "recommendations": ["代码质量良好，未发现需要修复的缺陷"],
+            }
+        )
+
+    return DefectReport(
+        file_path=file_path,
+        analysis=analysis,
+        issues=issues,
+        aggregation=aggregation,
+        incremental=incremental_info,
+        baseline=baseline_info,
+        metadata={
+            "analysis_timestamp": analysis.metadata.get("aggregation_timestamp", ""),
+            "toolchain_version": TOOLCHAIN_VERSION,
+            "language_detected": analysis.language,
+        },
+    )
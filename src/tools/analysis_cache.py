@@ -0,0 +1,375 @@
+"""
+代码分析结果缓存模块
+
+为BaseCodeAnalyzer.analyze提供持久化的结果缓存：
+- 缓存存放在 ~/.deepagents/<agent>/cache/ 下的SQLite数据库中
+- 缓存键由文件路径、文件内容哈希、工具名称、工具版本和分析器选项共同决定
+- 按最近访问时间进行LRU淘汰，同时限制条目数量和总大小
+- 记录命中/未命中/淘汰计数，便于观察缓存效果
+- 支持在一个事务中批量读写，供复杂度分析等按文件批量查询的调用方使用
+- 文件内容哈希按修改时间和大小在进程内记忆，工作区监视器报告变化时丢弃
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from .multilang_code_analyzers import AnalysisIssue, AnalysisResult
+
+# 默认缓存限制
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 缓存格式版本，结构变化时递增以废弃旧数据
+CACHE_SCHEMA_VERSION = 1
+
+# 进程内记忆的内容哈希数量上限
+MAX_MEMOIZED_HASHES = 20000
+
+# 修改时间距今不足该值（纳秒）的文件不记忆哈希
+_HASH_MEMO_MIN_AGE_NS = 2 * 10**9
+
+_current_agent_id: Optional[str] = None
+
+_content_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_content_hashes_lock = threading.Lock()
+
+
+def set_cache_agent(assistant_id: str) -> None:
+    """设置当前代理ID，缓存目录将位于 ~/.deepagents/<assistant_id>/cache/"""
+    global _current_agent_id, _default_cache
+    with _default_cache_lock:
+        if assistant_id == _current_agent_id:
+            return
+        _current_agent_id = assistant_id
+        # 切换代理后关闭旧缓存的连接，下次使用时打开对应目录下的缓存
+        previous, _default_cache = _default_cache, None
+        if previous is not None:
+            previous.close()
+
+
+def get_agent_cache_dir(*parts: str) -> Path:
+    """获取当前代理的缓存目录（不存在时自动创建）"""
+    assistant_id = _current_agent_id or os.getenv("ASSISTANT_ID") or "agent"
+    cache_dir = Path.home() / ".deepagents" / assistant_id / "cache"
+    cache_dir = cache_dir.joinpath(*parts)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def hash_file_content(file_path: Path) -> str:
+    """计算文件内容的SHA-256哈希
+
+    结果按(修改时间, 大小)在进程内记忆，文件未变化时不再重新读取；
+    刚修改不久的文件不记忆，避免同一时间粒度内的再次修改被漏掉。
+    """
+    stat_info = os.stat(file_path)
+    signature = (stat_info.st_mtime_ns, stat_info.st_size)
+    memo_key = os.path.abspath(file_path)
+    with _content_hashes_lock:
+        memo = _content_hashes.get(memo_key)
+    if memo is not None and memo[0] == signature:
+        return memo[1]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    if time.time_ns() - stat_info.st_mtime_ns > _HASH_MEMO_MIN_AGE_NS:
+        with _content_hashes_lock:
+            if len(_content_hashes) >= MAX_MEMOIZED_HASHES:
+                _content_hashes.clear()
+            _content_hashes[memo_key] = (signature, content_hash)
+    return content_hash
+
+
+def forget_content_hashes(paths: Iterable[Union[str, Path]]) -> None:
+    """丢弃文件的内容哈希记忆（由工作区监视器在文件变化时调用）"""
+    with _content_hashes_lock:
+        for path in paths:
+            _content_hashes.pop(os.path.abspath(path), None)
+
+
+def build_cache_key(
+    file_path: Path, content_hash: str, tool: str, version: str, options: Dict
+) -> str:
+    """构建缓存键
+
+    除内容哈希外还包含文件路径：pylint等工具的结果依赖模块名、相对导入和
+    向上查找的项目配置，同样内容放在不同位置可能得到不同的结果。
+    """
+    payload = json.dumps(
+        {
+            "schema": CACHE_SCHEMA_VERSION,
+            "path": str(file_path),
+            "content": content_hash,
+            "tool": tool,
+            "version": version,
+            "options": options,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def result_to_dict(result: AnalysisResult) -> Dict[str, Any]:
+    """将AnalysisResult序列化为字典"""
+    return asdict(result)
+
+
+def result_from_dict(data: Dict[str, Any]) -> AnalysisResult:
+    """从字典还原AnalysisResult"""
+    data = dict(data)
+    data["issues"] = [AnalysisIssue(**issue) for issue in data.get("issues", [])]
+    return AnalysisResult(**data)
+
+
+class AnalysisCache:
+    """基于SQLite的分析结果缓存"""
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """
+        Args:
+            db_path: 数据库文件路径，默认位于当前代理的缓存目录
+            max_entries: 最多保留的缓存条目数
+            max_bytes: 缓存数据的最大总字节数
+        """
+        self.db_path = (
+            Path(db_path) if db_path else get_agent_cache_dir() / "analysis.db"
+        )
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_cache_access "
+            "ON analysis_cache(last_access)"
+        )
+        self._conn.commit()
+
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存数据，未命中返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE analysis_cache SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            return None
+
+    def put(self, key: str, payload: Dict[str, Any], tool: str = "") -> None:
+        """写入缓存数据，超出限制时按LRU淘汰"""
+        data = json.dumps(payload, ensure_ascii=False, default=str)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache "
+                "(key, tool, payload, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool, data, size, now, now),
+            )
+            if old:
+                self._bytes += size - old[0]
+            else:
+                self._entries += 1
+                self._bytes += size
+
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """批量读取缓存数据，返回命中的 键 -> 数据（在一个事务中完成）"""
+        keys = list(dict.fromkeys(keys))
+        rows = []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(
+                    self._conn.execute(
+                        "SELECT key, payload FROM analysis_cache "
+                        f"WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+            if rows:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE analysis_cache SET last_access = ? WHERE key = ?",
+                    [(now, key) for key, _ in rows],
+                )
+                self._conn.commit()
+            self.hits += len(rows)
+            self.misses += len(keys) - len(rows)
+
+        found = {}
+        for key, payload in rows:
+            try:
+                found[key] = json.loads(payload)
+            except json.JSONDecodeError:
+                continue
+        return found
+
+    def put_many(self, payloads: Dict[str, Any], tool: str = "") -> None:
+        """批量写入缓存数据（在一个事务中完成），超出限制时按LRU淘汰"""
+        now = time.time()
+        rows = []
+        for key, payload in payloads.items():
+            data = json.dumps(payload, ensure_ascii=False, default=str)
+            rows.append((key, tool, data, len(data.encode("utf-8")), now, now))
+
+        with self._lock:
+            for row in rows:
+                old = self._conn.execute(
+                    "SELECT size FROM analysis_cache WHERE key = ?", (row[0],)
+                ).fetchone()
+                if old:
+                    self._bytes -= old[0]
+                else:
+                    self._entries += 1
+                self._bytes += row[3]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analysis_cache "
+                "(key, tool, payload, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰条目，直到降至限制的90%以下"""
+        target_entries = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM analysis_cache ORDER BY last_access ASC"
+        ).fetchall()
+        to_delete = []
+        entries, total = self._entries, self._bytes
+        for key, size in rows:
+            if entries <= target_entries and total <= target_bytes:
+                break
+            to_delete.append((key,))
+            entries -= 1
+            total -= size
+
+        self._conn.executemany("DELETE FROM analysis_cache WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+        self._entries, self._bytes = entries, total
+
+    def get_result(self, key: str) -> Optional[AnalysisResult]:
+        """读取缓存的AnalysisResult"""
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            return result_from_dict(data)
+        except TypeError:
+            return None
+
+    def put_result(self, key: str, result: AnalysisResult) -> None:
+        """缓存AnalysisResult"""
+        self.put(key, result_to_dict(result), tool=result.tool_name)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+            self._entries, self._bytes = 0, 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            "db_path": str(self.db_path),
+            "entries": self._entries,
+            "size_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[AnalysisCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """获取全局分析缓存实例，缓存不可用时返回None"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = AnalysisCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return _default_cache
@@ -0,0 +1,161 @@
+"""
+分析器耗时与结果统计
+
+按(工具, 语言)记录每次分析的各阶段耗时分布和结果事件，用于找出在项目上占用
+墙钟时间最多的linter：
+- spawn: 常驻工作进程的启动耗时（冷启动）
+- run: 分析命令的运行耗时（一次性子进程包含解释器启动）
+- parse: 工具输出的解析耗时
+- total: 单个文件的总分析耗时（批量分析时按文件平均分摊）
+- issues: 单个文件的问题数量
+- 事件计数: 分析次数、缓存命中、超时、错误、降级等
+
+直方图使用固定的桶边界，记录开销恒定，不保存原始样本。
+通过get_analyzer_metrics()获取进程内共享的统计实例，
+PerformanceCollector.get_analyzer_stats()和CLI的 /perf analyzers 从这里读取数据。
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 耗时直方图的桶上界（秒）
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 问题数量直方图的桶上界
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# 记录的阶段及其使用的桶边界
+PHASES = {
+    "spawn": TIME_BUCKETS,
+    "run": TIME_BUCKETS,
+    "parse": TIME_BUCKETS,
+    "total": TIME_BUCKETS,
+    "issues": COUNT_BUCKETS,
+}
+
+# 记录的事件
+EVENTS = ("files", "cache_hits", "timeouts", "errors", "fallbacks")
+
+
+class Histogram:
+    """固定桶边界的直方图"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        # 最后一个桶收集超过所有上界的值
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """估算分位数（返回所在桶的上界，落在溢出桶时返回最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "buckets": {
+                **{
+                    f"le_{bound:g}": count
+                    for bound, count in zip(self.bounds, self.counts)
+                },
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class _AnalyzerStats:
+    """单个(工具, 语言)的统计"""
+
+    __slots__ = ("histograms", "events")
+
+    def __init__(self):
+        self.histograms = {phase: Histogram(bounds) for phase, bounds in PHASES.items()}
+        self.events = dict.fromkeys(EVENTS, 0)
+
+
+class AnalyzerMetrics:
+    """线程安全的分析器统计注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], _AnalyzerStats] = {}
+
+    def _get(self, tool: str, language: str) -> _AnalyzerStats:
+        key = (tool or "unknown", language or "unknown")
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _AnalyzerStats()
+        return stats
+
+    def observe(self, tool: str, language: str, phase: str, value: float) -> None:
+        """记录一个阶段的观测值（耗时为秒，issues为问题数）"""
+        with self._lock:
+            self._get(tool, language).histograms[phase].observe(value)
+
+    def increment(self, tool: str, language: str, event: str, count: int = 1) -> None:
+        """累加事件计数"""
+        with self._lock:
+            events = self._get(tool, language).events
+            events[event] = events.get(event, 0) + count
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """导出全部统计，按总耗时从高到低排序"""
+        with self._lock:
+            rows = [
+                {
+                    "tool": tool,
+                    "language": language,
+                    "events": dict(stats.events),
+                    **{
+                        phase: histogram.to_dict()
+                        for phase, histogram in stats.histograms.items()
+                    },
+                }
+                for (tool, language), stats in self._stats.items()
+            ]
+        rows.sort(
+            key=lambda row: row["total"]["sum"] + row["spawn"]["sum"], reverse=True
+        )
+        return rows
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+_metrics = AnalyzerMetrics()
+
+
+def get_analyzer_metrics() -> AnalyzerMetrics:
+    """获取进程内共享的分析器统计实例"""
+    return _metrics
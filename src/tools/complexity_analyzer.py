@@ -0,0 +1,805 @@
+"""
+代码复杂度分析引擎
+
+为analyze_code_complexity提供逐函数的复杂度度量，替代按行匹配关键字子串的估算：
+- Python基于ast计算每个函数的圈复杂度（McCabe）和认知复杂度（SonarSource规则），
+  elif、else、布尔运算序列和递归调用分别计分，标识符中的if/for等子串不再计入
+- 花括号语言（JavaScript/TypeScript/Java/C/C++/Go/Rust）先剔除注释和字符串字面量，
+  在词法单元上统计分支关键字和逻辑运算符，按花括号跟踪函数边界和嵌套层级
+- 多文件分析在进程池上并行执行，少量文件直接在当前进程完成
+- 结果按文件内容哈希缓存：进程内记忆一份，并批量写入代理缓存目录下单独的
+  complexity.db，不挤占lint结果缓存的容量，后续会话直接复用
+
+工作进程只返回简单的元组，避免在进程间传递复杂对象。
+"""
+
+import ast
+import bisect
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 引擎版本，计分规则变化时递增以使缓存的结果失效
+ENGINE_VERSION = "1"
+
+# 少于该数量的文件直接在当前进程分析，避免进程池启动开销
+MIN_PARALLEL_FILES = 16
+
+# 进程内记忆的分析结果数量上限
+MAX_MEMOIZED_RESULTS = 20000
+
+# 持久化缓存的条目上限（结果很小，按每个文件一条预留到大型仓库的规模）
+MAX_CACHED_RESULTS = 200000
+
+# 函数复杂度阈值，超过时视为需要重构
+CYCLOMATIC_THRESHOLD = 10
+COGNITIVE_THRESHOLD = 15
+
+# 超过该行数的文件视为过大
+LARGE_FILE_LINES = 500
+
+# 超过该大小的文件通常是打包、压缩或生成的产物（bundle、搜索索引等），不做分析
+MAX_SOURCE_BYTES = 1024 * 1024
+
+# 扩展名 -> 分析使用的语言
+EXTENSION_LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".java": "java",
+    ".c": "c",
+    ".h": "c",
+    ".cpp": "cpp",
+    ".cc": "cpp",
+    ".cxx": "cpp",
+    ".hpp": "cpp",
+    ".go": "go",
+    ".rs": "rust",
+}
+
+SUPPORTED_EXTENSIONS = tuple(EXTENSION_LANGUAGES)
+
+
+class FunctionComplexity(NamedTuple):
+    """单个函数的复杂度"""
+
+    name: str
+    line: int
+    cyclomatic: int
+    cognitive: int
+
+
+class FileComplexity(NamedTuple):
+    """单个文件的复杂度
+
+    cyclomatic和cognitive为文件合计：各函数之和加上函数外代码的分支。
+    """
+
+    lines: int
+    classes: int
+    functions: Tuple[FunctionComplexity, ...]
+    cyclomatic: int
+    cognitive: int
+    error: Optional[str] = None
+
+    @property
+    def max_cyclomatic(self) -> int:
+        return max((f.cyclomatic for f in self.functions), default=0)
+
+    @property
+    def max_cognitive(self) -> int:
+        return max((f.cognitive for f in self.functions), default=0)
+
+    def to_payload(self) -> list:
+        """转换为可JSON序列化的列表（用于持久化缓存）"""
+        return [
+            self.lines,
+            self.classes,
+            [list(f) for f in self.functions],
+            self.cyclomatic,
+            self.cognitive,
+            self.error,
+        ]
+
+    @classmethod
+    def from_payload(cls, payload: list) -> "FileComplexity":
+        lines, classes, functions, cyclomatic, cognitive, error = payload
+        return cls(
+            lines,
+            classes,
+            tuple(FunctionComplexity(*f) for f in functions),
+            cyclomatic,
+            cognitive,
+            error,
+        )
+
+
+def language_for(file_path: Union[str, Path]) -> Optional[str]:
+    """根据扩展名获取分析语言，不支持时返回None"""
+    return EXTENSION_LANGUAGES.get(os.path.splitext(str(file_path))[1].lower())
+
+
+# ---------------------------------------------------------------------------
+# Python
+# ---------------------------------------------------------------------------
+
+
+class _Frame:
+    """正在统计的函数（或模块顶层）"""
+
+    __slots__ = ("name", "line", "cyclomatic", "cognitive", "nesting")
+
+    def __init__(self, name: str, line: int, cyclomatic: int):
+        self.name = name
+        self.line = line
+        self.cyclomatic = cyclomatic
+        self.cognitive = 0
+        self.nesting = 0
+
+    def result(self) -> FunctionComplexity:
+        return FunctionComplexity(self.name, self.line, self.cyclomatic, self.cognitive)
+
+
+class _PythonComplexity(ast.NodeVisitor):
+    """在语法树上计算每个函数的复杂度
+
+    嵌套函数单独统计，不计入外层函数；lambda计入所在函数并增加嵌套层级。
+    """
+
+    def __init__(self):
+        self.functions: List[FunctionComplexity] = []
+        self.classes = 0
+        self.module = _Frame("<module>", 0, 0)
+        self._frame = self.module
+        self._names: List[str] = []
+
+    def _nested(self, nodes) -> None:
+        self._frame.nesting += 1
+        for node in nodes:
+            self.visit(node)
+        self._frame.nesting -= 1
+
+    def _structure(self) -> None:
+        """分支结构：圈复杂度+1，认知复杂度+1并按嵌套层级加分"""
+        self._frame.cyclomatic += 1
+        self._frame.cognitive += 1 + self._frame.nesting
+
+    def visit_FunctionDef(self, node) -> None:
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+
+        outer = self._frame
+        self._names.append(node.name)
+        self._frame = _Frame(".".join(self._names), node.lineno, 1)
+        for statement in node.body:
+            self.visit(statement)
+        self.functions.append(self._frame.result())
+        self._names.pop()
+        self._frame = outer
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes += 1
+        self._names.append(node.name)
+        self.generic_visit(node)
+        self._names.pop()
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self._nested([node.args, node.body])
+
+    def visit_If(self, node: ast.If, is_elif: bool = False) -> None:
+        if is_elif:
+            self._frame.cyclomatic += 1
+            self._frame.cognitive += 1
+        else:
+            self._structure()
+        self.visit(node.test)
+        self._nested(node.body)
+
+        orelse = node.orelse
+        if (
+            len(orelse) == 1
+            and isinstance(orelse[0], ast.If)
+            and orelse[0].col_offset == node.col_offset
+        ):
+            self.visit_If(orelse[0], is_elif=True)
+        elif orelse:
+            self._frame.cognitive += 1
+            self._nested(orelse)
+
+    def _visit_loop(self, node, header) -> None:
+        self._structure()
+        for child in header:
+            self.visit(child)
+        self._nested(node.body)
+        if node.orelse:
+            self._frame.cognitive += 1
+            self._nested(node.orelse)
+
+    def visit_For(self, node) -> None:
+        self._visit_loop(node, [node.target, node.iter])
+
+    visit_AsyncFor = visit_For
+
+    def visit_While(self, node: ast.While) -> None:
+        self._visit_loop(node, [node.test])
+
+    def visit_Try(self, node) -> None:
+        for statement in node.body:
+            self.visit(statement)
+        for handler in node.handlers:
+            self._structure()
+            if handler.type is not None:
+                self.visit(handler.type)
+            self._nested(handler.body)
+        for statement in node.orelse + node.finalbody:
+            self.visit(statement)
+
+    visit_TryStar = visit_Try
+
+    def visit_IfExp(self, node: ast.IfExp) -> None:
+        self._structure()
+        self.visit(node.test)
+        self._nested([node.body, node.orelse])
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        self._frame.cyclomatic += len(node.values) - 1
+        self._frame.cognitive += 1
+        self.generic_visit(node)
+
+    def visit_comprehension(self, node: ast.comprehension) -> None:
+        self._frame.cyclomatic += 1 + len(node.ifs)
+        self._frame.cognitive += 1 + len(node.ifs)
+        self.generic_visit(node)
+
+    def visit_Match(self, node) -> None:
+        self._frame.cognitive += 1 + self._frame.nesting
+        self.visit(node.subject)
+        for case in node.cases:
+            self._frame.cyclomatic += 1
+            if case.guard is not None:
+                self.visit(case.guard)
+            self._nested(case.body)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if self._names and self._frame is not self.module:
+            name = self._frame.name.rpartition(".")[2]
+            func = node.func
+            if (isinstance(func, ast.Name) and func.id == name) or (
+                isinstance(func, ast.Attribute)
+                and func.attr == name
+                and isinstance(func.value, ast.Name)
+                and func.value.id in ("self", "cls")
+            ):
+                self._frame.cognitive += 1
+        self.generic_visit(node)
+
+
+def _count_lines(source: str) -> int:
+    return len(source.splitlines())
+
+
+def analyze_python_source(source: str) -> FileComplexity:
+    """计算Python源码的复杂度"""
+    lines = _count_lines(source)
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return FileComplexity(lines, 0, (), 0, 0, f"{type(e).__name__}: {e}")
+
+    visitor = _PythonComplexity()
+    visitor.visit(tree)
+    functions = tuple(sorted(visitor.functions, key=lambda f: f.line))
+    return FileComplexity(
+        lines,
+        visitor.classes,
+        functions,
+        visitor.module.cyclomatic + sum(f.cyclomatic for f in functions),
+        visitor.module.cognitive + sum(f.cognitive for f in functions),
+    )
+
+
+# ---------------------------------------------------------------------------
+# 花括号语言
+# ---------------------------------------------------------------------------
+
+_TOKEN_TEMPLATE = r"""
+    (?P<skip>//[^\n]*|/\*.*?\*/|\s+{preprocessor})
+    |(?P<string>"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`|{char})
+    |(?P<name>[A-Za-z_$][\w$]*)
+    |(?P<number>\d[\w.]*)
+    |(?P<op>&&|\|\||\?\?|\?\.|=>|->|::|==|!=|<=|>=|.)
+"""
+
+# 单引号：Rust中还用于生命周期标注，只把单个字符当作字面量
+_QUOTED_CHARS = r"'(?:\\.|[^'\\\n])*'"
+_RUST_CHAR = r"'(?:\\[^'\n]*|[^'\\\n])'"
+
+
+def _token_pattern(char: str, preprocessor: bool = False) -> "re.Pattern[str]":
+    return re.compile(
+        _TOKEN_TEMPLATE.format(
+            char=char, preprocessor=r"|^[ \t]*\#[^\n]*" if preprocessor else ""
+        ),
+        re.VERBOSE | re.DOTALL | re.MULTILINE,
+    )
+
+
+class _BraceLanguage(NamedTuple):
+    """花括号语言的计分规则"""
+
+    pattern: "re.Pattern[str]"
+    # 圈复杂度+1的分支关键字（case之外的关键字同时按嵌套计认知复杂度并开启嵌套块）
+    branches: frozenset
+    # 只在认知复杂度中计分的多分支结构（switch/match/select）
+    selections: frozenset
+    # 引出函数定义的关键字
+    function_keywords: frozenset
+    # 是否把“名称(参数) {”识别为函数定义
+    c_style_functions: bool
+    # 引出lambda的箭头（后跟花括号时视为函数）
+    lambda_arrow: Optional[str]
+    # 是否支持?:三元运算符
+    ternary: bool
+    # 是否由箭头表示match分支
+    arm_arrow: bool
+    # 分号是否结束不带花括号的控制结构（Go中if x := f(); x > 0 {合法）
+    semicolon_ends_control: bool
+
+
+_C_LIKE_BRANCHES = frozenset({"if", "for", "while", "do", "case", "catch"})
+_C_PATTERN = _token_pattern(_QUOTED_CHARS)
+
+_BRACE_LANGUAGES = {
+    "javascript": _BraceLanguage(
+        pattern=_C_PATTERN,
+        branches=_C_LIKE_BRANCHES,
+        selections=frozenset({"switch"}),
+        function_keywords=frozenset({"function"}),
+        c_style_functions=True,
+        lambda_arrow="=>",
+        ternary=True,
+        arm_arrow=False,
+        semicolon_ends_control=True,
+    ),
+    "java": _BraceLanguage(
+        pattern=_C_PATTERN,
+        branches=_C_LIKE_BRANCHES,
+        selections=frozenset({"switch"}),
+        function_keywords=frozenset(),
+        c_style_functions=True,
+        lambda_arrow="->",
+        ternary=True,
+        arm_arrow=False,
+        semicolon_ends_control=True,
+    ),
+    "c": _BraceLanguage(
+        pattern=_token_pattern(_QUOTED_CHARS, preprocessor=True),
+        branches=_C_LIKE_BRANCHES,
+        selections=frozenset({"switch"}),
+        function_keywords=frozenset(),
+        c_style_functions=True,
+        lambda_arrow=None,
+        ternary=True,
+        arm_arrow=False,
+        semicolon_ends_control=True,
+    ),
+    "go": _BraceLanguage(
+        pattern=_C_PATTERN,
+        branches=frozenset({"if", "for", "case"}),
+        selections=frozenset({"switch", "select"}),
+        function_keywords=frozenset({"func"}),
+        c_style_functions=False,
+        lambda_arrow=None,
+        ternary=False,
+        arm_arrow=False,
+        semicolon_ends_control=False,
+    ),
+    "rust": _BraceLanguage(
+        pattern=_token_pattern(_RUST_CHAR),
+        branches=frozenset({"if", "for", "while", "loop"}),
+        selections=frozenset({"match"}),
+        function_keywords=frozenset({"fn"}),
+        c_style_functions=False,
+        lambda_arrow=None,
+        ternary=False,
+        arm_arrow=True,
+        semicolon_ends_control=True,
+    ),
+}
+_BRACE_LANGUAGES["typescript"] = _BRACE_LANGUAGES["javascript"]
+_BRACE_LANGUAGES["cpp"] = _BRACE_LANGUAGES["c"]
+
+# 带括号出现但不是函数调用/定义的关键字
+_NOT_CALLABLE = frozenset(
+    {
+        "if",
+        "for",
+        "while",
+        "switch",
+        "catch",
+        "return",
+        "sizeof",
+        "typeof",
+        "await",
+        "throw",
+        "synchronized",
+        "using",
+        "elif",
+        "else",
+        "do",
+        "try",
+        "case",
+        "new",
+        "delete",
+        "in",
+        "of",
+        "void",
+        "yield",
+    }
+)
+
+# 引出类型定义的关键字（花括号体计为一个类）
+_CLASS_KEYWORDS = frozenset({"class", "interface", "struct", "trait"})
+
+# 三元运算符的?之后不会出现的记号（排除可选参数x?: T、x?)等写法）
+_NOT_TERNARY_FOLLOWERS = frozenset({":", ")", ",", "=", ";", "]"})
+
+# 块类型
+_BLOCK_OTHER, _BLOCK_CONTROL, _BLOCK_FUNCTION, _BLOCK_CLASS, _BLOCK_DO = range(5)
+
+
+def analyze_brace_source(source: str, language: str) -> FileComplexity:
+    """在词法单元上计算花括号语言源码的复杂度"""
+    rules = _BRACE_LANGUAGES[language]
+    line_starts = [0] + [m.end() for m in re.finditer("\n", source)]
+    tokens = [
+        (m.lastgroup, m.group(), m.start())
+        for m in rules.pattern.finditer(source)
+        if m.lastgroup != "skip"
+    ]
+
+    module = _Frame("<module>", 0, 0)
+    frame = module
+    functions: List[FunctionComplexity] = []
+    classes = 0
+    # 块栈: (块类型, 块结束时恢复的外层帧)
+    blocks: List[Tuple[int, _Frame]] = []
+    names: List[str] = []
+
+    depth = 0
+    pending_control: Optional[int] = None
+    pending_function: Optional[Tuple[int, Optional[str]]] = None
+    pending_class: Optional[Tuple[int, str]] = None
+    # 待定函数的形参列表是否已经开始
+    in_signature = False
+    pending_case = False
+    call_name: Dict[int, str] = {}
+    assigned: Optional[str] = None
+    last_logical: Optional[str] = None
+    after_do = False
+    # Rust的impl Trait for Type中的for不是循环
+    in_impl = False
+    previous: Tuple[Optional[str], str] = (None, "")
+
+    for i, (kind, text, offset) in enumerate(tokens):
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+
+        if kind == "name":
+            if text == "while" and after_do:
+                after_do = False
+            elif text == "case" and text in rules.branches:
+                frame.cyclomatic += 1
+                pending_case = True
+            elif text == "for" and in_impl:
+                pass
+            elif text in rules.branches:
+                is_else_if = text == "if" and previous[1] == "else"
+                frame.cyclomatic += 1
+                frame.cognitive += 1 if is_else_if else 1 + frame.nesting
+                pending_control = depth
+            elif text == "impl":
+                in_impl = True
+            elif text in rules.selections:
+                frame.cognitive += 1 + frame.nesting
+                pending_control = depth
+            elif text == "else":
+                if following != "if":
+                    frame.cognitive += 1
+                pending_control = depth
+            elif text == "default":
+                pending_case = True
+            elif text in rules.function_keywords:
+                pending_function = (depth, None)
+                pending_control = None
+                in_signature = False
+            elif text in _CLASS_KEYWORDS and following[:1].isidentifier():
+                pending_class = (depth, following)
+            elif pending_function is not None and pending_function[1] is None:
+                if pending_function[0] == depth:
+                    pending_function = (depth, text)
+                    in_signature = False
+            after_do = False
+        elif kind == "op":
+            if text == "(":
+                if (
+                    rules.c_style_functions
+                    and previous[0] == "name"
+                    and previous[1] not in _NOT_CALLABLE
+                ):
+                    call_name[depth] = previous[1]
+                if pending_function is not None and pending_function[0] == depth:
+                    in_signature = True
+                depth += 1
+            elif text == ")":
+                depth = max(depth - 1, 0)
+                name = call_name.pop(depth, None)
+                if pending_function is not None and pending_function[0] > depth:
+                    pending_function = None
+                if (
+                    name is not None
+                    and pending_function is None
+                    and pending_control != depth
+                ):
+                    pending_function = (depth, name)
+                    in_signature = True
+            elif text == "{":
+                if pending_control == depth:
+                    block = _BLOCK_DO if previous[1] == "do" else _BLOCK_CONTROL
+                    blocks.append((block, frame))
+                    frame.nesting += 1
+                elif pending_function is not None and pending_function[0] == depth:
+                    outer = frame
+                    name = pending_function[1] or assigned or "<lambda>"
+                    names.append(name)
+                    line = bisect.bisect_right(line_starts, offset)
+                    frame = _Frame(".".join(names), line, 1)
+                    blocks.append((_BLOCK_FUNCTION, outer))
+                elif pending_class is not None and pending_class[0] == depth:
+                    classes += 1
+                    names.append(pending_class[1])
+                    blocks.append((_BLOCK_CLASS, frame))
+                else:
+                    blocks.append((_BLOCK_OTHER, frame))
+                pending_control = pending_function = pending_class = None
+                assigned = last_logical = None
+                in_impl = False
+            elif text == "}":
+                if blocks:
+                    block, outer = blocks.pop()
+                    if block == _BLOCK_FUNCTION:
+                        functions.append(frame.result())
+                        names.pop()
+                        frame = outer
+                    elif block == _BLOCK_CLASS:
+                        names.pop()
+                    elif block in (_BLOCK_CONTROL, _BLOCK_DO):
+                        frame.nesting -= 1
+                    after_do = block == _BLOCK_DO
+                pending_function = pending_class = None
+                assigned = last_logical = None
+            elif text == ";":
+                if rules.semicolon_ends_control and pending_control == depth:
+                    pending_control = None
+                if pending_function is not None and pending_function[0] == depth:
+                    pending_function = None
+                pending_class = None
+                assigned = last_logical = None
+                in_impl = False
+            elif text in ("&&", "||"):
+                frame.cyclomatic += 1
+                if text != last_logical:
+                    frame.cognitive += 1
+                last_logical = text
+            elif text == "?":
+                if rules.ternary and following not in _NOT_TERNARY_FOLLOWERS:
+                    frame.cyclomatic += 1
+                    frame.cognitive += 1 + frame.nesting
+            elif text == "=>" and rules.arm_arrow:
+                frame.cyclomatic += 1
+            elif text == rules.lambda_arrow:
+                if pending_case:
+                    pending_case = False
+                elif following == "{":
+                    pending_function = (depth, None)
+            elif text in ("=", ":"):
+                if text == ":":
+                    pending_case = False
+                if previous[0] == "name":
+                    assigned = previous[1]
+                if text == "=":
+                    pending_class = None
+                    if pending_function is not None and pending_function[1]:
+                        pending_function = None
+            elif text in (".", "?."):
+                # 名称之后、形参列表之前的点号，或紧跟在括号后的点号（调用链f(x).g）
+                # 说明不是函数定义；形参类型和返回类型中的限定名（如Go的
+                # http.Request、*pkg.T）不影响
+                if (
+                    pending_function is not None
+                    and pending_function[1]
+                    and pending_function[0] == depth
+                    and (previous[1] == ")" or not in_signature)
+                ):
+                    pending_function = None
+            elif text == ",":
+                assigned = None
+        previous = (kind, text)
+
+    while blocks:
+        block, outer = blocks.pop()
+        if block == _BLOCK_FUNCTION:
+            functions.append(frame.result())
+            frame = outer
+
+    functions.sort(key=lambda f: f.line)
+    return FileComplexity(
+        _count_lines(source),
+        classes,
+        tuple(functions),
+        module.cyclomatic + sum(f.cyclomatic for f in functions),
+        module.cognitive + sum(f.cognitive for f in functions),
+    )
+
+
+# ---------------------------------------------------------------------------
+# 多文件分析
+# ---------------------------------------------------------------------------
+
+
+def analyze_source(source: str, language: str) -> FileComplexity:
+    """计算源码的复杂度"""
+    if language == "python":
+        return analyze_python_source(source)
+    return analyze_brace_source(source, language)
+
+
+def _analyze_file_worker(args: Tuple[str, str]) -> Tuple[str, FileComplexity]:
+    """工作进程入口：分析单个文件，返回(内容哈希, 结果)
+
+    哈希按实际分析的内容计算，文件在查询缓存后被修改时结果不会记到旧内容下。
+    """
+    file_path, language = args
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return "", FileComplexity(0, 0, (), 0, 0, f"{type(e).__name__}: {e}")
+    source = data.decode("utf-8", errors="replace")
+    return hashlib.sha256(data).hexdigest(), analyze_source(source, language)
+
+
+_memo: Dict[str, FileComplexity] = {}
+_memo_lock = threading.Lock()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """获取共享的复杂度分析进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_complexity_cache():
+    """获取复杂度结果的持久化缓存，缓存不可用时返回None"""
+    global _cache
+    from .analysis_cache import AnalysisCache, get_agent_cache_dir
+
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = AnalysisCache(
+                    db_path=get_agent_cache_dir() / "complexity.db",
+                    max_entries=MAX_CACHED_RESULTS,
+                )
+            except (OSError, sqlite3.Error):
+                return None
+        return _cache
+
+
+def _cache_key(content_hash: str, language: str) -> str:
+    return f"complexity:{ENGINE_VERSION}:{language}:{content_hash}"
+
+
+def _run(tasks: List[Tuple[str, str]]) -> List[Tuple[str, FileComplexity]]:
+    """在进程池上分析文件，进程池不可用时退回当前进程"""
+    global _pool
+    if len(tasks) >= MIN_PARALLEL_FILES:
+        pool = _get_pool()
+        chunksize = max(1, len(tasks) // ((os.cpu_count() or 1) * 4))
+        try:
+            return list(pool.map(_analyze_file_worker, tasks, chunksize=chunksize))
+        except (OSError, BrokenProcessPool):
+            with _pool_lock:
+                _pool = None
+    return [_analyze_file_worker(task) for task in tasks]
+
+
+def analyze_files(
+    file_paths: Sequence[Union[str, Path]], use_cache: bool = True
+) -> Dict[str, FileComplexity]:
+    """分析多个文件的复杂度，返回 路径 -> FileComplexity
+
+    不支持的扩展名会被跳过。内容未变化的文件直接使用进程内记忆或持久化缓存。
+    """
+    from .analysis_cache import hash_file_content
+
+    results: Dict[str, FileComplexity] = {}
+    pending: Dict[str, Tuple[str, str]] = {}
+    for file_path in file_paths:
+        path = str(file_path)
+        language = language_for(path)
+        if language is None:
+            continue
+        if not use_cache:
+            pending[path] = ("", language)
+            continue
+        try:
+            key = _cache_key(hash_file_content(Path(path)), language)
+        except OSError:
+            key = ""
+        with _memo_lock:
+            memo = _memo.get(key)
+        if memo is not None:
+            results[path] = memo
+        else:
+            pending[path] = (key, language)
+
+    cache = get_complexity_cache() if use_cache and pending else None
+    if cache is not None:
+        stored = cache.get_many([key for key, _ in pending.values() if key])
+        for path, (key, _) in list(pending.items()):
+            payload = stored.get(key)
+            if payload is None:
+                continue
+            try:
+                results[path] = FileComplexity.from_payload(payload)
+            except (TypeError, ValueError):
+                continue
+            del pending[path]
+            _remember(key, results[path])
+
+    tasks = [(path, language) for path, (_, language) in pending.items()]
+    computed = {}
+    for (path, language), (content_hash, result) in zip(tasks, _run(tasks)):
+        results[path] = result
+        if use_cache and content_hash:
+            key = _cache_key(content_hash, language)
+            _remember(key, result)
+            computed[key] = result.to_payload()
+    if cache is not None and computed:
+        cache.put_many(computed, tool="complexity")
+    return results
+
+
+def _remember(key: str, result: FileComplexity) -> None:
+    with _memo_lock:
+        if len(_memo) >= MAX_MEMOIZED_RESULTS:
+            _memo.clear()
+        _memo[key] = result
+
+
+def clear_complexity_memo() -> None:
+    """清空进程内记忆的分析结果"""
+    with _memo_lock:
+        _memo.clear()
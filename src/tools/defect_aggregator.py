@@ -5,22 +5,33 @@
 它充分利用LLM的语义理解能力，提供比简单规则匹配更智能的缺陷分析。
 """
 
+import heapq
 import json
+import math
 import re
-from dataclasses import dataclass
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from langchain_core.tools import tool
 
+from .defect_similarity import DefectFeatures
+
 
 @dataclass
 class DefectCluster:
-    """缺陷聚类"""
+    """缺陷聚类
+
+    只保存成员在共享缺陷表（去重后的缺陷列表，或增量聚合器以键索引的缺陷字典）
+    中的下标，缺陷在需要时才从表中读取。
+    """
 
     cluster_id: str
-    defects: List[Dict[str, Any]]
+    indices: Sequence[Any]
+    table: Sequence[Mapping] = field(repr=False)
     root_cause: str
     severity: str
     priority: str
@@ -29,6 +40,67 @@ class DefectCluster:
     confidence: float
     suggested_fix_type: str
 
+    @property
+    def defects(self) -> List[Mapping]:
+        """聚类中的缺陷"""
+        return [self.table[index] for index in self.indices]
+
+    @property
+    def defect_count(self) -> int:
+        return len(self.indices)
+
+
+# 默认输出完整内容的聚类数量，其余聚类只计入摘要
+MAX_RENDERED_CLUSTERS = 50
+
+_PRIORITY_ORDER = {"critical": 4, "high": 3, "medium": 2, "low": 1}
+
+
+# _calculate_similarity中除消息相似度（权重0.5）外各项的最大得分：
+# 不同文件时最多为类别+规则（0.2），同一文件时再加上文件+行号（0.5）
+_MAX_CROSS_FILE_SCORE = 0.2
+_MAX_SAME_FILE_SCORE = 0.5
+_MESSAGE_WEIGHT = 0.5
+
+# 浮点累加误差的余量，保证筛选出的候选是精确结果的超集
+_EPSILON = 1e-6
+
+
+class _SimilarityIndex:
+    """相似缺陷的候选索引
+
+    阈值不低于0.7时，超过阈值的两条缺陷必然在同一文件中，
+    且消息词集合的Jaccard相似度不低于(阈值-0.5)/0.5。
+    按(文件, 消息词)建立倒排索引，并使用前缀过滤：每条缺陷的词按全局出现次数
+    从少到多排序，只索引前 n-ceil(t*n)+1 个词。Jaccard不低于t的两个集合的前缀
+    必然有公共词，因此候选集合包含所有可能超过阈值的缺陷，结果与两两比较完全一致。
+    """
+
+    def __init__(self, features: DefectFeatures, min_jaccard: float):
+        frequency = Counter(token for tokens in features.token_sets for token in tokens)
+
+        self._files = features.files
+        self._prefixes: List[List[int]] = []
+        for tokens in features.token_sets:
+            ordered = sorted(tokens, key=lambda token: (frequency[token], token))
+            overlap = max(1, math.ceil((min_jaccard - _EPSILON) * len(ordered)))
+            self._prefixes.append(ordered[: len(ordered) - overlap + 1])
+        self._postings: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    def add(self, item: int) -> None:
+        """将缺陷加入索引"""
+        file = self._files[item]
+        for token in self._prefixes[item]:
+            self._postings[(file, token)].append(item)
+
+    def candidates(self, item: int) -> set:
+        """获取可能与缺陷相似的已索引缺陷（可能包含自身）"""
+        file = self._files[item]
+        result = set()
+        for token in self._prefixes[item]:
+            result.update(self._postings.get((file, token), ()))
+        return result
+
 
 class DefectAggregator:
     """智能缺陷聚合器"""
@@ -53,12 +125,20 @@ class DefectAggregator:
             ],
         }
 
-    def aggregate_defects(self, raw_defects: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def aggregate_defects(
+        self,
+        raw_defects: Sequence[Mapping],
+        top_n: Optional[int] = None,
+        include_remaining: bool = False,
+    ) -> Dict[str, Any]:
         """
         聚合和智能分类缺陷
 
         Args:
-            raw_defects: 原始缺陷列表
+            raw_defects: 原始缺陷列表，可以是缺陷字典列表，也可以是
+                IssueTable/IssueView（按行提供只读映射，避免为每条缺陷创建字典）
+            top_n: 只输出优先级最高的前N个聚类的完整内容，默认输出全部聚类
+            include_remaining: 是否附带其余聚类的简要信息（不含缺陷列表）
 
         Returns:
             聚合后的缺陷分析结果
@@ -77,26 +157,37 @@ class DefectAggregator:
         # 步骤2: 智能聚类
         clusters = self._cluster_defects(deduplicated_defects)
 
-        # 步骤3: 计算优先级和影响分析
-        prioritized_clusters = self._prioritize_clusters(clusters)
-
-        # 步骤4: 生成智能建议
-        recommendations = self._generate_smart_recommendations(prioritized_clusters)
+        # 步骤3-5: 优先级排序、智能建议和摘要
+        return self._build_result(
+            clusters,
+            deduplicated_defects,
+            len(raw_defects),
+            top_n=top_n,
+            include_remaining=include_remaining,
+        )
 
-        # 步骤5: 创建摘要
-        summary = self._create_summary(prioritized_clusters, deduplicated_defects)
+    def _build_result(
+        self,
+        clusters: List[DefectCluster],
+        unique_defects: Sequence[Mapping],
+        original_count: int,
+        top_n: Optional[int] = None,
+        include_remaining: bool = False,
+    ) -> Dict[str, Any]:
+        """由聚类生成聚合结果，只为输出的聚类生成包含缺陷的字典"""
+        ranked = self._prioritize_clusters(clusters, top_n)
 
-        return {
-            "total_defects": len(deduplicated_defects),
-            "original_count": len(raw_defects),
+        result = {
+            "total_defects": len(unique_defects),
+            "original_count": original_count,
             "deduplication_rate": (
-                (len(raw_defects) - len(deduplicated_defects)) / len(raw_defects)
-                if raw_defects
+                (original_count - len(unique_defects)) / original_count
+                if original_count
                 else 0
             ),
-            "clusters": prioritized_clusters,
-            "summary": summary,
-            "recommendations": recommendations,
+            "clusters": [self._cluster_to_dict(cluster) for cluster in ranked],
+            "summary": self._create_summary(clusters, unique_defects),
+            "recommendations": self._generate_smart_recommendations(clusters),
             "metadata": {
                 "aggregation_timestamp": datetime.now().isoformat(),
                 "clustering_method": "semantic_similarity",
@@ -104,10 +195,89 @@ class DefectAggregator:
             },
         }
 
+        omitted = len(clusters) - len(ranked)
+        if omitted:
+            result["omitted_clusters"] = omitted
+            if include_remaining:
+                shown = {id(cluster) for cluster in ranked}
+                remaining = [c for c in clusters if id(c) not in shown]
+                result["remaining_clusters"] = [
+                    self._cluster_to_dict(cluster, include_defects=False)
+                    for cluster in self._prioritize_clusters(remaining)
+                ]
+        return result
+
+    def _similarity_features(
+        self, defects: Sequence[Mapping]
+    ) -> Optional[DefectFeatures]:
+        """预处理缺陷特征，相似度计算被子类重写时返回None（退回逐对调用）"""
+        cls = type(self)
+        if (
+            cls._calculate_similarity is not DefectAggregator._calculate_similarity
+            or cls._calculate_text_similarity
+            is not DefectAggregator._calculate_text_similarity
+            or cls._rules_are_related is not DefectAggregator._rules_are_related
+            or cls._should_cluster_together
+            is not DefectAggregator._should_cluster_together
+        ):
+            return None
+        return DefectFeatures(defects)
+
+    def _build_similarity_index(
+        self, features: DefectFeatures
+    ) -> Optional[_SimilarityIndex]:
+        """构建候选索引，阈值过低（可能跨文件相似）时返回None（与所有缺陷比较）"""
+        if self.similarity_threshold < (
+            _MAX_CROSS_FILE_SCORE + _MESSAGE_WEIGHT + _EPSILON
+        ):
+            return None
+        min_jaccard = (
+            self.similarity_threshold - _MAX_SAME_FILE_SCORE
+        ) / _MESSAGE_WEIGHT
+        return _SimilarityIndex(features, min_jaccard)
+
     def _deduplicate_defects(
         self, defects: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """去重相似的缺陷"""
+        """去重相似的缺陷
+
+        每条缺陷与已保留的缺陷按保留顺序比较，归入第一个超过阈值的缺陷，
+        并保留信息更详细的那条（被替换的缺陷移到末尾）。
+        """
+        features = self._similarity_features(defects)
+        if features is None:
+            return self._deduplicate_pairwise(defects)
+        index = self._build_similarity_index(features)
+
+        # 已保留缺陷的编号 -> 在保留列表中的顺序
+        order: Dict[int, int] = {}
+        next_position = 0
+        for item, defect in enumerate(defects):
+            candidates = index.candidates(item) if index is not None else order
+            ranked = sorted(
+                (order[other], other) for other in candidates if other in order
+            )
+            match = features.first_above(
+                item, [other for _, other in ranked], self.similarity_threshold
+            )
+            if match is None:
+                order[item] = next_position
+            elif self._is_more_detailed(defect, defects[match]):
+                # 合并缺陷信息，保留更详细的那个
+                del order[match]
+                order[item] = next_position
+            else:
+                continue
+            next_position += 1
+            if index is not None:
+                index.add(item)
+
+        return [defects[item] for item in sorted(order, key=order.__getitem__)]
+
+    def _deduplicate_pairwise(
+        self, defects: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """两两比较的去重"""
         unique_defects = []
 
         for defect in defects:
@@ -129,7 +299,41 @@ class DefectAggregator:
         return unique_defects
 
     def _cluster_defects(self, defects: List[Dict[str, Any]]) -> List[DefectCluster]:
-        """将缺陷智能聚类"""
+        """将缺陷智能聚类
+
+        按顺序以每条未分配的缺陷为中心，收集其后所有与之相似的未分配缺陷。
+        """
+        features = self._similarity_features(defects)
+        if features is None:
+            return self._cluster_pairwise(defects)
+        index = self._build_similarity_index(features)
+        if index is not None:
+            for item in range(len(defects)):
+                index.add(item)
+
+        clusters = []
+        assigned_defects = set()
+        for i, defect in enumerate(defects):
+            if i in assigned_defects:
+                continue
+
+            candidates = (
+                index.candidates(i) if index is not None else range(i + 1, len(defects))
+            )
+            members = features.all_above(
+                i,
+                sorted(j for j in candidates if j > i and j not in assigned_defects),
+                self.similarity_threshold,
+            )
+            assigned_defects.add(i)
+            assigned_defects.update(members)
+
+            clusters.append(self._create_cluster(defects, [i] + members, len(clusters)))
+
+        return clusters
+
+    def _cluster_pairwise(self, defects: List[Dict[str, Any]]) -> List[DefectCluster]:
+        """两两比较的聚类"""
         clusters = []
         assigned_defects = set()
 
@@ -138,7 +342,7 @@ class DefectAggregator:
                 continue
 
             # 创建新聚类
-            cluster_defects = [defect]
+            members = [i]
             assigned_defects.add(i)
 
             # 查找相似缺陷
@@ -147,11 +351,11 @@ class DefectAggregator:
                     continue
 
                 if self._should_cluster_together(defect, other_defect):
-                    cluster_defects.append(other_defect)
+                    members.append(j)
                     assigned_defects.add(j)
 
             # 创建聚类对象
-            cluster = self._create_cluster(cluster_defects, len(clusters))
+            cluster = self._create_cluster(defects, members, len(clusters))
             clusters.append(cluster)
 
         return clusters
@@ -166,14 +370,14 @@ class DefectAggregator:
         if defect1.get("file") == defect2.get("file"):
             similarity += 0.2
             # 行号相近 (权重: 0.1)
-            line1 = defect1.get("line", 0)
-            line2 = defect2.get("line", 0)
+            line1 = defect1.get("line") or 0
+            line2 = defect2.get("line") or 0
             if abs(line1 - line2) <= 5:
                 similarity += 0.1
 
         # 消息语义相似度 (权重: 0.5)
-        msg1 = defect1.get("message", "").lower()
-        msg2 = defect2.get("message", "").lower()
+        msg1 = (defect1.get("message") or "").lower()
+        msg2 = (defect2.get("message") or "").lower()
         message_similarity = self._calculate_text_similarity(msg1, msg2)
         similarity += message_similarity * 0.5
 
@@ -220,18 +424,29 @@ class DefectAggregator:
         self, defect1: Dict[str, Any], defect2: Dict[str, Any]
     ) -> bool:
         """判断哪个缺陷信息更详细"""
-        score1 = len(defect1.get("message", "")) + (
+        score1 = len(defect1.get("message") or "") + (
             1 if defect1.get("suggestion") else 0
         )
-        score2 = len(defect2.get("message", "")) + (
+        score2 = len(defect2.get("message") or "") + (
             1 if defect2.get("suggestion") else 0
         )
         return score1 > score2
 
     def _create_cluster(
-        self, defects: List[Dict[str, Any]], cluster_id: int
+        self, table: Sequence[Mapping], indices: Sequence[Any], cluster_id: int
     ) -> DefectCluster:
-        """创建缺陷聚类"""
+        """创建缺陷聚类
+
+        Args:
+            table: 共享的缺陷表
+            indices: 聚类成员在缺陷表中的下标
+            cluster_id: 聚类编号
+        """
+        defects = [table[index] for index in indices]
+
+        # 获取受影响文件
+        affected_files = list(set(d.get("file", "") for d in defects))
+
         # 分析根原因
         root_cause = self._analyze_root_cause(defects)
 
@@ -239,14 +454,11 @@ class DefectAggregator:
         severity = self._determine_cluster_severity(defects)
 
         # 计算优先级
-        priority = self._calculate_priority(defects, severity)
+        priority = self._calculate_priority(defects, severity, len(affected_files))
 
         # 评估修复复杂度
         complexity = self._assess_fix_complexity(defects)
 
-        # 获取受影响文件
-        affected_files = list(set(d.get("file", "") for d in defects))
-
         # 计算置信度
         confidence = self._calculate_cluster_confidence(defects)
 
@@ -255,7 +467,8 @@ class DefectAggregator:
 
         return DefectCluster(
             cluster_id=f"cluster_{cluster_id:03d}",
-            defects=defects,
+            indices=indices,
+            table=table,
             root_cause=root_cause,
             severity=severity,
             priority=priority,
@@ -268,8 +481,8 @@ class DefectAggregator:
     def _analyze_root_cause(self, defects: List[Dict[str, Any]]) -> str:
         """分析缺陷的根本原因"""
         # 使用简单的规则来识别常见模式
-        messages = [d.get("message", "").lower() for d in defects]
-        categories = [d.get("category", "") for d in defects]
+        messages = [(d.get("message") or "").lower() for d in defects]
+        categories = [d.get("category") or "" for d in defects]
 
         # 检查常见根原因模式
         if any("undef" in msg or "name '" in msg for msg in messages):
@@ -307,8 +520,13 @@ class DefectAggregator:
         else:
             return "low"
 
-    def _calculate_priority(self, defects: List[Dict[str, Any]], severity: str) -> str:
-        """计算修复优先级"""
+    def _calculate_priority(
+        self,
+        defects: List[Dict[str, Any]],
+        severity: str,
+        affected_files: Optional[int] = None,
+    ) -> str:
+        """计算修复优先级（affected_files为已统计的受影响文件数）"""
         base_priority = {"critical": 4, "high": 3, "medium": 2, "low": 1}
 
         # 考虑缺陷数量和影响范围
@@ -321,7 +539,8 @@ class DefectAggregator:
             score += 0.5
 
         # 影响文件数量
-        affected_files = len(set(d.get("file", "") for d in defects))
+        if affected_files is None:
+            affected_files = len(set(d.get("file", "") for d in defects))
         if affected_files > 3:
             score += 0.5
 
@@ -337,7 +556,7 @@ class DefectAggregator:
 
     def _assess_fix_complexity(self, defects: List[Dict[str, Any]]) -> str:
         """评估修复复杂度"""
-        messages = [d.get("message", "").lower() for d in defects]
+        messages = [(d.get("message") or "").lower() for d in defects]
 
         # 检查复杂度模式
         complexity_score = 0
@@ -366,7 +585,7 @@ class DefectAggregator:
 
         # 检查缺陷的一致性
         severities = [d.get("severity", "") for d in defects]
-        categories = [d.get("category", "") for d in defects]
+        categories = [d.get("category") or "" for d in defects]
 
         severity_consistency = len(set(severities)) / len(severities)
         category_consistency = len(set(categories)) / len(categories)
@@ -401,49 +620,56 @@ class DefectAggregator:
         return prefix1 == prefix2 and len(prefix1) > 2
 
     def _prioritize_clusters(
-        self, clusters: List[DefectCluster]
-    ) -> List[Dict[str, Any]]:
-        """对聚类进行优先级排序"""
-        # 转换为字典格式并排序
-        cluster_dicts = []
-        for cluster in clusters:
-            cluster_dict = {
-                "cluster_id": cluster.cluster_id,
-                "root_cause": cluster.root_cause,
-                "severity": cluster.severity,
-                "priority": cluster.priority,
-                "fix_complexity": cluster.fix_complexity,
-                "affected_files": cluster.affected_files,
-                "defect_count": len(cluster.defects),
-                "confidence": cluster.confidence,
-                "suggested_fix_type": cluster.suggested_fix_type,
-                "defects": cluster.defects,
-            }
-            cluster_dicts.append(cluster_dict)
-
-        # 按优先级排序
-        priority_order = {"critical": 4, "high": 3, "medium": 2, "low": 1}
-        cluster_dicts.sort(
-            key=lambda x: (
-                priority_order.get(x["priority"], 0),
-                x["defect_count"],
-                -x["confidence"],
-            ),
-            reverse=True,
+        self, clusters: List[DefectCluster], top_n: Optional[int] = None
+    ) -> List[DefectCluster]:
+        """按优先级、缺陷数量和置信度排序聚类
+
+        指定top_n时用有界堆只选出前N个，结果与完整排序后取前N个相同。
+        """
+        if top_n is None or top_n >= len(clusters):
+            return sorted(clusters, key=self._cluster_rank, reverse=True)
+        return heapq.nlargest(max(top_n, 0), clusters, key=self._cluster_rank)
+
+    def _cluster_rank(self, cluster: DefectCluster) -> Tuple[int, int, float]:
+        """聚类的排序键"""
+        return (
+            _PRIORITY_ORDER.get(cluster.priority, 0),
+            cluster.defect_count,
+            -cluster.confidence,
         )
 
-        return cluster_dicts
+    def _cluster_to_dict(
+        self, cluster: DefectCluster, include_defects: bool = True
+    ) -> Dict[str, Any]:
+        """将聚类转换为输出字典"""
+        cluster_dict = {
+            "cluster_id": cluster.cluster_id,
+            "root_cause": cluster.root_cause,
+            "severity": cluster.severity,
+            "priority": cluster.priority,
+            "fix_complexity": cluster.fix_complexity,
+            "affected_files": cluster.affected_files,
+            "defect_count": cluster.defect_count,
+            "confidence": cluster.confidence,
+            "suggested_fix_type": cluster.suggested_fix_type,
+        }
+        if include_defects:
+            # 输出时才从缺陷表读取缺陷，并将行视图转换为字典
+            cluster_dict["defects"] = [
+                d if isinstance(d, dict) else dict(d) for d in cluster.defects
+            ]
+        return cluster_dict
 
     def _generate_smart_recommendations(
-        self, clusters: List[Dict[str, Any]]
+        self, clusters: List[DefectCluster]
     ) -> List[str]:
         """生成智能修复建议"""
         recommendations = []
 
         # 统计信息
         total_clusters = len(clusters)
-        critical_clusters = sum(1 for c in clusters if c["priority"] == "critical")
-        simple_fixes = sum(1 for c in clusters if c["fix_complexity"] == "simple")
+        critical_clusters = sum(1 for c in clusters if c.priority == "critical")
+        simple_fixes = sum(1 for c in clusters if c.fix_complexity == "simple")
 
         # 生成总体建议
         if critical_clusters > 0:
@@ -457,7 +683,7 @@ class DefectAggregator:
             )
 
         # 针对高影响聚类生成建议
-        high_impact_clusters = [c for c in clusters if len(c["affected_files"]) > 1]
+        high_impact_clusters = [c for c in clusters if len(c.affected_files) > 1]
         if high_impact_clusters:
             recommendations.append(
                 f"有 {len(high_impact_clusters)} 个跨文件问题聚类，建议制定系统性修复方案"
@@ -466,7 +692,7 @@ class DefectAggregator:
         # 根据根因分布生成建议
         root_causes = {}
         for cluster in clusters:
-            cause = cluster["root_cause"]
+            cause = cluster.root_cause
             root_causes[cause] = root_causes.get(cause, 0) + 1
 
         if "导入或模块问题" in root_causes:
@@ -478,7 +704,7 @@ class DefectAggregator:
         return recommendations
 
     def _create_summary(
-        self, clusters: List[Dict[str, Any]], defects: List[Dict[str, Any]]
+        self, clusters: List[DefectCluster], defects: Sequence[Mapping]
     ) -> Dict[str, Any]:
         """创建摘要统计"""
         summary = {
@@ -496,19 +722,19 @@ class DefectAggregator:
 
         for cluster in clusters:
             # 统计优先级
-            summary["by_priority"][cluster["priority"]] += 1
+            summary["by_priority"][cluster.priority] += 1
 
             # 统计复杂度
-            summary["by_complexity"][cluster["fix_complexity"]] += 1
+            summary["by_complexity"][cluster.fix_complexity] += 1
 
             # 统计修复类型
-            summary["by_fix_type"][cluster["suggested_fix_type"]] += 1
+            summary["by_fix_type"][cluster.suggested_fix_type] += 1
 
             # 统计受影响文件
-            summary["affected_files"].update(cluster["affected_files"])
+            summary["affected_files"].update(cluster.affected_files)
 
             # 累计置信度
-            total_confidence += cluster["confidence"]
+            total_confidence += cluster.confidence
 
         summary["affected_files"] = len(summary["affected_files"])
         summary["avg_confidence"] = total_confidence / len(clusters) if clusters else 0
@@ -516,13 +742,13 @@ class DefectAggregator:
         # 获取Top 3聚类
         summary["top_clusters"] = [
             {
-                "cluster_id": c["cluster_id"],
-                "root_cause": c["root_cause"],
-                "priority": c["priority"],
-                "defect_count": c["defect_count"],
-                "affected_files": len(c["affected_files"]),
+                "cluster_id": c.cluster_id,
+                "root_cause": c.root_cause,
+                "priority": c.priority,
+                "defect_count": c.defect_count,
+                "affected_files": len(c.affected_files),
             }
-            for c in clusters[:3]
+            for c in self._prioritize_clusters(clusters, 3)
         ]
 
         return summary
@@ -545,7 +771,12 @@ class DefectAggregator:
 @tool(
     description="智能聚合和分类代码缺陷，提供去重、聚类和优先级排序。能够识别重复缺陷、进行语义相似度聚类、分析根因、评估修复复杂度，并提供智能修复建议。支持多种输入格式，输出包含聚类结果、优先级排序和修复建议的综合报告。"
 )
-def aggregate_defects_tool(defects_json: str) -> str:
+def aggregate_defects_tool(
+    defects_json: str,
+    workspace: Optional[str] = None,
+    max_clusters: int = MAX_RENDERED_CLUSTERS,
+    include_remaining: bool = False,
+) -> str:
     """
     智能聚合和分析代码缺陷，提供给agent使用的缺陷分析工具。
 
@@ -560,12 +791,19 @@ def aggregate_defects_tool(defects_json: str) -> str:
         defects_json: 原始缺陷列表的JSON字符串。支持多种格式：
             - 直接缺陷列表: [{"file": "test.py", "line": 10, "message": "..."}]
             - 带结构的结果: {"defects_found": [...]} 或 {"result": {"defects": [...]}}
+        workspace: 可选，工作区（项目）路径。提供时使用该工作区保存的聚类状态，
+            只处理与上次调用相比新增或消失的缺陷，适合修复→验证循环中反复调用
+        max_clusters: 输出完整缺陷列表的聚类数量（按优先级取前N个），
+            其余聚类只计入summary，omitted_clusters给出未输出的数量
+        include_remaining: 是否附带其余聚类的简要信息（不含缺陷列表）
 
     Returns:
         聚合分析结果的JSON字符串，包含：
             - total_defects: 缺陷总数
             - deduplication_rate: 去重率
             - clusters: 缺陷聚类列表，每个聚类包含相似缺陷
+            - omitted_clusters: 超过max_clusters未输出的聚类数量
+            - remaining_clusters: include_remaining时其余聚类的简要信息
             - priority_ranking: 优先级排序的缺陷列表
             - recommendations: 修复建议和行动计划
             - root_cause_analysis: 根因分析结果
@@ -577,27 +815,15 @@ def aggregate_defects_tool(defects_json: str) -> str:
         - 了解项目中常见的缺陷模式
         - 制定代码质量改进计划
     """
-    try:
-        data = json.loads(defects_json)
+    from .analysis_api import aggregate, extract_defects
 
+    try:
         # 支持多种输入格式
-        if isinstance(data, dict):
-            if "analysis_results" in data:
-                # 来自DetectionAgent的格式
-                defects = data["analysis_results"]["analysis"]["defects_found"]
-            elif "defects_found" in data:
-                # 直接的缺陷列表
-                defects = data["defects_found"]
-            else:
-                # 尝试其他可能的字段
-                defects = data.get("defects", [])
-        elif isinstance(data, list):
-            # 直接的缺陷列表
-            defects = data
-        else:
-            return json.dumps(
-                {"success": False, "error": "无效的输入格式，期望JSON对象或数组"}
-            )
+        data = json.loads(defects_json)
+        try:
+            defects = extract_defects(data)
+        except ValueError as e:
+            return json.dumps({"success": False, "error": str(e)})
 
         if not defects:
             return json.dumps(
@@ -607,12 +833,9 @@ def aggregate_defects_tool(defects_json: str) -> str:
                 }
             )
 
-        # 执行聚合
-        aggregator = DefectAggregator()
-        result = aggregator.aggregate_defects(defects)
-
+        report = aggregate(defects, workspace, max_clusters, include_remaining)
         return json.dumps(
-            {"success": True, "result": result}, indent=2, ensure_ascii=False
+            {"success": True, "result": report.to_dict()}, indent=2, ensure_ascii=False
         )
 
     except json.JSONDecodeError as e:
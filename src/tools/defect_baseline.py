@@ -0,0 +1,358 @@
+"""
+缺陷指纹与基线
+
+为每个缺陷生成在代码移动后保持稳定的指纹，并保存在SQLite基线数据库中，
+analyze_code_defects的基线模式只报告相对基线新增、已修复和未变化的缺陷数量，
+大型遗留项目中不再每次输出全部存量问题。
+
+指纹由以下部分组成（不含行号，在上方插入或删除代码后保持不变）：
+- 工具和规则ID
+- 规范化的消息（小写、数字替换为#、合并空白）
+- 所在的符号（Python使用ast得到Class.method形式的限定名，
+  其他语言向上查找最近的函数/类声明）
+- 缺陷所在行去除空白后的内容哈希
+同一文件中指纹相同的缺陷按行号顺序追加序号。
+
+基线按(项目, 相对路径)保存，项目为文件所在的git仓库根目录（不在仓库中时为文件所在目录）。
+"""
+
+import ast
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_NUMBER_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+
+# 非Python语言的函数/类声明（JavaScript/TypeScript、Go、Rust等）
+_DECLARATION_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+    r"(?:function\*?|def|class|func|fn|struct|impl|interface|enum|trait)\s+"
+    r"(?:\([^)]*\)\s*)?([A-Za-z_$][\w$]*)"
+)
+
+# 基线模式输出的已修复缺陷详情上限
+MAX_FIXED_DETAILS = 20
+
+
+def normalize_message(message: Optional[str]) -> str:
+    """规范化缺陷消息，去除行号、计数等易变部分"""
+    message = _NUMBER_RE.sub("#", (message or "").lower())
+    return _SPACE_RE.sub(" ", message).strip()
+
+
+def _python_symbols(source: str) -> List[Tuple[int, int, str]]:
+    """获取Python源码中的(起始行, 结束行, 限定名)"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    spans = []
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                spans.append((start, child.end_lineno or child.lineno, name))
+                visit(child, f"{name}.")
+            else:
+                visit(child, prefix)
+
+    visit(tree, "")
+    return spans
+
+
+class SourceContext:
+    """文件内容及符号信息，用于计算指纹"""
+
+    def __init__(self, file_path: Path):
+        try:
+            source = Path(file_path).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            source = ""
+        self.lines = source.splitlines()
+        self._spans = (
+            _python_symbols(source)
+            if Path(file_path).suffix in (".py", ".pyi")
+            else None
+        )
+
+    def line_text(self, line: Optional[int]) -> str:
+        """获取去除空白后的行内容"""
+        if not line or not 1 <= line <= len(self.lines):
+            return ""
+        return _SPACE_RE.sub("", self.lines[line - 1])
+
+    def enclosing_symbol(self, line: Optional[int]) -> str:
+        """获取包含该行的最内层符号，没有时返回空字符串"""
+        if not line:
+            return ""
+        if self._spans is not None:
+            best = ""
+            best_start = 0
+            for start, end, name in self._spans:
+                if start <= line <= end and start >= best_start:
+                    best, best_start = name, start
+            return best
+        for index in range(min(line, len(self.lines)) - 1, -1, -1):
+            match = _DECLARATION_RE.match(self.lines[index])
+            if match:
+                return match.group(1)
+        return ""
+
+
+def compute_fingerprint(defect: Mapping, context: SourceContext) -> str:
+    """计算单个缺陷的指纹（不含同文件内的序号）"""
+    line = defect.get("line")
+    try:
+        line = int(line) if line is not None else None
+    except (TypeError, ValueError):
+        line = None
+
+    parts = [
+        defect.get("tool") or "",
+        defect.get("rule_id") or "",
+        normalize_message(defect.get("message")),
+        context.enclosing_symbol(line),
+        hashlib.sha1(context.line_text(line).encode("utf-8")).hexdigest()[:12],
+    ]
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+def compute_fingerprints(file_path: Path, defects: Sequence[Mapping]) -> List[str]:
+    """计算同一文件中一组缺陷的指纹，指纹相同的缺陷按行号顺序追加序号"""
+    context = SourceContext(file_path)
+    base = [compute_fingerprint(defect, context) for defect in defects]
+
+    order = sorted(range(len(defects)), key=lambda i: (defects[i].get("line") or 0, i))
+    seen: Dict[str, int] = {}
+    fingerprints = [""] * len(defects)
+    for i in order:
+        occurrence = seen.get(base[i], 0)
+        seen[base[i]] = occurrence + 1
+        fingerprints[i] = f"{base[i]}#{occurrence}"
+    return fingerprints
+
+
+def locate_file(file_path: Path) -> Tuple[str, str]:
+    """获取文件所属的项目和在项目中的相对路径"""
+    from .incremental_analysis import find_git_root
+
+    file_path = Path(file_path).resolve()
+    project = find_git_root(file_path) or file_path.parent
+    try:
+        relative = file_path.relative_to(project).as_posix()
+    except ValueError:
+        relative = file_path.name
+    return str(project), relative
+
+
+class DefectBaseline:
+    """基于SQLite的缺陷基线数据库"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Args:
+            db_path: 数据库文件路径，默认位于当前代理的缓存目录
+        """
+        from .analysis_cache import get_agent_cache_dir
+
+        self.db_path = (
+            Path(db_path) if db_path else get_agent_cache_dir() / "baseline.db"
+        )
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS baseline_files (
+                project TEXT NOT NULL,
+                file TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (project, file)
+            );
+            CREATE TABLE IF NOT EXISTS baseline_defects (
+                project TEXT NOT NULL,
+                file TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                tool TEXT,
+                rule_id TEXT,
+                severity TEXT,
+                message TEXT,
+                line INTEGER,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (project, file, fingerprint)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_file(self, project: str, file: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """获取文件的基线缺陷{指纹: 缺陷}，文件没有基线时返回None"""
+        with self._lock:
+            known = self._conn.execute(
+                "SELECT 1 FROM baseline_files WHERE project = ? AND file = ?",
+                (project, file),
+            ).fetchone()
+            if known is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT fingerprint, tool, rule_id, severity, message, line "
+                "FROM baseline_defects WHERE project = ? AND file = ?",
+                (project, file),
+            ).fetchall()
+        return {
+            row[0]: {
+                "tool": row[1],
+                "rule_id": row[2],
+                "severity": row[3],
+                "message": row[4],
+                "line": row[5],
+            }
+            for row in rows
+        }
+
+    def replace_file(
+        self,
+        project: str,
+        file: str,
+        defects: Sequence[Mapping],
+        fingerprints: Sequence[str],
+    ) -> None:
+        """用当前缺陷替换文件的基线"""
+        now = time.time()
+        rows = []
+        for fingerprint, defect in zip(fingerprints, defects):
+            line = defect.get("line")
+            rows.append(
+                (
+                    project,
+                    file,
+                    fingerprint,
+                    defect.get("tool"),
+                    defect.get("rule_id"),
+                    defect.get("severity"),
+                    defect.get("message"),
+                    line if isinstance(line, int) else None,
+                    now,
+                )
+            )
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM baseline_defects WHERE project = ? AND file = ?",
+                (project, file),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO baseline_defects "
+                "(project, file, fingerprint, tool, rule_id, severity, message, line, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO baseline_files (project, file, updated_at) "
+                "VALUES (?, ?, ?)",
+                (project, file, now),
+            )
+            self._conn.commit()
+
+    def clear(self, project: Optional[str] = None) -> None:
+        """清空基线（指定项目时只清空该项目）"""
+        with self._lock:
+            for table in ("baseline_defects", "baseline_files"):
+                if project is None:
+                    self._conn.execute(f"DELETE FROM {table}")
+                else:
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE project = ?", (project,)
+                    )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_default_baseline: Optional[DefectBaseline] = None
+_default_baseline_lock = threading.Lock()
+
+
+def get_defect_baseline() -> Optional[DefectBaseline]:
+    """获取全局基线数据库实例，不可用时返回None"""
+    global _default_baseline
+    with _default_baseline_lock:
+        if _default_baseline is None:
+            try:
+                _default_baseline = DefectBaseline()
+            except (OSError, sqlite3.Error):
+                return None
+        return _default_baseline
+
+
+def compare_with_baseline(
+    file_path: Path,
+    defects: Sequence[Mapping],
+    update: bool = False,
+    baseline: Optional[DefectBaseline] = None,
+) -> Optional[Dict[str, Any]]:
+    """将文件的当前缺陷与基线比较
+
+    文件还没有基线时以当前缺陷创建基线（全部视为未变化）。
+
+    Args:
+        file_path: 被分析的文件
+        defects: 当前缺陷（缺陷字典或IssueRow）
+        update: 比较后是否用当前缺陷更新基线
+        baseline: 基线数据库，默认使用全局实例
+
+    Returns:
+        {"created", "updated", "new_indices", "fixed", "unchanged"}，
+        基线数据库不可用时返回None
+    """
+    baseline = baseline or get_defect_baseline()
+    if baseline is None:
+        return None
+
+    defects = list(defects)
+    fingerprints = compute_fingerprints(file_path, defects)
+    project, relative = locate_file(file_path)
+
+    try:
+        known = baseline.get_file(project, relative)
+        if known is None:
+            baseline.replace_file(project, relative, defects, fingerprints)
+            return {
+                "created": True,
+                "updated": False,
+                "new_indices": [],
+                "fixed": [],
+                "unchanged": len(defects),
+            }
+
+        current = set(fingerprints)
+        new_indices = [i for i, fp in enumerate(fingerprints) if fp not in known]
+        fixed = [row for fp, row in known.items() if fp not in current]
+        if update:
+            baseline.replace_file(project, relative, defects, fingerprints)
+    except sqlite3.Error:
+        return None
+
+    return {
+        "created": False,
+        "updated": update,
+        "new_indices": new_indices,
+        "fixed": fixed,
+        "unchanged": len(defects) - len(new_indices),
+    }
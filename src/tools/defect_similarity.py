@@ -0,0 +1,228 @@
+"""
+缺陷相似度的批量计算
+
+DefectAggregator去重和聚类时需要反复计算一条缺陷与一批候选缺陷的相似度。
+DefectFeatures在聚合开始时对全部缺陷做一次预处理：
+- 消息只分词一次，词映射为整数编号，按CSR布局（indptr/indices）保存
+- 文件、类别、规则ID、规则前缀映射为整数编号，行号保存为整数数组
+
+安装了NumPy时，候选较多的批次用数组运算一次算出全部相似度（交集大小由CSR行
+与中心缺陷词集合的成员判断得到，Jaccard及文件/行号/类别/规则加权均为向量运算）；
+未安装NumPy或候选较少时使用预处理后的纯Python实现。
+两种实现的加权项和累加顺序与DefectAggregator._calculate_similarity完全一致，
+得到的浮点结果相同。
+"""
+
+import re
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy是可选依赖
+    np = None
+
+# 候选数量达到该值时使用NumPy批量计算，数量较少时数组运算的固定开销不划算
+VECTORIZE_MIN_CANDIDATES = 64
+
+# 按顺序查找第一个匹配时每次批量计算的候选数量
+VECTORIZE_CHUNK = 256
+
+# 无效编号（规则ID为空、规则前缀过短）
+_MISSING = -1
+
+
+class DefectFeatures:
+    """预处理后的缺陷特征，用于批量计算相似度"""
+
+    def __init__(self, defects: Sequence[Mapping], use_numpy: Optional[bool] = None):
+        """
+        Args:
+            defects: 缺陷字典列表（或IssueTable/IssueView）
+            use_numpy: 是否使用NumPy，默认在可用时使用
+        """
+        vocabulary: Dict[str, int] = {}
+        files: Dict[Any, int] = {}
+        categories: Dict[Any, int] = {}
+        rules: Dict[Any, int] = {}
+        prefixes: Dict[str, int] = {}
+
+        self.token_sets: List[FrozenSet[int]] = []
+        self.files: List[int] = []
+        self.lines: List[int] = []
+        self.categories: List[int] = []
+        self.rules: List[int] = []
+        self.rule_prefixes: List[int] = []
+
+        for defect in defects:
+            words = (defect.get("message") or "").lower().split()
+            self.token_sets.append(
+                frozenset(
+                    vocabulary.setdefault(word, len(vocabulary)) for word in words
+                )
+            )
+            self.files.append(files.setdefault(defect.get("file"), len(files)))
+            self.lines.append(defect.get("line") or 0)
+            self.categories.append(
+                categories.setdefault(defect.get("category"), len(categories))
+            )
+
+            rule = defect.get("rule_id", "")
+            if rule:
+                self.rules.append(rules.setdefault(rule, len(rules)))
+                # 与DefectAggregator._rules_are_related的前缀规则一致
+                prefix = re.split(r"[\d_]", rule)[0] if isinstance(rule, str) else ""
+                self.rule_prefixes.append(
+                    prefixes.setdefault(prefix, len(prefixes))
+                    if len(prefix) > 2
+                    else _MISSING
+                )
+            else:
+                self.rules.append(_MISSING)
+                self.rule_prefixes.append(_MISSING)
+
+        if use_numpy is None:
+            use_numpy = np is not None
+        self._arrays = self._build_arrays() if use_numpy and np is not None else None
+
+    def _build_arrays(self) -> Optional[Dict[str, Any]]:
+        """构建NumPy数组，行号不是整数时返回None（只使用纯Python实现）"""
+        if not all(type(line) is int for line in self.lines):
+            return None
+        try:
+            lines = np.array(self.lines, dtype=np.int64)
+        except OverflowError:
+            return None
+
+        lengths = np.array([len(tokens) for tokens in self.token_sets], dtype=np.int64)
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            (token for tokens in self.token_sets for token in tokens),
+            dtype=np.int64,
+            count=int(indptr[-1]),
+        )
+        return {
+            # 词是否属于当前中心缺陷的标记，每次计算后复位
+            "in_seed": np.zeros(
+                int(indices.max()) + 1 if len(indices) else 0, dtype=bool
+            ),
+            "lengths": lengths,
+            "indptr": indptr,
+            "indices": indices,
+            "files": np.array(self.files, dtype=np.int64),
+            "lines": lines,
+            "categories": np.array(self.categories, dtype=np.int64),
+            "rules": np.array(self.rules, dtype=np.int64),
+            "rule_prefixes": np.array(self.rule_prefixes, dtype=np.int64),
+        }
+
+    def __len__(self) -> int:
+        return len(self.token_sets)
+
+    def similarity(self, i: int, j: int) -> float:
+        """计算两条缺陷的相似度（与DefectAggregator._calculate_similarity一致）"""
+        similarity = 0.0
+
+        if self.files[i] == self.files[j]:
+            similarity += 0.2
+            if abs(self.lines[i] - self.lines[j]) <= 5:
+                similarity += 0.1
+
+        tokens1, tokens2 = self.token_sets[i], self.token_sets[j]
+        if tokens1 and tokens2:
+            similarity += len(tokens1 & tokens2) / len(tokens1 | tokens2) * 0.5
+
+        if self.categories[i] == self.categories[j]:
+            similarity += 0.1
+
+        rule1, rule2 = self.rules[i], self.rules[j]
+        if rule1 != _MISSING and rule2 != _MISSING:
+            if rule1 == rule2:
+                similarity += 0.1
+            elif (
+                self.rule_prefixes[i] != _MISSING
+                and self.rule_prefixes[i] == self.rule_prefixes[j]
+            ):
+                similarity += 0.05
+
+        return min(similarity, 1.0)
+
+    def similarities(self, i: int, candidates: Sequence[int]) -> Sequence[float]:
+        """计算缺陷i与一批候选缺陷的相似度"""
+        if self._arrays is not None and len(candidates) >= VECTORIZE_MIN_CANDIDATES:
+            return self._similarities_numpy(i, candidates)
+        return [self.similarity(i, j) for j in candidates]
+
+    def first_above(
+        self, i: int, candidates: Sequence[int], threshold: float
+    ) -> Optional[int]:
+        """按顺序返回第一个相似度超过阈值的候选，没有时返回None"""
+        if self._arrays is not None and len(candidates) >= VECTORIZE_MIN_CANDIDATES:
+            # 分块计算，找到匹配后不再计算剩余候选
+            for start in range(0, len(candidates), VECTORIZE_CHUNK):
+                chunk = candidates[start : start + VECTORIZE_CHUNK]
+                hits = np.flatnonzero(self._similarities_numpy(i, chunk) > threshold)
+                if len(hits):
+                    return chunk[hits[0]]
+            return None
+        for j in candidates:
+            if self.similarity(i, j) > threshold:
+                return j
+        return None
+
+    def all_above(
+        self, i: int, candidates: Sequence[int], threshold: float
+    ) -> List[int]:
+        """按顺序返回所有相似度超过阈值的候选"""
+        scores = self.similarities(i, candidates)
+        return [j for j, score in zip(candidates, scores) if score > threshold]
+
+    def _similarities_numpy(self, i: int, candidates: Sequence[int]):
+        arrays = self._arrays
+        cands = np.asarray(candidates, dtype=np.int64)
+
+        # 交集大小：取出候选的CSR行，判断每个词是否属于缺陷i的词集合
+        lengths = arrays["lengths"][cands]
+        starts = arrays["indptr"][cands]
+        total = int(lengths.sum())
+        row_of = np.repeat(np.arange(len(cands)), lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        tokens = arrays["indices"][np.repeat(starts, lengths) + offsets]
+        seed = arrays["indices"][arrays["indptr"][i] : arrays["indptr"][i + 1]]
+        in_seed = arrays["in_seed"]
+        in_seed[seed] = True
+        intersection = np.bincount(
+            row_of, weights=in_seed[tokens], minlength=len(cands)
+        )
+        in_seed[seed] = False
+        union = lengths + len(seed) - intersection
+        jaccard = np.zeros(len(cands))
+        if len(seed):
+            np.divide(intersection, union, out=jaccard, where=union > 0)
+
+        same_file = arrays["files"][cands] == arrays["files"][i]
+        close = np.abs(arrays["lines"][cands] - arrays["lines"][i]) <= 5
+        rules = arrays["rules"][cands]
+        rule = arrays["rules"][i]
+        both_rules = (rules != _MISSING) & (rule != _MISSING)
+        prefix = arrays["rule_prefixes"][i]
+        related = (
+            both_rules
+            & (rules != rule)
+            & (prefix != _MISSING)
+            & (arrays["rule_prefixes"][cands] == prefix)
+        )
+
+        # 与逐对计算相同的累加顺序
+        similarity = np.zeros(len(cands))
+        similarity += np.where(same_file, 0.2, 0.0)
+        similarity += np.where(same_file & close, 0.1, 0.0)
+        similarity += jaccard * 0.5
+        similarity += np.where(
+            arrays["categories"][cands] == arrays["categories"][i], 0.1, 0.0
+        )
+        similarity += np.where(
+            both_rules & (rules == rule), 0.1, np.where(related, 0.05, 0.0)
+        )
+        return np.minimum(similarity, 1.0)
@@ -5,6 +5,7 @@
 为deepagents提供实时的错误监控和分析能力。
 """
 
+import hashlib
 import json
 import os
 import re
@@ -15,10 +16,23 @@ import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from langchain_core.tools import tool
 
+from .python_checker import check_files_raw
+from .toolchain_registry import get_toolchain_registry
+from .workspace_index import EXCLUDED_DIRS, WorkspaceIndex, get_workspace_index
+
+# Node.js编译检查的默认超时（秒），可通过构建配置的timeout覆盖
+NODEJS_COMPILE_TIMEOUT = 60
+
+# 查找日志文件时跳过的目录：构建输出目录中常有日志，不在此列
+LOG_SEARCH_EXCLUDED_DIRS = EXCLUDED_DIRS - {"build", "dist", "target"}
+
+# tsc --pretty false的错误格式: file(line,column): error TScode: message
+_TS_ERROR_PATTERN = re.compile(r"(.+)\((\d+),(\d+)\): error (TS\d+): (.+)")
+
 
 @dataclass
 class CompilationError:
@@ -125,6 +139,9 @@ def _parse_build_config(build_config: Optional[str]) -> Dict[str, Any]:
         "verbose": True,
         "stop_on_error": True,
         "environment": {},
+        # Node.js项目使用tsc --incremental和eslint --cache
+        "incremental": True,
+        "timeout": NODEJS_COMPILE_TIMEOUT,
     }
 
     if build_config:
@@ -175,108 +192,199 @@ def _error_response(message: str) -> str:
 
 
 def _check_python_syntax(project_path: Path, config: Dict[str, Any]) -> Dict[str, List]:
-    """检查Python语法错误"""
+    """检查Python语法错误
+
+    在进程池上对源码字节调用compile()，结果按内容哈希缓存，再次检查时只重新编译
+    内容变化的文件。
+    """
     errors = []
     warnings = []
 
-    # 查找Python文件
-    python_files = list(project_path.rglob("*.py"))
-
-    for py_file in python_files:
-        # 跳过虚拟环境和缓存目录
-        if "venv" in str(py_file) or "__pycache__" in str(py_file):
-            continue
-
-        try:
-            # 使用Python -m py_compile 检查语法
-            result = subprocess.run(
-                ["python", "-m", "py_compile", str(py_file)],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
+    # 查找Python文件，虚拟环境和缓存目录由工作区索引的排除规则跳过
+    python_files = [
+        Path(indexed_file.path)
+        for indexed_file in get_workspace_index(project_path).files(
+            extensions={".py"}
+        )
+    ]
 
-            if result.returncode != 0:
+    # 在进程内使用compile()检查语法，多个文件在进程池上并行执行，
+    # 内容未变化的文件直接使用缓存的结果
+    try:
+        results = check_files_raw(python_files, syntax_only=True)
+    except Exception as e:
+        warnings.append(
+            {
+                "error_type": "check_failed",
+                "error_message": str(e),
+                "severity": "warning",
+                "compiler": "python",
+            }
+        )
+        return {"errors": errors, "warnings": warnings}
+
+    for file_path, issues in results.items():
+        for rule_id, message, line, column in issues:
+            if rule_id == "E999":
+                error = CompilationError(
+                    file_path=file_path,
+                    line_number=line or 0,
+                    column_number=column or 0,
+                    error_type="syntax_error",
+                    error_message=message,
+                    compiler="python",
+                    severity="error",
+                    raw_output=f"{file_path}:{line or 0}:{column or 0}: {message}",
+                )
+                errors.append(error.__dict__)
+            else:
+                # 文件无法读取等检查失败的情况
                 errors.append(
                     {
-                        "file_path": str(py_file),
-                        "error_type": "syntax_error",
-                        "error_message": result.stderr.strip(),
-                        "severity": "error",
+                        "file_path": file_path,
+                        "error_type": "check_failed",
+                        "error_message": message,
+                        "severity": "warning",
                         "compiler": "python",
                     }
                 )
 
-        except subprocess.TimeoutExpired:
-            errors.append(
-                {
-                    "file_path": str(py_file),
-                    "error_type": "timeout",
-                    "error_message": "语法检查超时",
-                    "severity": "warning",
-                    "compiler": "python",
-                }
-            )
-        except Exception as e:
-            errors.append(
-                {
-                    "file_path": str(py_file),
-                    "error_type": "check_failed",
-                    "error_message": str(e),
-                    "severity": "warning",
-                    "compiler": "python",
-                }
-            )
-
     return {"errors": errors, "warnings": warnings}
 
 
+def _nodejs_cache_paths(project_path: Path) -> Tuple[Path, Path]:
+    """项目在代理缓存目录中的tsc增量信息文件和ESLint缓存文件"""
+    from .analysis_cache import get_agent_cache_dir
+
+    project_key = hashlib.sha256(str(project_path.resolve()).encode("utf-8"))
+    cache_dir = get_agent_cache_dir("nodejs", project_key.hexdigest()[:16])
+    return cache_dir / "tsconfig.tsbuildinfo", cache_dir / "eslintcache"
+
+
+def _stream_command(
+    command: List[str],
+    cwd: Path,
+    timeout: float,
+    on_stdout: Callable[[str], None],
+    on_stderr: Optional[Callable[[str], None]] = None,
+) -> Tuple[Optional[int], bool]:
+    """运行命令，输出到达时逐行交给回调处理
+
+    超时后终止进程，超时前已经处理的输出仍然有效。
+
+    Returns:
+        (退出码, 是否超时)
+    """
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    )
+
+    def pump(stream, callback) -> None:
+        for line in stream:
+            if callback is not None:
+                callback(line)
+
+    readers = [
+        threading.Thread(target=pump, args=(process.stdout, on_stdout), daemon=True),
+        threading.Thread(target=pump, args=(process.stderr, on_stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        process.kill()
+        process.wait()
+    # npx启动的子进程可能仍持有管道，不无限等待
+    for reader in readers:
+        reader.join(timeout=5)
+    return process.returncode, timed_out
+
+
 def _compile_nodejs(project_path: Path, config: Dict[str, Any]) -> Dict[str, List]:
-    """编译Node.js项目"""
+    """编译Node.js项目
+
+    默认使用增量模式：tsc --incremental把增量信息写入代理缓存目录中按项目区分的
+    tsbuildinfo文件，eslint --cache使用同一目录中的缓存文件，再次检查时只重新分析
+    变化的文件。clean_build为True时先删除这些文件，incremental为False时完整检查。
+    tsc的输出在到达时逐行解析，超时前报告的错误会保留。
+    """
     errors = []
     warnings = []
 
-    try:
-        # 检查TypeScript配置
-        if (project_path / "tsconfig.json").exists():
-            # TypeScript编译
-            result = subprocess.run(
-                ["npx", "tsc", "--noEmit"],
-                cwd=project_path,
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
+    if not get_toolchain_registry().is_available("npx"):
+        warnings.append(
+            {
+                "error_type": "tool_unavailable",
+                "error_message": "npx不可用，跳过Node.js编译检查",
+                "severity": "warning",
+                "compiler": "nodejs",
+            }
+        )
+        return {"errors": errors, "warnings": warnings}
 
-            if result.returncode != 0:
-                errors.extend(_parse_typescript_errors(result.stderr, "typescript"))
-        else:
-            # JavaScript语法检查（使用ESLint如果可用）
-            if (project_path / ".eslintrc.js").exists() or (
-                project_path / ".eslintrc.json"
-            ).exists():
-                result = subprocess.run(
-                    ["npx", "eslint", ".", "--format", "json"],
-                    cwd=project_path,
-                    capture_output=True,
-                    text=True,
-                    timeout=60,
-                )
+    timeout = config.get("timeout", NODEJS_COMPILE_TIMEOUT)
+    incremental = config.get("incremental", True)
+    tsbuildinfo, eslint_cache = _nodejs_cache_paths(project_path)
+    if config.get("clean_build"):
+        for cache_file in (tsbuildinfo, eslint_cache):
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
+
+    # 检查TypeScript配置
+    if (project_path / "tsconfig.json").exists():
+        # TypeScript编译（错误输出在stdout，配置错误可能在stderr）
+        command = ["npx", "tsc", "--noEmit", "--pretty", "false"]
+        if incremental:
+            command += ["--incremental", "--tsBuildInfoFile", str(tsbuildinfo)]
+        parser = _TypeScriptOutputParser("typescript")
+        _, timed_out = _stream_command(
+            command, project_path, timeout, parser.feed, parser.feed
+        )
+        errors.extend(parser.errors)
 
-                if result.stdout:
-                    lint_errors = _parse_eslint_output(result.stdout)
-                    errors.extend(
-                        [e for e in lint_errors if e.get("severity") == "error"]
-                    )
-                    warnings.extend(
-                        [e for e in lint_errors if e.get("severity") == "warning"]
-                    )
+    # JavaScript语法检查（使用ESLint如果可用）
+    elif (project_path / ".eslintrc.js").exists() or (
+        project_path / ".eslintrc.json"
+    ).exists():
+        command = ["npx", "eslint", ".", "--format", "json"]
+        if incremental:
+            command += [
+                "--cache",
+                "--cache-location",
+                str(eslint_cache),
+                "--cache-strategy",
+                "content",
+            ]
+        # JSON报告在进程结束时才完整，边读取边缓存，结束后一次解析
+        stdout: List[str] = []
+        _, timed_out = _stream_command(command, project_path, timeout, stdout.append)
+
+        if stdout and not timed_out:
+            lint_errors = _parse_eslint_output("".join(stdout))
+            errors.extend([e for e in lint_errors if e.get("severity") == "error"])
+            warnings.extend(
+                [e for e in lint_errors if e.get("severity") == "warning"]
+            )
+    else:
+        return {"errors": errors, "warnings": warnings}
 
-    except subprocess.TimeoutExpired:
+    if timed_out:
         errors.append(
             {
                 "error_type": "timeout",
-                "error_message": "Node.js编译超时",
+                "error_message": f"Node.js编译超时（{timeout}秒）",
                 "severity": "error",
                 "compiler": "nodejs",
             }
@@ -285,29 +393,40 @@ def _compile_nodejs(project_path: Path, config: Dict[str, Any]) -> Dict[str, Lis
     return {"errors": errors, "warnings": warnings}
 
 
-def _parse_typescript_errors(output: str, compiler: str) -> List[Dict[str, Any]]:
-    """解析TypeScript错误"""
-    errors = []
+class _TypeScriptOutputParser:
+    """逐行解析tsc的输出，多行错误消息的后续行以空格缩进"""
 
-    # TypeScript错误格式: file(line,column): error TScode: message
-    pattern = r"(.+)\((\d+),(\d+)\): error (TS\d+): (.+)"
+    def __init__(self, compiler: str):
+        self.compiler = compiler
+        self.errors: List[Dict[str, Any]] = []
 
-    for match in re.finditer(pattern, output):
-        file_path, line, column, error_code, message = match.groups()
-        errors.append(
-            {
-                "file_path": file_path.strip(),
-                "line_number": int(line),
-                "column_number": int(column),
-                "error_type": "typescript_error",
-                "error_message": message.strip(),
-                "error_code": error_code,
-                "severity": "error",
-                "compiler": compiler,
-            }
-        )
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        match = _TS_ERROR_PATTERN.match(line)
+        if match:
+            file_path, line_number, column, error_code, message = match.groups()
+            self.errors.append(
+                {
+                    "file_path": file_path.strip(),
+                    "line_number": int(line_number),
+                    "column_number": int(column),
+                    "error_type": "typescript_error",
+                    "error_message": message.strip(),
+                    "error_code": error_code,
+                    "severity": "error",
+                    "compiler": self.compiler,
+                }
+            )
+        elif line.startswith(" ") and line.strip() and self.errors:
+            self.errors[-1]["error_message"] += "\n" + line.strip()
 
-    return errors
+
+def _parse_typescript_errors(output: str, compiler: str) -> List[Dict[str, Any]]:
+    """解析TypeScript错误"""
+    parser = _TypeScriptOutputParser(compiler)
+    for line in output.splitlines():
+        parser.feed(line)
+    return parser.errors
 
 
 def _parse_eslint_output(output: str) -> List[Dict[str, Any]]:
@@ -420,7 +539,8 @@ def compile_project(project_path: str, build_config: Optional[str] = None) -> st
 
     Args:
         project_path: 项目根目录路径，支持相对路径和绝对路径
-        build_config: 可选的构建配置JSON字符串，包含编译参数和设置
+        build_config: 可选的构建配置JSON字符串，包含编译参数和设置，如
+            {"timeout": 120, "incremental": true, "clean_build": false}
 
     Returns:
         编译检查结果的JSON字符串，包含：
@@ -449,6 +569,8 @@ def compile_project(project_path: str, build_config: Optional[str] = None) -> st
     注意事项：
         - 需要系统中安装相应的编译工具
         - 大型项目编译可能需要较长时间
+        - Node.js项目默认增量检查（tsc --incremental、eslint --cache），缓存文件
+          保存在代理缓存目录中；clean_build为true时删除缓存后完整检查
         - 建议在项目根目录执行
     """
     try:
@@ -904,12 +1026,20 @@ def analyze_existing_logs(
         if log_patterns is None:
             log_patterns = ["*.log", "logs/*.log", "*.out", "*.err", "error.log"]
 
+        # 日志通常被.gitignore忽略，也常写在构建输出目录中，
+        # 所以不使用按忽略规则剪除的共享索引，只跳过版本库和依赖目录
+        index = WorkspaceIndex(
+            project_path,
+            exclude_dirs=LOG_SEARCH_EXCLUDED_DIRS,
+            use_ignore_files=False,
+        )
         log_files = []
         for pattern in log_patterns:
-            log_files.extend(project_path.glob(pattern))
-            log_files.extend(project_path.rglob(pattern))
+            log_files.extend(
+                Path(indexed_file.path) for indexed_file in index.glob(f"**/{pattern}")
+            )
 
-        log_files = list(set(log_files))  # 去重
+        log_files = list(dict.fromkeys(log_files))  # 去重
 
         # 分析日志文件
         all_errors = []
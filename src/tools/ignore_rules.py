@@ -0,0 +1,236 @@
+"""
+忽略规则（.gitignore / .fixagentignore）
+
+工作区索引遍历目录时按忽略规则剪除整个子树，不再进入生成产物、数据转储和第三方代码：
+- 支持gitignore语法：注释、转义、!取反、结尾/只匹配目录、含/的模式相对所在目录
+  锚定、**匹配任意层目录、[]字符类
+- 每个目录的规则由上级规则加上本目录的.gitignore和.fixagentignore组成，后出现的
+  规则优先；根目录另外读取.git/info/exclude
+- 模式在读取时编译为正则表达式，同一文件内容未变化时复用编译结果
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 每个目录中读取的忽略文件（.fixagentignore在后，优先级更高）
+IGNORE_FILES = (".gitignore", ".fixagentignore")
+
+# 根目录额外读取的忽略文件
+ROOT_IGNORE_FILES = (".git/info/exclude",)
+
+
+class IgnoreRule(NamedTuple):
+    """编译后的单条规则"""
+
+    base: str
+    pattern: str
+    regex: "re.Pattern[str]"
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+
+def translate_pattern(pattern: str) -> str:
+    """把gitignore/glob模式翻译为正则表达式（不含首尾锚点）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                j = i + 2
+                at_start = i == 0 or pattern[i - 1] == "/"
+                if at_start and j == n:
+                    out.append(".*")
+                    i = j
+                    continue
+                if at_start and pattern[j] == "/":
+                    out.append("(?:.*/)?")
+                    i = j + 1
+                    continue
+                i = j
+            else:
+                i += 1
+            out.append("[^/]*")
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : j].replace("\\", "\\\\")
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_ignore_lines(lines: List[str], base: str = "") -> Tuple[IgnoreRule, ...]:
+    """解析忽略文件的内容
+
+    Args:
+        lines: 忽略文件的各行
+        base: 忽略文件所在目录相对工作区根目录的路径（使用/分隔）
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip("\r")
+        # 去掉未转义的结尾空格
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        anchored = "/" in line
+        line = line.lstrip("/")
+        try:
+            regex = re.compile(f"^{translate_pattern(line)}$", re.DOTALL)
+        except re.error:
+            continue
+        rules.append(IgnoreRule(base, line, regex, negate, dir_only, anchored))
+    return tuple(rules)
+
+
+_compiled: Dict[Tuple[str, str, int, int], Tuple[IgnoreRule, ...]] = {}
+_compiled_lock = threading.Lock()
+
+
+def load_ignore_file(path: str, base: str) -> Tuple[IgnoreRule, ...]:
+    """读取并编译忽略文件，文件内容未变化时复用编译结果"""
+    try:
+        stat_info = os.stat(path)
+    except OSError:
+        return ()
+    key = (path, base, stat_info.st_mtime_ns, stat_info.st_size)
+    with _compiled_lock:
+        rules = _compiled.get(key)
+    if rules is not None:
+        return rules
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            rules = parse_ignore_lines(f.readlines(), base)
+    except OSError:
+        return ()
+    with _compiled_lock:
+        if len(_compiled) > 1024:
+            _compiled.clear()
+        _compiled[key] = rules
+    return rules
+
+
+class IgnoreRules:
+    """对某个目录生效的全部规则（不可变，子目录在此基础上追加）"""
+
+    __slots__ = ("rules", "_key")
+
+    def __init__(self, rules: Tuple[IgnoreRule, ...] = ()):
+        self.rules = rules
+        self._key = tuple((r.base, r.pattern, r.negate, r.dir_only) for r in rules)
+
+    def extend(self, rules: Tuple[IgnoreRule, ...]) -> "IgnoreRules":
+        if not rules:
+            return self
+        return IgnoreRules(self.rules + rules)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IgnoreRules) and self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """判断相对工作区根目录的路径是否被忽略（只看路径本身，不检查上级目录）"""
+        name = relative_path.rpartition("/")[2]
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.anchored:
+                if rule.base:
+                    if not relative_path.startswith(rule.base + "/"):
+                        continue
+                    target = relative_path[len(rule.base) + 1 :]
+                else:
+                    target = relative_path
+            else:
+                target = name
+            if rule.regex.match(target):
+                return not rule.negate
+        return False
+
+
+EMPTY_RULES = IgnoreRules()
+
+
+def directory_rules(
+    root: str, relative: str, parent: IgnoreRules, names: Optional[List[str]] = None
+) -> Tuple[IgnoreRules, Tuple[Tuple[str, int], ...]]:
+    """计算目录的生效规则
+
+    Args:
+        root: 工作区根目录
+        relative: 目录相对根目录的路径
+        parent: 上级目录的生效规则
+        names: 目录中的文件名，已知时只读取其中存在的忽略文件
+
+    Returns:
+        (生效规则, 忽略文件签名)，签名用于判断忽略文件是否被修改
+    """
+    candidates = [f for f in IGNORE_FILES if names is None or f in names]
+    if not relative:
+        candidates = list(ROOT_IGNORE_FILES) + candidates
+    rules = parent
+    signature = []
+    for name in candidates:
+        path = os.path.join(root, relative, name)
+        try:
+            stat_info = os.stat(path)
+        except OSError:
+            continue
+        signature.append((name, stat_info.st_mtime_ns))
+        rules = rules.extend(load_ignore_file(path, relative))
+    return rules, tuple(signature)
+
+
+def ignore_signature(root: str, relative: str, names: Tuple[str, ...]) -> tuple:
+    """重新获取目录中已知忽略文件的签名"""
+    signature = []
+    for name in names:
+        try:
+            mtime_ns = os.stat(os.path.join(root, relative, name)).st_mtime_ns
+        except OSError:
+            continue
+        signature.append((name, mtime_ns))
+    return tuple(signature)
@@ -0,0 +1,365 @@
+"""
+增量缺陷聚合
+
+修复→验证循环中，每次调用aggregate_defects_tool时只有少量缺陷出现或消失。
+IncrementalDefectAggregator保存去重和聚类状态，只处理变化的缺陷：
+- 新增缺陷：按保留顺序与同文件的保留缺陷比较去重，再加入第一个中心缺陷与之
+  相似的聚类，或成为新聚类的中心（与DefectAggregator的贪心规则相同）
+- 移除缺陷：重复项直接移除；保留缺陷移除后其重复项重新加入；
+  聚类中心被移除时，该聚类的其余成员重新分配
+- 聚类的分析结果（根因、优先级、复杂度等）按聚类缓存，只重新计算变化的聚类
+- 聚类编号在多次调用之间保持稳定
+- 变化量超过现有缺陷数的一半时直接重建
+
+状态按工作区保存在代理缓存目录的 aggregator/ 下，下次调用时继续使用。
+"""
+
+import hashlib
+import json
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .defect_aggregator import (_EPSILON, _MAX_CROSS_FILE_SCORE,
+                                _MESSAGE_WEIGHT, DefectAggregator,
+                                DefectCluster)
+
+# 状态格式版本
+STATE_VERSION = 1
+
+# 变化的缺陷数超过现有缺陷数的该比例时重建
+REBUILD_RATIO = 0.5
+
+
+def defect_content_key(defect: Mapping) -> str:
+    """缺陷内容的键（字段完全相同的缺陷键相同）"""
+    payload = json.dumps(dict(defect), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def defect_keys(defects: Iterable[Mapping]) -> List[str]:
+    """为缺陷列表生成唯一键，内容相同的缺陷按出现次序编号"""
+    seen: Dict[str, int] = {}
+    keys = []
+    for defect in defects:
+        content_key = defect_content_key(defect)
+        occurrence = seen.get(content_key, 0)
+        seen[content_key] = occurrence + 1
+        keys.append(f"{content_key}#{occurrence}")
+    return keys
+
+
+class IncrementalDefectAggregator(DefectAggregator):
+    """保存聚类状态、支持增删缺陷的缺陷聚合器"""
+
+    def __init__(self, workspace: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            workspace: 工作区路径，用于持久化状态；为None时只在内存中保存
+        """
+        super().__init__()
+        self.workspace = str(Path(workspace).resolve()) if workspace else None
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        # 全部缺陷（包括重复项）
+        self.defects: Dict[str, Dict[str, Any]] = {}
+        # 保留缺陷 -> 归入它的重复项，字典顺序即保留顺序
+        self.duplicates: Dict[str, List[str]] = {}
+        # 重复项 -> 保留缺陷
+        self.representative: Dict[str, str] = {}
+        # 聚类编号 -> 成员（第一个为聚类中心）
+        self.clusters: Dict[int, List[str]] = {}
+        self.cluster_of: Dict[str, int] = {}
+        self._next_cluster = 0
+        # 文件 -> 该文件中的保留缺陷 / 以该文件缺陷为中心的聚类（保持顺序）
+        self._unique_by_file: Dict[Any, Dict[str, None]] = {}
+        self._seeds_by_file: Dict[Any, Dict[int, None]] = {}
+        # 聚类编号 -> 聚类对象（成员变化时失效）
+        self._cluster_cache: Dict[int, DefectCluster] = {}
+
+    @property
+    def _blocking(self) -> bool:
+        """阈值足够高时，相似缺陷必然在同一文件中，只需比较同文件的缺陷"""
+        return self.similarity_threshold >= (
+            _MAX_CROSS_FILE_SCORE + _MESSAGE_WEIGHT + _EPSILON
+        )
+
+    # ---- 增删操作 ----
+
+    def add(self, defect: Mapping, key: Optional[str] = None) -> str:
+        """添加一条缺陷，返回其键"""
+        if key is None:
+            content_key = defect_content_key(defect)
+            occurrence = 0
+            while f"{content_key}#{occurrence}" in self.defects:
+                occurrence += 1
+            key = f"{content_key}#{occurrence}"
+        self.defects[key] = dict(defect)
+        self._insert(key)
+        return key
+
+    def remove(self, key: str) -> bool:
+        """移除一条缺陷，键不存在时返回False"""
+        if key not in self.defects:
+            return False
+
+        representative = self.representative.pop(key, None)
+        if representative is not None:
+            # 重复项直接移除
+            self.duplicates[representative].remove(key)
+            del self.defects[key]
+            return True
+
+        defect = self.defects.pop(key)
+        duplicates = self.duplicates.pop(key)
+        del self._unique_by_file[defect.get("file")][key]
+
+        cluster = self.cluster_of.pop(key)
+        members = self.clusters[cluster]
+        if members[0] == key:
+            # 聚类中心被移除，其余成员重新分配
+            self._drop_cluster(cluster, defect.get("file"))
+            for member in members[1:]:
+                del self.cluster_of[member]
+                self._assign_cluster(member)
+        else:
+            members.remove(key)
+            self._cluster_cache.pop(cluster, None)
+
+        # 归入该缺陷的重复项重新去重
+        for duplicate in duplicates:
+            del self.representative[duplicate]
+            self._insert(duplicate)
+        return True
+
+    def update(self, defects: List[Mapping]) -> Dict[str, Any]:
+        """将状态同步为给定的缺陷列表，返回增删统计"""
+        keys = defect_keys(defects)
+        current = set(keys)
+        removed = [key for key in self.defects if key not in current]
+        added = [
+            (key, defect)
+            for key, defect in zip(keys, defects)
+            if key not in self.defects
+        ]
+
+        changed = len(added) + len(removed)
+        rebuilt = bool(self.defects) and changed > REBUILD_RATIO * len(self.defects)
+        if rebuilt:
+            self._reset()
+            added = list(zip(keys, defects))
+            removed = []
+
+        for key in removed:
+            self.remove(key)
+        for key, defect in added:
+            self.add(defect, key)
+
+        return {"added": len(added), "removed": len(removed), "rebuilt": rebuilt}
+
+    def _insert(self, key: str) -> None:
+        """对已记录的缺陷去重，不是重复项时加入聚类"""
+        defect = self.defects[key]
+        file = defect.get("file")
+        candidates = (
+            self._unique_by_file.get(file, {}) if self._blocking else self.duplicates
+        )
+        for existing_key in candidates:
+            existing = self.defects[existing_key]
+            if self._calculate_similarity(defect, existing) > self.similarity_threshold:
+                if self._is_more_detailed(defect, existing):
+                    self._replace_unique(existing_key, key)
+                else:
+                    self.duplicates[existing_key].append(key)
+                    self.representative[key] = existing_key
+                return
+
+        self.duplicates[key] = []
+        self._unique_by_file.setdefault(file, {})[key] = None
+        self._assign_cluster(key)
+
+    def _replace_unique(self, old: str, new: str) -> None:
+        """用信息更详细的缺陷替换保留缺陷，被替换的缺陷变为重复项（保留顺序移到末尾）"""
+        duplicates = [old] + self.duplicates.pop(old)
+        self.duplicates[new] = duplicates
+        for duplicate in duplicates:
+            self.representative[duplicate] = new
+
+        old_file = self.defects[old].get("file")
+        new_file = self.defects[new].get("file")
+        del self._unique_by_file[old_file][old]
+        self._unique_by_file.setdefault(new_file, {})[new] = None
+
+        cluster = self.cluster_of.pop(old)
+        members = self.clusters[cluster]
+        if members[0] == old and old_file != new_file:
+            # 只有低阈值（不按文件分块）时才会跨文件替换聚类中心
+            del self._seeds_by_file[old_file][cluster]
+            self._seeds_by_file.setdefault(new_file, {})[cluster] = None
+        members[members.index(old)] = new
+        self.cluster_of[new] = cluster
+        self._cluster_cache.pop(cluster, None)
+
+    def _assign_cluster(self, key: str) -> None:
+        """加入第一个中心缺陷与之相似的聚类，没有时创建新聚类"""
+        defect = self.defects[key]
+        file = defect.get("file")
+        seeds = self._seeds_by_file.get(file, {}) if self._blocking else self.clusters
+        for cluster in seeds:
+            seed = self.defects[self.clusters[cluster][0]]
+            if self._should_cluster_together(seed, defect):
+                self.clusters[cluster].append(key)
+                self.cluster_of[key] = cluster
+                self._cluster_cache.pop(cluster, None)
+                return
+
+        cluster = self._next_cluster
+        self._next_cluster += 1
+        self.clusters[cluster] = [key]
+        self.cluster_of[key] = cluster
+        self._seeds_by_file.setdefault(file, {})[cluster] = None
+
+    def _drop_cluster(self, cluster: int, seed_file: Any) -> None:
+        del self.clusters[cluster]
+        del self._seeds_by_file[seed_file][cluster]
+        self._cluster_cache.pop(cluster, None)
+
+    # ---- 结果 ----
+
+    def result(
+        self, top_n: Optional[int] = None, include_remaining: bool = False
+    ) -> Dict[str, Any]:
+        """生成与DefectAggregator.aggregate_defects相同结构的聚合结果"""
+        if not self.defects:
+            return {
+                "total_defects": 0,
+                "clusters": [],
+                "summary": self._create_empty_summary(),
+                "recommendations": ["未发现代码缺陷，代码质量良好！"],
+            }
+
+        # 聚类以键引用self.defects中的缺陷，未变化的聚类直接复用
+        clusters = []
+        for cluster, members in self.clusters.items():
+            cluster_obj = self._cluster_cache.get(cluster)
+            if cluster_obj is None:
+                cluster_obj = self._create_cluster(self.defects, list(members), cluster)
+                self._cluster_cache[cluster] = cluster_obj
+            clusters.append(cluster_obj)
+
+        unique_defects = [self.defects[key] for key in self.duplicates]
+        return self._build_result(
+            clusters,
+            unique_defects,
+            len(self.defects),
+            top_n=top_n,
+            include_remaining=include_remaining,
+        )
+
+    def aggregate_defects(
+        self,
+        raw_defects,
+        top_n: Optional[int] = None,
+        include_remaining: bool = False,
+    ) -> Dict[str, Any]:
+        """同步状态并返回聚合结果（附带本次增删统计）"""
+        changes = self.update(list(raw_defects))
+        result = self.result(top_n, include_remaining)
+        result["incremental"] = changes
+        return result
+
+    # ---- 持久化 ----
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "workspace": self.workspace,
+            "similarity_threshold": self.similarity_threshold,
+            "defects": list(self.defects.items()),
+            "duplicates": list(self.duplicates.items()),
+            "clusters": list(self.clusters.items()),
+            "next_cluster": self._next_cluster,
+        }
+
+    def load_state(self, state: Mapping) -> bool:
+        """恢复状态，版本或阈值不匹配时返回False（保持空状态）"""
+        if (
+            state.get("version") != STATE_VERSION
+            or state.get("workspace") != self.workspace
+            or state.get("similarity_threshold") != self.similarity_threshold
+        ):
+            return False
+
+        self._reset()
+        self.defects = dict(state["defects"])
+        for key, duplicates in state["duplicates"]:
+            self.duplicates[key] = list(duplicates)
+            self._unique_by_file.setdefault(self.defects[key].get("file"), {})[
+                key
+            ] = None
+            for duplicate in duplicates:
+                self.representative[duplicate] = key
+        for cluster, members in state["clusters"]:
+            self.clusters[cluster] = list(members)
+            for member in members:
+                self.cluster_of[member] = cluster
+            self._seeds_by_file.setdefault(self.defects[members[0]].get("file"), {})[
+                cluster
+            ] = None
+        self._next_cluster = state["next_cluster"]
+        return True
+
+    def _state_path(self) -> Path:
+        from .analysis_cache import get_agent_cache_dir
+
+        digest = hashlib.sha256(self.workspace.encode("utf-8")).hexdigest()[:16]
+        return get_agent_cache_dir("aggregator") / f"{digest}.json"
+
+    def save(self) -> None:
+        """保存工作区状态"""
+        if self.workspace is None:
+            return
+        path = self._state_path()
+        try:
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(self.to_state(), ensure_ascii=False), encoding="utf-8"
+            )
+            tmp_path.replace(path)
+        except OSError:
+            pass
+
+    def load(self) -> bool:
+        """读取工作区状态，不存在或无法使用时返回False"""
+        if self.workspace is None:
+            return False
+        try:
+            state = json.loads(self._state_path().read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        try:
+            return self.load_state(state)
+        except (KeyError, TypeError, ValueError, IndexError):
+            self._reset()
+            return False
+
+
+_aggregators: Dict[str, IncrementalDefectAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_incremental_aggregator(
+    workspace: Union[str, Path],
+) -> IncrementalDefectAggregator:
+    """获取工作区的增量聚合器，进程内复用，首次使用时读取保存的状态"""
+    workspace = str(Path(workspace).resolve())
+    with _aggregators_lock:
+        aggregator = _aggregators.get(workspace)
+        if aggregator is None:
+            aggregator = IncrementalDefectAggregator(workspace)
+            aggregator.load()
+            _aggregators[workspace] = aggregator
+        return aggregator
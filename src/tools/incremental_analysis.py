@@ -0,0 +1,227 @@
+"""
+基于git差异的增量分析支持
+
+为analyze_code_defects和项目级分析提供增量模式：
+- 通过git diff获取相对基准引用的变更文件和变更行范围（包含未跟踪的新文件）
+- 只分析变更文件，并将问题过滤到变更行范围内
+- 保存每次项目分析的快照（提交号+各文件结果），增量分析时与快照合并，
+  得到完整的项目视图
+"""
+
+import hashlib
+import json
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 变更行范围，None表示整个文件（如新文件）
+LineRanges = Optional[List[Tuple[int, int]]]
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+
+
+def _git(repo: Path, *args: str, timeout: int = 30) -> Optional[str]:
+    """运行git命令，失败时返回None"""
+    try:
+        result = subprocess.run(
+            ["git", "-c", "core.quotepath=off", *args],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=repo,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def find_git_root(path: Path) -> Optional[Path]:
+    """获取路径所在git仓库的根目录，不在仓库中时返回None"""
+    path = Path(path)
+    start = path if path.is_dir() else path.parent
+    output = _git(start, "rev-parse", "--show-toplevel")
+    return Path(output.strip()).resolve() if output else None
+
+
+def get_head_commit(repo_root: Path) -> Optional[str]:
+    """获取当前HEAD的提交号，仓库尚无提交时返回None"""
+    output = _git(repo_root, "rev-parse", "--verify", "HEAD")
+    return output.strip() if output else None
+
+
+def parse_unified_diff(diff_text: str, repo_root: Path) -> Dict[Path, LineRanges]:
+    """解析 git diff --unified=0 的输出，返回{文件: 新文件中的变更行范围}"""
+    changes: Dict[Path, LineRanges] = {}
+    current: Optional[Path] = None
+
+    for line in diff_text.splitlines():
+        if line.startswith("+++ "):
+            target = line[4:].rstrip("\t")
+            if target == "/dev/null":
+                current = None  # 文件已删除
+            else:
+                current = (repo_root / target[2:]).resolve()
+                changes.setdefault(current, [])
+        elif line.startswith("@@") and current is not None:
+            match = _HUNK_RE.match(line)
+            if not match:
+                continue
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count == 0:
+                # 纯删除：标记删除位置前后的行
+                changes[current].append((max(start, 1), start + 1))
+            else:
+                changes[current].append((start, start + count - 1))
+
+    return changes
+
+
+def get_changed_lines(
+    repo_root: Path, base_ref: Optional[str] = None
+) -> Optional[Dict[Path, LineRanges]]:
+    """获取工作区相对基准引用的变更（包括已暂存、未暂存和未跟踪的文件）
+
+    Args:
+        repo_root: git仓库根目录
+        base_ref: 基准引用（提交号、分支、标签），默认为HEAD
+
+    Returns:
+        {文件绝对路径: 变更行范围}，git命令失败时返回None
+    """
+    base_ref = base_ref or "HEAD"
+    diff = _git(
+        repo_root,
+        "diff",
+        "--unified=0",
+        "--no-color",
+        "--no-ext-diff",
+        "--no-renames",
+        base_ref,
+        "--",
+    )
+    if diff is None:
+        return None
+
+    changes = parse_unified_diff(diff, repo_root)
+
+    untracked = _git(repo_root, "ls-files", "--others", "--exclude-standard")
+    for name in (untracked or "").splitlines():
+        if name:
+            changes[(repo_root / name).resolve()] = None
+
+    return changes
+
+
+def line_in_ranges(line: Optional[int], ranges: LineRanges) -> bool:
+    """判断行号是否落在变更范围内，文件级问题（无行号）视为在范围内"""
+    if ranges is None or not line:
+        return True
+    return any(start <= line <= end for start, end in ranges)
+
+
+def filter_issues_to_ranges(issues: List[Any], ranges: LineRanges) -> List[Any]:
+    """过滤出落在变更行范围内的问题（支持AnalysisIssue和问题字典）"""
+    return [
+        issue
+        for issue in issues
+        if line_in_ranges(
+            issue.get("line") if isinstance(issue, dict) else issue.line, ranges
+        )
+    ]
+
+
+def _snapshot_path(project_root: Path) -> Path:
+    from .analysis_cache import get_agent_cache_dir
+
+    digest = hashlib.sha256(str(project_root).encode("utf-8")).hexdigest()[:16]
+    return get_agent_cache_dir("snapshots") / f"{digest}.json"
+
+
+def load_snapshot(project_root: Path) -> Optional[Dict[str, Any]]:
+    """读取项目的上次分析快照"""
+    try:
+        data = json.loads(_snapshot_path(project_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    if data.get("project_root") != str(project_root):
+        return None
+    return data
+
+
+def find_snapshot(path: Path, repo_root: Path) -> Optional[Dict[str, Any]]:
+    """查找覆盖路径的最近一次项目分析快照
+
+    项目分析可能针对仓库的子目录进行，快照按分析的项目根目录保存，
+    因此从路径所在目录逐级向上查找直到仓库根目录，取其中最新的快照。
+    """
+    snapshots = []
+    directory = path if path.is_dir() else path.parent
+    for candidate in (directory, *directory.parents):
+        snapshot = load_snapshot(candidate)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+        if candidate == repo_root:
+            break
+    return max(snapshots, key=lambda s: s.get("created_at", 0), default=None)
+
+
+def save_snapshot(
+    project_root: Path, commit: Optional[str], results: List[Any]
+) -> None:
+    """保存项目分析快照（结果按文件路径索引）"""
+    from .analysis_cache import result_to_dict
+
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "project_root": str(project_root),
+        "commit": commit,
+        "created_at": time.time(),
+        "results": {result.file_path: result_to_dict(result) for result in results},
+    }
+    path = _snapshot_path(project_root)
+    try:
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError:
+        pass
+
+
+def get_file_changes(
+    file_path: Path, base_ref: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """获取单个文件相对基准引用的变更行范围
+
+    基准引用默认使用上次项目分析（分析范围包含该文件）的提交，没有快照时使用HEAD。
+
+    Returns:
+        {"base_ref", "changed", "ranges"}，文件不在git仓库中时返回None
+    """
+    file_path = Path(file_path).resolve()
+    repo_root = find_git_root(file_path)
+    if repo_root is None:
+        return None
+
+    if base_ref is None:
+        snapshot = find_snapshot(file_path, repo_root)
+        base_ref = (snapshot or {}).get("commit") or "HEAD"
+
+    changes = get_changed_lines(repo_root, base_ref)
+    if changes is None:
+        return None
+
+    return {
+        "base_ref": base_ref,
+        "changed": file_path in changes,
+        "ranges": changes.get(file_path, []),
+    }
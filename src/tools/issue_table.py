@@ -0,0 +1,347 @@
+"""
+紧凑的缺陷存储
+
+大量lint结果（数万条）以字典列表保存时，每条记录都要付出字典和重复字符串的开销。
+IssueTable按列存储缺陷：
+- 文件路径、工具、类型、严重程度、规则ID、类别、消息等字符串统一驻留在字符串池中，
+  每列只保存整数编号
+- 行号、列号保存在紧凑的数组中
+- IssueView是表上的行号索引视图，过滤只产生新的索引数组，不复制数据
+- IssueRow是单行的只读映射视图，可以直接替代缺陷字典传给DefectAggregator，
+  需要输出JSON时再通过to_dict/to_defects生成字典
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import (Any, Callable, Collection, Dict, Iterable, Iterator, List,
+                    Optional, Union)
+
+# 缺陷字典的字段，与issue_to_defect输出一致
+FIELDS = (
+    "file",
+    "tool",
+    "type",
+    "severity",
+    "message",
+    "line",
+    "column",
+    "rule_id",
+    "category",
+    "suggestion",
+)
+
+# 字符串列（保存字符串池编号）
+_STRING_FIELDS = tuple(f for f in FIELDS if f not in ("line", "column"))
+
+# 整数列中表示None的值
+_NONE_INT = -(2**31)
+
+
+class StringPool:
+    """字符串驻留池，编号0保留给None"""
+
+    __slots__ = ("_values", "_ids")
+
+    def __init__(self):
+        self._values: List[Optional[str]] = [None]
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: Optional[Any]) -> int:
+        """返回字符串的编号，不存在时加入池中"""
+        if value is None:
+            return 0
+        value = str(value)
+        index = self._ids.get(value)
+        if index is None:
+            index = len(self._values)
+            self._values.append(value)
+            self._ids[value] = index
+        return index
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        """查找字符串的编号，不存在时返回None（不加入池中）"""
+        if value is None:
+            return 0
+        return self._ids.get(value)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        return self._values[index]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class IssueRow(Mapping):
+    """表中单行的只读映射视图，支持与缺陷字典相同的get/[]访问"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "IssueTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._table.value(key, self._index)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._table._columns:
+            return default
+        return self._table.value(key, self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"IssueRow({self.to_dict()!r})"
+
+    @property
+    def index(self) -> int:
+        """行在表中的编号"""
+        return self._index
+
+    def to_dict(self) -> Dict[str, Any]:
+        """生成普通的缺陷字典"""
+        return self._table.row_dict(self._index)
+
+
+class IssueTable:
+    """按列存储的缺陷表"""
+
+    def __init__(self, pool: Optional[StringPool] = None):
+        self.pool = pool or StringPool()
+        self._columns: Dict[str, array] = {name: array("I") for name in _STRING_FIELDS}
+        self._columns["line"] = array("i")
+        self._columns["column"] = array("i")
+
+    @classmethod
+    def from_results(cls, results: Iterable[Any]) -> "IssueTable":
+        """从AnalysisResult列表构建"""
+        table = cls()
+        for result in results:
+            table.add_result(result)
+        return table
+
+    @classmethod
+    def from_defects(cls, defects: Iterable[Mapping]) -> "IssueTable":
+        """从缺陷字典列表构建"""
+        table = cls()
+        for defect in defects:
+            table.add_defect(defect)
+        return table
+
+    def append(
+        self,
+        file: Optional[str],
+        tool: Optional[str],
+        issue_type: Optional[str],
+        severity: Optional[str],
+        message: Optional[str],
+        line: Optional[int] = None,
+        column: Optional[int] = None,
+        rule_id: Optional[str] = None,
+        category: Optional[str] = None,
+        suggestion: Optional[str] = None,
+    ) -> int:
+        """追加一行，返回行号"""
+        intern = self.pool.intern
+        columns = self._columns
+        columns["file"].append(intern(file))
+        columns["tool"].append(intern(tool))
+        columns["type"].append(intern(issue_type))
+        columns["severity"].append(intern(severity))
+        columns["message"].append(intern(message))
+        columns["line"].append(_to_int(line))
+        columns["column"].append(_to_int(column))
+        columns["rule_id"].append(intern(rule_id))
+        columns["category"].append(intern(category))
+        columns["suggestion"].append(intern(suggestion))
+        return len(columns["file"]) - 1
+
+    def add_issue(self, issue: Any, file_path: Optional[str]) -> int:
+        """追加一个AnalysisIssue"""
+        return self.append(
+            file_path,
+            issue.tool_name,
+            issue.issue_type,
+            issue.severity,
+            issue.message,
+            issue.line,
+            issue.column,
+            issue.rule_id,
+            issue.category,
+            issue.suggestion,
+        )
+
+    def add_result(self, result: Any) -> None:
+        """追加一个AnalysisResult中的全部问题"""
+        for issue in result.issues:
+            self.add_issue(issue, result.file_path)
+
+    def add_defect(self, defect: Mapping) -> int:
+        """追加一个缺陷字典"""
+        get = defect.get
+        return self.append(
+            get("file"),
+            get("tool"),
+            get("type"),
+            get("severity"),
+            get("message"),
+            get("line"),
+            get("column"),
+            get("rule_id"),
+            get("category"),
+            get("suggestion"),
+        )
+
+    def value(self, field: str, index: int) -> Any:
+        """读取单个字段"""
+        raw = self._columns[field][index]
+        if field in ("line", "column"):
+            return None if raw == _NONE_INT else raw
+        return self.pool[raw]
+
+    def row_dict(self, index: int) -> Dict[str, Any]:
+        """生成单行的缺陷字典"""
+        return {field: self.value(field, index) for field in FIELDS}
+
+    def row(self, index: int) -> IssueRow:
+        return IssueRow(self, index)
+
+    def view(self, indices: Optional[Iterable[int]] = None) -> "IssueView":
+        """获取整张表或指定行的视图"""
+        return IssueView(self, indices)
+
+    def __len__(self) -> int:
+        return len(self._columns["file"])
+
+    def __iter__(self) -> Iterator[IssueRow]:
+        return (IssueRow(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> IssueRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("issue index out of range")
+        return IssueRow(self, index)
+
+    def filter(self, **criteria) -> "IssueView":
+        """按字段过滤，参见IssueView.filter"""
+        return self.view().filter(**criteria)
+
+    def to_defects(self) -> List[Dict[str, Any]]:
+        """生成缺陷字典列表（用于JSON输出）"""
+        return [self.row_dict(i) for i in range(len(self))]
+
+    def memory_usage(self) -> int:
+        """列数组占用的字节数（不含字符串池）"""
+        return sum(
+            column.buffer_info()[1] * column.itemsize
+            for column in self._columns.values()
+        )
+
+
+class IssueView:
+    """表上的行号索引视图，过滤和切片都不复制行数据"""
+
+    def __init__(self, table: IssueTable, indices: Optional[Iterable[int]] = None):
+        self.table = table
+        if indices is None:
+            self._indices: Union[range, array] = range(len(table))
+        elif isinstance(indices, (range, array)):
+            self._indices = indices
+        else:
+            self._indices = array("I", indices)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __iter__(self) -> Iterator[IssueRow]:
+        table = self.table
+        return (IssueRow(table, i) for i in self._indices)
+
+    def __getitem__(self, position: Union[int, slice]):
+        if isinstance(position, slice):
+            return IssueView(self.table, self._indices[position])
+        return IssueRow(self.table, self._indices[position])
+
+    @property
+    def indices(self) -> Union[range, array]:
+        return self._indices
+
+    def take(self, positions: Iterable[int]) -> "IssueView":
+        """按视图中的位置选取行"""
+        return IssueView(self.table, array("I", (self._indices[p] for p in positions)))
+
+    def where(self, predicate: Callable[[IssueRow], bool]) -> "IssueView":
+        """按任意条件过滤"""
+        table = self.table
+        return IssueView(
+            table,
+            array("I", (i for i in self._indices if predicate(IssueRow(table, i)))),
+        )
+
+    def filter(
+        self,
+        file: Union[str, Collection[str], None] = None,
+        severity: Union[str, Collection[str], None] = None,
+        issue_type: Union[str, Collection[str], None] = None,
+        tool: Union[str, Collection[str], None] = None,
+        rule_id: Union[str, Collection[str], None] = None,
+        category: Union[str, Collection[str], None] = None,
+    ) -> "IssueView":
+        """按字符串字段过滤，每个条件可以是单个值或值的集合
+
+        条件在字符串池编号上比较，不需要解码任何字符串。
+        """
+        criteria = {
+            "file": file,
+            "severity": severity,
+            "type": issue_type,
+            "tool": tool,
+            "rule_id": rule_id,
+            "category": category,
+        }
+        indices = self._indices
+        for field, wanted in criteria.items():
+            if wanted is None:
+                continue
+            if isinstance(wanted, str):
+                wanted = (wanted,)
+            ids = {self.table.pool.lookup(value) for value in wanted}
+            ids.discard(None)
+            column = self.table._columns[field]
+            indices = array("I", (i for i in indices if column[i] in ids))
+        return IssueView(self.table, indices)
+
+    def group_by(self, field: str) -> Dict[Any, "IssueView"]:
+        """按字段分组"""
+        column = self.table._columns[field]
+        groups: Dict[int, array] = {}
+        for i in self._indices:
+            groups.setdefault(column[i], array("I")).append(i)
+
+        decode = (
+            (lambda raw: None if raw == _NONE_INT else raw)
+            if field in ("line", "column")
+            else self.table.pool.__getitem__
+        )
+        return {
+            decode(raw): IssueView(self.table, indices)
+            for raw, indices in groups.items()
+        }
+
+    def to_defects(self) -> List[Dict[str, Any]]:
+        """生成缺陷字典列表（用于JSON输出）"""
+        return [self.table.row_dict(i) for i in self._indices]
+
+
+def _to_int(value: Any) -> int:
+    if value is None:
+        return _NONE_INT
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return _NONE_INT
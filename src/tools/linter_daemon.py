@@ -0,0 +1,301 @@
+"""
+常驻lint工作进程池
+
+为反复分析同一批文件的会话（修复→验证循环）提供预热的分析进程，
+思路与eslint_d、mypy daemon相同：
+- 工作进程常驻并在进程内运行pylint、flake8、mypy，省去每次的解释器启动和导入开销
+- 通过标准输入/输出管道上的JSON行协议通信（见linter_worker.py）
+- 空闲超时后自动关闭工作进程
+- 工作进程内存超过上限或处理任务数达到上限后回收重建
+- 工作进程异常时回退到普通的子进程调用，分析结果不受影响
+
+默认不启用，可通过分析器参数use_daemon=True或环境变量FIX_AGENT_LINTER_DAEMON=1开启。
+"""
+
+import atexit
+import importlib.util
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+WORKER_SCRIPT = Path(__file__).with_name("linter_worker.py")
+
+# 可以在工作进程内运行的工具
+SUPPORTED_TOOLS = ("pylint", "flake8", "mypy")
+
+
+def linter_daemon_enabled() -> bool:
+    """是否通过环境变量默认启用常驻工作进程"""
+    return os.environ.get("FIX_AGENT_LINTER_DAEMON", "").lower() in ("1", "true", "yes")
+
+
+class _WarmWorker:
+    """单个常驻工作进程"""
+
+    def __init__(self, idle_timeout: float):
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", str(WORKER_SCRIPT), str(idle_timeout)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # 不继承调用方的工作目录（可能已被删除），任务中再切换
+            cwd=str(WORKER_SCRIPT.parent),
+            text=True,
+            encoding="utf-8",
+        )
+        self.jobs = 0
+        self.rss_mb = 0.0
+        self.last_used = time.time()
+        self._responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self._responses.put(line)
+        self._responses.put(None)
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """发送一个任务并等待结果"""
+        self.process.stdin.write(json.dumps(payload) + "\n")
+        self.process.stdin.flush()
+        try:
+            line = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise subprocess.TimeoutExpired(payload.get("args"), timeout)
+        if line is None:
+            raise RuntimeError("lint worker exited unexpectedly")
+
+        self.jobs += 1
+        self.last_used = time.time()
+        response = json.loads(line)
+        self.rss_mb = response.get("rss_mb", 0.0)
+        return response
+
+    def close(self) -> None:
+        """正常关闭（关闭输入管道后工作进程自行退出）"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+class LinterWorkerPool:
+    """常驻lint工作进程池"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        idle_timeout: float = 300.0,
+        max_memory_mb: float = 1024.0,
+        max_jobs_per_worker: int = 500,
+    ):
+        """
+        Args:
+            max_workers: 最多同时存在的工作进程数
+            idle_timeout: 工作进程空闲多久后关闭（秒）
+            max_memory_mb: 工作进程常驻内存上限，超过后回收
+            max_jobs_per_worker: 单个工作进程最多处理的任务数，达到后回收
+        """
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+        self._condition = threading.Condition()
+        self._idle: List[_WarmWorker] = []
+        self._workers: List[_WarmWorker] = []
+        self._importable: Dict[str, bool] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.stats = {
+            "jobs": 0,
+            "spawned": 0,
+            "recycled": 0,
+            "idle_shutdowns": 0,
+            "fallbacks": 0,
+        }
+
+    def supports(self, cmd: List[str]) -> bool:
+        """命令对应的工具能否在工作进程内运行"""
+        if not cmd or cmd[0] not in SUPPORTED_TOOLS:
+            return False
+        tool = cmd[0]
+        if tool not in self._importable:
+            # 工作进程使用当前解释器，工具必须能在当前环境中导入
+            self._importable[tool] = importlib.util.find_spec(tool) is not None
+        return self._importable[tool]
+
+    def run(
+        self, cmd: List[str], cwd: Union[str, Path], timeout: float
+    ) -> subprocess.CompletedProcess:
+        """在工作进程中运行命令，返回与subprocess.run相同形式的结果"""
+        worker = self._acquire(cmd[0])
+        try:
+            response = worker.request(
+                {"tool": cmd[0], "args": cmd[1:], "cwd": str(cwd)}, timeout
+            )
+        except subprocess.TimeoutExpired:
+            self._discard(worker)
+            raise
+        except (RuntimeError, OSError, ValueError):
+            self._discard(worker)
+            return self._fallback(cmd, cwd, timeout)
+
+        self._release(worker)
+        if "error" in response:
+            return self._fallback(cmd, cwd, timeout)
+
+        self.stats["jobs"] += 1
+        return subprocess.CompletedProcess(
+            cmd,
+            response.get("returncode", 0),
+            response.get("stdout", ""),
+            response.get("stderr", ""),
+        )
+
+    def _fallback(
+        self, cmd: List[str], cwd: Union[str, Path], timeout: float
+    ) -> subprocess.CompletedProcess:
+        """工作进程不可用时回退到普通子进程"""
+        from .analyzer_metrics import get_analyzer_metrics
+
+        self.stats["fallbacks"] += 1
+        # 工作进程中的工具都是Python工具
+        get_analyzer_metrics().increment(cmd[0], "python", "fallbacks")
+        return subprocess.run(
+            cmd, capture_output=True, text=True, timeout=timeout, cwd=cwd
+        )
+
+    def _acquire(self, tool: Optional[str] = None) -> _WarmWorker:
+        with self._condition:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.is_alive():
+                        return worker
+                    # 工作进程已因空闲超时自行退出
+                    self._workers.remove(worker)
+
+                if len(self._workers) < self.max_workers:
+                    spawn_start = time.perf_counter()
+                    worker = _WarmWorker(self.idle_timeout)
+                    if tool:
+                        from .analyzer_metrics import get_analyzer_metrics
+
+                        get_analyzer_metrics().observe(
+                            tool, "python", "spawn", time.perf_counter() - spawn_start
+                        )
+                    self._workers.append(worker)
+                    self.stats["spawned"] += 1
+                    self._start_reaper()
+                    return worker
+
+                self._condition.wait()
+
+    def _release(self, worker: _WarmWorker) -> None:
+        recycle = (
+            worker.rss_mb > self.max_memory_mb
+            or worker.jobs >= self.max_jobs_per_worker
+        )
+        with self._condition:
+            if recycle or self._closed:
+                self._workers.remove(worker)
+                self.stats["recycled"] += int(recycle)
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+        if recycle or self._closed:
+            worker.close()
+
+    def _discard(self, worker: _WarmWorker) -> None:
+        worker.kill()
+        with self._condition:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self._condition.notify()
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+            self._reaper.start()
+
+    def _reap_idle(self) -> None:
+        """后台关闭空闲超时的工作进程，没有工作进程时线程退出"""
+        interval = max(1.0, min(self.idle_timeout / 4, 30.0))
+        while True:
+            time.sleep(interval)
+            now = time.time()
+            with self._condition:
+                expired = [
+                    w for w in self._idle if now - w.last_used > self.idle_timeout
+                ]
+                for worker in expired:
+                    self._idle.remove(worker)
+                    self._workers.remove(worker)
+                self.stats["idle_shutdowns"] += len(expired)
+                remaining = len(self._workers)
+            for worker in expired:
+                worker.close()
+            if remaining == 0:
+                return
+
+    def warm_up(self, count: int = 1) -> None:
+        """预先启动工作进程"""
+        workers = [self._acquire() for _ in range(min(count, self.max_workers))]
+        for worker in workers:
+            self._release(worker)
+
+    def shutdown(self) -> None:
+        """关闭所有工作进程"""
+        with self._condition:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+            self._idle.clear()
+            self._condition.notify_all()
+        for worker in workers:
+            worker.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作进程池统计信息"""
+        with self._condition:
+            return {
+                **self.stats,
+                "workers": len(self._workers),
+                "idle_workers": len(self._idle),
+                "worker_rss_mb": [round(w.rss_mb, 1) for w in self._workers],
+            }
+
+
+_pool: Optional[LinterWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_linter_pool() -> LinterWorkerPool:
+    """获取全局常驻工作进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LinterWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
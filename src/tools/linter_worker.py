@@ -0,0 +1,144 @@
+"""
+常驻lint工作进程
+
+由linter_daemon.LinterWorkerPool以独立脚本方式启动（不导入项目包，启动开销最小），
+在进程内反复运行pylint、flake8和mypy，省去每次分析的解释器启动和导入开销。
+
+通信协议：标准输入/输出上的JSON行
+- 请求: {"tool": "pylint", "args": [...], "cwd": "..."}
+- 响应: {"stdout": "...", "stderr": "...", "returncode": 0, "rss_mb": 123.4}
+       或 {"error": "..."}
+
+工作进程在空闲超过指定时间（第一个命令行参数，秒）后自动退出。
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+
+
+def _rss_mb() -> float:
+    """当前进程的常驻内存（MB）"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux以KB为单位，macOS以字节为单位
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+class _Capture(io.TextIOWrapper):
+    """同时支持文本写入和.buffer字节写入的输出捕获（flake8直接写sys.stdout.buffer）"""
+
+    def __init__(self):
+        super().__init__(io.BytesIO(), encoding="utf-8", write_through=True)
+
+    def getvalue(self) -> str:
+        self.flush()
+        return self.buffer.getvalue().decode("utf-8", errors="replace")
+
+
+def _run_pylint(args):
+    from astroid import MANAGER
+    from pylint.lint import Run
+
+    # 清除astroid的模块缓存，保证被编辑的文件重新解析
+    MANAGER.clear_cache()
+    try:
+        run = Run(args, exit=False)
+        return run.linter.msg_status
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+
+def _run_flake8(args):
+    from flake8.main.application import Application
+
+    # 工作进程池本身提供并行，flake8内部不再启动子进程
+    app = Application()
+    try:
+        app.run(["--jobs=1", *args])
+        return app.exit_code()
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+
+def _run_mypy(args):
+    from mypy import api
+
+    stdout, stderr, status = api.run(list(args))
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    return status
+
+
+RUNNERS = {"pylint": _run_pylint, "flake8": _run_flake8, "mypy": _run_mypy}
+
+
+def handle(request):
+    runner = RUNNERS.get(request.get("tool"))
+    if runner is None:
+        return {"error": f"unsupported tool: {request.get('tool')}"}
+
+    stdout, stderr = _Capture(), _Capture()
+    try:
+        # 每个请求都指定工作目录，无需恢复
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            returncode = runner(request.get("args", []))
+    except Exception:
+        return {"error": traceback.format_exc()}
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "returncode": returncode or 0,
+        "rss_mb": _rss_mb(),
+    }
+
+
+def main():
+    idle_timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 300.0
+
+    # 协议使用复制出的标准输出，原始的文件描述符1重定向到空设备，
+    # 防止工具直接写fd造成协议数据损坏
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = io.TextIOWrapper(os.fdopen(1, "wb"), encoding="utf-8")
+
+    import select
+
+    while True:
+        # Windows上select不支持管道，空闲关闭由父进程负责
+        if os.name != "nt":
+            ready, _, _ = select.select([sys.stdin], [], [], idle_timeout)
+            if not ready:
+                break  # 空闲超时，自动退出
+        line = sys.stdin.readline()
+        if not line:
+            break  # 父进程关闭了管道
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"error": "invalid request"}
+        else:
+            response = handle(request)
+        protocol_out.write(json.dumps(response) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
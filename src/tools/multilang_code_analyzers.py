@@ -5,19 +5,69 @@
 """
 
 import json
+import os
 import re
 import subprocess
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Type, Union
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
 
 from langchain_core.tools import tool
 
+from .analyzer_metrics import get_analyzer_metrics
+from .linter_daemon import get_linter_pool, linter_daemon_enabled
+from .toolchain_registry import get_toolchain_registry
 
-@dataclass
+# 批量分析时单次调用的文件数量和命令行长度上限（兼顾Windows的32K命令行限制）
+MAX_BATCH_FILES = 100
+MAX_BATCH_ARGV_CHARS = 30000
+
+# pylint退出码中表示致命错误（1）和用法错误（32）的位
+PYLINT_FATAL_STATUS = 1 | 32
+
+# ESLint退出码2表示配置错误或内部错误
+ESLINT_FATAL_STATUS = 2
+
+
+class ToolOutputError(Exception):
+    """分析工具异常退出或输出无法解析
+
+    此时无法判断文件是否有问题，结果按分析失败处理，不写入缓存。
+    """
+
+    def __init__(self, tool: str, returncode: int, detail: str = ""):
+        lines = [line for line in detail.strip().splitlines() if line.strip()]
+        message = f"{tool} exited abnormally (code {returncode})"
+        if lines:
+            message += f": {lines[-1].strip()}"
+        super().__init__(message)
+
+
+class _ReportedPathMatcher:
+    """将工具输出中的文件路径映射回输入文件
+
+    工具报告的路径可能是绝对路径，也可能相对于运行时的工作目录。
+    """
+
+    def __init__(self, file_paths: List[Path], cwd: Path):
+        self.cwd = cwd
+        self.lookup = {file_path.resolve(): file_path for file_path in file_paths}
+        self.memo: Dict[str, Optional[Path]] = {}
+
+    def __call__(self, reported: str) -> Optional[Path]:
+        if reported not in self.memo:
+            path = Path(reported)
+            if not path.is_absolute():
+                path = self.cwd / path
+            self.memo[reported] = self.lookup.get(path.resolve())
+        return self.memo[reported]
+
+
+@dataclass(slots=True)
 class AnalysisIssue:
-    """代码分析问题"""
+    """代码分析问题（使用__slots__，大量问题时节省内存）"""
 
     tool_name: str
     issue_type: str  # error, warning, info, convention
@@ -83,6 +133,10 @@ class BaseCodeAnalyzer(ABC):
 
     def __init__(self, timeout: int = 30, **kwargs):
         self.timeout = timeout
+        # 是否使用持久化结果缓存
+        self.use_cache = kwargs.pop("use_cache", True)
+        # 是否使用常驻的lint工作进程（eslint_d、进程内pylint/flake8/mypy）
+        self.use_daemon = kwargs.pop("use_daemon", linter_daemon_enabled())
         self.config = kwargs
 
     @abstractmethod
@@ -126,44 +180,114 @@ class BaseCodeAnalyzer(ABC):
             and self._check_tool_availability()
         )
 
+    def _get_version_command(self) -> List[str]:
+        """获取版本查询命令"""
+        return [self.get_tool_name(), "--version"]
+
+    def get_tool_version(self) -> str:
+        """获取工具版本字符串"""
+        return get_toolchain_registry().get_version(self._get_version_command())
+
+    def _get_cache_options(self) -> Dict[str, Any]:
+        """获取影响分析结果的选项，作为缓存键的一部分"""
+        return {"analyzer": type(self).__name__, "config": self.config}
+
+    def _get_cache_key(self, file_path: Path) -> Optional[str]:
+        """计算文件的缓存键，无法读取文件时返回None"""
+        from .analysis_cache import build_cache_key, hash_file_content
+
+        try:
+            content_hash = hash_file_content(file_path)
+        except OSError:
+            return None
+
+        return build_cache_key(
+            file_path.resolve(),
+            content_hash,
+            self.get_tool_name(),
+            self.get_tool_version(),
+            self._get_cache_options(),
+        )
+
+    def _lookup_cache(self, file_path: Path):
+        """查询结果缓存，返回(缓存, 缓存键, 缓存结果)"""
+        if not self.use_cache:
+            return None, None, None
+
+        from .analysis_cache import get_analysis_cache
+
+        cache = get_analysis_cache()
+        if cache is None:
+            return None, None, None
+
+        cache_key = self._get_cache_key(file_path)
+        if cache_key is None:
+            return cache, None, None
+
+        cached = cache.get_result(cache_key)
+        if cached is not None:
+            cached.file_path = str(file_path)
+            cached.metadata["cache_hit"] = True
+        return cache, cache_key, cached
+
+    def _observe(self, phase: str, value: float) -> None:
+        """记录当前工具的阶段耗时或问题数"""
+        get_analyzer_metrics().observe(
+            self.get_tool_name(), self.get_language(), phase, value
+        )
+
+    def _count(self, event: str, count: int = 1) -> None:
+        """累加当前工具的事件计数"""
+        get_analyzer_metrics().increment(
+            self.get_tool_name(), self.get_language(), event, count
+        )
+
+    def _error_result(self, file_path: Path, error: str) -> AnalysisResult:
+        """构建分析失败的结果"""
+        return AnalysisResult(
+            file_path=str(file_path),
+            language=self.get_language(),
+            tool_name=self.get_tool_name(),
+            success=False,
+            issues=[],
+            error=error,
+        )
+
     def analyze(self, file_path: Union[str, Path]) -> AnalysisResult:
         """分析文件"""
-        import time
-
         start_time = time.time()
 
         file_path = Path(file_path)
 
         if not self.can_analyze(file_path):
-            return AnalysisResult(
-                file_path=str(file_path),
-                language=self.get_language(),
-                tool_name=self.get_tool_name(),
-                success=False,
-                issues=[],
-                error=f"Cannot analyze file: {file_path}",
-            )
+            return self._error_result(file_path, f"Cannot analyze file: {file_path}")
 
-        try:
-            # 执行分析命令
-            cmd = self._build_command(file_path)
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout,
-                cwd=file_path.parent,
-            )
+        # 文件内容、工具版本和选项都未变化时直接返回缓存结果
+        cache, cache_key, cached = self._lookup_cache(file_path)
+        if cached is not None:
+            cached.execution_time = time.time() - start_time
+            self._count("cache_hits")
+            return cached
 
-            # 解析输出
-            issues = self._parse_output(
-                result.stdout, result.stderr, result.returncode, file_path
-            )
+        analysis_result = self._run_single(file_path, start_time)
+        if cache_key is not None and analysis_result.success:
+            cache.put_result(cache_key, analysis_result)
+
+        return analysis_result
+
+    def _run_single(self, file_path: Path, start_time: float) -> AnalysisResult:
+        """对单个文件运行分析工具"""
+        try:
+            # 执行分析并解析输出
+            issues, returncode = self._execute(file_path)
 
             # 计算质量评分
             score = self._calculate_score(issues)
 
             execution_time = time.time() - start_time
+            self._observe("total", execution_time)
+            self._observe("issues", len(issues))
+            self._count("files")
 
             return AnalysisResult(
                 file_path=str(file_path),
@@ -173,36 +297,212 @@ class BaseCodeAnalyzer(ABC):
                 issues=issues,
                 score=score,
                 execution_time=execution_time,
-                metadata={"returncode": result.returncode},
+                metadata={"returncode": returncode, "cache_hit": False},
             )
 
         except subprocess.TimeoutExpired:
-            return AnalysisResult(
-                file_path=str(file_path),
-                language=self.get_language(),
-                tool_name=self.get_tool_name(),
-                success=False,
-                issues=[],
-                error="Analysis timeout",
-            )
+            self._count("timeouts")
+            return self._error_result(file_path, "Analysis timeout")
+        except ToolOutputError as e:
+            self._count("errors")
+            return self._error_result(file_path, str(e))
         except FileNotFoundError:
-            return AnalysisResult(
-                file_path=str(file_path),
-                language=self.get_language(),
-                tool_name=self.get_tool_name(),
-                success=False,
-                issues=[],
-                error=f"Tool '{self.get_tool_name()}' is not installed",
+            self._count("errors")
+            return self._error_result(
+                file_path, f"Tool '{self.get_tool_name()}' is not installed"
             )
         except Exception as e:
-            return AnalysisResult(
+            self._count("errors")
+            return self._error_result(file_path, f"Analysis failed: {e}")
+
+    def _execute(self, file_path: Path) -> Tuple[List[AnalysisIssue], int]:
+        """运行分析工具并解析输出，返回(问题列表, 返回码)"""
+        cmd = self._build_command(file_path)
+        result = self._run_command(cmd, file_path.parent, self.timeout)
+        parse_start = time.perf_counter()
+        issues = self._parse_output(
+            result.stdout, result.stderr, result.returncode, file_path
+        )
+        self._observe("parse", time.perf_counter() - parse_start)
+        return issues, result.returncode
+
+    def _execute_batch(
+        self, file_paths: List[Path], cwd: Path
+    ) -> Tuple[Dict[Path, List[AnalysisIssue]], int]:
+        """对多个文件运行一次分析工具，返回(按文件拆分的问题, 返回码)"""
+        result = self._run_command(
+            self._build_batch_command(file_paths), cwd, self.timeout * len(file_paths)
+        )
+        parse_start = time.perf_counter()
+        issues_by_file = self._parse_batch_output(
+            result.stdout, result.stderr, result.returncode, file_paths, cwd
+        )
+        self._observe("parse", time.perf_counter() - parse_start)
+        return issues_by_file, result.returncode
+
+    def _run_command(
+        self, cmd: List[str], cwd: Path, timeout: float
+    ) -> subprocess.CompletedProcess:
+        """运行分析命令；启用常驻模式时交给预热的工作进程执行"""
+        run_start = time.perf_counter()
+        result = self._dispatch_command(cmd, cwd, timeout)
+        self._observe("run", time.perf_counter() - run_start)
+        return result
+
+    def _dispatch_command(
+        self, cmd: List[str], cwd: Path, timeout: float
+    ) -> subprocess.CompletedProcess:
+        if self.use_daemon:
+            if cmd[0] == "eslint" and get_toolchain_registry().is_available("eslint_d"):
+                # Node工具无法在Python工作进程中运行，使用eslint_d常驻服务
+                cmd = ["eslint_d", *cmd[1:]]
+            else:
+                pool = get_linter_pool()
+                if pool.supports(cmd):
+                    return pool.run(cmd, cwd, timeout)
+
+        return subprocess.run(
+            cmd, capture_output=True, text=True, timeout=timeout, cwd=cwd
+        )
+
+    def supports_batch(self) -> bool:
+        """当前工具是否支持一次调用分析多个文件"""
+        return False
+
+    def _build_batch_command(self, file_paths: List[Path]) -> List[str]:
+        """构建多文件分析命令，支持批量分析的分析器需要实现"""
+        raise NotImplementedError
+
+    def _parse_batch_output(
+        self,
+        stdout: str,
+        stderr: str,
+        returncode: int,
+        file_paths: List[Path],
+        cwd: Path,
+    ) -> Dict[Path, List[AnalysisIssue]]:
+        """解析多文件分析的输出，按输入文件拆分问题，支持批量分析的分析器需要实现"""
+        raise NotImplementedError
+
+    def _chunk_paths(self, items: List[tuple]) -> List[List[tuple]]:
+        """按文件数量和命令行长度将待分析文件分块"""
+        chunks = []
+        current = []
+        current_chars = 0
+        for item in items:
+            path_chars = len(str(item[2])) + 1
+            if current and (
+                len(current) >= MAX_BATCH_FILES
+                or current_chars + path_chars > MAX_BATCH_ARGV_CHARS
+            ):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(item)
+            current_chars += path_chars
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def analyze_many(self, file_paths: List[Union[str, Path]]) -> List[AnalysisResult]:
+        """批量分析多个文件，结果顺序与输入一致
+
+        支持批量的工具（如pylint、eslint）每个分块只启动一次，
+        其余工具逐个文件分析。缓存命中的文件不会再交给工具。
+        """
+        paths = [Path(p) for p in file_paths]
+        results: Dict[int, AnalysisResult] = {}
+        # (输入序号, 原始路径, 绝对路径, 缓存键)
+        pending = []
+        cache = None
+
+        for index, file_path in enumerate(paths):
+            start_time = time.time()
+            if not self.can_analyze(file_path):
+                results[index] = self._error_result(
+                    file_path, f"Cannot analyze file: {file_path}"
+                )
+                continue
+
+            cache, cache_key, cached = self._lookup_cache(file_path)
+            if cached is not None:
+                cached.execution_time = time.time() - start_time
+                self._count("cache_hits")
+                results[index] = cached
+                continue
+
+            pending.append((index, file_path, file_path.resolve(), cache_key))
+
+        if self.supports_batch():
+            for chunk in self._chunk_paths(pending):
+                results.update(self._run_batch(chunk, cache))
+        else:
+            for index, file_path, _, cache_key in pending:
+                result = self._run_single(file_path, time.time())
+                if cache_key is not None and result.success:
+                    cache.put_result(cache_key, result)
+                results[index] = result
+
+        return [results[index] for index in range(len(paths))]
+
+    def _run_batch(self, chunk: List[tuple], cache) -> Dict[int, AnalysisResult]:
+        """对一个分块运行一次分析工具并按文件拆分结果"""
+        start_time = time.time()
+        files = [resolved for _, _, resolved, _ in chunk]
+        cwd = Path(os.path.commonpath([str(path.parent) for path in files]))
+
+        try:
+            issues_by_file, returncode = self._execute_batch(files, cwd)
+        except subprocess.TimeoutExpired:
+            self._count("timeouts")
+            return {
+                index: self._error_result(path, "Analysis timeout")
+                for index, path, _, _ in chunk
+            }
+        except ToolOutputError as e:
+            # 整个分块的输出不可信，不为其中任何文件写入"没有问题"的结果
+            self._count("errors")
+            return {
+                index: self._error_result(path, str(e)) for index, path, _, _ in chunk
+            }
+        except FileNotFoundError:
+            self._count("errors")
+            error = f"Tool '{self.get_tool_name()}' is not installed"
+            return {
+                index: self._error_result(path, error) for index, path, _, _ in chunk
+            }
+        except Exception as e:
+            self._count("errors")
+            return {
+                index: self._error_result(path, f"Analysis failed: {e}")
+                for index, path, _, _ in chunk
+            }
+
+        # 批量运行的耗时平均分摊到每个文件
+        execution_time = (time.time() - start_time) / len(files)
+        self._count("files", len(files))
+        results = {}
+        for index, file_path, resolved, cache_key in chunk:
+            issues = issues_by_file.get(resolved, [])
+            self._observe("total", execution_time)
+            self._observe("issues", len(issues))
+            analysis_result = AnalysisResult(
                 file_path=str(file_path),
                 language=self.get_language(),
                 tool_name=self.get_tool_name(),
-                success=False,
-                issues=[],
-                error=f"Analysis failed: {e}",
+                success=True,
+                issues=issues,
+                score=self._calculate_score(issues),
+                execution_time=execution_time,
+                metadata={
+                    "returncode": returncode,
+                    "cache_hit": False,
+                    "batch_size": len(files),
+                },
             )
+            if cache_key is not None:
+                cache.put_result(cache_key, analysis_result)
+            results[index] = analysis_result
+        return results
 
     def _calculate_score(self, issues: List[AnalysisIssue]) -> float:
         """计算质量评分"""
@@ -235,13 +535,15 @@ class JavaScriptTypeScriptAnalyzer(BaseCodeAnalyzer):
         return "eslint"
 
     def _check_tool_availability(self) -> bool:
-        try:
-            subprocess.run(["eslint", "--version"], capture_output=True, timeout=5)
-            return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        return get_toolchain_registry().is_available("eslint")
+
+    def supports_batch(self) -> bool:
+        return True
 
     def _build_command(self, file_path: Path) -> List[str]:
+        return self._build_batch_command([file_path])
+
+    def _build_batch_command(self, file_paths: List[Path]) -> List[str]:
         cmd = [
             "eslint",
             "--format",
@@ -251,40 +553,61 @@ class JavaScriptTypeScriptAnalyzer(BaseCodeAnalyzer):
             "browser,es2021,node",
             "--parser-options",
             '{"ecmaVersion": "latest", "sourceType": "module"}',
-            str(file_path),
         ]
+        cmd.extend(str(file_path) for file_path in file_paths)
         return cmd
 
     def _parse_output(
         self, stdout: str, stderr: str, returncode: int, file_path: Path
     ) -> List[AnalysisIssue]:
-        issues = []
+        issues_by_file = self._parse_batch_output(
+            stdout, stderr, returncode, [file_path], file_path.parent
+        )
+        return issues_by_file[file_path]
+
+    def _parse_batch_output(
+        self,
+        stdout: str,
+        stderr: str,
+        returncode: int,
+        file_paths: List[Path],
+        cwd: Path,
+    ) -> Dict[Path, List[AnalysisIssue]]:
+        if returncode == ESLINT_FATAL_STATUS:
+            raise ToolOutputError("eslint", returncode, stderr or stdout)
+
+        issues_by_file = {file_path: [] for file_path in file_paths}
+        match_path = _ReportedPathMatcher(file_paths, cwd)
 
         try:
-            # 解析ESLint JSON输出
+            # 解析ESLint JSON输出，filePath为绝对路径
             if stdout:
                 results = json.loads(stdout)
                 for result in results:
-                    if result.get("filePath") == str(file_path):
-                        for message in result.get("messages", []):
-                            issue = AnalysisIssue(
-                                tool_name="eslint",
-                                issue_type=message.get(
-                                    "severity", 1
-                                ),  # 1=error, 2=warning
-                                severity=(
-                                    "high" if message.get("severity") == 1 else "medium"
-                                ),
-                                message=message.get("message", ""),
-                                line=message.get("line"),
-                                column=message.get("column"),
-                                rule_id=message.get("ruleId"),
-                                category="code_style",
-                            )
-                            issues.append(issue)
+                    target = match_path(result.get("filePath", ""))
+                    if target is None:
+                        continue
+                    for message in result.get("messages", []):
+                        issue = AnalysisIssue(
+                            tool_name="eslint",
+                            issue_type=message.get("severity", 1),  # 1=error, 2=warning
+                            severity=(
+                                "high" if message.get("severity") == 1 else "medium"
+                            ),
+                            message=message.get("message", ""),
+                            line=message.get("line"),
+                            column=message.get("column"),
+                            rule_id=message.get("ruleId"),
+                            category="code_style",
+                        )
+                        issues_by_file[target].append(issue)
         except json.JSONDecodeError:
-            # 如果JSON解析失败，尝试从stderr提取信息
+            # 多个文件时无法判断哪些文件已检查，整个分块按失败处理
+            if len(file_paths) > 1:
+                raise ToolOutputError("eslint", returncode, stderr or stdout)
+            # 单个文件时尝试从stderr提取信息
             if stderr:
+                issues = issues_by_file[file_paths[0]]
                 for line in stderr.split("\n"):
                     if line.strip() and ":" in line:
                         # 简单的错误信息解析
@@ -304,7 +627,7 @@ class JavaScriptTypeScriptAnalyzer(BaseCodeAnalyzer):
                             except ValueError:
                                 continue
 
-        return issues
+        return issues_by_file
 
 
 class JavaAnalyzer(BaseCodeAnalyzer):
@@ -324,21 +647,16 @@ class JavaAnalyzer(BaseCodeAnalyzer):
         return self.tool
 
     def _check_tool_availability(self) -> bool:
-        tools = {
-            "spotbugs": ["spotbugs", "-textui", "-version"],
-            "pmd": ["pmd", "--version"],
-            "checkstyle": ["checkstyle", "-version"],
-        }
-
-        cmd = tools.get(self.tool)
-        if not cmd:
+        if self.tool not in ("spotbugs", "pmd", "checkstyle"):
             return False
+        return get_toolchain_registry().is_available(self.tool)
 
-        try:
-            subprocess.run(cmd, capture_output=True, timeout=5)
-            return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+    def _get_version_command(self) -> List[str]:
+        if self.tool == "spotbugs":
+            return ["spotbugs", "-textui", "-version"]
+        elif self.tool == "checkstyle":
+            return ["checkstyle", "-version"]
+        return [self.tool, "--version"]
 
     def _build_command(self, file_path: Path) -> List[str]:
         if self.tool == "spotbugs":
@@ -443,17 +761,9 @@ class CCppAnalyzer(BaseCodeAnalyzer):
         return self.tool
 
     def _check_tool_availability(self) -> bool:
-        tools = {"clang": ["clang", "--version"], "cppcheck": ["cppcheck", "--version"]}
-
-        cmd = tools.get(self.tool)
-        if not cmd:
-            return False
-
-        try:
-            subprocess.run(cmd, capture_output=True, timeout=5)
-            return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
+        if self.tool not in ("clang", "cppcheck"):
             return False
+        return get_toolchain_registry().is_available(self.tool)
 
     def _build_command(self, file_path: Path) -> List[str]:
         if self.tool == "clang":
@@ -553,11 +863,14 @@ class GoAnalyzer(BaseCodeAnalyzer):
         return self.tool
 
     def _check_tool_availability(self) -> bool:
-        try:
-            subprocess.run(["go", "version"], capture_output=True, timeout=5)
-            return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        if self.tool == "staticcheck":
+            return get_toolchain_registry().is_available("staticcheck")
+        return get_toolchain_registry().is_available("go")
+
+    def _get_version_command(self) -> List[str]:
+        if self.tool == "staticcheck":
+            return ["staticcheck", "-version"]
+        return ["go", "version"]
 
     def _build_command(self, file_path: Path) -> List[str]:
         if self.tool == "vet":
@@ -623,13 +936,10 @@ class RustAnalyzer(BaseCodeAnalyzer):
         return "clippy"
 
     def _check_tool_availability(self) -> bool:
-        try:
-            subprocess.run(
-                ["cargo", "clippy", "--version"], capture_output=True, timeout=5
-            )
-            return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        return get_toolchain_registry().is_available("cargo")
+
+    def _get_version_command(self) -> List[str]:
+        return ["cargo", "clippy", "--version"]
 
     def _build_command(self, file_path: Path) -> List[str]:
         # Rust分析通常在项目根目录运行
@@ -698,122 +1008,155 @@ class PythonAnalyzer(BaseCodeAnalyzer):
     def get_tool_name(self) -> str:
         return self.tool
 
+    # 各工具的降级顺序，全部不可用时降级到Python内置检查
+    _FALLBACK_CHAINS = {
+        "pylint": ["pylint", "flake8"],
+        "flake8": ["flake8"],
+        "mypy": ["mypy"],
+    }
+
     def _check_tool_availability(self) -> bool:
-        if self.tool == "pylint":
-            try:
-                subprocess.run(["pylint", "--version"], capture_output=True, timeout=5)
-                return True
-            except (FileNotFoundError, subprocess.TimeoutExpired):
-                # pylint未安装，尝试降级到flake8
-                try:
-                    subprocess.run(
-                        ["flake8", "--version"], capture_output=True, timeout=5
-                    )
-                    self.tool = "flake8"  # 降级到flake8
-                    return True
-                except (FileNotFoundError, subprocess.TimeoutExpired):
-                    # 如果flake8也未安装，使用Python内置的语法检查
-                    self.tool = "python_builtin"
-                    return True
-        elif self.tool == "flake8":
-            try:
-                subprocess.run(["flake8", "--version"], capture_output=True, timeout=5)
-                return True
-            except (FileNotFoundError, subprocess.TimeoutExpired):
-                # flake8未安装，降级到Python内置检查
-                self.tool = "python_builtin"
-                return True
-        elif self.tool == "mypy":
-            try:
-                subprocess.run(["mypy", "--version"], capture_output=True, timeout=5)
-                return True
-            except (FileNotFoundError, subprocess.TimeoutExpired):
-                # mypy未安装，降级到Python内置检查
-                self.tool = "python_builtin"
-                return True
-        elif self.tool == "python_builtin":
+        if self.tool == "python_builtin":
             return True  # Python内置检查总是可用
-        return False
+
+        chain = self._FALLBACK_CHAINS.get(self.tool)
+        if chain is None:
+            return False
+
+        resolved = get_toolchain_registry().resolve(chain) or "python_builtin"
+        if resolved != self.tool:
+            # 记录在请求的工具名下，便于看出哪个linter缺失
+            self._count("fallbacks")
+        self.tool = resolved
+        return True
+
+    def get_tool_version(self) -> str:
+        if self.tool == "python_builtin":
+            # 内置检查在当前解释器中运行，版本由检查器和解释器共同决定
+            import platform
+
+            from .python_checker import CHECKER_VERSION
+
+            return f"python_checker {CHECKER_VERSION} / {platform.python_version()}"
+        return super().get_tool_version()
+
+    def supports_batch(self) -> bool:
+        return self.tool in ("pylint", "flake8", "python_builtin")
+
+    def _execute(self, file_path: Path) -> Tuple[List[AnalysisIssue], int]:
+        if self.tool == "python_builtin":
+            # 进程内检查，不再为每个文件启动 python -m py_compile
+            from .python_checker import check_python_file
+
+            issues = check_python_file(file_path)
+            return issues, 1 if issues else 0
+        return super()._execute(file_path)
+
+    def _execute_batch(
+        self, file_paths: List[Path], cwd: Path
+    ) -> Tuple[Dict[Path, List[AnalysisIssue]], int]:
+        if self.tool == "python_builtin":
+            # 多个文件在共享进程池上并行检查，结果由分析结果缓存保存
+            from .python_checker import check_python_files
+
+            results = check_python_files(file_paths, use_cache=False)
+            issues_by_file = {path: results[str(path)] for path in file_paths}
+            return issues_by_file, 1 if any(issues_by_file.values()) else 0
+        return super()._execute_batch(file_paths, cwd)
 
     def _build_command(self, file_path: Path) -> List[str]:
-        if self.tool == "pylint":
-            return ["pylint", "--output-format=json", "--reports=no", str(file_path)]
-        elif self.tool == "flake8":
-            return ["flake8", "--format=json", str(file_path)]
+        if self.tool in ("pylint", "flake8"):
+            return self._build_batch_command([file_path])
         elif self.tool == "mypy":
             return ["mypy", "--show-error-codes", "--no-error-summary", str(file_path)]
         elif self.tool == "python_builtin":
-            # 使用Python内置的语法检查
+            # 内置检查在进程内完成（见_execute），命令仅用于展示
             return ["python", "-m", "py_compile", str(file_path)]
         else:
             raise ValueError(f"Unsupported tool: {self.tool}")
 
-    def _parse_output(
-        self, stdout: str, stderr: str, returncode: int, file_path: Path
-    ) -> List[AnalysisIssue]:
-        issues = []
+    def _build_batch_command(self, file_paths: List[Path]) -> List[str]:
+        paths = [str(file_path) for file_path in file_paths]
+        if self.tool == "pylint":
+            return ["pylint", "--output-format=json", "--reports=no", *paths]
+        elif self.tool == "flake8":
+            # 使用flake8默认的 path:row:col: code text 格式，无需额外插件
+            return ["flake8", *paths]
+        else:
+            raise ValueError(f"Tool does not support batch analysis: {self.tool}")
+
+    def _parse_batch_output(
+        self,
+        stdout: str,
+        stderr: str,
+        returncode: int,
+        file_paths: List[Path],
+        cwd: Path,
+    ) -> Dict[Path, List[AnalysisIssue]]:
+        issues_by_file = {file_path: [] for file_path in file_paths}
+        match_path = _ReportedPathMatcher(file_paths, cwd)
 
-        if self.tool == "pylint" and stdout:
+        if self.tool == "pylint":
+            # 致命错误、用法错误或崩溃时输出不是完整的报告
+            if returncode < 0 or returncode & PYLINT_FATAL_STATUS:
+                raise ToolOutputError("pylint", returncode, stderr or stdout)
+            # pylint报告的path相对于运行时的工作目录；没有输出时只有退出码为0才可信
             try:
-                pylint_issues = json.loads(stdout)
+                pylint_issues = (
+                    json.loads(stdout) if stdout.strip() or returncode else []
+                )
                 for issue in pylint_issues:
-                    if issue.get("path") == str(file_path):
-                        analysis_issue = AnalysisIssue(
-                            tool_name="pylint",
-                            issue_type=issue.get("type", "warning"),
-                            severity=(
-                                "high" if issue.get("type") == "error" else "medium"
-                            ),
-                            message=issue.get("message", ""),
-                            line=issue.get("line"),
-                            column=issue.get("column"),
-                            rule_id=issue.get("message-id"),
-                            category="python_quality",
-                        )
-                        issues.append(analysis_issue)
+                    target = match_path(issue.get("path", ""))
+                    if target is None:
+                        continue
+                    analysis_issue = AnalysisIssue(
+                        tool_name="pylint",
+                        issue_type=issue.get("type", "warning"),
+                        severity="high" if issue.get("type") == "error" else "medium",
+                        message=issue.get("message", ""),
+                        line=issue.get("line"),
+                        column=issue.get("column"),
+                        rule_id=issue.get("message-id"),
+                        category="python_quality",
+                    )
+                    issues_by_file[target].append(analysis_issue)
             except json.JSONDecodeError:
-                pass
+                raise ToolOutputError("pylint", returncode, stderr or stdout)
 
         elif self.tool == "flake8" and stdout:
-            # Flake8输出格式: {"filename": "...", "line": 1, "column": 1, "text": "...", "code": "E001"}
-            try:
-                flake8_issues = json.loads(stdout)
-                if isinstance(flake8_issues, list):
-                    for issue in flake8_issues:
-                        if issue.get("filename") == str(file_path):
-                            analysis_issue = AnalysisIssue(
-                                tool_name="flake8",
-                                issue_type="warning",
-                                severity="medium",
-                                message=issue.get("text", ""),
-                                line=issue.get("line"),
-                                column=issue.get("column"),
-                                rule_id=issue.get("code"),
-                                category="python_style",
-                            )
-                            issues.append(analysis_issue)
-            except json.JSONDecodeError:
-                # 尝试解析传统格式
-                for line in stdout.split("\n"):
-                    if line.strip() and file_path.name in line:
-                        # 示例: test.py:1:1: E001 error message
-                        match = re.search(
-                            rf"{re.escape(file_path.name)}:(\d+):(\d+):\s*(\w+)\s+(.+)",
-                            line,
-                        )
-                        if match:
-                            line_num, col_num, code, message = match.groups()
-                            analysis_issue = AnalysisIssue(
-                                tool_name="flake8",
-                                issue_type="warning",
-                                severity="medium",
-                                message=message.strip(),
-                                line=int(line_num),
-                                column=int(col_num),
-                                rule_id=code,
-                                category="python_style",
-                            )
-                            issues.append(analysis_issue)
+            # 示例: /path/to/test.py:1:1: E001 error message
+            for line in stdout.split("\n"):
+                match = re.match(r"(.+?):(\d+):(\d+):\s*(\w+)\s+(.+)", line.strip())
+                if not match:
+                    continue
+                reported, line_num, col_num, code, message = match.groups()
+                target = match_path(reported)
+                if target is None:
+                    continue
+                analysis_issue = AnalysisIssue(
+                    tool_name="flake8",
+                    issue_type="warning",
+                    severity="medium",
+                    message=message.strip(),
+                    line=int(line_num),
+                    column=int(col_num),
+                    rule_id=code,
+                    category="python_style",
+                )
+                issues_by_file[target].append(analysis_issue)
+
+        return issues_by_file
+
+    def _parse_output(
+        self, stdout: str, stderr: str, returncode: int, file_path: Path
+    ) -> List[AnalysisIssue]:
+        issues = []
+
+        if self.tool in ("pylint", "flake8"):
+            issues_by_file = self._parse_batch_output(
+                stdout, stderr, returncode, [file_path], file_path.parent
+            )
+            issues = issues_by_file[file_path]
 
         elif self.tool == "mypy" and stderr:
             # MyPy输出在stderr中
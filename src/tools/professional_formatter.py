@@ -16,6 +16,9 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.tools import tool
 
+from .toolchain_registry import get_toolchain_registry
+from .workspace_index import get_workspace_index
+
 
 class FormatOperation(Enum):
     """格式化操作类型"""
@@ -258,13 +261,7 @@ class JavaScriptFormatter:
 
     def _check_prettier(self) -> bool:
         """检查prettier是否可用"""
-        try:
-            result = subprocess.run(
-                ["npx", "--version"], capture_output=True, text=True, timeout=10
-            )
-            return result.returncode == 0
-        except:
-            return False
+        return get_toolchain_registry().is_available("npx")
 
     def format_file(
         self, file_path: str, operation: FormatOperation = FormatOperation.AUTO_FIX
@@ -424,16 +421,7 @@ class CppFormatter:
 
     def _check_clang_format(self) -> bool:
         """检查clang-format是否可用"""
-        try:
-            result = subprocess.run(
-                ["clang-format", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
-            return result.returncode == 0
-        except:
-            return False
+        return get_toolchain_registry().is_available("clang-format")
 
     def format_file(
         self, file_path: str, operation: FormatOperation = FormatOperation.AUTO_FIX
@@ -758,7 +746,6 @@ def batch_format_professional(
         批量格式化结果的JSON字符串
     """
     try:
-        import glob
         from pathlib import Path
 
         project_dir = Path(project_path)
@@ -769,9 +756,10 @@ def batch_format_professional(
                 ensure_ascii=False,
             )
 
-        # 查找文件
+        # 查找文件（查询共享的工作区索引，遵循.gitignore/.fixagentignore）
         search_pattern = str(project_dir / file_pattern)
-        files = glob.glob(search_pattern, recursive=True)
+        index = get_workspace_index(project_dir)
+        files = [indexed_file.path for indexed_file in index.glob(file_pattern)]
 
         if not files:
             return json.dumps(
@@ -16,6 +16,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.tools import tool
 
+from .workspace_index import get_workspace_index
+
 
 @dataclass
 class ProcessInfo:
@@ -570,15 +572,9 @@ class ProjectDynamicAnalyzer:
 
         # 项目文件统计
         try:
-            file_count = 0
-            total_size = 0
-            for root, dirs, files in os.walk(project_path):
-                file_count += len(files)
-                for file in files:
-                    try:
-                        total_size += os.path.getsize(os.path.join(root, file))
-                    except OSError:
-                        continue
+            index_stats = get_workspace_index(project_path).stats()
+            file_count = index_stats["file_count"]
+            total_size = index_stats["total_size"]
 
             metrics.append(
                 PerformanceMetric(
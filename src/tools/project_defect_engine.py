@@ -0,0 +1,602 @@
+"""
+项目级缺陷分析引擎
+
+在MultiLanguageAnalyzerFactory之上构建的项目级并行分析引擎：
+- 通过共享的工作区索引扫描项目源文件并按语言分组
+- 在有界线程池上并行运行各语言的BaseCodeAnalyzer，同语言文件分块批量调用工具
+- 支持项目级的时间预算，超时后取消尚未开始的分析任务
+- 将所有文件的缺陷汇总后进行一次DefectAggregator聚合
+- 增量模式：只分析git变更文件，与上次分析快照合并出完整视图
+- 流式接口：iter_results/aiter_results按完成顺序逐个产出文件结果，
+  分析工具通过langgraph的custom流上报进度
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (Any, AsyncIterator, Callable, Dict, Iterable, Iterator,
+                    List, Optional)
+
+from langchain_core.tools import tool
+
+from .defect_aggregator import MAX_RENDERED_CLUSTERS, DefectAggregator
+from .incremental_analysis import (filter_issues_to_ranges, find_git_root,
+                                   get_changed_lines, get_head_commit,
+                                   load_snapshot, save_snapshot)
+from .issue_table import IssueTable
+from .multilang_code_analyzers import (MAX_BATCH_FILES, AnalysisResult,
+                                       BaseCodeAnalyzer,
+                                       MultiLanguageAnalyzerFactory)
+from .workspace_index import EXCLUDED_DIRS, get_workspace_index
+
+# 流式输出时每个批量调用的最大文件数，较小的分块让首批结果更早返回
+STREAM_BATCH_FILES = 16
+
+# 进度回调：(刚完成的文件结果, 已完成文件数, 文件总数)
+ProgressCallback = Callable[[AnalysisResult, int, int], None]
+
+# 扫描时跳过的目录（与其他项目扫描共用）
+DEFAULT_EXCLUDE_DIRS = EXCLUDED_DIRS
+
+
+@dataclass
+class ProjectAnalysisReport:
+    """项目级分析报告"""
+
+    project_path: str
+    files_discovered: int
+    files_analyzed: int
+    files_skipped: int
+    timed_out: bool
+    execution_time: float
+    languages: Dict[str, int]
+    results: List[AnalysisResult] = field(default_factory=list)
+    aggregation: Dict[str, Any] = field(default_factory=dict)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    mode: str = "full"
+    incremental: Dict[str, Any] = field(default_factory=dict)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """获取分析摘要"""
+        total_issues = sum(len(r.issues) for r in self.results)
+        scores = [r.score for r in self.results if r.success]
+        return {
+            "project_path": self.project_path,
+            "files_discovered": self.files_discovered,
+            "files_analyzed": self.files_analyzed,
+            "files_skipped": self.files_skipped,
+            "timed_out": self.timed_out,
+            "execution_time": self.execution_time,
+            "languages": self.languages,
+            "total_issues": total_issues,
+            "average_score": sum(scores) / len(scores) if scores else 0.0,
+            "mode": self.mode,
+        }
+
+
+def issue_to_defect(issue, file_path: str) -> Dict[str, Any]:
+    """将AnalysisIssue转换为DefectAggregator使用的缺陷字典"""
+    return {
+        "file": file_path,
+        "tool": issue.tool_name,
+        "type": issue.issue_type,
+        "severity": issue.severity,
+        "message": issue.message,
+        "line": issue.line,
+        "column": issue.column,
+        "rule_id": issue.rule_id,
+        "category": issue.category,
+        "suggestion": issue.suggestion,
+    }
+
+
+class ProjectDefectEngine:
+    """项目级并行缺陷分析引擎"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        time_budget: float = 300.0,
+        max_files: Optional[int] = None,
+        languages: Optional[List[str]] = None,
+        per_file_timeout: int = 30,
+    ):
+        """
+        Args:
+            max_workers: 并行工作线程数，默认根据CPU数量确定
+            time_budget: 整个项目的墙钟时间预算（秒）
+            max_files: 最多分析的文件数量，None表示不限制
+            languages: 只分析指定语言（如["python", "javascript"]），None表示全部
+            per_file_timeout: 单个文件分析的超时时间（秒）
+        """
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.time_budget = time_budget
+        self.max_files = max_files
+        self.languages = {lang.lower() for lang in languages} if languages else None
+        self.per_file_timeout = per_file_timeout
+
+    def discover_files(self, project_path: Path) -> Dict[str, List[Path]]:
+        """扫描项目源文件并按语言分组"""
+        groups: Dict[str, List[Path]] = {}
+        count = 0
+
+        # 查询共享的工作区索引，遵循排除目录和.gitignore/.fixagentignore
+        for indexed_file in get_workspace_index(project_path).files():
+            file_path = Path(indexed_file.path)
+            language = MultiLanguageAnalyzerFactory.detect_language_from_extension(
+                file_path
+            )
+            if not language:
+                continue
+            if self.languages and language not in self.languages:
+                continue
+
+            groups.setdefault(language, []).append(file_path)
+            count += 1
+            if self.max_files and count >= self.max_files:
+                return groups
+
+        return groups
+
+    def _prepare_analyzers(
+        self, groups: Dict[str, List[Path]], errors: List[Dict[str, str]]
+    ) -> Dict[str, BaseCodeAnalyzer]:
+        """为每种语言创建一个分析器，并在分发任务前完成一次工具可用性检查"""
+        analyzers = {}
+        for language, files in groups.items():
+            analyzer = MultiLanguageAnalyzerFactory.create_analyzer(
+                language, timeout=self.per_file_timeout
+            )
+            if analyzer is None:
+                errors.append({"language": language, "error": "没有可用的分析器"})
+                continue
+
+            # 可用性检查可能会切换降级工具（如pylint -> flake8），需在并发前完成
+            if not analyzer._check_tool_availability():
+                errors.append(
+                    {
+                        "language": language,
+                        "error": f"分析工具 '{analyzer.get_tool_name()}' 不可用",
+                    }
+                )
+                continue
+
+            analyzers[language] = analyzer
+        return analyzers
+
+    def _split_for_workers(
+        self, files: List[Path], max_chunk: int = MAX_BATCH_FILES
+    ) -> List[List[Path]]:
+        """将同一语言的文件分块，每块由分析器一次批量调用完成
+
+        分块数量不少于工作线程数，以便批量调用之间仍能并行。
+        """
+        chunk_size = max(1, min(max_chunk, math.ceil(len(files) / self.max_workers)))
+        return [files[i : i + chunk_size] for i in range(0, len(files), chunk_size)]
+
+    def analyze_project(
+        self, project_path: str, progress: Optional[ProgressCallback] = None
+    ) -> ProjectAnalysisReport:
+        """并行分析整个项目
+
+        Args:
+            project_path: 项目根目录
+            progress: 可选的进度回调，每个文件完成时调用
+        """
+        start_time = time.time()
+        root = Path(project_path).resolve()
+        groups = self.discover_files(root)
+
+        errors: List[Dict[str, str]] = []
+        results, timed_out = self._run_groups(groups, start_time, errors, progress)
+        files_discovered = sum(len(files) for files in groups.values())
+
+        # 完整分析在git仓库中记录快照，作为后续增量分析的基线；
+        # 有文件缺少结果时不记录，否则这些文件在之后的增量分析中会一直缺失
+        truncated = bool(self.max_files) and files_discovered >= self.max_files
+        complete = (
+            not (timed_out or truncated or errors) and len(results) == files_discovered
+        )
+        repo_root = find_git_root(root)
+        if repo_root is not None and complete:
+            save_snapshot(root, get_head_commit(repo_root), results)
+
+        return ProjectAnalysisReport(
+            project_path=str(root),
+            files_discovered=files_discovered,
+            files_analyzed=len(results),
+            files_skipped=files_discovered - len(results),
+            timed_out=timed_out,
+            execution_time=time.time() - start_time,
+            languages={language: len(files) for language, files in groups.items()},
+            results=results,
+            aggregation=self._aggregate(results),
+            errors=errors,
+        )
+
+    def analyze_incremental(
+        self,
+        project_path: str,
+        base_ref: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> ProjectAnalysisReport:
+        """增量分析：只分析相对基准引用变更的文件，并与上次快照合并
+
+        Args:
+            project_path: 项目根目录
+            base_ref: git基准引用，默认使用上次分析快照的提交；
+                没有快照时退化为完整分析（并生成快照）
+            progress: 可选的进度回调，每个文件完成时调用
+        """
+        start_time = time.time()
+        root = Path(project_path).resolve()
+        repo_root = find_git_root(root)
+        if repo_root is None:
+            report = self.analyze_project(project_path, progress)
+            report.errors.append({"error": "项目不在git仓库中，已执行完整分析"})
+            return report
+
+        snapshot = load_snapshot(root)
+        if base_ref is None and not (snapshot and snapshot.get("commit")):
+            report = self.analyze_project(project_path, progress)
+            report.incremental = {"reason": "没有可用的分析快照，已执行完整分析"}
+            return report
+
+        errors: List[Dict[str, str]] = []
+        changes = get_changed_lines(repo_root, base_ref or snapshot["commit"])
+        if changes is None:
+            return self._failed_incremental(root, base_ref, start_time)
+
+        # 显式基准与快照提交不同时，快照之后的变更也需重新分析，否则合并结果会过期
+        stale: Dict[Path, Any] = {}
+        if snapshot and snapshot.get("commit") and base_ref:
+            stale = get_changed_lines(repo_root, snapshot["commit"]) or {}
+
+        groups = self._group_files(root, set(changes) | set(stale))
+        results, timed_out = self._run_groups(groups, start_time, errors, progress)
+        files_discovered = sum(len(files) for files in groups.values())
+        complete = not (timed_out or errors) and len(results) == files_discovered
+
+        # 合并：快照中未变更的文件沿用旧结果，已删除的文件被丢弃；
+        # 变更文件重新分析失败（或没有结果）时保留快照中的旧结果
+        previous = snapshot.get("results", {}) if snapshot else {}
+        merged = []
+        failed_files = []
+        for result in results:
+            if not result.success and result.file_path in previous:
+                failed_files.append(result.file_path)
+            else:
+                merged.append(result)
+        analyzed = {result.file_path for result in merged}
+
+        baseline_files = 0
+        if previous:
+            from .analysis_cache import result_from_dict
+
+            touched = {str(path) for path in set(changes) | set(stale)}
+            grouped = {str(path) for files in groups.values() for path in files}
+            for file_path, data in previous.items():
+                if file_path in analyzed:
+                    continue
+                if file_path in touched and file_path not in grouped:
+                    continue
+                if not Path(file_path).exists():
+                    continue
+                merged.append(result_from_dict(data))
+                baseline_files += 1
+
+        changed_issues = [
+            issue_to_defect(issue, result.file_path)
+            for result in results
+            if Path(result.file_path) in changes
+            for issue in filter_issues_to_ranges(
+                result.issues, changes[Path(result.file_path)]
+            )
+        ]
+
+        # 只有在完整基线上合并、且变更文件都有结果时才能作为新的快照
+        if snapshot and complete:
+            save_snapshot(root, get_head_commit(repo_root), merged)
+
+        return ProjectAnalysisReport(
+            project_path=str(root),
+            files_discovered=files_discovered,
+            files_analyzed=len(results),
+            files_skipped=files_discovered - len(results),
+            timed_out=timed_out,
+            execution_time=time.time() - start_time,
+            languages={language: len(files) for language, files in groups.items()},
+            results=merged,
+            aggregation=self._aggregate(merged),
+            errors=errors,
+            mode="incremental",
+            incremental={
+                "base_ref": base_ref or snapshot["commit"],
+                "changed_files": sorted(str(path) for path in changes),
+                "baseline_files": baseline_files,
+                "failed_files": failed_files,
+                "changed_issues": changed_issues,
+            },
+        )
+
+    def _failed_incremental(
+        self, root: Path, base_ref: Optional[str], start_time: float
+    ) -> ProjectAnalysisReport:
+        return ProjectAnalysisReport(
+            project_path=str(root),
+            files_discovered=0,
+            files_analyzed=0,
+            files_skipped=0,
+            timed_out=False,
+            execution_time=time.time() - start_time,
+            languages={},
+            errors=[{"error": f"无法获取相对 '{base_ref}' 的git变更"}],
+            mode="incremental",
+        )
+
+    def _group_files(self, root: Path, paths: Iterable[Path]) -> Dict[str, List[Path]]:
+        """将指定文件按语言分组，应用与完整扫描相同的排除规则"""
+        groups: Dict[str, List[Path]] = {}
+        index = get_workspace_index(root)
+        for file_path in sorted(paths):
+            try:
+                relative = file_path.relative_to(root)
+            except ValueError:
+                continue
+            if index.is_ignored(relative.as_posix()):
+                continue
+            if not file_path.is_file():
+                continue
+            language = MultiLanguageAnalyzerFactory.detect_language_from_extension(
+                file_path
+            )
+            if not language:
+                continue
+            if self.languages and language not in self.languages:
+                continue
+            groups.setdefault(language, []).append(file_path)
+        return groups
+
+    def iter_results(
+        self,
+        project_path: str,
+        files: Optional[Iterable[str]] = None,
+        errors: Optional[List[Dict[str, str]]] = None,
+    ) -> Iterator[AnalysisResult]:
+        """按完成顺序逐个产出文件分析结果
+
+        首个结果在第一个分块完成后即可获得，不受最慢文件的影响。
+        提前停止迭代时，尚未开始的分析任务会被取消。
+
+        Args:
+            project_path: 项目根目录
+            files: 可选，只分析指定的文件，默认扫描整个项目
+            errors: 可选，用于收集分析过程中的错误信息
+        """
+        root = Path(project_path).resolve()
+        if files is not None:
+            groups = self._group_files(root, {Path(f).resolve() for f in files})
+        else:
+            groups = self.discover_files(root)
+
+        yield from self._iter_groups(
+            groups,
+            time.time() + self.time_budget,
+            errors if errors is not None else [],
+            {"timed_out": False},
+            STREAM_BATCH_FILES,
+        )
+
+    async def aiter_results(
+        self, project_path: str, files: Optional[Iterable[str]] = None
+    ) -> AsyncIterator[AnalysisResult]:
+        """iter_results的异步版本，分析在线程中进行，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        iterator = self.iter_results(project_path, files)
+        done = object()
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, iterator, done)
+                if result is done:
+                    break
+                yield result
+        finally:
+            iterator.close()
+
+    def _run_groups(
+        self,
+        groups: Dict[str, List[Path]],
+        start_time: float,
+        errors: List[Dict[str, str]],
+        progress: Optional[ProgressCallback] = None,
+    ):
+        """在线程池中分析分组后的文件，返回(结果列表, 是否超时)"""
+        state = {"timed_out": False}
+        total = sum(len(files) for files in groups.values())
+        # 需要上报进度时使用较小的分块，让进度更平滑
+        max_chunk = STREAM_BATCH_FILES if progress else MAX_BATCH_FILES
+
+        results: List[AnalysisResult] = []
+        for result in self._iter_groups(
+            groups, start_time + self.time_budget, errors, state, max_chunk
+        ):
+            results.append(result)
+            if progress:
+                try:
+                    progress(result, len(results), total)
+                except Exception:
+                    pass  # 进度上报失败不影响分析
+        return results, state["timed_out"]
+
+    def _iter_groups(
+        self,
+        groups: Dict[str, List[Path]],
+        deadline: float,
+        errors: List[Dict[str, str]],
+        state: Dict[str, bool],
+        max_chunk: int = MAX_BATCH_FILES,
+    ) -> Iterator[AnalysisResult]:
+        """在线程池中分析分组后的文件，按分块完成顺序产出结果
+
+        超出时间预算时在state中标记timed_out并停止。
+        """
+        analyzers = self._prepare_analyzers(groups, errors)
+
+        tasks = [
+            (analyzers[language], chunk)
+            for language, files in groups.items()
+            if language in analyzers
+            for chunk in self._split_for_workers(files, max_chunk)
+        ]
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        finished = False
+        try:
+            pending = {
+                executor.submit(analyzer.analyze_many, chunk)
+                for analyzer, chunk in tasks
+            }
+
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    state["timed_out"] = True
+                    break
+
+                done, pending = wait(
+                    pending, timeout=remaining, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        errors.append({"error": f"分析任务失败: {e}"})
+                        continue
+                    yield from chunk_results
+            finished = not state["timed_out"]
+        finally:
+            # 超出预算或提前停止迭代时取消未开始的任务，不等待正在运行的任务
+            executor.shutdown(wait=finished, cancel_futures=True)
+
+    def _aggregate(self, results: List[AnalysisResult]) -> Dict[str, Any]:
+        """将所有文件的缺陷进行一次聚合"""
+        # 使用列存储，聚合器按行视图读取，不为每条缺陷创建字典；
+        # 与analysis_api.aggregate一致，只完整输出优先级最高的聚类，其余给出简要信息
+        return DefectAggregator().aggregate_defects(
+            IssueTable.from_results(results),
+            top_n=MAX_RENDERED_CLUSTERS,
+            include_remaining=True,
+        )
+
+
+def _stream_progress_writer() -> Optional[ProgressCallback]:
+    """在langgraph运行环境中，将每个文件的完成情况写入custom流"""
+    try:
+        from langgraph.config import get_stream_writer
+
+        writer = get_stream_writer()
+    except Exception:
+        return None  # 不在图执行上下文中（如直接调用工具）
+
+    def report(result: AnalysisResult, completed: int, total: int) -> None:
+        writer(
+            {
+                "type": "analysis_progress",
+                "file": result.file_path,
+                "completed": completed,
+                "total": total,
+                "issues": len(result.issues),
+                "success": result.success,
+            }
+        )
+
+    return report
+
+
+@tool(
+    description="项目级代码缺陷分析工具。扫描整个项目的源文件，按语言分组后在并行工作池中运行静态分析工具（pylint、eslint、clang等），并对所有缺陷进行统一的去重、聚类和优先级排序。适合一次性分析整个仓库，替代逐文件调用analyze_code_defects。设置incremental=True时只分析git变更的文件，并与上次分析结果合并。"
+)
+def analyze_project_defects(
+    project_path: str,
+    languages: Optional[str] = None,
+    max_workers: int = 4,
+    time_budget: float = 300.0,
+    max_files: int = 2000,
+    incremental: bool = False,
+    base_ref: Optional[str] = None,
+) -> str:
+    """
+    项目级代码缺陷分析，提供给agent使用的批量分析工具。
+
+    Args:
+        project_path: 项目根目录路径
+        languages: 可选，逗号分隔的语言列表（如"python,javascript"），默认分析全部语言
+        max_workers: 并行工作线程数，默认4
+        time_budget: 整个项目的分析时间预算（秒），默认300秒，超时后返回已完成部分
+        max_files: 最多分析的文件数量，默认2000
+        incremental: 是否只分析git变更的文件（与上次分析快照合并出完整结果）
+        base_ref: 增量模式的git基准引用（如"main"、"HEAD~3"），默认使用上次分析的提交
+
+    Returns:
+        分析结果的JSON字符串，包含：
+            - success: 分析是否成功
+            - summary: 项目级摘要（文件数、语言分布、问题总数、是否超时等）
+            - files: 每个文件的分析摘要
+            - aggregation: 全项目缺陷聚合结果
+            - errors: 分析过程中的错误信息
+            - incremental: 增量模式下的变更文件和变更行范围内的问题
+    """
+    try:
+        root = Path(project_path)
+        if not root.exists():
+            return json.dumps(
+                {"success": False, "error": f"项目路径不存在: {project_path}"},
+                indent=2,
+                ensure_ascii=False,
+            )
+
+        language_list = (
+            [lang.strip() for lang in languages.split(",") if lang.strip()]
+            if languages
+            else None
+        )
+        engine = ProjectDefectEngine(
+            max_workers=max_workers,
+            time_budget=time_budget,
+            max_files=max_files,
+            languages=language_list,
+        )
+        progress = _stream_progress_writer()
+        if incremental or base_ref:
+            report = engine.analyze_incremental(project_path, base_ref, progress)
+        else:
+            report = engine.analyze_project(project_path, progress)
+
+        return json.dumps(
+            {
+                "success": True,
+                "summary": report.get_summary(),
+                "files": [result.get_summary() for result in report.results],
+                "aggregation": report.aggregation,
+                "errors": report.errors,
+                "incremental": report.incremental,
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+
+    except Exception as e:
+        return json.dumps(
+            {
+                "success": False,
+                "error": f"项目缺陷分析失败: {str(e)}",
+                "project_path": project_path,
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
@@ -5,9 +5,11 @@
 为缺陷检测代理提供全面的项目上下文信息。
 """
 
+import heapq
+import itertools
 import json
-import os
 import subprocess
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -16,6 +18,23 @@ from typing import Any, Dict, List, Optional, Set, Tuple
 
 from langchain_core.tools import tool
 
+from .complexity_analyzer import (COGNITIVE_THRESHOLD, CYCLOMATIC_THRESHOLD,
+                                  LARGE_FILE_LINES, MAX_SOURCE_BYTES,
+                                  SUPPORTED_EXTENSIONS, analyze_files)
+from .workspace_index import (LANGUAGE_INDICATORS, DirectoryRollup,
+                              IndexedFile, WorkspaceIndex, categorize_file,
+                              detect_language, get_workspace_index)
+
+# 摘要模式下每个目录最多展开的子目录数，以及整棵树的节点上限
+SUMMARY_MAX_CHILDREN = 20
+SUMMARY_MAX_NODES = 200
+
+# 摘要模式下每个目录列出的主要语言数量，其余合并为other
+SUMMARY_TOP_LANGUAGES = 5
+
+# 摘要模式下用于识别项目类型和技术栈的文件样本上限
+DETECTION_SAMPLE_LIMIT = 2000
+
 
 class ProjectType(Enum):
     """项目类型"""
@@ -91,44 +110,38 @@ class ProjectAnalysis:
     analysis_timestamp: str
 
 
+@dataclass
+class DirectorySummary:
+    """目录子树的汇总（摘要模式）"""
+
+    path: str
+    files: int = 0
+    size: int = 0
+    directories: int = 0
+    # 直接位于该目录中的文件数
+    direct_files: int = 0
+    newest_mtime: float = 0.0
+    languages: Dict[str, int] = field(default_factory=dict)
+    children: Dict[str, "DirectorySummary"] = field(default_factory=dict)
+
+    @classmethod
+    def from_rollup(cls, rollup: DirectoryRollup) -> "DirectorySummary":
+        return cls(
+            path=rollup.relative_path,
+            files=rollup.file_count,
+            size=rollup.total_size,
+            directories=rollup.directory_count,
+            direct_files=rollup.direct_file_count,
+            newest_mtime=rollup.newest_mtime,
+            languages=rollup.languages,
+        )
+
+
 class ProjectExplorer:
     """项目结构探索器"""
 
     def __init__(self):
-        self.language_indicators = {
-            "python": [
-                ".py",
-                ".pyi",
-                "Pipfile",
-                "pyproject.toml",
-                "requirements.txt",
-                "setup.py",
-            ],
-            "javascript": [
-                ".js",
-                ".jsx",
-                ".mjs",
-                ".cjs",
-                "package.json",
-                "package-lock.json",
-            ],
-            "typescript": [".ts", ".tsx", "tsconfig.json"],
-            "java": [".java", ".jar", "pom.xml", "build.gradle", "gradlew"],
-            "cpp": [
-                ".cpp",
-                ".cc",
-                ".cxx",
-                ".c++",
-                ".c",
-                ".h",
-                ".hpp",
-                ".hxx",
-                "CMakeLists.txt",
-                "Makefile",
-            ],
-            "go": [".go", "go.mod", "go.sum"],
-            "rust": [".rs", "Cargo.toml", "Cargo.lock"],
-        }
+        self.language_indicators = LANGUAGE_INDICATORS
 
         self.framework_patterns = {
             "django": ["django", "wsgi.py", "settings.py", "urls.py", "manage.py"],
@@ -141,6 +154,28 @@ class ProjectExplorer:
             "angular": ["angular", "app.module.ts", "components/", "services/"],
         }
 
+        # 识别项目类型、技术栈和依赖时按文件名查找的文件（小写）
+        self.marker_names = {
+            "setup.py",
+            "pyproject.toml",
+            "requirements.txt",
+            "pipfile",
+            "package.json",
+            "pom.xml",
+            "build.gradle",
+            "gradlew",
+            "cmakelists.txt",
+            "makefile",
+            "go.mod",
+            "cargo.toml",
+            "main.py",
+        } | {
+            pattern.lower()
+            for patterns in self.framework_patterns.values()
+            for pattern in patterns
+            if "." in pattern and "/" not in pattern
+        }
+
     def analyze_project(self, project_path: str) -> ProjectAnalysis:
         """全面分析项目结构"""
         try:
@@ -170,7 +205,12 @@ class ProjectExplorer:
             dependencies = self._analyze_dependencies(files, directories, project_type)
 
             # 计算项目指标
-            metrics = self._calculate_metrics(files, directories, technologies)
+            metrics = self._calculate_metrics(
+                files,
+                directories,
+                technologies,
+                rollup=get_workspace_index(project_path).rollup(),
+            )
 
             # 生成建议
             recommendations = self._generate_recommendations(
@@ -207,178 +247,237 @@ class ProjectExplorer:
                 analysis_timestamp=datetime.now().isoformat(),
             )
 
-    def _scan_files(self, project_path: Path) -> List[ProjectFile]:
-        """扫描项目文件"""
-        files = []
-        exclude_patterns = {
-            ".git",
-            ".svn",
-            ".hg",
-            "__pycache__",
-            "node_modules",
-            ".venv",
-            "venv",
-            "target",
-            "build",
-            "dist",
-            ".pytest_cache",
-            ".mypy_cache",
+    def summarize_project(
+        self,
+        project_path: str,
+        cursor: str = "",
+        depth: int = 2,
+        max_files: int = 1000,
+    ) -> Dict[str, Any]:
+        """流式汇总项目结构（摘要模式，用于大型仓库）
+
+        目录的文件数、大小和语言分布读取索引的目录汇总树，不为每个文件创建
+        ProjectFile；返回以cursor为根、展开depth层的目录树，每个目录带有继续展开用
+        的cursor，并列出cursor目录中最多max_files个文件。项目类型、技术栈和度量只在
+        根目录（cursor为空）时计算，识别所用的文件样本有上限。
+        """
+        project_root = Path(project_path).resolve()
+        if not project_root.is_dir():
+            raise FileNotFoundError(f"项目路径不存在: {project_root}")
+        index = get_workspace_index(project_root)
+        cursor = cursor.strip("/")
+        tree, rollup = self._build_directory_tree(index, cursor, max(depth, 0))
+        listed = itertools.islice(index.files(under=cursor, recursive=False), max_files)
+        files = [_file_to_dict(self._to_project_file(f)) for f in listed]
+
+        result: Dict[str, Any] = {
+            "mode": "summary",
+            "project_path": str(project_root),
+            "cursor": cursor,
         }
+        technologies: List[Technology] = []
+        if not cursor:
+            sample = self._sample_files(index)
+            # 目录名只用于模式匹配，取前三层即可
+            directories = [d for d in index.directories() if d.count("/") < 3]
+            project_type = self._identify_project_type(sample, directories)
+            architecture = self._identify_architecture_pattern(
+                sample, directories, project_type
+            )
+            technologies = self._identify_technologies(sample, directories)
+            metrics = self._rollup_metrics(rollup, technologies)
+            source_languages = rollup.source_languages
+            result.update(
+                {
+                    "project_type": project_type.value,
+                    "architecture_pattern": architecture.value,
+                    "primary_language": (
+                        max(source_languages, key=source_languages.get)
+                        if source_languages
+                        else "unknown"
+                    ),
+                    "technologies": [_technology_to_dict(t) for t in technologies],
+                    "dependencies": self._analyze_dependencies(
+                        sample, directories, project_type
+                    ),
+                    "metrics": metrics,
+                    "recommendations": (
+                        self._generate_recommendations(
+                            project_type, architecture, metrics
+                        )
+                        if tree.files
+                        else []
+                    ),
+                }
+            )
 
-        for root, dirs, filenames in os.walk(project_path):
-            # 过滤目录
-            dirs[:] = [d for d in dirs if d not in exclude_patterns]
-
-            for filename in filenames:
-                file_path = Path(root) / filename
-                relative_path = file_path.relative_to(project_path)
-
-                try:
-                    stat_info = file_path.stat()
-                    language = self._detect_file_language(file_path)
-                    category = self._categorize_file(relative_path, language)
-
-                    project_file = ProjectFile(
-                        path=str(file_path),
-                        relative_path=str(relative_path),
-                        name=filename,
-                        extension=file_path.suffix.lower(),
-                        size=stat_info.st_size,
-                        language=language,
-                        category=category,
-                        is_source=category in ["source", "test"],
-                        is_test=category == "test",
-                        is_config=category == "config",
-                        is_doc=category == "documentation",
-                        last_modified=datetime.fromtimestamp(
-                            stat_info.st_mtime
-                        ).isoformat(),
-                    )
-                    files.append(project_file)
-
-                except OSError:
+        result.update(
+            {
+                "tree": self._tree_to_dict(tree),
+                "files": files,
+                "analysis_timestamp": datetime.now().isoformat(),
+                "summary": {
+                    "total_files": tree.files,
+                    "total_directories": tree.directories,
+                    "files_listed": len(files),
+                    "files_in_directory": tree.direct_files,
+                    "technologies_detected": len(technologies),
+                },
+            }
+        )
+        return result
+
+    def _build_directory_tree(
+        self, index: WorkspaceIndex, cursor: str, depth: int
+    ) -> Tuple[DirectorySummary, DirectoryRollup]:
+        """由索引的目录汇总树构建以cursor为根、展开depth层的目录树
+
+        每个节点直接读取子树的汇总，耗时只与展开的节点数有关，与子树中的文件数无关。
+
+        Returns:
+            (目录树, cursor目录的子树汇总)
+        """
+        rollup = index.rollup(cursor)
+        if rollup is None:
+            raise FileNotFoundError(f"目录不存在或已被忽略: {cursor}")
+        root = DirectorySummary.from_rollup(rollup)
+        level = [root]
+        for _ in range(depth):
+            next_level = []
+            for node in level:
+                for child in index.rollup_children(node.path):
+                    summary = DirectorySummary.from_rollup(child)
+                    node.children[child.relative_path.rpartition("/")[2]] = summary
+                    next_level.append(summary)
+            level = next_level
+        return root, rollup
+
+    def _tree_to_dict(self, root: DirectorySummary) -> Dict[str, Any]:
+        """把目录树转换为字典，按广度优先展开，大的子目录优先占用节点预算"""
+        budget = SUMMARY_MAX_NODES
+        root_dict = _directory_to_dict(root)
+        queue = deque([(root, root_dict)])
+        while queue:
+            node, node_dict = queue.popleft()
+            children = sorted(
+                node.children.values(), key=lambda c: (c.size, c.files), reverse=True
+            )
+            shown = children[: max(0, min(SUMMARY_MAX_CHILDREN, budget))]
+            budget -= len(shown)
+            node_dict["children"] = []
+            for child in shown:
+                child_dict = _directory_to_dict(child)
+                node_dict["children"].append(child_dict)
+                queue.append((child, child_dict))
+
+            hidden = children[len(shown) :]
+            if hidden:
+                node_dict["more_directories"] = {
+                    "count": len(hidden),
+                    "files": sum(c.files for c in hidden),
+                    "size_bytes": sum(c.size for c in hidden),
+                }
+        return root_dict
+
+    def _sample_files(self, index: WorkspaceIndex) -> List[ProjectFile]:
+        """流式选取识别项目类型和技术栈所需的文件样本
+
+        包括每种标志文件名的第一个文件、每种扩展名的第一个文件和前两层目录中的文件，
+        只比较文件名，选中的文件才从索引读取完整信息，样本达到上限时停止遍历。
+        """
+        selected: List[str] = []
+        seen_names: Set[str] = set()
+        seen_extensions: Set[str] = set()
+        shallow_budget = DETECTION_SAMPLE_LIMIT // 2
+        for relative, names in index.file_names():
+            shallow = relative.count("/") < 1
+            for name in names:
+                lower = name.lower()
+                extension = lower.rpartition(".")[2] if "." in lower else ""
+                if (lower in self.marker_names or "dockerfile" in lower) and (
+                    lower not in seen_names
+                ):
+                    seen_names.add(lower)
+                elif extension not in seen_extensions:
+                    pass
+                elif shallow and shallow_budget > 0:
+                    shallow_budget -= 1
+                else:
                     continue
+                seen_extensions.add(extension)
+                selected.append(f"{relative}/{name}" if relative else name)
+                if len(selected) >= DETECTION_SAMPLE_LIMIT:
+                    break
+            else:
+                continue
+            break
 
-        return files
+        sample = []
+        for relative_path in selected:
+            indexed = index.get(relative_path)
+            if indexed is not None:
+                sample.append(self._to_project_file(indexed))
+        return sample
 
-    def _get_directories(self, project_path: Path) -> List[str]:
-        """获取目录列表"""
-        directories = []
-        exclude_patterns = {
-            ".git",
-            ".svn",
-            ".hg",
-            "__pycache__",
-            "node_modules",
-            ".venv",
-            "venv",
-            "target",
-            "build",
-            "dist",
-            ".pytest_cache",
+    def _rollup_metrics(
+        self, rollup: DirectoryRollup, technologies: List[Technology]
+    ) -> Dict[str, Any]:
+        """由目录子树汇总计算项目指标（与_calculate_metrics的字段一致）"""
+        categories = rollup.categories
+        test_files = categories.get("test", 0)
+        source_files = categories.get("source", 0) + test_files
+        total_files = rollup.file_count
+        return {
+            "total_files": total_files,
+            "source_files": source_files,
+            "test_files": test_files,
+            "config_files": categories.get("config", 0),
+            "doc_files": categories.get("documentation", 0),
+            "total_directories": rollup.directory_count,
+            "total_size_bytes": rollup.total_size,
+            "average_file_size_bytes": (
+                rollup.total_size / total_files if total_files else 0
+            ),
+            "language_distribution": rollup.source_languages,
+            "test_coverage": test_files / source_files if source_files > 0 else 0,
+            "technologies_count": len(technologies),
+            "categories_count": len(set(t.category for t in technologies)),
         }
 
-        for root, dirs, _ in os.walk(project_path):
-            for d in dirs:
-                if d not in exclude_patterns:
-                    rel_path = Path(root) / d
-                    directories.append(str(rel_path.relative_to(project_path)))
+    def _to_project_file(self, f: IndexedFile) -> ProjectFile:
+        return ProjectFile(
+            path=f.path,
+            relative_path=f.relative_path,
+            name=f.name,
+            extension=f.extension,
+            size=f.size,
+            language=f.language,
+            category=f.category,
+            is_source=f.category in ["source", "test"],
+            is_test=f.category == "test",
+            is_config=f.category == "config",
+            is_doc=f.category == "documentation",
+            last_modified=f.last_modified,
+        )
+
+    def _scan_files(self, project_path: Path) -> List[ProjectFile]:
+        """扫描项目文件（查询共享的工作区索引）"""
+        return [
+            self._to_project_file(f)
+            for f in get_workspace_index(project_path).files()
+        ]
 
-        return sorted(set(directories))
+    def _get_directories(self, project_path: Path) -> List[str]:
+        """获取目录列表"""
+        return get_workspace_index(project_path).directories()
 
     def _detect_file_language(self, file_path: Path) -> str:
         """检测文件语言"""
-        ext = file_path.suffix.lower()
-
-        # 根据扩展名检测
-        for language, extensions in self.language_indicators.items():
-            if ext in extensions:
-                return language
-
-        # 根据文件名检测
-        name = file_path.name.lower()
-        if name in ["makefile", "cmakelists.txt"]:
-            return "build"
-        elif name in ["dockerfile", ".dockerignore"]:
-            return "containerization"
-        elif name.endswith((".yml", ".yaml")):
-            return "configuration"
-        elif name.endswith((".json", ".toml", ".ini", ".cfg")):
-            return "configuration"
-        elif name.endswith((".md", ".rst", ".txt")):
-            return "documentation"
-
-        return "unknown"
+        return detect_language(file_path.name)
 
     def _categorize_file(self, relative_path: Path, language: str) -> str:
         """文件分类"""
-        path_parts = str(relative_path).lower().split("/")
-        filename = relative_path.name.lower()
-
-        # 测试文件
-        if (
-            any("test" in part for part in path_parts)
-            or filename.startswith("test_")
-            or filename.endswith("_test")
-            or filename.endswith(".test")
-            or "tests/" in str(relative_path)
-        ):
-            return "test"
-
-        # 源代码文件
-        if language in [
-            "python",
-            "javascript",
-            "typescript",
-            "java",
-            "cpp",
-            "go",
-            "rust",
-        ]:
-            if any(folder in path_parts for folder in ["src", "lib", "app", "modules"]):
-                return "source"
-
-        # 配置文件
-        if (
-            language == "configuration"
-            or filename
-            in [
-                "package.json",
-                "requirements.txt",
-                "setup.py",
-                "pyproject.toml",
-                "pom.xml",
-                "build.gradle",
-            ]
-            or any(
-                folder in path_parts
-                for folder in ["config", "settings", ".vscode", ".idea"]
-            )
-        ):
-            return "config"
-
-        # 文档文件
-        if (
-            language == "documentation"
-            or filename.endswith((".md", ".rst", ".txt", ".adoc"))
-            or any(folder in path_parts for folder in ["docs", "doc", "documentation"])
-        ):
-            return "documentation"
-
-        # 构建文件
-        if any(
-            folder in path_parts for folder in ["build", "target", "dist", "out"]
-        ) or filename in ["makefile", "cmakelists.txt"]:
-            return "build"
-
-        # 资源文件
-        if any(
-            folder in path_parts
-            for folder in ["assets", "static", "resources", "public"]
-        ):
-            return "assets"
-
-        return "other"
+        return categorize_file(relative_path.as_posix(), language)
 
     def _identify_project_type(
         self, files: List[ProjectFile], directories: List[str]
@@ -771,8 +870,12 @@ class ProjectExplorer:
         files: List[ProjectFile],
         directories: List[str],
         technologies: List[Technology],
+        rollup: Optional[DirectoryRollup] = None,
     ) -> Dict[str, Any]:
-        """计算项目指标"""
+        """计算项目指标，提供目录汇总时直接读取汇总，不再逐个统计文件"""
+        if rollup is not None:
+            return self._rollup_metrics(rollup, technologies)
+
         total_files = len(files)
         source_files = len([f for f in files if f.is_source])
         test_files = len([f for f in files if f.is_test])
@@ -842,11 +945,63 @@ class ProjectExplorer:
         return recommendations
 
 
+def _file_to_dict(f: ProjectFile) -> Dict[str, Any]:
+    return {
+        "relative_path": f.relative_path,
+        "name": f.name,
+        "extension": f.extension,
+        "size": f.size,
+        "language": f.language,
+        "category": f.category,
+        "is_source": f.is_source,
+        "is_test": f.is_test,
+        "is_config": f.is_config,
+        "is_doc": f.is_doc,
+    }
+
+
+def _technology_to_dict(tech: Technology) -> Dict[str, Any]:
+    return {
+        "name": tech.name,
+        "category": tech.category,
+        "version": tech.version,
+        "confidence": tech.confidence,
+        "evidence": tech.evidence,
+    }
+
+
+def _directory_to_dict(node: DirectorySummary) -> Dict[str, Any]:
+    languages = sorted(node.languages.items(), key=lambda item: item[1], reverse=True)
+    language_mix = dict(languages[:SUMMARY_TOP_LANGUAGES])
+    other = sum(count for _, count in languages[SUMMARY_TOP_LANGUAGES:])
+    if other:
+        language_mix["other"] = other
+    return {
+        "path": node.path or ".",
+        "cursor": node.path,
+        "files": node.files,
+        "size_bytes": node.size,
+        "directories": node.directories,
+        "languages": language_mix,
+        "last_modified": (
+            datetime.fromtimestamp(node.newest_mtime).isoformat()
+            if node.newest_mtime
+            else None
+        ),
+    }
+
+
 # 创建工具函数
 @tool(
-    description="深度分析项目结构，识别技术栈、架构模式和依赖关系。智能扫描项目文件，检测项目类型、编程语言、框架依赖和架构模式，为代码分析和重构提供全面的项目上下文信息。"
+    description="深度分析项目结构，识别技术栈、架构模式和依赖关系。智能扫描项目文件，检测项目类型、编程语言、框架依赖和架构模式，为代码分析和重构提供全面的项目上下文信息。大型仓库返回按目录汇总的目录树，可通过cursor逐层展开。"
 )
-def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
+def explore_project_structure(
+    project_path: str,
+    max_files: int = 1000,
+    cursor: str = "",
+    depth: int = 2,
+    summary: Optional[bool] = None,
+) -> str:
     """
     探索项目结构，提供给agent使用的项目结构分析工具。
 
@@ -856,27 +1011,40 @@ def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
     - 深度扫描文件结构，分类源码、测试、配置和文档文件
     - 分析项目度量和统计信息，提供量化评估
     - 生成项目优化建议和技术栈升级指导
+    - 大型仓库自动切换为摘要模式：按目录汇总文件数、大小和语言分布，返回可逐层
+      展开的目录树，而不是逐个列出全部文件
 
     Args:
         project_path: 项目根目录路径，支持相对路径和绝对路径
-        max_files: 最大分析文件数量，默认1000，用于控制分析规模避免内存占用
+        max_files: 最大列出文件数量，默认1000；项目文件数超过该值时使用摘要模式
+        cursor: 摘要模式下要展开的目录（相对项目根目录），取自上一次结果中目录树
+            节点的cursor字段，默认为项目根目录
+        depth: 摘要模式下目录树展开的层数，默认2
+        summary: 是否使用摘要模式，默认根据项目规模和cursor自动选择
 
     Returns:
         项目分析结果的JSON字符串，包含：
-            - success: 分析是否成功
+            - mode: full（完整模式）或summary（摘要模式）
             - project_path: 项目根目录路径
             - project_type: 项目类型枚举值（python_package、react_app等）
             - architecture_pattern: 架构模式（monolith、microservice、library等）
             - primary_language: 主要编程语言
             - technologies: 技术栈列表，包含名称、类别、版本、置信度和证据
             - files: 文件详细信息列表，包含路径、语言、分类、大小等
-            - directories: 目录结构列表
+              （摘要模式下只列出cursor目录中直接包含的文件）
+            - directories: 目录结构列表（完整模式）
+            - tree: 目录树（摘要模式），每个节点包含path、cursor、files、size_bytes、
+              directories、languages、last_modified和children，超出节点预算的子目录
+              汇总在more_directories中
             - dependencies: 依赖关系分析结果
             - metrics: 项目度量指标（文件数、代码行数、复杂度等）
             - recommendations: 项目优化建议列表
             - analysis_timestamp: 分析执行时间戳
             - summary: 分析摘要信息（总文件数、目录数、技术栈数量等）
 
+        摘要模式下project_type、technologies、dependencies、metrics和recommendations
+        只在项目根目录（cursor为空）时返回。
+
     使用场景：
         - 项目架构分析和重构规划
         - 技术栈识别和依赖管理
@@ -884,6 +1052,7 @@ def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
         - 新团队成员项目快速理解
         - 技术债务评估和清理计划
         - 项目迁移和升级决策支持
+        - 大型单体仓库的逐层浏览
 
     工具优势：
         - 深度分析项目结构和架构模式，超越表面文件扫描
@@ -891,15 +1060,27 @@ def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
         - 提供详细的项目元数据和量化度量指标
         - 支持多种编程语言和主流项目类型
         - 生成实用的优化建议和最佳实践指导
+        - 摘要模式的内存占用和返回内容大小与仓库文件总数无关
 
     注意事项：
-        - 大型项目分析可能需要较长时间，建议适当调整max_files参数
+        - 大型项目先查看根目录摘要，再通过cursor展开感兴趣的目录
         - 某些复杂的项目结构可能需要人工审核和补充分析
         - 隐藏文件和临时目录会被自动过滤
         - 分析结果基于文件模式匹配，可能存在误识别情况
     """
     try:
         explorer = ProjectExplorer()
+        if summary is None:
+            summary = bool(cursor) or (
+                Path(project_path).is_dir()
+                and len(get_workspace_index(project_path)) > max_files
+            )
+        if summary:
+            result_data = explorer.summarize_project(
+                project_path, cursor=cursor, depth=depth, max_files=max_files
+            )
+            return json.dumps(result_data, indent=2, ensure_ascii=False)
+
         analysis = explorer.analyze_project(project_path)
 
         # 限制返回的文件数量
@@ -907,35 +1088,13 @@ def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
 
         # 转换为JSON格式
         result_data = {
+            "mode": "full",
             "project_path": analysis.project_path,
             "project_type": analysis.project_type.value,
             "architecture_pattern": analysis.architecture_pattern.value,
             "primary_language": analysis.primary_language,
-            "technologies": [
-                {
-                    "name": tech.name,
-                    "category": tech.category,
-                    "version": tech.version,
-                    "confidence": tech.confidence,
-                    "evidence": tech.evidence,
-                }
-                for tech in analysis.technologies
-            ],
-            "files": [
-                {
-                    "relative_path": f.relative_path,
-                    "name": f.name,
-                    "extension": f.extension,
-                    "size": f.size,
-                    "language": f.language,
-                    "category": f.category,
-                    "is_source": f.is_source,
-                    "is_test": f.is_test,
-                    "is_config": f.is_config,
-                    "is_doc": f.is_doc,
-                }
-                for f in limited_files
-            ],
+            "technologies": [_technology_to_dict(t) for t in analysis.technologies],
+            "files": [_file_to_dict(f) for f in limited_files],
             "directories": analysis.directories[:50],  # 限制目录数量
             "dependencies": analysis.dependencies,
             "metrics": analysis.metrics,
@@ -963,22 +1122,91 @@ def explore_project_structure(project_path: str, max_files: int = 1000) -> str:
 
 
 @tool(
-    description="分析代码复杂度，识别潜在问题和改进点。智能扫描项目源代码，计算圈复杂度、函数和类统计，识别复杂文件并提供重构建议，帮助改善代码质量和可维护性。"
+    description="查询目录子树的汇总信息：文件数、目录数、总大小、最新修改时间，以及按语言和文件分类的文件数。读取工作区索引中预先汇总的目录树，不逐个扫描文件，适合在大型仓库中快速了解某个目录有多大、包含哪些语言，并逐层展开子目录。"
+)
+def summarize_directory_tree(
+    project_path: str, path: str = "", depth: int = 1
+) -> str:
+    """
+    查询目录子树的汇总，提供给agent使用的目录浏览工具。
+
+    此工具读取工作区索引维护的目录汇总树：
+    - 每个目录保存整棵子树的文件数、目录数、总大小和最新修改时间
+    - 按语言和文件分类（源码、测试、配置、文档等）统计文件数
+    - 文件变化只更新所在目录及其上级的汇总，查询只读取对应节点，
+      耗时与子树中的文件数无关
+
+    Args:
+        project_path: 项目根目录路径
+        path: 要查询的目录（相对项目根目录），默认为项目根目录
+        depth: 同时展开的子目录层数，默认1，0表示只返回该目录本身
+
+    Returns:
+        JSON字符串，包含：
+            - success: 是否成功
+            - project_path: 项目根目录路径
+            - path: 查询的目录
+            - categories: 子树中按文件分类的文件数
+            - source_languages: 子树中源码和测试文件的语言分布
+            - tree: 目录树，每个节点包含path、cursor、files、size_bytes、directories、
+              languages、last_modified和children，超出节点预算的子目录汇总在
+              more_directories中；节点的cursor可作为path继续查询
+
+    使用场景：
+        - 判断某个目录的规模和主要语言，决定是否深入分析
+        - 在大型单体仓库中逐层定位源码、测试和配置所在的目录
+    """
+    try:
+        project_root = Path(project_path).resolve()
+        if not project_root.is_dir():
+            raise FileNotFoundError(f"项目路径不存在: {project_root}")
+        relative = path.strip("/")
+        tree, rollup = ProjectExplorer()._build_directory_tree(
+            get_workspace_index(project_root), relative, max(depth, 0)
+        )
+        result_data = {
+            "success": True,
+            "project_path": str(project_root),
+            "path": relative or ".",
+            "categories": rollup.categories,
+            "source_languages": rollup.source_languages,
+            "tree": ProjectExplorer()._tree_to_dict(tree),
+        }
+        return json.dumps(result_data, indent=2, ensure_ascii=False)
+
+    except Exception as e:
+        return json.dumps(
+            {
+                "success": False,
+                "error": f"目录汇总查询失败: {str(e)}",
+                "project_path": project_path,
+                "path": path,
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
+
+
+@tool(
+    description="分析代码复杂度，识别潜在问题和改进点。基于语法树和词法分析计算整个项目每个函数的圈复杂度和认知复杂度，统计函数和类，识别复杂函数与复杂文件并提供重构建议，帮助改善代码质量和可维护性。"
 )
-def analyze_code_complexity(project_path: str, min_lines: int = 10) -> str:
+def analyze_code_complexity(
+    project_path: str, min_lines: int = 10, max_results: int = 50
+) -> str:
     """
     分析代码复杂度，提供给agent使用的代码复杂度分析工具。
 
     此工具提供全面的代码复杂度分析功能：
-    - 智能识别和分析多种编程语言的源代码文件
-    - 计算圈复杂度指标，识别代码逻辑复杂程度
+    - 分析整个项目的源代码文件（也可以只分析单个文件），不限制文件数量
+    - Python基于语法树、其他语言基于词法单元，计算每个函数的圈复杂度和认知复杂度
     - 统计函数和类的数量，评估代码结构合理性
-    - 识别复杂文件，提供具体的重构建议和优化方向
+    - 识别复杂函数和复杂文件，提供具体的重构建议和优化方向
     - 生成项目整体复杂度评估和改进指导
 
     Args:
-        project_path: 项目根目录路径，支持相对路径和绝对路径
+        project_path: 项目根目录或单个源文件路径，支持相对路径和绝对路径
         min_lines: 最小分析行数，默认10行，过滤过小文件避免噪声
+        max_results: 复杂文件和复杂函数列表的最大长度，默认50
 
     Returns:
         复杂度分析结果的JSON字符串，包含：
@@ -987,13 +1215,21 @@ def analyze_code_complexity(project_path: str, min_lines: int = 10) -> str:
             - total_lines: 总代码行数统计
             - functions_found: 发现的函数总数
             - classes_found: 发现的类总数
-            - complex_files: 复杂文件列表，每个文件包含：
+            - average_complexity: 函数的平均圈复杂度
+            - complex_files_total: 复杂文件总数
+            - complex_files: 最复杂的文件列表（按认知复杂度排序），每个文件包含：
                 - file: 相对文件路径
                 - lines: 文件行数
                 - functions: 文件内函数数量
                 - classes: 文件内类数量
-                - complexity_score: 复杂度得分
-                - avg_complexity: 平均复杂度
+                - complexity_score: 文件圈复杂度合计
+                - avg_complexity: 文件内函数的平均圈复杂度
+                - max_complexity: 文件内函数的最大圈复杂度
+                - cognitive_complexity: 文件内函数的最大认知复杂度
+            - complex_functions_total: 超过复杂度阈值的函数总数
+            - complex_functions: 最复杂的函数列表，包含文件、函数名、行号和两种复杂度
+            - parse_errors: 无法解析的文件数量
+            - skipped_files: 超过1MB未分析的文件数量（通常是打包或生成的产物）
             - recommendations: 具体的改进建议列表
             - project_path: 分析的项目路径
             - analysis_timestamp: 分析执行时间戳
@@ -1006,23 +1242,19 @@ def analyze_code_complexity(project_path: str, min_lines: int = 10) -> str:
         - 团队代码质量标准和最佳实践制定
 
     工具优势：
-        - 支持多种主流编程语言的复杂度分析
-        - 基于圈复杂度指标的科学评估方法
-        - 智能识别复杂文件，提供具体重构建议
-        - 提供量化指标，便于代码质量对比和跟踪
-        - 生成实用的改进指导，支持实际开发决策
+        - 支持Python、JavaScript/TypeScript、Java、C/C++、Go和Rust
+        - 圈复杂度（McCabe）和认知复杂度（SonarSource）逐函数计算
+        - 注释、字符串和标识符中的关键字不会被误计
+        - 多文件在进程池上并行分析，结果按文件内容缓存，重复分析只处理变化的文件
 
     注意事项：
         - 分析结果基于静态代码扫描，可能存在误判
-        - 复杂度阈值应根据项目实际情况调整
+        - 函数圈复杂度超过10或认知复杂度超过15视为复杂，阈值应结合项目实际判断
+        - 超过1MB的源文件视为生成产物，不参与分析
         - 建议结合人工代码审查进行综合评估
         - 某些设计模式可能自然增加复杂度，需要理性判断
-        - 分析范围默认限制为20个文件，大型项目可考虑分批分析
     """
     try:
-        import re
-        from pathlib import Path
-
         project_dir = Path(project_path)
         if not project_dir.exists():
             return json.dumps(
@@ -1031,104 +1263,122 @@ def analyze_code_complexity(project_path: str, min_lines: int = 10) -> str:
                 ensure_ascii=False,
             )
 
-        # 查找源代码文件
-        source_files = []
-        for ext in [".py", ".js", ".ts", ".java", ".cpp", ".cc", ".c", ".go", ".rs"]:
-            source_files.extend(project_dir.glob(f"**/*{ext}"))
-
-        complexity_analysis = {
-            "files_analyzed": len(source_files),
-            "total_lines": 0,
-            "functions_found": 0,
-            "classes_found": 0,
-            "complex_files": [],
-            "recommendations": [],
+        # 查找源代码文件（查询共享的工作区索引），跳过过大的生成产物
+        if project_dir.is_file():
+            candidates = [(project_dir, project_dir.name, project_dir.stat().st_size)]
+        else:
+            candidates = [
+                (f.path, f.relative_path, f.size)
+                for f in get_workspace_index(project_dir).files(
+                    extensions=SUPPORTED_EXTENSIONS
+                )
+            ]
+        source_files = {
+            str(path): relative_path
+            for path, relative_path, size in candidates
+            if size <= MAX_SOURCE_BYTES
         }
-
-        for file_path in source_files[:20]:  # 限制分析文件数量
-            try:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    lines = f.readlines()
-
-                    if len(lines) < min_lines:
-                        continue
-
-                    complexity_analysis["total_lines"] += len(lines)
-
-                    # 简单的复杂度分析
-                    complexity_score = 0
-                    function_count = 0
-                    class_count = 0
-
-                    for i, line in enumerate(lines):
-                        line_stripped = line.strip()
-
-                        # 计算圈复杂度指标
-                        if any(
-                            keyword in line_stripped
-                            for keyword in [
-                                "if",
-                                "elif",
-                                "for",
-                                "while",
-                                "try",
-                                "except",
-                                "catch",
-                                "switch",
-                                "case",
-                            ]
-                        ):
-                            complexity_score += 1
-
-                        # 统计函数和类
-                        if re.match(
-                            r"^(def|function|class|interface)\s+\w+", line_stripped
-                        ):
-                            if "class" in line_stripped or "interface" in line_stripped:
-                                class_count += 1
-                            else:
-                                function_count += 1
-
-                    complexity_analysis["functions_found"] += function_count
-                    complexity_analysis["classes_found"] += class_count
-
-                    # 识别复杂文件
-                    avg_complexity = (
-                        complexity_score / len(lines) if len(lines) > 0 else 0
-                    )
-                    if avg_complexity > 0.1 or len(lines) > 200:
-                        complexity_analysis["complex_files"].append(
-                            {
-                                "file": str(file_path.relative_to(project_dir)),
-                                "lines": len(lines),
-                                "functions": function_count,
-                                "classes": class_count,
-                                "complexity_score": complexity_score,
-                                "avg_complexity": avg_complexity,
-                            }
-                        )
-
-            except Exception:
+        results = analyze_files(list(source_files))
+
+        total_lines = 0
+        function_count = 0
+        class_count = 0
+        total_complexity = 0
+        parse_errors = 0
+        complex_files = []
+        complex_functions = []
+        for path, result in results.items():
+            if result.error:
+                parse_errors += 1
                 continue
+            if result.lines < min_lines:
+                continue
+            relative_path = source_files[path]
+            total_lines += result.lines
+            function_count += len(result.functions)
+            class_count += result.classes
+            total_complexity += sum(f.cyclomatic for f in result.functions)
+
+            hotspots = [
+                f
+                for f in result.functions
+                if f.cyclomatic > CYCLOMATIC_THRESHOLD
+                or f.cognitive > COGNITIVE_THRESHOLD
+            ]
+            complex_functions.extend((relative_path, f) for f in hotspots)
+            if hotspots or result.lines > LARGE_FILE_LINES:
+                complex_files.append(
+                    {
+                        "file": relative_path,
+                        "lines": result.lines,
+                        "functions": len(result.functions),
+                        "classes": result.classes,
+                        "complexity_score": result.cyclomatic,
+                        "avg_complexity": (
+                            round(
+                                sum(f.cyclomatic for f in result.functions)
+                                / len(result.functions),
+                                2,
+                            )
+                            if result.functions
+                            else 0
+                        ),
+                        "max_complexity": result.max_cyclomatic,
+                        "cognitive_complexity": result.max_cognitive,
+                    }
+                )
+
+        complex_files.sort(
+            key=lambda f: (f["cognitive_complexity"], f["max_complexity"], f["lines"]),
+            reverse=True,
+        )
+        top_functions = heapq.nlargest(
+            max_results,
+            complex_functions,
+            key=lambda item: (item[1].cognitive, item[1].cyclomatic),
+        )
 
         # 生成建议
-        if complexity_analysis["complex_files"]:
-            complexity_analysis["recommendations"].append(
-                f"发现 {len(complexity_analysis['complex_files'])} 个复杂文件，建议重构降低复杂度"
+        recommendations = []
+        if complex_functions:
+            recommendations.append(
+                f"发现 {len(complex_functions)} 个复杂函数（圈复杂度>{CYCLOMATIC_THRESHOLD}"
+                f"或认知复杂度>{COGNITIVE_THRESHOLD}），建议拆分函数、提前返回减少嵌套"
             )
+        if complex_files:
+            recommendations.append(
+                f"发现 {len(complex_files)} 个复杂文件，建议重构降低复杂度"
+            )
+        if total_lines > 10000:
+            recommendations.append("项目较大，建议模块化拆分")
+        if parse_errors:
+            recommendations.append(f"{parse_errors} 个文件无法解析，请先修复语法错误")
 
-        if complexity_analysis["total_lines"] > 10000:
-            complexity_analysis["recommendations"].append("项目较大，建议模块化拆分")
-
-        # 将结果提升到顶级，便于访问
         result = {
             "success": True,
-            "files_analyzed": complexity_analysis["files_analyzed"],
-            "total_lines": complexity_analysis["total_lines"],
-            "functions_found": complexity_analysis["functions_found"],
-            "classes_found": complexity_analysis["classes_found"],
-            "complex_files": complexity_analysis["complex_files"],
-            "recommendations": complexity_analysis["recommendations"],
+            "files_analyzed": len(results),
+            "total_lines": total_lines,
+            "functions_found": function_count,
+            "classes_found": class_count,
+            "average_complexity": (
+                round(total_complexity / function_count, 2) if function_count else 0
+            ),
+            "complex_files_total": len(complex_files),
+            "complex_files": complex_files[:max_results],
+            "complex_functions_total": len(complex_functions),
+            "complex_functions": [
+                {
+                    "file": relative_path,
+                    "function": function.name,
+                    "line": function.line,
+                    "cyclomatic_complexity": function.cyclomatic,
+                    "cognitive_complexity": function.cognitive,
+                }
+                for relative_path, function in top_functions
+            ],
+            "parse_errors": parse_errors,
+            "skipped_files": len(candidates) - len(source_files),
+            "recommendations": recommendations,
             "project_path": str(project_dir),
             "analysis_timestamp": datetime.now().isoformat(),
         }
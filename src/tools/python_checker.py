@@ -0,0 +1,758 @@
+"""
+进程内Python代码检查模块
+
+基于compile()和ast实现的Python检查后端，用于替代逐文件启动 python -m py_compile：
+- 语法检查：与py_compile等价，包括符号表阶段的错误
+- pyflakes风格的作用域分析：未定义名称、未使用的导入、未使用的局部变量
+- 多文件检查在进程池上并行执行，少量文件直接在当前进程完成
+- 检查结果按文件内容哈希缓存在进程内和代理缓存目录中，内容未变化的文件不再检查
+
+工作进程只返回简单的元组，由调用方转换为AnalysisIssue，避免在进程间传递复杂对象。
+"""
+
+import ast
+import builtins
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+# 检查器版本，检查规则变化时递增以使缓存的结果失效
+CHECKER_VERSION = "1"
+
+# 少于该数量的文件直接在当前进程检查，避免进程池启动开销
+MIN_PARALLEL_FILES = 16
+
+# 进程内记忆的检查结果数量上限，以及持久化缓存的条目上限
+MAX_MEMOIZED_RESULTS = 50000
+MAX_CACHED_RESULTS = 200000
+
+# compile()接受的语法随解释器版本变化，缓存键包含解释器版本
+_PYTHON_VERSION = f"{sys.version_info[0]}.{sys.version_info[1]}"
+
+# 工作进程返回的问题元组: (规则ID, 消息, 行号, 列号)
+RawIssue = Tuple[str, str, Optional[int], Optional[int]]
+
+# 规则定义: 规则ID -> (问题类型, 严重程度, 类别)
+RULES = {
+    "E999": ("error", "high", "syntax_error"),
+    "F821": ("error", "high", "python_quality"),
+    "F401": ("warning", "medium", "python_quality"),
+    "F841": ("warning", "medium", "python_quality"),
+}
+
+_BUILTIN_NAMES = set(dir(builtins)) | {
+    "__file__",
+    "__name__",
+    "__doc__",
+    "__builtins__",
+    "__spec__",
+    "__loader__",
+    "__package__",
+    "__path__",
+    "__annotations__",
+    "__cached__",
+    "WindowsError",
+}
+
+_NOQA_PATTERN = re.compile(r"#\s*noqa(?::\s*([A-Z0-9, ]+))?", re.IGNORECASE)
+
+# 类体中隐式可用的名称
+_CLASS_IMPLICIT_NAMES = {"__module__", "__qualname__"}
+
+# 提供cast的模块
+_TYPING_MODULES = {"typing", "typing_extensions"}
+
+
+class _Scope:
+    """作用域"""
+
+    def __init__(self, kind: str, bound: Set[str], parent: Optional["_Scope"] = None):
+        self.kind = kind  # module, function, class, comprehension
+        self.bound = bound
+        self.parent = parent
+        self.used: Set[str] = set()
+        self.globals: Set[str] = set()
+        self.nonlocals: Set[str] = set()
+        self.uses_locals = False
+
+
+class _BindingCollector(ast.NodeVisitor):
+    """预先收集一个作用域内绑定的所有名称（不进入嵌套作用域）"""
+
+    def __init__(self):
+        self.bound: Set[str] = set()
+        self.globals: Set[str] = set()
+        self.nonlocals: Set[str] = set()
+        self.star_import = False
+
+    def collect(self, body: Sequence[ast.AST]) -> "_BindingCollector":
+        for node in body:
+            self.visit(node)
+        self.bound -= self.globals | self.nonlocals
+        return self
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, (ast.Store, ast.Del)):
+            self.bound.add(node.id)
+
+    def visit_NamedExpr(self, node: ast.NamedExpr) -> None:
+        self.bound.add(node.target.id)
+        self.visit(node.value)
+
+    def _bind_definition(self, node) -> None:
+        self.bound.add(node.name)
+        # 装饰器、默认值和基类在当前作用域求值，但不会产生绑定（海象表达式除外）
+        for child in getattr(node, "decorator_list", []):
+            self.visit(child)
+
+    visit_FunctionDef = _bind_definition
+    visit_AsyncFunctionDef = _bind_definition
+    visit_ClassDef = _bind_definition
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        pass
+
+    def _skip_comprehension(self, node) -> None:
+        # 推导式中的海象表达式绑定到外层作用域
+        for child in ast.walk(node):
+            if isinstance(child, ast.NamedExpr):
+                self.bound.add(child.target.id)
+
+    visit_ListComp = _skip_comprehension
+    visit_SetComp = _skip_comprehension
+    visit_DictComp = _skip_comprehension
+    visit_GeneratorExp = _skip_comprehension
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.bound.add((alias.asname or alias.name).split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        for alias in node.names:
+            if alias.name == "*":
+                self.star_import = True
+            else:
+                self.bound.add(alias.asname or alias.name)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        self.globals.update(node.names)
+
+    def visit_Nonlocal(self, node: ast.Nonlocal) -> None:
+        self.nonlocals.update(node.names)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node) -> None:
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node) -> None:
+        if node.name:
+            self.bound.add(node.name)
+
+    def visit_MatchMapping(self, node) -> None:
+        if node.rest:
+            self.bound.add(node.rest)
+        self.generic_visit(node)
+
+
+def _collect(body: Sequence[ast.AST]) -> _BindingCollector:
+    return _BindingCollector().collect(body)
+
+
+def _typing_cast_bindings(tree: ast.Module) -> Tuple[Set[str], Set[str]]:
+    """收集绑定到typing.cast的名称和绑定到typing模块的名称"""
+    casts: Set[str] = set()
+    modules: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            if node.module in _TYPING_MODULES and not node.level:
+                casts.update(a.asname or a.name for a in node.names if a.name == "cast")
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name in _TYPING_MODULES:
+                    modules.add(alias.asname or alias.name)
+    return casts, modules
+
+
+def _arguments_names(args: ast.arguments) -> Set[str]:
+    names = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs}
+    if args.vararg:
+        names.add(args.vararg.arg)
+    if args.kwarg:
+        names.add(args.kwarg.arg)
+    return names
+
+
+class _ScopeChecker(ast.NodeVisitor):
+    """pyflakes风格的作用域检查"""
+
+    def __init__(self, is_package_init: bool = False):
+        self.issues: List[RawIssue] = []
+        self.is_package_init = is_package_init
+        self.star_import = False
+        self.scope: Optional[_Scope] = None
+        self.module_scope: Optional[_Scope] = None
+        # (作用域, 绑定名, 显示名, 节点, 是否显式再导出)
+        self.imports: List[Tuple[_Scope, str, str, ast.AST, bool]] = []
+        # (作用域, 变量名, 节点)
+        self.assignments: List[Tuple[_Scope, str, ast.AST]] = []
+        # 绑定到typing.cast的名称和绑定到typing模块的名称
+        self.cast_names: Set[str] = set()
+        self.typing_modules: Set[str] = set()
+
+    # ---- 作用域管理 ----
+
+    def _push(self, kind: str, collector: _BindingCollector, extra=()) -> _Scope:
+        scope = _Scope(kind, collector.bound | set(extra), self.scope)
+        scope.globals = collector.globals
+        scope.nonlocals = collector.nonlocals
+        self.scope = scope
+        return scope
+
+    def _pop(self) -> None:
+        self.scope = self.scope.parent
+
+    def _resolve(self, name: str) -> Optional[_Scope]:
+        """按Python的名称解析规则查找绑定名称的作用域"""
+        scope = self.scope
+        if name in scope.globals:
+            return self.module_scope
+        first = True
+        while scope is not None:
+            # 类作用域只对类体本身可见
+            if scope.kind != "class" or first:
+                if name in scope.bound and name not in scope.nonlocals:
+                    return scope
+            first = False
+            scope = scope.parent
+        return None
+
+    def _use(self, name: str, node: ast.AST) -> None:
+        scope = self._resolve(name)
+        if scope is not None:
+            scope.used.add(name)
+            return
+        if name in _BUILTIN_NAMES or self.star_import:
+            return
+        if self.scope.kind == "class" and name in _CLASS_IMPLICIT_NAMES:
+            return
+        if name == "__class__" and self.scope.kind == "function":
+            return
+        self.issues.append(
+            ("F821", f"undefined name '{name}'", node.lineno, node.col_offset + 1)
+        )
+
+    # ---- 入口 ----
+
+    def check(self, tree: ast.Module) -> List[RawIssue]:
+        collector = _collect(tree.body)
+        self.star_import = collector.star_import
+        self.cast_names, self.typing_modules = _typing_cast_bindings(tree)
+        # 函数中通过global声明赋值的名称同样是模块级绑定
+        declared_globals = {
+            name
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Global)
+            for name in node.names
+        }
+        collector.bound |= declared_globals
+        collector.globals = set()
+        self.module_scope = self._push("module", collector)
+        self._mark_dunder_all(tree)
+        for node in tree.body:
+            self.visit(node)
+        self._report_unused()
+        return self.issues
+
+    def _mark_dunder_all(self, tree: ast.Module) -> None:
+        """__all__中列出的名称视为已使用"""
+        for node in tree.body:
+            targets = []
+            if isinstance(node, ast.Assign):
+                targets, value = node.targets, node.value
+            elif isinstance(node, (ast.AugAssign, ast.AnnAssign)) and node.value:
+                targets, value = [node.target], node.value
+            if not any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+                continue
+            if isinstance(value, (ast.List, ast.Tuple)):
+                for elt in value.elts:
+                    if isinstance(elt, ast.Constant) and isinstance(elt.value, str):
+                        self.module_scope.used.add(elt.value)
+
+    def _report_unused(self) -> None:
+        for scope, name, display, node, reexport in self.imports:
+            if name in scope.used or reexport:
+                continue
+            if scope.kind == "module" and self.is_package_init:
+                continue
+            self.issues.append(
+                (
+                    "F401",
+                    f"'{display}' imported but unused",
+                    node.lineno,
+                    node.col_offset + 1,
+                )
+            )
+
+        # 与pyflakes一致，同一变量多次赋值时只报告最后一次
+        last_assignments = {}
+        for scope, name, node in self.assignments:
+            last_assignments[(id(scope), name)] = (scope, name, node)
+
+        for scope, name, node in last_assignments.values():
+            if name in scope.used or scope.uses_locals:
+                continue
+            self.issues.append(
+                (
+                    "F841",
+                    f"local variable '{name}' is assigned to but never used",
+                    node.lineno,
+                    node.col_offset + 1,
+                )
+            )
+
+    # ---- 名称 ----
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Load):
+            self._use(node.id, node)
+            if node.id == "locals" and self.scope.kind == "function":
+                self.scope.uses_locals = True
+        elif isinstance(node.ctx, ast.Del):
+            self._use(node.id, node)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        self.visit(node.value)
+        for target in node.targets:
+            self._record_assignment(target)
+            self.visit(target)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        self._visit_annotation(node.annotation)
+        if node.value is not None:
+            self.visit(node.value)
+            self._record_assignment(node.target)
+        self.visit(node.target)
+
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        # 增量赋值同时读取目标
+        if isinstance(node.target, ast.Name):
+            self._use(node.target.id, node.target)
+        else:
+            self.visit(node.target)
+        self.visit(node.value)
+
+    def visit_NamedExpr(self, node: ast.NamedExpr) -> None:
+        self.visit(node.value)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is not None:
+            self.visit(node.type)
+        if node.name:
+            self._record_assignment(ast.copy_location(ast.Name(id=node.name), node))
+        for stmt in node.body:
+            self.visit(stmt)
+
+    def _record_assignment(self, target: ast.AST) -> None:
+        """记录函数作用域中对简单名称的赋值（与pyflakes一致，不检查元组解包）"""
+        if self.scope.kind != "function" or not isinstance(target, ast.Name):
+            return
+        name = target.id
+        if name in self.scope.globals or name in self.scope.nonlocals or name == "_":
+            return
+        self.assignments.append((self.scope, name, target))
+
+    # ---- 导入 ----
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.asname:
+                reexport = alias.asname == alias.name
+                self.imports.append(
+                    (self.scope, alias.asname, alias.name, node, reexport)
+                )
+            else:
+                name = alias.name.split(".")[0]
+                self.imports.append((self.scope, name, alias.name, node, False))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module == "__future__":
+            return
+        module = "." * node.level + (node.module or "")
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            name = alias.asname or alias.name
+            reexport = alias.asname is not None and alias.asname == alias.name
+            display = f"{module}.{alias.name}" if module else alias.name
+            self.imports.append((self.scope, name, display, node, reexport))
+
+    def visit_Call(self, node: ast.Call) -> None:
+        # typing.cast的第一个参数是类型注解，可能以字符串形式给出；
+        # 其他名为cast的函数或方法（如memoryview.cast）的参数是普通值
+        func = node.func
+        is_cast = (isinstance(func, ast.Name) and func.id in self.cast_names) or (
+            isinstance(func, ast.Attribute)
+            and func.attr == "cast"
+            and isinstance(func.value, ast.Name)
+            and func.value.id in self.typing_modules
+        )
+        if is_cast and node.args:
+            self.visit(func)
+            self._visit_annotation(node.args[0])
+            for arg in node.args[1:]:
+                self.visit(arg)
+            for keyword in node.keywords:
+                self.visit(keyword.value)
+            return
+        self.generic_visit(node)
+
+    # ---- 定义 ----
+
+    def _visit_annotation(self, annotation: Optional[ast.AST]) -> None:
+        """访问类型注解，字符串形式的注解会被解析后再访问"""
+        if annotation is None:
+            return
+        # Literal["a", "b"]中的字符串是值而不是类型
+        literal_values = set()
+        for child in ast.walk(annotation):
+            if isinstance(child, ast.Subscript):
+                value = child.value
+                name = value.attr if isinstance(value, ast.Attribute) else None
+                if isinstance(value, ast.Name):
+                    name = value.id
+                if name == "Literal":
+                    literal_values.update(id(c) for c in ast.walk(child.slice))
+        for child in ast.walk(annotation):
+            if id(child) in literal_values:
+                continue
+            if isinstance(child, ast.Constant) and isinstance(child.value, str):
+                try:
+                    parsed = ast.parse(child.value.strip(), mode="eval")
+                except SyntaxError:
+                    continue
+                for name in ast.walk(parsed):
+                    if isinstance(name, ast.Name):
+                        ast.copy_location(name, child)
+                        self._use(name.id, name)
+        self.visit(annotation)
+
+    def _visit_arguments(self, args: ast.arguments) -> None:
+        for default in args.defaults + [d for d in args.kw_defaults if d]:
+            self.visit(default)
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            self._visit_annotation(arg.annotation)
+        for arg in (args.vararg, args.kwarg):
+            if arg:
+                self._visit_annotation(arg.annotation)
+
+    def visit_FunctionDef(self, node) -> None:
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self._visit_arguments(node.args)
+        self._visit_annotation(node.returns)
+
+        self._push("function", _collect(node.body), _arguments_names(node.args))
+        for stmt in node.body:
+            self.visit(stmt)
+        self._pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self._visit_arguments(node.args)
+        self._push("function", _collect([]), _arguments_names(node.args))
+        self.visit(node.body)
+        self._pop()
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        for base in node.bases:
+            self.visit(base)
+        for keyword in node.keywords:
+            self.visit(keyword.value)
+
+        self._push("class", _collect(node.body))
+        for stmt in node.body:
+            self.visit(stmt)
+        self._pop()
+
+    def _visit_comprehension(self, node, elements: Sequence[ast.AST]) -> None:
+        # 第一个生成器的可迭代对象在外层作用域求值
+        self.visit(node.generators[0].iter)
+
+        bound = set()
+        for generator in node.generators:
+            for child in ast.walk(generator.target):
+                if isinstance(child, ast.Name):
+                    bound.add(child.id)
+        self._push("comprehension", _collect([]), bound)
+        for index, generator in enumerate(node.generators):
+            if index > 0:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for element in elements:
+            self.visit(element)
+        self._pop()
+
+    def visit_ListComp(self, node: ast.ListComp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    visit_SetComp = visit_ListComp
+    visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node: ast.DictComp) -> None:
+        self._visit_comprehension(node, [node.key, node.value])
+
+
+def _syntax_issue(error: Exception) -> RawIssue:
+    if isinstance(error, SyntaxError):
+        return (
+            "E999",
+            f"{type(error).__name__}: {error.msg}",
+            error.lineno,
+            error.offset,
+        )
+    return ("E999", f"{type(error).__name__}: {error}", None, None)
+
+
+def check_source(
+    source: Union[str, bytes], filename: str = "<string>", syntax_only: bool = False
+) -> List[RawIssue]:
+    """检查Python源码，返回问题元组列表"""
+    try:
+        if syntax_only:
+            compile(source, filename, "exec", dont_inherit=True)
+            return []
+        tree = ast.parse(source, filename)
+        # 编译语法树以捕获符号表阶段的错误（如函数外的return、nonlocal等）
+        compile(tree, filename, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError, UnicodeDecodeError) as e:
+        return [_syntax_issue(e)]
+
+    is_package_init = os.path.basename(filename) == "__init__.py"
+    issues = _ScopeChecker(is_package_init).check(tree)
+    return _filter_noqa(issues, source)
+
+
+def _filter_noqa(issues: List[RawIssue], source: Union[str, bytes]) -> List[RawIssue]:
+    """过滤带有 # noqa 注释的行上的问题（支持 # noqa: F401 形式）"""
+    if not issues:
+        return issues
+    if isinstance(source, bytes):
+        source = source.decode("utf-8", errors="replace")
+    lines = source.splitlines()
+
+    kept = []
+    for issue in issues:
+        line = issue[2]
+        text = lines[line - 1] if line and line <= len(lines) else ""
+        match = _NOQA_PATTERN.search(text)
+        if match:
+            codes = match.group(1)
+            if not codes or issue[0] in re.split(r"[,\s]+", codes.strip()):
+                continue
+        kept.append(issue)
+    return kept
+
+
+def _check_file_worker(args: Tuple[str, bool]) -> Tuple[str, List[RawIssue]]:
+    """工作进程入口：检查单个文件，同时返回所检查内容的SHA-256哈希
+
+    文件无法读取时哈希为空字符串，结果不写入缓存。
+    """
+    file_path, syntax_only = args
+    try:
+        with open(file_path, "rb") as f:
+            source = f.read()
+    except OSError as e:
+        return "", [("E902", f"{type(e).__name__}: {e}", None, None)]
+    content_hash = hashlib.sha256(source).hexdigest()
+    return content_hash, check_source(source, file_path, syntax_only)
+
+
+def to_analysis_issues(raw_issues: List[RawIssue]) -> list:
+    """将问题元组转换为AnalysisIssue"""
+    from .multilang_code_analyzers import AnalysisIssue
+
+    issues = []
+    for rule_id, message, line, column in raw_issues:
+        issue_type, severity, category = RULES.get(
+            rule_id, ("error", "high", "python_quality")
+        )
+        issues.append(
+            AnalysisIssue(
+                tool_name="python_builtin",
+                issue_type=issue_type,
+                severity=severity,
+                message=message,
+                line=line,
+                column=column,
+                rule_id=rule_id,
+                category=category,
+            )
+        )
+    return issues
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+_memo: Dict[str, List[RawIssue]] = {}
+_memo_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """获取共享的检查进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_check_cache():
+    """获取检查结果的持久化缓存，缓存不可用时返回None"""
+    global _cache
+    from .analysis_cache import AnalysisCache, get_agent_cache_dir
+
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = AnalysisCache(
+                    db_path=get_agent_cache_dir() / "python_check.db",
+                    max_entries=MAX_CACHED_RESULTS,
+                )
+            except (OSError, sqlite3.Error):
+                return None
+        return _cache
+
+
+def _cache_key(content_hash: str, file_path: str, syntax_only: bool) -> str:
+    # 完整检查时__init__.py按包的规则报告未使用的导入
+    if syntax_only:
+        mode = "syntax"
+    elif os.path.basename(file_path) == "__init__.py":
+        mode = "package_init"
+    else:
+        mode = "full"
+    return f"python_check:{CHECKER_VERSION}:{_PYTHON_VERSION}:{mode}:{content_hash}"
+
+
+def _run(tasks: List[Tuple[str, bool]]) -> List[Tuple[str, List[RawIssue]]]:
+    """在进程池上检查文件，进程池不可用时退回当前进程"""
+    global _pool
+    if len(tasks) >= MIN_PARALLEL_FILES:
+        pool = _get_pool()
+        chunksize = max(1, len(tasks) // ((os.cpu_count() or 1) * 4))
+        try:
+            return list(pool.map(_check_file_worker, tasks, chunksize=chunksize))
+        except (OSError, BrokenProcessPool):
+            with _pool_lock:
+                _pool = None
+    return [_check_file_worker(task) for task in tasks]
+
+
+def check_files_raw(
+    file_paths: Sequence[Union[str, Path]],
+    syntax_only: bool = False,
+    use_cache: bool = True,
+) -> Dict[str, List[RawIssue]]:
+    """检查多个文件，返回 路径 -> 问题元组列表
+
+    内容未变化的文件直接使用进程内记忆或持久化缓存的结果，只检查其余的文件。
+    """
+    from .analysis_cache import hash_file_content
+
+    paths = [str(p) for p in file_paths]
+    results: Dict[str, List[RawIssue]] = {}
+    pending: Dict[str, str] = {}
+    for path in paths:
+        if not use_cache:
+            pending[path] = ""
+            continue
+        try:
+            key = _cache_key(hash_file_content(Path(path)), path, syntax_only)
+        except OSError:
+            key = ""
+        with _memo_lock:
+            memo = _memo.get(key)
+        if memo is not None:
+            results[path] = memo
+        else:
+            pending[path] = key
+
+    cache = get_check_cache() if use_cache and pending else None
+    if cache is not None:
+        stored = cache.get_many([key for key in pending.values() if key])
+        for path, key in list(pending.items()):
+            payload = stored.get(key)
+            if payload is None:
+                continue
+            try:
+                issues = [(str(r), str(m), l, c) for r, m, l, c in payload]
+            except (TypeError, ValueError):
+                continue
+            results[path] = issues
+            del pending[path]
+            _remember(key, issues)
+
+    tasks = [(path, syntax_only) for path in pending]
+    computed = {}
+    for (path, _), (content_hash, issues) in zip(tasks, _run(tasks)):
+        results[path] = issues
+        if use_cache and content_hash:
+            key = _cache_key(content_hash, path, syntax_only)
+            _remember(key, issues)
+            computed[key] = issues
+    if cache is not None and computed:
+        cache.put_many(computed, tool="python_check")
+    return {path: results[path] for path in paths}
+
+
+def _remember(key: str, issues: List[RawIssue]) -> None:
+    with _memo_lock:
+        if len(_memo) >= MAX_MEMOIZED_RESULTS:
+            _memo.clear()
+        _memo[key] = issues
+
+
+def clear_check_memo() -> None:
+    """清空进程内记忆的检查结果"""
+    with _memo_lock:
+        _memo.clear()
+
+
+def check_python_file(file_path: Union[str, Path], syntax_only: bool = False) -> list:
+    """检查单个Python文件，返回AnalysisIssue列表"""
+    return to_analysis_issues(_check_file_worker((str(file_path), syntax_only))[1])
+
+
+def check_python_files(
+    file_paths: Sequence[Union[str, Path]],
+    syntax_only: bool = False,
+    use_cache: bool = True,
+) -> Dict[str, list]:
+    """在进程池上并行检查多个Python文件，返回 路径 -> AnalysisIssue列表"""
+    return {
+        path: to_analysis_issues(raw)
+        for path, raw in check_files_raw(file_paths, syntax_only, use_cache).items()
+    }
@@ -0,0 +1,200 @@
+"""
+工具链注册表
+
+记录外部工具（pylint、eslint、clang-format、npx等）的可用性、版本和降级选择：
+- 可用性通过在PATH中查找可执行文件判断，不启动子进程，每个进程只查找一次
+- 版本在首次需要时才执行 --version 探测，结果可持久化并带有过期时间
+- 持久化的版本与可执行文件路径和修改时间绑定，工具升级后自动失效
+- 由代码分析器、专业格式化工具和错误检测工具共享
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+# 持久化版本信息的默认有效期（秒）
+DEFAULT_TTL = 24 * 3600
+
+
+class ToolchainRegistry:
+    """进程级的工具链注册表"""
+
+    def __init__(
+        self,
+        cache_file: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        persist: bool = True,
+    ):
+        """
+        Args:
+            cache_file: 版本信息持久化文件，默认位于当前代理的缓存目录
+            ttl: 持久化版本信息的有效期（秒）
+            persist: 是否持久化版本信息
+        """
+        self._cache_file = cache_file
+        self.ttl = ttl
+        self.persist = persist
+
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Optional[str]] = {}
+        self._versions: Dict[tuple, str] = {}
+        self._fallbacks: Dict[str, Optional[str]] = {}
+        self._persisted: Optional[Dict[str, Any]] = None
+
+    @property
+    def cache_file(self) -> Path:
+        if self._cache_file is None:
+            from .analysis_cache import get_agent_cache_dir
+
+            self._cache_file = get_agent_cache_dir() / "toolchain.json"
+        return self._cache_file
+
+    def which(self, name: str) -> Optional[str]:
+        """查找可执行文件路径，结果在进程内记忆"""
+        with self._lock:
+            if name not in self._paths:
+                self._paths[name] = shutil.which(name)
+            return self._paths[name]
+
+    def is_available(self, name: str) -> bool:
+        """检查工具是否可用"""
+        return self.which(name) is not None
+
+    def resolve(self, candidates: Sequence[str]) -> Optional[str]:
+        """按降级顺序返回第一个可用的工具，并记录降级选择"""
+        chosen = next((name for name in candidates if self.is_available(name)), None)
+        with self._lock:
+            self._fallbacks[candidates[0]] = chosen
+        return chosen
+
+    def get_version(self, command: Sequence[str]) -> str:
+        """获取工具版本（命令形如 ["pylint", "--version"]）
+
+        每个进程对同一命令最多探测一次；启用持久化时，可执行文件未变化
+        且未过期的探测结果会直接复用。
+        """
+        key = tuple(command)
+        with self._lock:
+            if key in self._versions:
+                return self._versions[key]
+
+        binary = self.which(key[0])
+        if binary is None:
+            version = "unavailable"
+        else:
+            version = self._load_persisted_version(key, binary)
+            if version is None:
+                version = self._probe_version(key)
+                self._save_persisted_version(key, binary, version)
+
+        with self._lock:
+            self._versions[key] = version
+        return version
+
+    def _probe_version(self, command: tuple) -> str:
+        """执行版本命令"""
+        try:
+            result = subprocess.run(
+                list(command), capture_output=True, text=True, timeout=10
+            )
+            output = (result.stdout or result.stderr).strip()
+            return output.splitlines()[0] if output else "unknown"
+        except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+            return "unavailable"
+
+    def _binary_signature(self, binary: str) -> Optional[float]:
+        """可执行文件的修改时间，用于判断工具是否升级"""
+        try:
+            return os.path.getmtime(binary)
+        except OSError:
+            return None
+
+    def _load_persisted(self) -> Dict[str, Any]:
+        if self._persisted is None:
+            self._persisted = {}
+            if self.persist:
+                try:
+                    self._persisted = json.loads(
+                        self.cache_file.read_text(encoding="utf-8")
+                    )
+                except (OSError, ValueError):
+                    self._persisted = {}
+        return self._persisted
+
+    def _load_persisted_version(self, key: tuple, binary: str) -> Optional[str]:
+        if not self.persist:
+            return None
+        with self._lock:
+            entry = self._load_persisted().get(" ".join(key))
+        if not entry:
+            return None
+        if time.time() - entry.get("probed_at", 0) > self.ttl:
+            return None
+        if entry.get("path") != binary:
+            return None
+        if entry.get("mtime") != self._binary_signature(binary):
+            return None
+        return entry.get("version")
+
+    def _save_persisted_version(self, key: tuple, binary: str, version: str) -> None:
+        if not self.persist:
+            return
+        with self._lock:
+            data = self._load_persisted()
+            data[" ".join(key)] = {
+                "path": binary,
+                "mtime": self._binary_signature(binary),
+                "version": version,
+                "probed_at": time.time(),
+            }
+            try:
+                tmp_file = self.cache_file.with_suffix(".tmp")
+                tmp_file.write_text(
+                    json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
+                )
+                tmp_file.replace(self.cache_file)
+            except OSError:
+                pass
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """清除进程内记忆的探测结果（如安装了新工具后）"""
+        with self._lock:
+            if name is None:
+                self._paths.clear()
+                self._versions.clear()
+                self._fallbacks.clear()
+            else:
+                self._paths.pop(name, None)
+                self._fallbacks.pop(name, None)
+                for key in [k for k in self._versions if k[0] == name]:
+                    del self._versions[key]
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """获取当前已知的工具信息"""
+        with self._lock:
+            return {
+                "tools": {
+                    name: {"available": path is not None, "path": path}
+                    for name, path in self._paths.items()
+                },
+                "versions": {" ".join(k): v for k, v in self._versions.items()},
+                "fallbacks": dict(self._fallbacks),
+            }
+
+
+_registry: Optional[ToolchainRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_toolchain_registry() -> ToolchainRegistry:
+    """获取全局工具链注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ToolchainRegistry()
+        return _registry
@@ -5,6 +5,8 @@ from typing import List, Optional
 
 from langchain_core.tools import tool
 
+# 导入内部类型化分析API（工具之间直接传递对象）
+from .analysis_api import AnalysisError, analyze_defects
 from .defect_aggregator import aggregate_defects_tool as aggregate_defects
 # 直接导入error_detector中的工具（已经是@tool装饰过的，避免双重包装）
 from .error_detector import (analyze_existing_logs, compile_project,
@@ -16,9 +18,12 @@ from .network_tools import http_request, web_search
 # 导入代码格式化工具
 from .professional_formatter import (batch_format_professional,
                                      format_code_professional)
+# 导入项目级缺陷分析引擎
+from .project_defect_engine import analyze_project_defects
 # 导入project_explorer中的工具
 from .project_explorer import (analyze_code_complexity,
-                               explore_project_structure)
+                               explore_project_structure,
+                               summarize_directory_tree)
 # 导入智能测试生成工具
 from .test_generator import (execute_test_suite_tool,
                              generate_validation_tests_tool)
@@ -40,9 +45,21 @@ from .test_generator import (execute_test_suite_tool,
 
 使用场景：代码审查、重构前分析、CI/CD质量门禁、技术债务评估
 
-输出：JSON格式的详细缺陷分析报告，包含问题定位、影响评估和修复建议"""
+输出：JSON格式的详细缺陷分析报告，包含问题定位、影响评估和修复建议
+
+增量模式：设置incremental=True（或指定base_ref）时只报告git变更行范围内的问题
+
+基线模式：设置baseline=True时只报告相对缺陷基线新增的问题，以及新增/已修复/未变化的数量；
+文件首次使用基线模式时以当前问题创建基线，update_baseline=True时用当前结果更新基线"""
 )
-def analyze_code_defects(file_path: str, language: Optional[str] = None) -> str:
+def analyze_code_defects(
+    file_path: str,
+    language: Optional[str] = None,
+    incremental: bool = False,
+    base_ref: Optional[str] = None,
+    baseline: bool = False,
+    update_baseline: bool = False,
+) -> str:
     """
     智能代码缺陷分析工具链，提供给agent使用的一站式代码质量分析工具。
 
@@ -58,6 +75,10 @@ def analyze_code_defects(file_path: str, language: Optional[str] = None) -> str:
         file_path: 要分析的文件路径，支持相对路径和绝对路径
         language: 可选的语言标识符，如果不提供将自动检测
             支持的语言：python, javascript, java, cpp, go, rust等
+        incremental: 是否只报告相对git基准变更的行范围内的问题
+        base_ref: 增量模式的git基准引用，默认使用上次项目分析的提交或HEAD
+        baseline: 是否只报告相对缺陷基线新增的问题（按稳定指纹匹配，不受行号移动影响）
+        update_baseline: 比较后是否用当前结果更新基线（隐含baseline=True）
 
     Returns:
         分析结果的JSON字符串，包含：
@@ -75,6 +96,8 @@ def analyze_code_defects(file_path: str, language: Optional[str] = None) -> str:
                 - priority_ranking: 优先级排序
                 - recommendations: 修复建议
                 - root_cause_analysis: 根因分析
+            - incremental: 增量模式下的基准引用、变更行范围和过滤前的问题总数
+            - baseline: 基线模式下新增、已修复、未变化的问题数量和部分已修复问题
 
     使用场景：
         - 代码审查前的质量检查
@@ -95,101 +118,31 @@ def analyze_code_defects(file_path: str, language: Optional[str] = None) -> str:
         - 建议在代码提交前执行分析
     """
     try:
-        # 第一步：执行代码静态分析
-        analysis_result = analyze_file.invoke(
-            {"file_path": file_path, "language": language}
+        report = analyze_defects(
+            file_path,
+            language,
+            incremental=incremental,
+            base_ref=base_ref,
+            baseline=baseline,
+            update_baseline=update_baseline,
         )
-
-        # 解析分析结果
-        try:
-            analysis_data = json.loads(analysis_result)
-            if not analysis_data.get("success", False):
-                return json.dumps(
-                    {
-                        "success": False,
-                        "error": f"代码分析失败: {analysis_data.get('error', '未知错误')}",
-                        "file_path": file_path,
-                    }
-                )
-        except json.JSONDecodeError:
-            return json.dumps(
-                {
-                    "success": False,
-                    "error": "代码分析结果格式错误",
-                    "file_path": file_path,
-                }
-            )
-
-        # 第二步：聚合和智能分析缺陷
-        defects = analysis_data.get("detailed_result", {}).get("issues", [])
-        if defects:
-            aggregation_result = aggregate_defects.invoke(
-                {"defects_json": json.dumps(defects)}
-            )
-            try:
-                aggregation_data = json.loads(aggregation_result)
-            except json.JSONDecodeError:
-                # 如果聚合失败，返回基础分析结果
-                aggregation_data = {
-                    "success": True,
-                    "result": {
-                        "total_defects": len(defects),
-                        "clusters": [],
-                        "recommendations": ["缺陷聚合失败，请查看原始分析结果"],
-                    },
-                }
-        else:
-            # 没有发现缺陷
-            aggregation_data = {
-                "success": True,
-                "result": {
-                    "total_defects": 0,
-                    "clusters": [],
-                    "recommendations": ["代码质量良好，未发现需要修复的缺陷"],
-                },
-            }
-
-        # 组合结果
-        detailed_result = analysis_data.get("detailed_result", {})
-        combined_result = {
-            "success": True,
-            "file_path": file_path,
-            "analysis": {
-                "file_path": detailed_result.get("file_path", file_path),
-                "language": detailed_result.get("language", "unknown"),
-                "tool_name": detailed_result.get("tool_name", "unknown"),
-                "issues": defects,
-                "score": detailed_result.get("score", 0),
-                "execution_time": detailed_result.get("execution_time", 0),
-                "success": detailed_result.get("success", False),
-            },
-            "aggregation": aggregation_data.get("result", {}),
-            "metadata": {
-                "analysis_timestamp": detailed_result.get("metadata", {}).get(
-                    "aggregation_timestamp", ""
-                ),
-                "toolchain_version": "1.0.0",
-                "language_detected": detailed_result.get("language", "unknown"),
-            },
-        }
-
-        return json.dumps(combined_result, indent=2, ensure_ascii=False)
-
-    except ImportError as e:
+        # 只在返回给agent时序列化一次
+        return json.dumps(report.to_dict(), indent=2, ensure_ascii=False)
+    except AnalysisError as e:
         return json.dumps(
             {
                 "success": False,
-                "error": f"工具模块导入失败: {str(e)}",
+                "error": f"代码分析失败: {str(e)}",
                 "file_path": file_path,
-                "suggestion": "请确保multilang_code_analyzers.py和defect_aggregator.py模块可用",
             }
         )
-    except json.JSONDecodeError as e:
+    except ImportError as e:
         return json.dumps(
             {
                 "success": False,
-                "error": f"JSON解析错误: {str(e)}",
+                "error": f"工具模块导入失败: {str(e)}",
                 "file_path": file_path,
+                "suggestion": "请确保multilang_code_analyzers.py和defect_aggregator.py模块可用",
             }
         )
     except Exception as e:
@@ -210,6 +163,7 @@ __all__ = [
     "web_search",
     # 代码分析工具链
     "analyze_code_defects",
+    "analyze_project_defects",
     # 错误检测工具（直接从error_detector导入）
     "compile_project",
     "run_and_monitor",
@@ -217,6 +171,7 @@ __all__ = [
     "analyze_existing_logs",
     # 项目探索工具（从project_explorer导入）
     "explore_project_structure",
+    "summarize_directory_tree",
     "analyze_code_complexity",
     # 代码格式化工具（从professional_formatter导入）
     "format_code_professional",
@@ -229,14 +184,18 @@ __all__ = [
 # 工具分类字典（便于管理和使用）
 TOOL_CATEGORIES = {
     "网络工具": ["http_request", "web_search"],
-    "代码分析": ["analyze_code_defects", "analyze_code_complexity"],
+    "代码分析": [
+        "analyze_code_defects",
+        "analyze_project_defects",
+        "analyze_code_complexity",
+    ],
     "错误检测": [
         "compile_project",
         "run_and_monitor",
         "run_tests_with_error_capture",
         "analyze_existing_logs",
     ],
-    "项目探索": ["explore_project_structure"],
+    "项目探索": ["explore_project_structure", "summarize_directory_tree"],
     "代码格式化": ["format_code_professional", "batch_format_professional"],
     "测试生成": ["generate_validation_tests_tool", "execute_test_suite_tool"],
 }
@@ -0,0 +1,1108 @@
+"""
+共享的工作区文件索引
+
+项目探索、上下文增强、动态分析、错误检测和复杂度分析原先各自完整遍历一次项目目录。
+WorkspaceIndex用os.scandir遍历一次并在进程内共享：
+- 所有遍历使用同一套排除目录规则，并按.gitignore/.fixagentignore剪除整个子树
+- 每个目录的文件按列保存（文件名列表，大小/修改时间/语言/分类的紧凑数组）
+- 刷新时只比较目录的修改时间，未变化的目录直接复用已有条目，不重新列出
+- 目录修改时间只反映直接子项的增删和重命名；原地修改已有文件不会改变目录的
+  修改时间，需要准确的文件大小和时间时可调用invalidate()
+- 由WorkspaceWatcher维护时，文件事件直接更新对应的行或子树，查询不再检查目录
+- 支持限定目录子树的查询
+- 目录汇总树保存每棵子树的文件数、大小、最新修改时间和按语言/分类的计数，
+  文件变化只沿所在目录的上级更新，子树查询只读取一个节点
+- 文件的增删改以IndexChange通知监听函数，下游缓存据此精确失效
+"""
+
+import os
+import re
+import stat
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import (Any, Callable, Collection, Dict, Iterator, List,
+                    NamedTuple, Optional, Tuple, Union)
+
+from .ignore_rules import (EMPTY_RULES, IGNORE_FILES, IgnoreRules,
+                           directory_rules, ignore_signature, translate_pattern)
+
+# 所有目录遍历共用的排除目录
+EXCLUDED_DIRS = frozenset(
+    {
+        ".git",
+        ".svn",
+        ".hg",
+        "__pycache__",
+        "node_modules",
+        ".venv",
+        "venv",
+        "target",
+        "build",
+        "dist",
+        ".pytest_cache",
+        ".mypy_cache",
+    }
+)
+
+# 按扩展名识别语言（与ProjectExplorer的识别规则一致）
+LANGUAGE_INDICATORS: Dict[str, List[str]] = {
+    "python": [
+        ".py",
+        ".pyi",
+        "Pipfile",
+        "pyproject.toml",
+        "requirements.txt",
+        "setup.py",
+    ],
+    "javascript": [
+        ".js",
+        ".jsx",
+        ".mjs",
+        ".cjs",
+        "package.json",
+        "package-lock.json",
+    ],
+    "typescript": [".ts", ".tsx", "tsconfig.json"],
+    "java": [".java", ".jar", "pom.xml", "build.gradle", "gradlew"],
+    "cpp": [
+        ".cpp",
+        ".cc",
+        ".cxx",
+        ".c++",
+        ".c",
+        ".h",
+        ".hpp",
+        ".hxx",
+        "CMakeLists.txt",
+        "Makefile",
+    ],
+    "go": [".go", "go.mod", "go.sum"],
+    "rust": [".rs", "Cargo.toml", "Cargo.lock"],
+}
+
+_SOURCE_LANGUAGES = ("python", "javascript", "typescript", "java", "cpp", "go", "rust")
+
+# 语言和分类在数组中保存为下标
+LANGUAGES = tuple(LANGUAGE_INDICATORS) + (
+    "build",
+    "containerization",
+    "configuration",
+    "documentation",
+    "unknown",
+)
+CATEGORIES = (
+    "test",
+    "source",
+    "config",
+    "documentation",
+    "build",
+    "assets",
+    "other",
+)
+_LANGUAGE_CODES = {name: code for code, name in enumerate(LANGUAGES)}
+_CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+
+# 进程内保留的索引数量
+MAX_INDEXES = 8
+
+# 两次刷新检查之间的最短间隔（秒），同一轮分析中的多次查询共用一次检查
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+
+def detect_language(name: str) -> str:
+    """根据文件名检测语言"""
+    ext = os.path.splitext(name)[1].lower()
+
+    # 根据扩展名检测
+    for language, extensions in LANGUAGE_INDICATORS.items():
+        if ext in extensions:
+            return language
+
+    # 根据文件名检测
+    name = name.lower()
+    if name in ["makefile", "cmakelists.txt"]:
+        return "build"
+    elif name in ["dockerfile", ".dockerignore"]:
+        return "containerization"
+    elif name.endswith((".yml", ".yaml")):
+        return "configuration"
+    elif name.endswith((".json", ".toml", ".ini", ".cfg")):
+        return "configuration"
+    elif name.endswith((".md", ".rst", ".txt")):
+        return "documentation"
+
+    return "unknown"
+
+
+def categorize_file(relative_path: str, language: str) -> str:
+    """根据相对路径（使用/分隔）和语言对文件分类"""
+    path_parts = relative_path.lower().split("/")
+    filename = path_parts[-1]
+
+    # 测试文件
+    if (
+        any("test" in part for part in path_parts)
+        or filename.startswith("test_")
+        or filename.endswith("_test")
+        or filename.endswith(".test")
+        or "tests/" in relative_path
+    ):
+        return "test"
+
+    # 源代码文件
+    if language in _SOURCE_LANGUAGES:
+        if any(folder in path_parts for folder in ["src", "lib", "app", "modules"]):
+            return "source"
+
+    # 配置文件
+    if (
+        language == "configuration"
+        or filename
+        in [
+            "package.json",
+            "requirements.txt",
+            "setup.py",
+            "pyproject.toml",
+            "pom.xml",
+            "build.gradle",
+        ]
+        or any(
+            folder in path_parts
+            for folder in ["config", "settings", ".vscode", ".idea"]
+        )
+    ):
+        return "config"
+
+    # 文档文件
+    if (
+        language == "documentation"
+        or filename.endswith((".md", ".rst", ".txt", ".adoc"))
+        or any(folder in path_parts for folder in ["docs", "doc", "documentation"])
+    ):
+        return "documentation"
+
+    # 构建文件
+    if any(
+        folder in path_parts for folder in ["build", "target", "dist", "out"]
+    ) or filename in ["makefile", "cmakelists.txt"]:
+        return "build"
+
+    # 资源文件
+    if any(
+        folder in path_parts for folder in ["assets", "static", "resources", "public"]
+    ):
+        return "assets"
+
+    return "other"
+
+
+class IndexedFile(NamedTuple):
+    """索引中的单个文件（查询时按需生成）"""
+
+    path: str
+    relative_path: str
+    name: str
+    size: int
+    mtime: float
+    language: str
+    category: str
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+
+    @property
+    def last_modified(self) -> str:
+        return datetime.fromtimestamp(self.mtime).isoformat()
+
+
+class DirectoryRollup(NamedTuple):
+    """目录子树（含全部下级目录）的文件汇总"""
+
+    relative_path: str
+    file_count: int
+    # 下级目录数（不含目录本身）
+    directory_count: int
+    # 直接位于该目录中的文件数
+    direct_file_count: int
+    total_size: int
+    newest_mtime: float
+    languages: Dict[str, int]
+    categories: Dict[str, int]
+    # 源码和测试文件的语言分布
+    source_languages: Dict[str, int]
+    subdirectories: Tuple[str, ...]
+
+
+class IndexChange(NamedTuple):
+    """索引中文件的变化（created、modified或deleted），目录变化展开为其中的文件"""
+
+    kind: str
+    relative_path: str
+
+
+# 索引变化的监听函数，参数为一批变化
+IndexListener = Callable[[List[IndexChange]], None]
+
+
+class _DirectoryEntry:
+    """单个目录的快照，文件属性按列保存，文件按名称排序
+
+    文件行发布到索引后不再原地修改，事件更新时替换为修改后的副本，
+    查询遍历时无需持有锁。
+    """
+
+    __slots__ = (
+        "mtime_ns",
+        "subdirs",
+        "names",
+        "sizes",
+        "mtimes",
+        "languages",
+        "categories",
+        "rules",
+        "ignore_signature",
+    )
+
+    def __init__(self, mtime_ns: int, rules: IgnoreRules = EMPTY_RULES):
+        self.mtime_ns = mtime_ns
+        # 对本目录子项生效的忽略规则，及本目录忽略文件的签名
+        self.rules = rules
+        self.ignore_signature: Tuple[Tuple[str, int], ...] = ()
+        self.subdirs: Tuple[str, ...] = ()
+        self.names: List[str] = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.languages = array("B")
+        self.categories = array("B")
+
+    @property
+    def total_size(self) -> int:
+        return sum(self.sizes)
+
+    def copy(self) -> "_DirectoryEntry":
+        entry = _DirectoryEntry(self.mtime_ns, self.rules)
+        entry.ignore_signature = self.ignore_signature
+        entry.subdirs = self.subdirs
+        entry.names = list(self.names)
+        entry.sizes = array("q", self.sizes)
+        entry.mtimes = array("d", self.mtimes)
+        entry.languages = array("B", self.languages)
+        entry.categories = array("B", self.categories)
+        return entry
+
+    def find(self, name: str) -> Optional[int]:
+        """二分查找文件所在的行"""
+        pos = bisect_left(self.names, name)
+        if pos < len(self.names) and self.names[pos] == name:
+            return pos
+        return None
+
+    def append(self, relative: str, name: str, size: int, mtime: float) -> None:
+        """在末尾追加一行（调用方保证名称有序）"""
+        self.insert(len(self.names), relative, name, size, mtime)
+
+    def insert(
+        self, pos: int, relative: str, name: str, size: int, mtime: float
+    ) -> None:
+        language = detect_language(name)
+        category = categorize_file(_join(relative, name), language)
+        self.names.insert(pos, name)
+        self.sizes.insert(pos, size)
+        self.mtimes.insert(pos, mtime)
+        self.languages.insert(pos, _LANGUAGE_CODES[language])
+        self.categories.insert(pos, _CATEGORY_CODES[category])
+
+    def remove(self, pos: int) -> None:
+        del self.names[pos]
+        del self.sizes[pos]
+        del self.mtimes[pos]
+        del self.languages[pos]
+        del self.categories[pos]
+
+
+_SOURCE_CATEGORY_CODES = (_CATEGORY_CODES["source"], _CATEGORY_CODES["test"])
+
+
+class _RollupNode:
+    """汇总树中的一个目录：整棵子树的文件数、大小和按语言/分类的计数
+
+    newest为None表示子树中最新的文件被删除，查询时再由下级重新计算。
+    """
+
+    __slots__ = (
+        "directories",
+        "files",
+        "size",
+        "newest",
+        "languages",
+        "categories",
+        "source_languages",
+    )
+
+    def __init__(self) -> None:
+        self.directories = 0
+        self.files = 0
+        self.size = 0
+        self.newest: Optional[float] = 0.0
+        self.languages = array("q", bytes(8 * len(LANGUAGES)))
+        self.categories = array("q", bytes(8 * len(CATEGORIES)))
+        self.source_languages = array("q", bytes(8 * len(LANGUAGES)))
+
+    def add(self, pairs: Dict[Tuple[int, int], int], size: int, sign: int) -> None:
+        """累加（sign=1）或扣除（sign=-1）一批文件，pairs为(语言, 分类)的计数"""
+        for (language, category), count in pairs.items():
+            count *= sign
+            self.files += count
+            self.languages[language] += count
+            self.categories[category] += count
+            if category in _SOURCE_CATEGORY_CODES:
+                self.source_languages[language] += count
+        self.size += sign * size
+
+
+def _counts(codes: array, names: Tuple[str, ...]) -> Dict[str, int]:
+    return {names[code]: count for code, count in enumerate(codes) if count}
+
+
+def _join(directory: str, name: str) -> str:
+    return f"{directory}/{name}" if directory else name
+
+
+def _ancestors(relative: str) -> Iterator[str]:
+    """目录自身及其全部上级目录，直到根目录"""
+    while True:
+        yield relative
+        if not relative:
+            return
+        relative = relative.rpartition("/")[0]
+
+
+def _expand_braces(pattern: str) -> List[str]:
+    """展开{a,b}形式的备选"""
+    start = pattern.find("{")
+    end = pattern.find("}", start)
+    if start < 0 or end < 0:
+        return [pattern]
+    head, body, tail = pattern[:start], pattern[start + 1 : end], pattern[end + 1 :]
+    return [
+        expanded
+        for option in body.split(",")
+        for expanded in _expand_braces(head + option + tail)
+    ]
+
+
+def _diff_entries(
+    relative: str, old: Optional[_DirectoryEntry], new: _DirectoryEntry
+) -> List[IndexChange]:
+    """比较同一目录的两次快照"""
+    if old is None:
+        return [IndexChange("created", _join(relative, n)) for n in new.names]
+    changes = []
+    old_rows = {
+        name: (old.sizes[i], old.mtimes[i]) for i, name in enumerate(old.names)
+    }
+    for i, name in enumerate(new.names):
+        row = old_rows.pop(name, None)
+        if row is None:
+            changes.append(IndexChange("created", _join(relative, name)))
+        elif row != (new.sizes[i], new.mtimes[i]):
+            changes.append(IndexChange("modified", _join(relative, name)))
+    changes.extend(IndexChange("deleted", _join(relative, n)) for n in old_rows)
+    return changes
+
+
+def _indexed_file(
+    root: str, relative: str, entry: _DirectoryEntry, pos: int
+) -> IndexedFile:
+    relative_path = _join(relative, entry.names[pos])
+    return IndexedFile(
+        path=os.path.join(root, relative_path),
+        relative_path=relative_path,
+        name=entry.names[pos],
+        size=entry.sizes[pos],
+        mtime=entry.mtimes[pos],
+        language=LANGUAGES[entry.languages[pos]],
+        category=CATEGORIES[entry.categories[pos]],
+    )
+
+
+class WorkspaceIndex:
+    """单个工作区的文件索引"""
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        exclude_dirs: Collection[str] = EXCLUDED_DIRS,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        use_ignore_files: bool = True,
+    ):
+        """
+        Args:
+            root: 工作区根目录
+            exclude_dirs: 遍历时跳过的目录名
+            refresh_interval: 两次刷新检查之间的最短间隔（秒），0表示每次查询都检查
+            use_ignore_files: 是否按.gitignore/.fixagentignore剪除子树
+        """
+        self.root = Path(root).resolve()
+        self.exclude_dirs = frozenset(exclude_dirs)
+        self.refresh_interval = refresh_interval
+        self.use_ignore_files = use_ignore_files
+
+        # 由文件监视器维护时为True，查询不再检查目录修改时间
+        self.live = False
+
+        self._lock = threading.RLock()
+        self._dirs: Dict[str, _DirectoryEntry] = {}
+        self._checked_at: Optional[float] = None
+        self._dirty = False
+        self._listeners: List[IndexListener] = []
+        # 目录汇总树，首次查询时建立，之后随目录快照增量更新
+        self._rollup: Optional[Dict[str, _RollupNode]] = None
+        self.scanned_dirs = 0
+
+    def add_listener(self, listener: IndexListener) -> None:
+        """注册变化监听函数（首次建立索引不通知）"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def remove_listener(self, listener: IndexListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, changes: List[IndexChange]) -> None:
+        if not changes:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changes)
+            except Exception:
+                continue
+
+    def refresh(self, force: bool = False) -> bool:
+        """按目录修改时间刷新索引，返回索引中的文件是否有变化
+
+        Args:
+            force: 忽略刷新间隔（以及监视器维护的状态）立即检查
+        """
+        with self._lock:
+            if not force and self._checked_at is not None:
+                if self.live and not self._dirty:
+                    return False
+                if time.monotonic() - self._checked_at < self.refresh_interval:
+                    return False
+
+            initial = self._checked_at is None and not self._dirs
+            previous = self._dirs
+            current: Dict[str, _DirectoryEntry] = {}
+            changes: List[IndexChange] = []
+            # (目录, 上级目录的生效规则, 上级规则是否变化)
+            stack = [("", EMPTY_RULES, False)]
+            while stack:
+                relative, parent_rules, rules_changed = stack.pop()
+                absolute = os.path.join(self.root, relative) if relative else self.root
+                try:
+                    mtime_ns = os.stat(absolute).st_mtime_ns
+                except OSError:
+                    continue
+                old = previous.get(relative)
+                entry = old
+                if (
+                    entry is None
+                    or rules_changed
+                    or entry.mtime_ns != mtime_ns
+                    or self._ignore_files_changed(relative, entry)
+                ):
+                    entry = self._scan_directory(
+                        absolute, relative, mtime_ns, parent_rules
+                    )
+                    changes.extend(_diff_entries(relative, old, entry))
+                    self._rollup_replace(relative, old, entry)
+                current[relative] = entry
+                # 忽略规则变化时，子目录即使修改时间未变也要重新列出
+                children_changed = old is not None and entry.rules != old.rules
+                stack.extend(
+                    (_join(relative, d), entry.rules, children_changed)
+                    for d in reversed(entry.subdirs)
+                )
+
+            for relative, old in previous.items():
+                if relative not in current:
+                    changes.extend(
+                        IndexChange("deleted", _join(relative, n)) for n in old.names
+                    )
+                    self._rollup_replace(relative, old, None)
+            self._dirs = current
+            self._checked_at = time.monotonic()
+            self._dirty = False
+
+        if not initial:
+            self._notify(changes)
+        return bool(changes)
+
+    def _ignore_files_changed(self, relative: str, entry: _DirectoryEntry) -> bool:
+        """目录中的忽略文件是否被原地修改（不会改变目录的修改时间）"""
+        if not entry.ignore_signature:
+            return False
+        names = tuple(name for name, _ in entry.ignore_signature)
+        return (
+            ignore_signature(str(self.root), relative, names)
+            != entry.ignore_signature
+        )
+
+    def _scan_directory(
+        self,
+        absolute: Union[str, Path],
+        relative: str,
+        mtime_ns: int,
+        parent_rules: IgnoreRules = EMPTY_RULES,
+    ) -> _DirectoryEntry:
+        """列出单个目录，按排除目录和忽略规则过滤子项"""
+        self.scanned_dirs += 1
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(absolute) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            if item.name not in self.exclude_dirs:
+                                subdirs.append(item.name)
+                        elif item.is_file():
+                            stat_info = item.stat()
+                            files.append(
+                                (item.name, stat_info.st_size, stat_info.st_mtime)
+                            )
+                    except OSError:
+                        continue
+        except OSError:
+            return _DirectoryEntry(mtime_ns, parent_rules)
+
+        rules, signature = parent_rules, ()
+        if self.use_ignore_files:
+            rules, signature = directory_rules(
+                str(self.root), relative, parent_rules, [f[0] for f in files]
+            )
+        entry = _DirectoryEntry(mtime_ns, rules)
+        entry.ignore_signature = signature
+        entry.subdirs = tuple(
+            sorted(
+                d for d in subdirs if not rules.is_ignored(_join(relative, d), True)
+            )
+        )
+        for name, size, mtime in sorted(files):
+            if not rules.is_ignored(_join(relative, name)):
+                entry.append(relative, name, size, mtime)
+        return entry
+
+    def _relative(self, path: Union[str, Path], is_directory: bool) -> Optional[str]:
+        """事件路径对应的相对路径，位于工作区外或排除目录中时返回None"""
+        path = os.path.abspath(path)
+        root = str(self.root)
+        if path == root:
+            return ""
+        if not path.startswith(root + os.sep):
+            return None
+        parts = path[len(root) + 1 :].split(os.sep)
+        dirs = parts if is_directory else parts[:-1]
+        if any(part in self.exclude_dirs for part in dirs):
+            return None
+        return "/".join(parts)
+
+    def apply_event(
+        self,
+        kind: str,
+        path: Union[str, Path],
+        is_directory: bool = False,
+        dest_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """把文件系统事件（created、modified、deleted、moved）应用到索引
+
+        只更新事件涉及的行或子树；父目录尚未进入索引时，下次查询按目录修改时间检查。
+        """
+        if kind == "moved":
+            self.apply_event("deleted", path, is_directory)
+            if dest_path is not None:
+                self.apply_event("created", dest_path, is_directory)
+            return
+        if kind not in ("created", "modified", "deleted"):
+            return
+        relative = self._relative(path, is_directory)
+        if not relative:
+            return
+        parent, _, name = relative.rpartition("/")
+
+        with self._lock:
+            entry = self._dirs.get(parent)
+            if entry is None:
+                self._dirty = True
+                return
+            if name in IGNORE_FILES and not is_directory:
+                # 忽略规则变化，由下次刷新重新列出受影响的子树
+                entry.mtime_ns = -1
+                self._dirty = True
+                return
+            if entry.rules.is_ignored(relative, is_directory):
+                return
+            entry = entry.copy()
+            if is_directory:
+                changes = self._apply_directory_event(kind, entry, relative, name)
+            else:
+                changes = self._apply_file_event(kind, entry, parent, name)
+            self._dirs[parent] = entry
+
+        self._notify(changes)
+
+    def _apply_file_event(
+        self, kind: str, entry: _DirectoryEntry, parent: str, name: str
+    ) -> List[IndexChange]:
+        relative = _join(parent, name)
+        pos = entry.find(name)
+        stat_info = None
+        if kind != "deleted":
+            try:
+                stat_info = os.stat(os.path.join(self.root, relative))
+            except OSError:
+                stat_info = None
+            if stat_info is not None and not stat.S_ISREG(stat_info.st_mode):
+                return []
+
+        if stat_info is None:
+            if pos is None:
+                return []
+            self._rollup_row(parent, entry, pos, -1)
+            entry.remove(pos)
+            return [IndexChange("deleted", relative)]
+
+        if pos is None:
+            pos = bisect_left(entry.names, name)
+            entry.insert(pos, parent, name, stat_info.st_size, stat_info.st_mtime)
+            self._rollup_row(parent, entry, pos, 1)
+            return [IndexChange("created", relative)]
+
+        if (entry.sizes[pos], entry.mtimes[pos]) == (
+            stat_info.st_size,
+            stat_info.st_mtime,
+        ):
+            return []
+        self._rollup_row(parent, entry, pos, -1)
+        entry.sizes[pos] = stat_info.st_size
+        entry.mtimes[pos] = stat_info.st_mtime
+        self._rollup_row(parent, entry, pos, 1)
+        return [IndexChange("modified", relative)]
+
+    def _apply_directory_event(
+        self, kind: str, entry: _DirectoryEntry, relative: str, name: str
+    ) -> List[IndexChange]:
+        if kind == "modified":
+            # 子项的变化会单独产生事件
+            return []
+
+        changes: List[IndexChange] = []
+        prefix = relative + "/"
+        for subtree in [d for d in self._dirs if d == relative or d.startswith(prefix)]:
+            old = self._dirs.pop(subtree)
+            self._rollup_replace(subtree, old, None)
+            changes.extend(
+                IndexChange("deleted", _join(subtree, n)) for n in old.names
+            )
+        subdirs = set(entry.subdirs)
+        subdirs.discard(name)
+
+        if kind == "created" and os.path.isdir(os.path.join(self.root, relative)):
+            subdirs.add(name)
+            deleted = {c.relative_path for c in changes}
+            stack = [(relative, entry.rules)]
+            while stack:
+                current, parent_rules = stack.pop()
+                absolute = os.path.join(self.root, current)
+                try:
+                    mtime_ns = os.stat(absolute).st_mtime_ns
+                except OSError:
+                    continue
+                scanned = self._scan_directory(
+                    absolute, current, mtime_ns, parent_rules
+                )
+                self._dirs[current] = scanned
+                self._rollup_replace(current, None, scanned)
+                for n in scanned.names:
+                    path = _join(current, n)
+                    if path in deleted:
+                        deleted.discard(path)
+                        changes.append(IndexChange("modified", path))
+                    else:
+                        changes.append(IndexChange("created", path))
+                stack.extend(
+                    (_join(current, d), scanned.rules) for d in scanned.subdirs
+                )
+            changes = [
+                c for c in changes if c.kind != "deleted" or c.relative_path in deleted
+            ]
+
+        entry.subdirs = tuple(sorted(subdirs))
+        return changes
+
+    def invalidate(self, relative_dir: Optional[str] = None) -> None:
+        """使目录（默认全部）在下次查询时重新列出"""
+        with self._lock:
+            target = None if relative_dir is None else relative_dir.strip("/")
+            for relative, entry in self._dirs.items():
+                if target is None or relative == target:
+                    entry.mtime_ns = -1
+            self._checked_at = None
+
+    def _snapshot(self) -> List[Tuple[str, _DirectoryEntry]]:
+        """刷新后按相对路径排序的目录快照"""
+        self.refresh()
+        with self._lock:
+            return sorted(self._dirs.items())
+
+    def _subtree(
+        self, under: Optional[str] = None, recursive: bool = True
+    ) -> List[Tuple[str, _DirectoryEntry]]:
+        """目录快照中位于under目录（默认根目录）之下的部分"""
+        snapshot = self._snapshot()
+        if under is None:
+            return snapshot
+        under = under.strip("/")
+        if not recursive:
+            return [(r, e) for r, e in snapshot if r == under]
+        if not under:
+            return snapshot
+        prefix = under + "/"
+        return [(r, e) for r, e in snapshot if r == under or r.startswith(prefix)]
+
+    def files(
+        self,
+        extensions: Optional[Collection[str]] = None,
+        languages: Optional[Collection[str]] = None,
+        categories: Optional[Collection[str]] = None,
+        include_hidden: bool = True,
+        under: Optional[str] = None,
+        recursive: bool = True,
+    ) -> Iterator[IndexedFile]:
+        """按目录顺序遍历文件，可按扩展名（小写，含点）、语言和分类过滤
+
+        under限定在某个目录（相对路径）之下，recursive=False时只返回该目录中的文件。
+        """
+        language_codes = (
+            {_LANGUAGE_CODES[l] for l in languages if l in _LANGUAGE_CODES}
+            if languages is not None
+            else None
+        )
+        category_codes = (
+            {_CATEGORY_CODES[c] for c in categories if c in _CATEGORY_CODES}
+            if categories is not None
+            else None
+        )
+        root = str(self.root)
+        for relative, entry in self._subtree(under, recursive):
+            for i, name in enumerate(entry.names):
+                if not include_hidden and name.startswith("."):
+                    continue
+                if (
+                    language_codes is not None
+                    and entry.languages[i] not in language_codes
+                ):
+                    continue
+                if (
+                    category_codes is not None
+                    and entry.categories[i] not in category_codes
+                ):
+                    continue
+                if (
+                    extensions is not None
+                    and os.path.splitext(name)[1].lower() not in extensions
+                ):
+                    continue
+                yield _indexed_file(root, relative, entry, i)
+
+    def file_names(
+        self, under: Optional[str] = None
+    ) -> Iterator[Tuple[str, List[str]]]:
+        """按目录顺序遍历(目录相对路径, 有序文件名列表)，不为单个文件创建对象"""
+        for relative, entry in self._subtree(under):
+            yield relative, entry.names
+
+    def get(self, relative_path: str) -> Optional[IndexedFile]:
+        """按相对路径查找单个文件，不在索引中时返回None"""
+        relative, _, name = relative_path.strip("/").rpartition("/")
+        self.refresh()
+        with self._lock:
+            entry = self._dirs.get(relative)
+        pos = entry.find(name) if entry is not None else None
+        if pos is None:
+            return None
+        return _indexed_file(str(self.root), relative, entry, pos)
+
+    def rollup(self, under: str = "") -> Optional[DirectoryRollup]:
+        """目录子树（默认根目录）的汇总，目录不在索引中时返回None
+
+        首次查询时由目录快照一次建立汇总树，之后刷新和文件事件只沿变化目录的上级
+        更新，查询只读取一个节点，与子树中的文件数无关。
+        """
+        relative = under.strip("/")
+        self.refresh()
+        with self._lock:
+            if self._rollup is None:
+                self._build_rollup()
+            return self._rollup_of(relative)
+
+    def rollup_children(self, under: str = "") -> List[DirectoryRollup]:
+        """目录的各个直接子目录的子树汇总，按名称排序"""
+        relative = under.strip("/")
+        self.refresh()
+        with self._lock:
+            if self._rollup is None:
+                self._build_rollup()
+            entry = self._dirs.get(relative)
+            if entry is None:
+                return []
+            children = (self._rollup_of(_join(relative, d)) for d in entry.subdirs)
+            return [child for child in children if child is not None]
+
+    def _build_rollup(self) -> None:
+        """由目录快照建立汇总树（调用方持有锁）"""
+        rollup = {relative: _RollupNode() for relative in self._dirs}
+        # 逆序遍历时子目录排在上级目录之前
+        for relative in sorted(self._dirs, reverse=True):
+            entry = self._dirs[relative]
+            node = rollup[relative]
+            pairs = Counter(zip(entry.languages, entry.categories))
+            node.add(pairs, entry.total_size, 1)
+            node.newest = max(node.newest, max(entry.mtimes, default=0.0))
+            parent = rollup.get(relative.rpartition("/")[0]) if relative else None
+            if parent is None:
+                continue
+            parent.directories += node.directories + 1
+            parent.files += node.files
+            parent.size += node.size
+            parent.newest = max(parent.newest, node.newest)
+            for target, source in (
+                (parent.languages, node.languages),
+                (parent.categories, node.categories),
+                (parent.source_languages, node.source_languages),
+            ):
+                for code, count in enumerate(source):
+                    target[code] += count
+        self._rollup = rollup
+
+    def _rollup_of(self, relative: str) -> Optional[DirectoryRollup]:
+        node = self._rollup.get(relative) if self._rollup is not None else None
+        entry = self._dirs.get(relative)
+        if node is None or entry is None:
+            return None
+        return DirectoryRollup(
+            relative_path=relative,
+            file_count=node.files,
+            directory_count=node.directories,
+            direct_file_count=len(entry.names),
+            total_size=node.size,
+            newest_mtime=self._rollup_newest(relative),
+            languages=_counts(node.languages, LANGUAGES),
+            categories=_counts(node.categories, CATEGORIES),
+            source_languages=_counts(node.source_languages, LANGUAGES),
+            subdirectories=entry.subdirs,
+        )
+
+    def _rollup_newest(self, relative: str) -> float:
+        """子树中最新文件的修改时间，最新文件被删除后在此重新计算"""
+        node = self._rollup[relative]
+        if node.newest is None:
+            entry = self._dirs[relative]
+            newest = max(entry.mtimes, default=0.0)
+            for name in entry.subdirs:
+                child = _join(relative, name)
+                if child in self._rollup and child in self._dirs:
+                    newest = max(newest, self._rollup_newest(child))
+            node.newest = newest
+        return node.newest
+
+    def _rollup_replace(
+        self,
+        relative: str,
+        old: Optional[_DirectoryEntry],
+        new: Optional[_DirectoryEntry],
+    ) -> None:
+        """把目录的快照从old换为new（None表示目录不存在），更新汇总树"""
+        rollup = self._rollup
+        if rollup is None:
+            return
+        if new is not None and relative not in rollup:
+            rollup[relative] = _RollupNode()
+            self._rollup_directories(relative, 1)
+        for entry, sign in ((old, -1), (new, 1)):
+            if entry is not None and entry.names:
+                self._rollup_files(
+                    relative,
+                    Counter(zip(entry.languages, entry.categories)),
+                    entry.total_size,
+                    max(entry.mtimes),
+                    sign,
+                )
+        if new is None and rollup.pop(relative, None) is not None:
+            self._rollup_directories(relative, -1)
+
+    def _rollup_row(
+        self, relative: str, entry: _DirectoryEntry, pos: int, sign: int
+    ) -> None:
+        """把目录中的一行计入（sign=1）或移出（sign=-1）汇总树"""
+        if self._rollup is None:
+            return
+        self._rollup_files(
+            relative,
+            {(entry.languages[pos], entry.categories[pos]): 1},
+            entry.sizes[pos],
+            entry.mtimes[pos],
+            sign,
+        )
+
+    def _rollup_directories(self, relative: str, sign: int) -> None:
+        if not relative:
+            return
+        for path in _ancestors(relative.rpartition("/")[0]):
+            node = self._rollup.get(path)
+            if node is not None:
+                node.directories += sign
+
+    def _rollup_files(
+        self,
+        relative: str,
+        pairs: Dict[Tuple[int, int], int],
+        size: int,
+        newest: float,
+        sign: int,
+    ) -> None:
+        """沿上级目录累加一批文件，newest为这批文件中最新的修改时间"""
+        settled = False
+        for path in _ancestors(relative):
+            node = self._rollup.get(path)
+            if node is None:
+                continue
+            node.add(pairs, size, sign)
+            # 上级目录的最新时间不早于下级，确定不受影响后不再比较
+            if settled or node.newest is None:
+                continue
+            if sign > 0:
+                if node.newest >= newest:
+                    settled = True
+                else:
+                    node.newest = newest
+            elif node.newest > newest:
+                settled = True
+            else:
+                node.newest = None
+
+    def glob(self, pattern: str) -> List[IndexedFile]:
+        """返回相对路径与glob模式匹配的文件
+
+        支持*、?、[]、匹配任意层目录的**，以及{a,b}形式的备选。
+        """
+        alternatives = "|".join(
+            f"(?:{translate_pattern(p)})" for p in _expand_braces(pattern)
+        )
+        regex = re.compile(f"(?:{alternatives})\\Z")
+        return [f for f in self.files() if regex.match(f.relative_path)]
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """路径是否被排除目录或忽略规则排除（包括位于被排除的目录中）"""
+        parts = relative_path.strip("/").split("/")
+        self.refresh()
+        with self._lock:
+            dirs = self._dirs
+
+        # 从最近的已索引上级目录开始逐级判断
+        depth = len(parts) - 1
+        while depth > 0 and "/".join(parts[:depth]) not in dirs:
+            depth -= 1
+        current = "/".join(parts[:depth])
+        entry = dirs.get(current)
+        if entry is None:
+            return False
+        rules = entry.rules
+        for i in range(depth, len(parts)):
+            path = _join(current, parts[i])
+            last = i == len(parts) - 1
+            path_is_dir = is_dir or not last
+            if path_is_dir and parts[i] in self.exclude_dirs:
+                return True
+            if rules.is_ignored(path, path_is_dir):
+                return True
+            if not last and self.use_ignore_files:
+                rules, _ = directory_rules(str(self.root), path, rules)
+            current = path
+        return False
+
+    def directories(self) -> List[str]:
+        """索引中的目录（相对路径，不含根目录）"""
+        return [relative for relative, _ in self._snapshot() if relative]
+
+    def recent_files(self, limit: int = 10, include_hidden: bool = False) -> List[str]:
+        """最近修改的文件（相对路径）"""
+        candidates = [
+            (f.mtime, f.relative_path)
+            for f in self.files(include_hidden=include_hidden)
+        ]
+        candidates.sort(reverse=True)
+        return [path for _, path in candidates[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """文件数量、总大小和扩展名分布"""
+        snapshot = self._snapshot()
+        file_count = 0
+        total_size = 0
+        file_types: Dict[str, int] = {}
+        for _, entry in snapshot:
+            file_count += len(entry.names)
+            total_size += entry.total_size
+            for name in entry.names:
+                ext = os.path.splitext(name)[1].lower()
+                if ext:
+                    file_types[ext] = file_types.get(ext, 0) + 1
+        return {
+            "file_count": file_count,
+            "total_size": total_size,
+            "directory_count": len(snapshot),
+            "file_types": file_types,
+        }
+
+    def __len__(self) -> int:
+        return sum(len(entry.names) for _, entry in self._snapshot())
+
+
+_indexes: "OrderedDict[Tuple[str, frozenset], WorkspaceIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(
+    root: Union[str, Path], exclude_dirs: Collection[str] = EXCLUDED_DIRS
+) -> WorkspaceIndex:
+    """获取工作区的共享索引，进程内复用，未被监视的索引保留最近使用的MAX_INDEXES个"""
+    key = (str(Path(root).resolve()), frozenset(exclude_dirs))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = WorkspaceIndex(key[0], exclude_dirs=key[1])
+            _indexes[key] = index
+            # 由监视器维护的索引不淘汰
+            idle = [k for k, v in _indexes.items() if not v.live and k != key]
+            for old_key in idle[: max(0, len(_indexes) - MAX_INDEXES)]:
+                del _indexes[old_key]
+        else:
+            _indexes.move_to_end(key)
+        return index
+
+
+def clear_workspace_indexes() -> None:
+    """清除进程内的所有索引"""
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,243 @@
+"""
+工作区文件监视器
+
+长时间运行的CLI会话中，WorkspaceIndex每次查询都要检查全部目录的修改时间。
+WorkspaceWatcher启动后在后台线程中建立一次索引，之后由文件事件增量维护：
+- 安装了watchdog时使用系统通知（Linux上为inotify），创建/修改/删除/移动事件
+  直接更新索引中对应的行或子树
+- 未安装watchdog或通知不可用时退回轮询：后台线程按间隔比较目录修改时间
+- 首次扫描完成后查询直接读取索引，不再访问文件系统；扫描期间查询照常检查目录
+- 文件变化通知索引的监听函数，分析缓存据此丢弃变化文件的内容哈希
+
+安装了watchdog时默认在CLI会话中启用；未安装时轮询的开销与收益不成比例，默认不启用。
+可通过环境变量FIX_AGENT_WORKSPACE_WATCH=1/0强制开启或关闭。
+"""
+
+import atexit
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .workspace_index import (IndexChange, IndexListener, WorkspaceIndex,
+                              get_workspace_index)
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog是可选依赖
+    FileSystemEventHandler = object
+    Observer = None
+
+# 轮询模式下两次检查之间的间隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def workspace_watch_enabled() -> bool:
+    """是否启用工作区监视（未设置环境变量时仅在安装了watchdog时启用）"""
+    value = os.environ.get("FIX_AGENT_WORKSPACE_WATCH")
+    if value is None:
+        return Observer is not None
+    return value.lower() not in ("0", "false", "no")
+
+
+class _IndexEventHandler(FileSystemEventHandler):
+    """把watchdog事件转交给索引"""
+
+    def __init__(self, index: WorkspaceIndex):
+        super().__init__()
+        self.index = index
+
+    def dispatch(self, event: Any) -> None:
+        self.index.apply_event(
+            event.event_type,
+            os.fsdecode(event.src_path),
+            is_directory=event.is_directory,
+            dest_path=(
+                os.fsdecode(event.dest_path)
+                if getattr(event, "dest_path", None)
+                else None
+            ),
+        )
+
+
+class WorkspaceWatcher:
+    """维护单个工作区索引的文件监视器"""
+
+    def __init__(
+        self,
+        index: WorkspaceIndex,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_watchdog: Optional[bool] = None,
+    ):
+        """
+        Args:
+            index: 要维护的工作区索引
+            poll_interval: 轮询模式下的检查间隔（秒）
+            use_watchdog: 是否使用watchdog，默认在已安装时使用
+        """
+        self.index = index
+        self.poll_interval = poll_interval
+        self.use_watchdog = (
+            Observer is not None if use_watchdog is None else use_watchdog
+        )
+        self.backend: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._observer = None
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self.backend is not None
+
+    def start(self) -> str:
+        """开始监视，返回使用的方式（watchdog或polling）
+
+        首次建立索引在后台线程中进行，不阻塞调用方，可用wait_ready等待完成。
+        """
+        with self._lock:
+            if self.backend is not None:
+                return self.backend
+            self._stop.clear()
+            self._ready.clear()
+
+            if self.use_watchdog and Observer is not None:
+                try:
+                    observer = Observer()
+                    observer.schedule(
+                        _IndexEventHandler(self.index),
+                        str(self.index.root),
+                        recursive=True,
+                    )
+                    observer.daemon = True
+                    observer.start()
+                    self._observer = observer
+                    self.backend = "watchdog"
+                except (OSError, RuntimeError):
+                    self._observer = None
+
+            polling = self.backend is None
+            if polling:
+                self.backend = "polling"
+
+            # 先开始接收事件再建立索引，扫描期间的变化不会丢失
+            self._worker = threading.Thread(
+                target=self._run, args=(polling,), daemon=True
+            )
+            self._worker.start()
+            return self.backend
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待首次建立索引完成"""
+        return self._ready.wait(timeout)
+
+    def _run(self, polling: bool) -> None:
+        try:
+            self.index.refresh(force=True)
+        except Exception:
+            pass  # 索引保持非live状态，查询时自行检查目录
+        else:
+            self.index.live = True
+            if self._stop.is_set():  # 扫描期间已停止监视
+                self.index.live = False
+        self._ready.set()
+
+        if not polling:
+            return
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.index.refresh(force=True)
+            except Exception:
+                continue
+
+    def stop(self) -> None:
+        """停止监视，索引恢复为查询时按目录修改时间检查"""
+        with self._lock:
+            self._stop.set()
+            if self._observer is not None:
+                try:
+                    self._observer.stop()
+                    self._observer.join(timeout=5)
+                except RuntimeError:
+                    pass
+                self._observer = None
+            if self._worker is not None:
+                self._worker.join(timeout=self.poll_interval + 1)
+                self._worker = None
+            self.index.live = False
+            self.backend = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "root": str(self.index.root),
+            "backend": self.backend,
+            "ready": self._ready.is_set(),
+            "poll_interval": self.poll_interval,
+        }
+
+
+_watchers: Dict[str, WorkspaceWatcher] = {}
+_listeners: Dict[str, IndexListener] = {}
+_watchers_lock = threading.Lock()
+_atexit_registered = False
+
+
+def _forget_changed_hashes(index: WorkspaceIndex) -> IndexListener:
+    """生成丢弃变化文件内容哈希的监听函数"""
+    from .analysis_cache import forget_content_hashes
+
+    def listener(changes: List[IndexChange]) -> None:
+        forget_content_hashes(index.root / c.relative_path for c in changes)
+
+    return listener
+
+
+def watch_workspace(
+    root: Union[str, Path],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    use_watchdog: Optional[bool] = None,
+) -> WorkspaceWatcher:
+    """开始监视工作区（进程内每个工作区只有一个监视器）"""
+    global _atexit_registered
+    index = get_workspace_index(root)
+    key = str(index.root)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = WorkspaceWatcher(
+                index, poll_interval=poll_interval, use_watchdog=use_watchdog
+            )
+            if key not in _listeners:
+                _listeners[key] = _forget_changed_hashes(index)
+                index.add_listener(_listeners[key])
+            _watchers[key] = watcher
+            if not _atexit_registered:
+                atexit.register(stop_workspace_watchers)
+                _atexit_registered = True
+    watcher.start()
+    return watcher
+
+
+def switch_workspace(root: Union[str, Path]) -> Optional[WorkspaceWatcher]:
+    """工作目录切换后改为监视新的工作区，会话未启用监视时返回None"""
+    key = str(Path(root).resolve())
+    with _watchers_lock:
+        if not _watchers:
+            return None
+        stale = [k for k in _watchers if k != key]
+        watchers = [_watchers.pop(k) for k in stale]
+    for watcher in watchers:
+        watcher.stop()
+    return watch_workspace(root)
+
+
+def stop_workspace_watchers() -> None:
+    """停止所有工作区监视器"""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
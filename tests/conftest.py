@@ -8,6 +8,7 @@ import os
 import sys
 import tempfile
 from pathlib import Path
+from unittest.mock import Mock
 
 import pytest
 
@@ -36,6 +37,40 @@ def temp_file(temp_dir):
     return create_temp_file
 
 
+@pytest.fixture
+def fake_analyzer():
+    """创建模拟代码分析器的工厂夹具
+
+    生成的分析器工具可用，analyze_many逐个调用analyze；
+    issues按文件路径返回问题列表，calls记录被分析的文件名。
+    """
+    from src.tools.multilang_code_analyzers import AnalysisResult
+
+    def create(language="python", issues=None, calls=None):
+        def analyze(file_path):
+            if calls is not None:
+                calls.append(Path(file_path).name)
+            return AnalysisResult(
+                file_path=str(file_path),
+                language=language,
+                tool_name="fake",
+                success=True,
+                issues=issues(Path(file_path)) if issues else [],
+                score=95.0,
+            )
+
+        analyzer = Mock()
+        analyzer._check_tool_availability.return_value = True
+        analyzer.get_tool_name.return_value = "fake"
+        analyzer.analyze.side_effect = analyze
+        analyzer.analyze_many.side_effect = lambda paths: [
+            analyzer.analyze(path) for path in paths
+        ]
+        return analyzer
+
+    return create
+
+
 @pytest.fixture
 def sample_python_file(temp_dir):
     """创建Python示例文件夹具"""
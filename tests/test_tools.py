@@ -42,7 +42,7 @@ try:
                                  format_code_professional,
                                  generate_validation_tests_tool, http_request,
                                  run_and_monitor, run_tests_with_error_capture,
-                                 web_search)
+                                 summarize_directory_tree, web_search)
 except ImportError as e:
     print(f"Warning: Could not import tools: {e}")
 
@@ -68,6 +68,7 @@ except ImportError as e:
     http_request = MockTool()
     run_and_monitor = MockTool()
     run_tests_with_error_capture = MockTool()
+    summarize_directory_tree = MockTool()
     web_search = MockTool()
 
 
@@ -479,6 +480,28 @@ class TestErrorDetectionTools:
         finally:
             os.unlink(log_file)
 
+    def test_analyze_existing_logs_finds_ignored_logs(self):
+        """测试被.gitignore忽略或位于构建目录中的日志文件也会被分析"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / ".gitignore").write_text("*.log\nlogs/\n")
+            (root / "logs").mkdir()
+            (root / "build").mkdir()
+            (root / "node_modules").mkdir()
+            (root / "app.log").write_text("ERROR app failed\n")
+            (root / "logs" / "server.log").write_text("FATAL server down\n")
+            (root / "build" / "build.log").write_text("error: link failed\n")
+            (root / "node_modules" / "dep.log").write_text("ERROR vendored\n")
+
+            data = json.loads(analyze_existing_logs.invoke({"project_path": temp_dir}))
+
+        assert data["success"] is True
+        analyzed = sorted(
+            Path(p).relative_to(root).as_posix()
+            for p in data["log_analysis"]["analyzed_files"]
+        )
+        assert analyzed == ["app.log", "build/build.log", "logs/server.log"]
+
 
 class TestProjectExplorerTools:
     """测试项目探索工具"""
@@ -923,6 +946,2693 @@ def function_{i}():
         assert all(result is not None for result in results)
 
 
+class TestProjectDefectEngine:
+    """测试项目级并行缺陷分析引擎"""
+
+    def _make_project(self, root: Path):
+        (root / "pkg").mkdir()
+        (root / "node_modules" / "lib").mkdir(parents=True)
+        (root / "pkg" / "a.py").write_text("import os\n")
+        (root / "pkg" / "b.py").write_text("x = 1\n")
+        (root / "web.js").write_text("let a = 1;\n")
+        (root / "node_modules" / "lib" / "index.js").write_text("var a;\n")
+        (root / "README.md").write_text("# demo\n")
+
+    def _unused_import(self, path: Path):
+        from src.tools.multilang_code_analyzers import AnalysisIssue
+
+        return [
+            AnalysisIssue(
+                tool_name="fake",
+                issue_type="warning",
+                severity="medium",
+                message="unused import os",
+                line=1,
+                rule_id="W0611",
+            )
+        ]
+
+    def test_discover_files_groups_by_language(self, temp_dir):
+        """测试源文件发现按语言分组并跳过排除目录"""
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        groups = ProjectDefectEngine().discover_files(temp_dir)
+
+        assert sorted(p.name for p in groups["python"]) == ["a.py", "b.py"]
+        assert [p.name for p in groups["javascript"]] == ["web.js"]
+
+    def test_discover_files_language_filter(self, temp_dir):
+        """测试语言过滤"""
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        groups = ProjectDefectEngine(languages=["python"]).discover_files(temp_dir)
+
+        assert list(groups) == ["python"]
+
+    def test_analyze_project_aggregates_once(self, temp_dir, fake_analyzer):
+        """测试并行分析后统一聚合，只完整输出优先级最高的聚类"""
+        from src.tools.defect_aggregator import (MAX_RENDERED_CLUSTERS,
+                                                 DefectAggregator)
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        with (
+            patch(
+                "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+                side_effect=lambda language, **kwargs: fake_analyzer(
+                    language, self._unused_import
+                ),
+            ),
+            patch.object(
+                DefectAggregator,
+                "aggregate_defects",
+                autospec=True,
+                side_effect=DefectAggregator.aggregate_defects,
+            ) as mock_aggregate,
+        ):
+            report = ProjectDefectEngine(max_workers=2).analyze_project(str(temp_dir))
+
+        mock_aggregate.assert_called_once()
+        assert mock_aggregate.call_args.kwargs == {
+            "top_n": MAX_RENDERED_CLUSTERS,
+            "include_remaining": True,
+        }
+        assert report.files_discovered == 3
+        assert report.files_analyzed == 3
+        assert report.timed_out is False
+        assert report.aggregation["original_count"] == 3
+        assert report.get_summary()["total_issues"] == 3
+
+    def test_analyze_project_respects_time_budget(self, temp_dir, fake_analyzer):
+        """测试超出时间预算时返回已完成部分"""
+        import time
+
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+
+        def slow_analyzer(language, **kwargs):
+            analyzer = fake_analyzer(language, self._unused_import)
+            fast = analyzer.analyze.side_effect
+
+            def analyze(file_path):
+                time.sleep(0.5)
+                return fast(file_path)
+
+            analyzer.analyze.side_effect = analyze
+            return analyzer
+
+        with patch(
+            "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+            side_effect=slow_analyzer,
+        ):
+            report = ProjectDefectEngine(
+                max_workers=1, time_budget=0.2
+            ).analyze_project(str(temp_dir))
+
+        assert report.timed_out is True
+        assert report.files_analyzed < report.files_discovered
+
+
+class TestAnalysisCache:
+    """测试代码分析结果缓存"""
+
+    def _make_result(self, file_path="a.py"):
+        from src.tools.multilang_code_analyzers import (AnalysisIssue,
+                                                        AnalysisResult)
+
+        return AnalysisResult(
+            file_path=file_path,
+            language="python",
+            tool_name="pylint",
+            success=True,
+            issues=[
+                AnalysisIssue(
+                    tool_name="pylint",
+                    issue_type="warning",
+                    severity="medium",
+                    message="Unused import os",
+                    line=1,
+                    rule_id="W0611",
+                )
+            ],
+            score=95.0,
+        )
+
+    def test_result_roundtrip(self, temp_dir):
+        """测试AnalysisResult写入后可完整还原"""
+        from src.tools.analysis_cache import AnalysisCache
+
+        cache = AnalysisCache(db_path=temp_dir / "cache.db")
+        cache.put_result("k1", self._make_result())
+
+        restored = cache.get_result("k1")
+        assert restored.issues[0].rule_id == "W0611"
+        assert restored.score == 95.0
+        assert cache.get_result("missing") is None
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        cache.close()
+
+    def test_switching_agent_closes_default_cache(self, monkeypatch):
+        """测试切换代理时关闭旧的全局缓存连接"""
+        from src.tools import analysis_cache
+
+        previous = Mock()
+        monkeypatch.setattr(analysis_cache, "_current_agent_id", "first")
+        monkeypatch.setattr(analysis_cache, "_default_cache", previous)
+
+        analysis_cache.set_cache_agent("first")
+        previous.close.assert_not_called()
+
+        analysis_cache.set_cache_agent("second")
+        previous.close.assert_called_once()
+        assert analysis_cache._default_cache is None
+        assert analysis_cache._current_agent_id == "second"
+
+    def test_lru_eviction(self, temp_dir):
+        """测试超出条目上限时淘汰最久未访问的条目"""
+        import time
+
+        from src.tools.analysis_cache import AnalysisCache
+
+        cache = AnalysisCache(db_path=temp_dir / "cache.db", max_entries=3)
+        for key in ("a", "b", "c"):
+            cache.put(key, {"value": key})
+            time.sleep(0.01)
+        cache.get("a")
+        cache.put("d", {"value": "d"})
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get_stats()["evictions"] >= 1
+        cache.close()
+
+    def test_cache_key_changes_with_content(self, temp_dir):
+        """测试缓存键随文件内容和工具版本变化"""
+        from src.tools.analysis_cache import build_cache_key, hash_file_content
+
+        file_path = temp_dir / "a.py"
+        file_path.write_text("x = 1\n")
+        key1 = build_cache_key(
+            file_path, hash_file_content(file_path), "pylint", "3.0", {}
+        )
+        file_path.write_text("x = 2\n")
+        key2 = build_cache_key(
+            file_path, hash_file_content(file_path), "pylint", "3.0", {}
+        )
+        key3 = build_cache_key(
+            file_path, hash_file_content(file_path), "pylint", "3.1", {}
+        )
+
+        assert len({key1, key2, key3}) == 3
+
+    def test_analyzer_reuses_cached_result(self, temp_dir):
+        """测试文件未变化时分析器不再运行分析工具"""
+        from src.tools.analysis_cache import AnalysisCache
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        file_path = temp_dir / "a.py"
+        file_path.write_text("import os\n")
+        cache = AnalysisCache(db_path=temp_dir / "cache.db")
+        analyzer = PythonAnalyzer(tool="flake8")
+
+        completed = Mock(stdout="", stderr="", returncode=0)
+        with (
+            patch("src.tools.analysis_cache.get_analysis_cache", return_value=cache),
+            patch.object(analyzer, "_check_tool_availability", return_value=True),
+            patch.object(analyzer, "get_tool_version", return_value="7.0"),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                return_value=completed,
+            ) as mock_run,
+        ):
+            first = analyzer.analyze(file_path)
+            second = analyzer.analyze(file_path)
+
+        assert mock_run.call_count == 1
+        assert first.metadata["cache_hit"] is False
+        assert second.metadata["cache_hit"] is True
+        cache.close()
+
+
+class TestBatchAnalysis:
+    """测试多文件批量分析"""
+
+    def _make_files(self, root: Path):
+        (root / "x").mkdir()
+        (root / "y").mkdir()
+        a = root / "x" / "a.py"
+        b = root / "y" / "b.py"
+        a.write_text("import os\n")
+        b.write_text("import sys\n")
+        return a, b
+
+    def test_pylint_batch_splits_issues_per_file(self, temp_dir):
+        """测试一次pylint调用的结果按文件拆分，且路径相对于工作目录"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a, b = self._make_files(temp_dir)
+        stdout = json.dumps(
+            [
+                {
+                    "path": "x/a.py",
+                    "type": "warning",
+                    "message": "m1",
+                    "line": 1,
+                    "message-id": "W0611",
+                },
+                {
+                    "path": "y/b.py",
+                    "type": "error",
+                    "message": "m2",
+                    "line": 1,
+                    "message-id": "E0602",
+                },
+                {
+                    "path": "y/b.py",
+                    "type": "warning",
+                    "message": "m3",
+                    "line": 1,
+                    "message-id": "W0611",
+                },
+            ]
+        )
+        completed = Mock(stdout=stdout, stderr="", returncode=4)
+        analyzer = PythonAnalyzer(tool="pylint", use_cache=False)
+
+        with (
+            patch.object(analyzer, "_check_tool_availability", return_value=True),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                return_value=completed,
+            ) as mock_run,
+        ):
+            results = analyzer.analyze_many([a, b, temp_dir / "missing.py"])
+
+        assert mock_run.call_count == 1
+        assert mock_run.call_args.kwargs["cwd"] == temp_dir.resolve()
+        assert [i.rule_id for i in results[0].issues] == ["W0611"]
+        assert [i.rule_id for i in results[1].issues] == ["E0602", "W0611"]
+        assert results[1].metadata["batch_size"] == 2
+        assert results[2].success is False
+
+    def test_single_file_pylint_relative_path(self, temp_dir):
+        """测试单文件分析时pylint输出的相对路径能匹配到文件"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a, _ = self._make_files(temp_dir)
+        stdout = json.dumps(
+            [
+                {
+                    "path": "a.py",
+                    "type": "warning",
+                    "message": "m",
+                    "line": 1,
+                    "message-id": "W0611",
+                }
+            ]
+        )
+        analyzer = PythonAnalyzer(tool="pylint")
+
+        issues = analyzer._parse_output(stdout, "", 4, a)
+
+        assert [i.rule_id for i in issues] == ["W0611"]
+
+    def test_flake8_batch_output(self, temp_dir):
+        """测试flake8默认文本格式的批量解析"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a, b = self._make_files(temp_dir)
+        stdout = (
+            f"{a}:1:1: F401 'os' imported but unused\n"
+            f"{b}:1:1: F401 'sys' imported but unused\n"
+            f"{b}:2:1: F821 undefined name 'x'\n"
+        )
+        analyzer = PythonAnalyzer(tool="flake8")
+
+        issues_by_file = analyzer._parse_batch_output(stdout, "", 1, [a, b], temp_dir)
+
+        assert len(issues_by_file[a]) == 1
+        assert [i.rule_id for i in issues_by_file[b]] == ["F401", "F821"]
+
+    def test_chunking_respects_limits(self, temp_dir):
+        """测试分块遵守文件数量上限"""
+        from src.tools import multilang_code_analyzers as mca
+
+        analyzer = mca.PythonAnalyzer(tool="pylint")
+        items = [(i, Path(f"f{i}.py"), temp_dir / f"f{i}.py", None) for i in range(5)]
+
+        with patch.object(mca, "MAX_BATCH_FILES", 2):
+            chunks = analyzer._chunk_paths(items)
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_non_batch_tool_falls_back_to_single(self, temp_dir):
+        """测试不支持批量的工具逐个文件分析"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a, b = self._make_files(temp_dir)
+        completed = Mock(stdout="", stderr="", returncode=0)
+        analyzer = PythonAnalyzer(tool="mypy", use_cache=False)
+
+        with (
+            patch.object(analyzer, "_check_tool_availability", return_value=True),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                return_value=completed,
+            ) as mock_run,
+        ):
+            results = analyzer.analyze_many([a, b])
+
+        assert mock_run.call_count == 2
+        assert all(r.success for r in results)
+
+    def test_broken_tool_run_is_not_cached(self, temp_dir):
+        """测试pylint崩溃或输出无法解析时按失败处理，不缓存"没有问题"的结果"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a, b = self._make_files(temp_dir)
+        cache = Mock()
+        cache.get_result.return_value = None
+        analyzer = PythonAnalyzer(tool="pylint")
+        runs = [
+            Mock(stdout="", stderr="Traceback ...\nKeyError: 'x'\n", returncode=1),
+            Mock(stdout="not json", stderr="", returncode=4),
+            Mock(stdout="", stderr="usage: pylint [options]\n", returncode=32),
+        ]
+
+        with (
+            patch.object(analyzer, "_check_tool_availability", return_value=True),
+            patch(
+                "src.tools.analysis_cache.get_analysis_cache", return_value=cache
+            ),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                side_effect=runs,
+            ),
+        ):
+            crashed = analyzer.analyze_many([a, b])
+            garbled = analyzer.analyze_many([a, b])
+            single = analyzer.analyze(a)
+
+        assert not any(r.success for r in crashed + garbled + [single])
+        assert "KeyError" in crashed[0].error
+        assert "usage" in single.error
+        cache.put_result.assert_not_called()
+
+
+class TestToolchainRegistry:
+    """测试工具链注册表"""
+
+    def test_which_is_memoized(self):
+        """测试可执行文件查找只执行一次"""
+        from src.tools.toolchain_registry import ToolchainRegistry
+
+        registry = ToolchainRegistry(persist=False)
+        with patch(
+            "src.tools.toolchain_registry.shutil.which", return_value="/usr/bin/pylint"
+        ) as mock_which:
+            assert registry.is_available("pylint")
+            assert registry.is_available("pylint")
+
+        assert mock_which.call_count == 1
+
+    def test_resolve_records_fallback(self):
+        """测试降级链选择第一个可用工具"""
+        from src.tools.toolchain_registry import ToolchainRegistry
+
+        registry = ToolchainRegistry(persist=False)
+        paths = {"flake8": "/usr/bin/flake8"}
+        with patch("src.tools.toolchain_registry.shutil.which", side_effect=paths.get):
+            assert registry.resolve(["pylint", "flake8"]) == "flake8"
+
+        assert registry.get_snapshot()["fallbacks"]["pylint"] == "flake8"
+
+    def test_version_persisted_with_ttl(self, temp_dir):
+        """测试版本探测结果持久化，过期后重新探测"""
+        from src.tools.toolchain_registry import ToolchainRegistry
+
+        binary = temp_dir / "pylint"
+        binary.write_text("")
+        cache_file = temp_dir / "toolchain.json"
+        completed = Mock(stdout="pylint 3.0.0\n", stderr="", returncode=0)
+
+        with (
+            patch(
+                "src.tools.toolchain_registry.shutil.which", return_value=str(binary)
+            ),
+            patch(
+                "src.tools.toolchain_registry.subprocess.run", return_value=completed
+            ) as mock_run,
+        ):
+            first = ToolchainRegistry(cache_file=cache_file)
+            assert first.get_version(["pylint", "--version"]) == "pylint 3.0.0"
+            assert first.get_version(["pylint", "--version"]) == "pylint 3.0.0"
+
+            second = ToolchainRegistry(cache_file=cache_file)
+            assert second.get_version(["pylint", "--version"]) == "pylint 3.0.0"
+            assert mock_run.call_count == 1
+
+            expired = ToolchainRegistry(cache_file=cache_file, ttl=-1)
+            expired.get_version(["pylint", "--version"])
+            assert mock_run.call_count == 2
+
+    def test_python_analyzer_fallback_without_subprocess(self):
+        """测试Python分析器降级选择不再启动子进程"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+        from src.tools.toolchain_registry import ToolchainRegistry
+
+        registry = ToolchainRegistry(persist=False)
+        with (
+            patch(
+                "src.tools.multilang_code_analyzers.get_toolchain_registry",
+                return_value=registry,
+            ),
+            patch("src.tools.toolchain_registry.shutil.which", return_value=None),
+            patch("src.tools.multilang_code_analyzers.subprocess.run") as mock_run,
+        ):
+            analyzer = PythonAnalyzer(tool="pylint")
+            assert analyzer._check_tool_availability()
+
+        assert analyzer.get_tool_name() == "python_builtin"
+        mock_run.assert_not_called()
+
+
+class TestPythonChecker:
+    """测试进程内Python检查后端"""
+
+    def test_syntax_error(self):
+        """测试语法错误带有行列信息"""
+        from src.tools.python_checker import check_source
+
+        issues = check_source("def f(:\n    pass\n", "bad.py")
+
+        assert len(issues) == 1
+        assert issues[0][0] == "E999"
+        assert issues[0][2] == 1
+
+    def test_compile_stage_error(self):
+        """测试符号表阶段的错误同样被发现"""
+        from src.tools.python_checker import check_source
+
+        issues = check_source("return 1\n", "bad.py")
+
+        assert [i[0] for i in issues] == ["E999"]
+
+    def test_scope_analysis(self):
+        """测试未定义名称、未使用导入和未使用变量"""
+        from src.tools.python_checker import check_source
+
+        source = (
+            "import os\n"
+            "import sys\n"
+            "from typing import Literal\n"
+            "def f(mode: Literal['a', 'b']):\n"
+            "    unused = 1\n"
+            "    used = 2\n"
+            "    def g():\n"
+            "        return used\n"
+            "    return g, sys, missing_name\n"
+        )
+        issues = {(i[0], i[2]) for i in check_source(source, "mod.py")}
+
+        assert issues == {("F401", 1), ("F841", 5), ("F821", 9)}
+
+    def test_no_false_positives_for_common_patterns(self):
+        """测试前向引用、global声明、__all__和noqa不产生误报"""
+        from src.tools.python_checker import check_source
+
+        source = (
+            "from typing import TYPE_CHECKING\n"
+            "import json  # noqa: F401\n"
+            "import re\n"
+            "if TYPE_CHECKING:\n"
+            "    from pathlib import Path\n"
+            "__all__ = ['re']\n"
+            "def f(p: 'Path'):\n"
+            "    global counter\n"
+            "    counter = 1\n"
+            "    return later(), __name__\n"
+            "def later():\n"
+            "    return counter\n"
+            "class C:\n"
+            "    attr = 1\n"
+            "    def m(self):\n"
+            "        return __class__\n"
+        )
+
+        assert check_source(source, "mod.py") == []
+
+    def test_only_typing_cast_takes_string_annotation(self):
+        """测试只有typing.cast的字符串参数按类型注解解析"""
+        from src.tools.python_checker import check_source
+
+        source = (
+            "import typing as t\n"
+            "from typing import cast\n"
+            "from typing_extensions import cast as tcast\n"
+            "def f(b):\n"
+            "    view = memoryview(b).cast('B')\n"
+            "    return view, cast('Missing1', b), t.cast('Missing2', b), "
+            "tcast('Missing3', b)\n"
+        )
+        issues = check_source(source, "mod.py")
+
+        assert sorted(i[1] for i in issues) == [
+            "undefined name 'Missing1'",
+            "undefined name 'Missing2'",
+            "undefined name 'Missing3'",
+        ]
+
+    def test_check_files_in_pool(self, temp_dir):
+        """测试多文件在进程池上检查"""
+        from src.tools import python_checker
+
+        paths = []
+        for i in range(4):
+            path = temp_dir / f"m{i}.py"
+            path.write_text("import os\n" if i % 2 else "x = 1\n")
+            paths.append(path)
+
+        with patch.object(python_checker, "MIN_PARALLEL_FILES", 2):
+            results = python_checker.check_python_files(paths)
+
+        assert [len(results[str(p)]) for p in paths] == [0, 1, 0, 1]
+        assert results[str(paths[1])][0].rule_id == "F401"
+
+    def test_python_builtin_analyzer_runs_in_process(self, temp_dir):
+        """测试python_builtin分析不再启动子进程"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        a = temp_dir / "a.py"
+        b = temp_dir / "b.py"
+        a.write_text("import os\n")
+        b.write_text("def f(:\n")
+        analyzer = PythonAnalyzer(tool="python_builtin", use_cache=False)
+
+        with patch("src.tools.multilang_code_analyzers.subprocess.run") as mock_run:
+            single = analyzer.analyze(a)
+            batch = analyzer.analyze_many([a, b])
+
+        mock_run.assert_not_called()
+        assert [i.rule_id for i in single.issues] == ["F401"]
+        assert [i.rule_id for i in batch[1].issues] == ["E999"]
+        assert batch[1].issues[0].severity == "high"
+
+    def test_compile_project_rechecks_only_changed_files(self, temp_dir):
+        """测试compile_project的语法检查按内容哈希缓存，只重新检查修改过的文件"""
+        from src.tools import python_checker
+        from src.tools.analysis_cache import AnalysisCache
+        from src.tools.error_detector import _check_python_syntax
+
+        (temp_dir / "pyproject.toml").write_text("[project]\nname = 'demo'\n")
+        for i in range(8):
+            (temp_dir / f"m{i}.py").write_text(f"value = {i}\n")
+        (temp_dir / "broken.py").write_text("x = 1\nif x\n    pass\n")
+        cache = AnalysisCache(db_path=temp_dir / "python_check.db")
+        python_checker.clear_check_memo()
+
+        with (
+            patch.object(python_checker, "MIN_PARALLEL_FILES", 4),
+            patch.object(python_checker, "get_check_cache", return_value=cache),
+        ):
+            result = json.loads(compile_project.invoke({"project_path": str(temp_dir)}))
+            errors = result["compilation_result"]["errors"]
+            assert len(errors) == 1
+            assert errors[0]["file_path"].endswith("broken.py")
+            assert (errors[0]["line_number"], errors[0]["column_number"]) == (2, 5)
+            assert errors[0]["error_type"] == "syntax_error"
+
+            # 进程内记忆清空后从持久化缓存读取，只重新编译修改过的文件
+            python_checker.clear_check_memo()
+            (temp_dir / "broken.py").write_text("x = 1\nif x:\n    pass\n")
+            with patch.object(
+                python_checker, "_run", wraps=python_checker._run
+            ) as mock_run:
+                result = _check_python_syntax(temp_dir, {})
+
+        assert mock_run.call_args[0][0] == [(str(temp_dir / "broken.py"), True)]
+        assert result["errors"] == []
+        assert cache.get_stats()["hits"] == 8
+        cache.close()
+
+
+class TestLinterDaemon:
+    """测试常驻lint工作进程池"""
+
+    def test_worker_handles_flake8_in_process(self, temp_dir):
+        """测试工作进程在进程内运行flake8并捕获输出"""
+        pytest.importorskip("flake8")
+        from src.tools import linter_worker
+
+        (temp_dir / "sample.py").write_text("import os\n")
+        response = linter_worker.handle(
+            {"tool": "flake8", "args": ["sample.py"], "cwd": str(temp_dir)}
+        )
+
+        assert response["returncode"] == 1
+        assert "F401" in response["stdout"]
+        assert linter_worker.handle({"tool": "unknown"})["error"]
+
+    def test_pool_reuses_worker_and_sees_edits(self, temp_dir):
+        """测试工作进程被复用，且文件修改后重新分析"""
+        pytest.importorskip("flake8")
+        from src.tools.linter_daemon import LinterWorkerPool
+
+        sample = temp_dir / "sample.py"
+        sample.write_text("import os\n")
+        pool = LinterWorkerPool(max_workers=1)
+        try:
+            first = pool.run(["flake8", "sample.py"], temp_dir, 30)
+            sample.write_text("import os\n\nprint(os.name)\n")
+            second = pool.run(["flake8", "sample.py"], temp_dir, 30)
+            stats = pool.get_stats()
+        finally:
+            pool.shutdown()
+
+        assert "F401" in first.stdout
+        assert second.returncode == 0 and second.stdout == ""
+        assert stats["spawned"] == 1
+        assert stats["jobs"] == 2
+
+    def test_worker_recycled_after_job_limit(self, temp_dir):
+        """测试工作进程处理任务数达到上限后被回收"""
+        pytest.importorskip("flake8")
+        from src.tools.linter_daemon import LinterWorkerPool
+
+        (temp_dir / "sample.py").write_text("x = 1\n")
+        pool = LinterWorkerPool(max_workers=1, max_jobs_per_worker=2)
+        try:
+            for _ in range(3):
+                pool.run(["flake8", "sample.py"], temp_dir, 30)
+            stats = pool.get_stats()
+        finally:
+            pool.shutdown()
+
+        assert stats["recycled"] == 1
+        assert stats["spawned"] == 2
+
+    def test_worker_error_falls_back_to_subprocess(self, temp_dir):
+        """测试工作进程报告错误时回退到子进程，工作进程继续复用"""
+        from src.tools.linter_daemon import LinterWorkerPool
+
+        pool = LinterWorkerPool(max_workers=1)
+        try:
+            with patch(
+                "src.tools.linter_daemon.subprocess.run",
+                return_value=Mock(stdout="ok", stderr="", returncode=0),
+            ) as mock_run:
+                first = pool.run(["no-such-linter", "a.py"], temp_dir, 30)
+                second = pool.run(["no-such-linter", "b.py"], temp_dir, 30)
+            stats = pool.get_stats()
+        finally:
+            pool.shutdown()
+
+        assert first.stdout == second.stdout == "ok"
+        assert mock_run.call_args[0][0] == ["no-such-linter", "b.py"]
+        assert stats["spawned"] == 1
+        assert stats["fallbacks"] == 2
+        assert stats["jobs"] == 0
+
+    def test_unsupported_command(self):
+        """测试非Python工具不进入工作进程"""
+        from src.tools.linter_daemon import LinterWorkerPool
+
+        pool = LinterWorkerPool()
+        assert not pool.supports(["eslint", "a.js"])
+        assert not pool.supports([])
+
+    def test_analyzer_dispatches_to_pool(self, temp_dir):
+        """测试启用常驻模式后分析器通过工作进程池运行"""
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        sample = temp_dir / "sample.py"
+        sample.write_text("x = 1\n")
+        pool = Mock()
+        pool.supports.return_value = True
+        pool.run.return_value = Mock(stdout="[]", stderr="", returncode=0)
+
+        analyzer = PythonAnalyzer(tool="pylint", use_cache=False, use_daemon=True)
+        with (
+            patch(
+                "src.tools.multilang_code_analyzers.get_toolchain_registry"
+            ) as registry,
+            patch(
+                "src.tools.multilang_code_analyzers.get_linter_pool",
+                return_value=pool,
+            ),
+            patch("src.tools.multilang_code_analyzers.subprocess.run") as mock_run,
+        ):
+            registry.return_value.resolve.return_value = "pylint"
+            result = analyzer.analyze(sample)
+
+        assert result.success
+        assert pool.run.call_args[0][0][0] == "pylint"
+        mock_run.assert_not_called()
+
+
+class TestIncrementalAnalysis:
+    """测试基于git差异的增量分析"""
+
+    def _git(self, repo: Path, *args: str):
+        import subprocess
+
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=repo,
+            check=True,
+            capture_output=True,
+        )
+
+    def _make_repo(self, root: Path):
+        import shutil
+
+        if shutil.which("git") is None:
+            pytest.skip("git不可用")
+        self._git(root, "init", "-q")
+        (root / "a.py").write_text("bad = 1\nok = 2\n")
+        (root / "b.py").write_text("bad = 1\n")
+        self._git(root, "add", ".")
+        self._git(root, "commit", "-q", "-m", "init")
+
+    def _bad_names(self, path: Path):
+        from src.tools.multilang_code_analyzers import AnalysisIssue
+
+        return [
+            AnalysisIssue(
+                tool_name="fake",
+                issue_type="warning",
+                severity="medium",
+                message="bad name",
+                line=number,
+            )
+            for number, text in enumerate(path.read_text().splitlines(), 1)
+            if "bad" in text
+        ]
+
+    def test_parse_unified_diff(self, temp_dir):
+        """测试解析变更行范围"""
+        from src.tools.incremental_analysis import parse_unified_diff
+
+        diff = (
+            "diff --git a/x.py b/x.py\n"
+            "--- a/x.py\n"
+            "+++ b/x.py\n"
+            "@@ -3 +3,2 @@\n"
+            "@@ -10,2 +11,0 @@\n"
+            "--- a/gone.py\n"
+            "+++ /dev/null\n"
+            "@@ -1,3 +0,0 @@\n"
+        )
+        changes = parse_unified_diff(diff, temp_dir)
+
+        assert changes == {(temp_dir / "x.py").resolve(): [(3, 4), (11, 12)]}
+
+    def test_incremental_merges_with_snapshot(self, temp_dir, fake_analyzer):
+        """测试增量分析只分析变更文件，并与快照合并"""
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_repo(temp_dir)
+        calls = []
+        with (
+            patch(
+                "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+                side_effect=lambda language, **kwargs: fake_analyzer(
+                    language, self._bad_names, calls
+                ),
+            ),
+            patch(
+                "src.tools.incremental_analysis._snapshot_path",
+                return_value=temp_dir / ".snapshot.json",
+            ),
+        ):
+            engine = ProjectDefectEngine(max_workers=1)
+            engine.analyze_project(str(temp_dir))
+            assert sorted(calls) == ["a.py", "b.py"]
+
+            calls.clear()
+            (temp_dir / "a.py").write_text("bad = 1\nok = 2\nbad_again = 3\n")
+            report = engine.analyze_incremental(str(temp_dir))
+
+        assert calls == ["a.py"]
+        assert report.mode == "incremental"
+        assert report.files_analyzed == 1
+        assert report.incremental["baseline_files"] == 1
+        assert report.get_summary()["total_issues"] == 3
+        assert [d["line"] for d in report.incremental["changed_issues"]] == [3]
+
+    def test_incremental_without_snapshot_runs_full(self, temp_dir, fake_analyzer):
+        """测试没有快照时退化为完整分析"""
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_repo(temp_dir)
+        calls = []
+        with (
+            patch(
+                "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+                side_effect=lambda language, **kwargs: fake_analyzer(
+                    language, self._bad_names, calls
+                ),
+            ),
+            patch(
+                "src.tools.incremental_analysis._snapshot_path",
+                return_value=temp_dir / ".snapshot.json",
+            ),
+        ):
+            report = ProjectDefectEngine(max_workers=1).analyze_incremental(
+                str(temp_dir)
+            )
+
+        assert report.mode == "full"
+        assert sorted(calls) == ["a.py", "b.py"]
+
+    def test_failed_analysis_does_not_drop_files(self, temp_dir, fake_analyzer):
+        """测试分块失败时不记录快照，重新分析失败的文件沿用快照中的结果"""
+        from src.tools.incremental_analysis import load_snapshot
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_repo(temp_dir)
+        calls = []
+        crash = []
+        broken = set()
+
+        def create_analyzer(language, **kwargs):
+            analyzer = fake_analyzer(language, self._bad_names, calls)
+            analyze_many = analyzer.analyze_many.side_effect
+
+            def flaky(paths):
+                if crash:
+                    crash.pop()
+                    raise RuntimeError("linter crashed")
+                results = analyze_many(paths)
+                for result in results:
+                    if Path(result.file_path).name in broken:
+                        result.success, result.issues = False, []
+                return results
+
+            analyzer.analyze_many.side_effect = flaky
+            return analyzer
+
+        with (
+            patch(
+                "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+                side_effect=create_analyzer,
+            ),
+            patch(
+                "src.tools.incremental_analysis._snapshot_path",
+                return_value=temp_dir / ".snapshot.json",
+            ),
+        ):
+            engine = ProjectDefectEngine(max_workers=1)
+            crash.append(True)
+            assert engine.analyze_project(str(temp_dir)).errors
+            assert load_snapshot(temp_dir.resolve()) is None
+
+            # 没有快照时增量分析退化为完整分析，两个文件都在结果中
+            report = engine.analyze_incremental(str(temp_dir))
+            assert report.mode == "full"
+            assert report.files_analyzed == 2
+
+            (temp_dir / "a.py").write_text("bad = 1\nbad_too = 2\n")
+            (temp_dir / "b.py").write_text("bad = 1\nbad_too = 2\n")
+            snapshot = load_snapshot(temp_dir.resolve())
+            crash.append(True)
+            report = engine.analyze_incremental(str(temp_dir))
+            assert report.errors
+            assert report.incremental["baseline_files"] == 2
+            assert load_snapshot(temp_dir.resolve()) == snapshot
+
+            broken.add("a.py")
+            report = engine.analyze_incremental(str(temp_dir))
+            saved = load_snapshot(temp_dir.resolve())["results"]
+
+        a_path = str((temp_dir / "a.py").resolve())
+        assert report.incremental["failed_files"] == [a_path]
+        assert sorted(Path(r.file_path).name for r in report.results) == [
+            "a.py",
+            "b.py",
+        ]
+        # a.py沿用上次快照中的结果，b.py使用新的结果
+        assert report.get_summary()["total_issues"] == 1 + 2
+        assert saved[a_path]["success"] is True
+
+    def test_file_changes_use_subdirectory_snapshot(self, temp_dir, fake_analyzer):
+        """测试对子目录做过项目分析时，单文件增量相对该次分析的提交比较"""
+        from src.tools.incremental_analysis import (get_file_changes,
+                                                    get_head_commit)
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_repo(temp_dir)
+        (temp_dir / "sub").mkdir()
+        module = temp_dir / "sub" / "c.py"
+        module.write_text("a = 1\nb = 2\n")
+        self._git(temp_dir, "add", ".")
+        self._git(temp_dir, "commit", "-q", "-m", "sub")
+        analyzed_commit = get_head_commit(temp_dir)
+
+        cache_dir = temp_dir / ".cache"
+        with (
+            patch(
+                "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+                side_effect=lambda language, **kwargs: fake_analyzer(language),
+            ),
+            patch(
+                "src.tools.analysis_cache.get_agent_cache_dir",
+                side_effect=lambda *parts: cache_dir.joinpath(*parts),
+            ),
+        ):
+            (cache_dir / "snapshots").mkdir(parents=True)
+            ProjectDefectEngine(max_workers=1).analyze_project(str(temp_dir / "sub"))
+
+            module.write_text("a = 10\nb = 2\n")
+            self._git(temp_dir, "commit", "-q", "-am", "edit")
+            changes = get_file_changes(module)
+
+        assert changes["base_ref"] == analyzed_commit
+        assert changes["changed"] is True
+        assert changes["ranges"] == [(1, 1)]
+
+
+class TestStreamingResults:
+    """测试按完成顺序流式产出分析结果"""
+
+    def _make_project(self, root: Path):
+        (root / "slow.py").write_text("x = 1\n")
+        (root / "fast.js").write_text("let a = 1;\n")
+
+    def _patch_factory(self, fake_analyzer, release):
+        """Python分析器阻塞到release被设置，JavaScript分析器立即完成"""
+
+        def create_analyzer(language, **kwargs):
+            analyzer = fake_analyzer(language)
+            if language == "python":
+                analyze = analyzer.analyze.side_effect
+
+                def blocked(file_path):
+                    assert release.wait(10), "慢速分析器未被放行"
+                    return analyze(file_path)
+
+                analyzer.analyze.side_effect = blocked
+            return analyzer
+
+        return patch(
+            "src.tools.project_defect_engine.MultiLanguageAnalyzerFactory.create_analyzer",
+            side_effect=create_analyzer,
+        )
+
+    def test_first_result_not_blocked_by_slowest_file(self, temp_dir, fake_analyzer):
+        """测试首个结果不等待最慢的文件"""
+        import threading
+
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        release = threading.Event()
+        with self._patch_factory(fake_analyzer, release):
+            iterator = ProjectDefectEngine(max_workers=2).iter_results(str(temp_dir))
+            # 慢速文件尚未完成时已经得到首个结果
+            first = next(iterator)
+            release.set()
+            rest = list(iterator)
+
+        assert Path(first.file_path).name == "fast.js"
+        assert [Path(r.file_path).name for r in rest] == ["slow.py"]
+
+    def test_aiter_results(self, temp_dir, fake_analyzer):
+        """测试异步迭代接口"""
+        import asyncio
+        import threading
+
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        release = threading.Event()
+
+        async def collect():
+            engine = ProjectDefectEngine(max_workers=2)
+            results = []
+            async for result in engine.aiter_results(str(temp_dir)):
+                results.append(result)
+                release.set()
+            return results
+
+        with self._patch_factory(fake_analyzer, release):
+            results = asyncio.run(collect())
+
+        assert [Path(r.file_path).name for r in results] == ["fast.js", "slow.py"]
+
+    def test_analyze_project_reports_progress(self, temp_dir, fake_analyzer):
+        """测试完整分析通过回调逐个上报进度"""
+        import threading
+
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        self._make_project(temp_dir)
+        release = threading.Event()
+        progress = []
+
+        def report(result, done, total):
+            progress.append((Path(result.file_path).name, done, total))
+            release.set()
+
+        with self._patch_factory(fake_analyzer, release):
+            ProjectDefectEngine(max_workers=2).analyze_project(
+                str(temp_dir), progress=report
+            )
+
+        assert progress == [("fast.js", 1, 2), ("slow.py", 2, 2)]
+
+
+class TestIssueTable:
+    """测试紧凑的缺陷列存储"""
+
+    def _defects(self):
+        return [
+            {
+                "file": "a.py",
+                "tool": "pylint",
+                "type": "warning",
+                "severity": "low",
+                "message": "unused import 'os'",
+                "line": 1,
+                "rule_id": "W0611",
+            },
+            {
+                "file": "b.py",
+                "tool": "pylint",
+                "type": "error",
+                "severity": "high",
+                "message": "undefined name 'x'",
+                "line": 3,
+                "rule_id": "E0602",
+            },
+            {
+                "file": "a.py",
+                "tool": "pylint",
+                "type": "error",
+                "severity": "high",
+                "message": "undefined name 'y'",
+                "line": None,
+            },
+        ]
+
+    def test_roundtrip_and_interning(self):
+        """测试字符串驻留和字典还原"""
+        from src.tools.issue_table import FIELDS, IssueTable
+
+        defects = self._defects()
+        table = IssueTable.from_defects(defects)
+
+        assert len(table) == 3
+        # None、a.py、b.py、pylint等重复字符串只保存一次
+        assert len(table.pool) < 3 * len(FIELDS)
+        restored = table.to_defects()
+        assert restored[2]["line"] is None
+        assert restored[0] == {field: defects[0].get(field) for field in FIELDS}
+
+    def test_filter_views_share_table(self):
+        """测试过滤视图不复制数据，且可以继续过滤"""
+        from src.tools.issue_table import IssueTable
+
+        table = IssueTable.from_defects(self._defects())
+        errors = table.filter(severity="high")
+        in_a = errors.filter(file=["a.py", "missing.py"])
+
+        assert len(errors) == 2
+        assert errors.table is table
+        assert [row["message"] for row in in_a] == ["undefined name 'y'"]
+        assert len(table.filter(severity="critical")) == 0
+        assert sorted(table.view().group_by("file")) == ["a.py", "b.py"]
+
+    def test_rows_behave_like_defect_dicts(self):
+        """测试行视图可以替代缺陷字典"""
+        from src.tools.issue_table import IssueTable
+
+        row = IssueTable.from_defects(self._defects())[1]
+
+        assert row.get("rule_id") == "E0602"
+        assert row.get("unknown", "default") == "default"
+        assert dict(row)["file"] == "b.py"
+
+    def test_aggregator_accepts_table(self):
+        """测试聚合器直接读取列存储，结果与字典输入一致"""
+        from src.tools.defect_aggregator import DefectAggregator
+        from src.tools.issue_table import FIELDS, IssueTable
+
+        defects = self._defects()
+        from_dicts = DefectAggregator().aggregate_defects(defects)
+        from_table = DefectAggregator().aggregate_defects(
+            IssueTable.from_defects(defects)
+        )
+
+        assert from_table["total_defects"] == from_dicts["total_defects"]
+        normalize = lambda d: {field: d.get(field) for field in FIELDS}
+        assert [c["defects"] for c in from_table["clusters"]] == [
+            [normalize(d) for d in c["defects"]] for c in from_dicts["clusters"]
+        ]
+        json.dumps(from_table)  # 输出中只包含普通字典
+
+
+class TestAnalyzerMetrics:
+    """测试分析器耗时与结果统计"""
+
+    def test_histogram_percentiles(self):
+        """测试直方图计数、分位数和溢出桶"""
+        from src.tools.analyzer_metrics import Histogram
+
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+
+        data = histogram.to_dict()
+        assert data["count"] == 4
+        assert data["buckets"] == {"le_0.1": 2, "le_1": 1, "inf": 1}
+        assert data["p50"] == 0.1
+        assert data["max"] == 3.0
+        assert histogram.percentile(1.0) == 3.0
+
+    def test_analyzer_records_phases_and_events(self, tmp_path):
+        """测试分析器记录运行、解析、问题数、缓存命中和超时"""
+        import subprocess
+
+        from src.tools.analyzer_metrics import get_analyzer_metrics
+        from src.tools.multilang_code_analyzers import GoAnalyzer
+
+        source = tmp_path / "main.go"
+        source.write_text("package main\n", encoding="utf-8")
+        output = f"{source}:1:1: something wrong\n"
+        metrics = get_analyzer_metrics()
+        metrics.reset()
+
+        analyzer = GoAnalyzer(use_cache=False)
+        with (
+            patch.object(GoAnalyzer, "_check_tool_availability", return_value=True),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                return_value=subprocess.CompletedProcess([], 1, "", output),
+            ),
+        ):
+            analyzer.analyze(source)
+        with (
+            patch.object(GoAnalyzer, "_check_tool_availability", return_value=True),
+            patch(
+                "src.tools.multilang_code_analyzers.subprocess.run",
+                side_effect=subprocess.TimeoutExpired("go", 1),
+            ),
+        ):
+            result = analyzer.analyze(source)
+
+        assert result.error == "Analysis timeout"
+        rows = metrics.snapshot()
+        assert len(rows) == 1
+        row = rows[0]
+        assert (row["tool"], row["language"]) == ("vet", "go")
+        assert row["events"]["files"] == 1
+        assert row["events"]["timeouts"] == 1
+        assert row["run"]["count"] == 1
+        assert row["parse"]["count"] == 1
+        assert row["total"]["count"] == 1
+        assert row["issues"]["sum"] == 1
+        metrics.reset()
+
+    def test_python_tool_fallback_counted(self):
+        """测试Python工具降级被记录在请求的工具名下"""
+        from src.tools.analyzer_metrics import get_analyzer_metrics
+        from src.tools.multilang_code_analyzers import PythonAnalyzer
+
+        metrics = get_analyzer_metrics()
+        metrics.reset()
+        analyzer = PythonAnalyzer(tool="mypy")
+        with patch(
+            "src.tools.multilang_code_analyzers.get_toolchain_registry"
+        ) as registry:
+            registry.return_value.resolve.return_value = None
+            assert analyzer._check_tool_availability()
+
+        assert analyzer.tool == "python_builtin"
+        (row,) = metrics.snapshot()
+        assert (row["tool"], row["events"]["fallbacks"]) == ("mypy", 1)
+        metrics.reset()
+
+    def test_perf_command_renders_table(self):
+        """测试 /perf analyzers 命令"""
+        from src.interface.commands import handle_command
+        from src.tools.analyzer_metrics import get_analyzer_metrics
+
+        metrics = get_analyzer_metrics()
+        metrics.reset()
+        metrics.observe("pylint", "python", "total", 0.4)
+        metrics.increment("pylint", "python", "files")
+
+        with patch("src.interface.commands.console") as console:
+            assert handle_command("/perf analyzers", None, None) is True
+
+        tables = [
+            call.args[0]
+            for call in console.print.call_args_list
+            if call.args and hasattr(call.args[0], "columns")
+        ]
+        assert tables and tables[0].row_count == 1
+        metrics.reset()
+
+
+class TestDefectBlocking:
+    """测试缺陷去重和聚类的候选索引"""
+
+    def _defects(self, count):
+        import random
+
+        rng = random.Random(7)
+        words = "unused import variable missing docstring undefined name line".split()
+        return [
+            {
+                "file": f"mod{rng.randint(0, 5)}.py",
+                "tool": "pylint",
+                "type": rng.choice(["error", "warning"]),
+                "severity": rng.choice(["high", "low"]),
+                "message": " ".join(rng.choice(words) for _ in range(rng.randint(0, 5)))
+                or None,
+                "line": rng.choice([None, rng.randint(1, 40)]),
+                "rule_id": rng.choice(["W0611", "W0612", "E0602", None]),
+                "category": rng.choice(["style", "bug", None]),
+                "suggestion": rng.choice([None, "fix"]),
+            }
+            for _ in range(count)
+        ]
+
+    def test_matches_pairwise_comparison(self):
+        """测试索引结果与两两比较完全一致（包括顺序）"""
+        from src.tools.defect_aggregator import DefectAggregator
+
+        class PairwiseAggregator(DefectAggregator):
+            def _similarity_features(self, defects):
+                return None
+
+        defects = self._defects(400)
+        for threshold in (0.8, 0.9):
+            indexed, pairwise = DefectAggregator(), PairwiseAggregator()
+            indexed.similarity_threshold = pairwise.similarity_threshold = threshold
+
+            unique = indexed._deduplicate_defects(defects)
+            assert [id(d) for d in unique] == [
+                id(d) for d in pairwise._deduplicate_defects(defects)
+            ]
+            assert [
+                [id(d) for d in cluster.defects]
+                for cluster in indexed._cluster_defects(unique)
+            ] == [
+                [id(d) for d in cluster.defects]
+                for cluster in pairwise._cluster_defects(unique)
+            ]
+
+    def test_low_threshold_falls_back_to_pairwise(self):
+        """测试阈值过低（可能跨文件相似）时不使用索引"""
+        from src.tools.defect_aggregator import DefectAggregator
+
+        aggregator = DefectAggregator()
+        aggregator.similarity_threshold = 0.6
+        defects = [
+            {"file": "a.py", "message": "unused import os", "rule_id": "W0611"},
+            {"file": "b.py", "message": "unused import os", "rule_id": "W0611"},
+        ]
+
+        features = aggregator._similarity_features(defects)
+        assert aggregator._build_similarity_index(features) is None
+        assert len(aggregator._deduplicate_defects(defects)) == 1
+
+
+class TestDefectSimilarityKernel:
+    """测试批量相似度计算"""
+
+    def _defects(self):
+        return TestDefectBlocking()._defects(150)
+
+    def _check(self, use_numpy):
+        from src.tools import defect_similarity
+        from src.tools.defect_aggregator import DefectAggregator
+
+        defects = self._defects()
+        features = defect_similarity.DefectFeatures(defects, use_numpy=use_numpy)
+        aggregator = DefectAggregator()
+        candidates = list(range(len(defects)))
+
+        with patch.object(defect_similarity, "VECTORIZE_MIN_CANDIDATES", 1):
+            for i in range(0, len(defects), 7):
+                expected = [
+                    aggregator._calculate_similarity(defects[i], defects[j])
+                    for j in candidates
+                ]
+                assert list(features.similarities(i, candidates)) == expected
+                assert features.first_above(i, candidates, 0.8) == next(
+                    (j for j, score in zip(candidates, expected) if score > 0.8), None
+                )
+
+    def test_python_kernel_matches_calculate_similarity(self):
+        """测试纯Python实现与逐对计算完全一致"""
+        self._check(use_numpy=False)
+
+    def test_numpy_kernel_matches_calculate_similarity(self):
+        """测试NumPy实现与逐对计算完全一致"""
+        pytest.importorskip("numpy")
+        self._check(use_numpy=True)
+
+    def test_low_threshold_uses_kernel_without_index(self):
+        """测试阈值过低时仍使用批量计算，结果与逐对比较一致"""
+        from src.tools.defect_aggregator import DefectAggregator
+
+        class PairwiseAggregator(DefectAggregator):
+            def _similarity_features(self, defects):
+                return None
+
+        defects = self._defects()
+        kernel, pairwise = DefectAggregator(), PairwiseAggregator()
+        kernel.similarity_threshold = pairwise.similarity_threshold = 0.5
+
+        unique = kernel._deduplicate_defects(defects)
+        assert [id(d) for d in unique] == [
+            id(d) for d in pairwise._deduplicate_defects(defects)
+        ]
+        assert [len(c.defects) for c in kernel._cluster_defects(unique)] == [
+            len(c.defects) for c in pairwise._cluster_defects(unique)
+        ]
+
+
+class TestIncrementalAggregator:
+    """测试增量缺陷聚合"""
+
+    def _defects(self):
+        return [
+            {
+                "file": "a.py",
+                "line": 1,
+                "message": "unused import os",
+                "rule_id": "W0611",
+            },
+            {
+                "file": "a.py",
+                "line": 2,
+                "message": "unused import os",
+                "rule_id": "W0611",
+            },
+            {
+                "file": "a.py",
+                "line": 30,
+                "message": "undefined name x",
+                "rule_id": "E0602",
+            },
+            {"file": "b.py", "line": 5, "message": "line too long", "rule_id": "C0301"},
+        ]
+
+    def test_matches_batch_and_tracks_changes(self):
+        """测试首次结果与批量聚合一致，之后只处理变化的缺陷"""
+        from src.tools.defect_aggregator import DefectAggregator
+        from src.tools.incremental_aggregator import \
+            IncrementalDefectAggregator
+
+        defects = self._defects()
+        aggregator = IncrementalDefectAggregator()
+        result = aggregator.aggregate_defects(defects)
+        batch = DefectAggregator().aggregate_defects(defects)
+
+        assert result["total_defects"] == batch["total_defects"] == 3
+        assert result["incremental"] == {"added": 4, "removed": 0, "rebuilt": False}
+        assert sorted(c["defect_count"] for c in result["clusters"]) == sorted(
+            c["defect_count"] for c in batch["clusters"]
+        )
+
+        # 修复了未定义名称，新增一个问题
+        new_defect = {"file": "b.py", "line": 9, "message": "missing docstring"}
+        result = aggregator.aggregate_defects(
+            [d for d in defects if d["rule_id"] != "E0602"] + [new_defect]
+        )
+        assert result["incremental"] == {"added": 1, "removed": 1, "rebuilt": False}
+        assert result["total_defects"] == 3
+        messages = {d["message"] for c in result["clusters"] for d in c["defects"]}
+        assert "undefined name x" not in messages
+        assert "missing docstring" in messages
+
+    def test_removing_representative_keeps_duplicates(self):
+        """测试移除保留缺陷后，其重复项重新成为保留缺陷"""
+        from src.tools.incremental_aggregator import \
+            IncrementalDefectAggregator
+
+        defects = self._defects()
+        aggregator = IncrementalDefectAggregator()
+        keys = [aggregator.add(defect) for defect in defects]
+        assert len(aggregator.duplicates) == 3
+
+        assert aggregator.remove(keys[0])
+        assert not aggregator.remove(keys[0])
+        assert keys[1] in aggregator.duplicates
+        assert sorted(m for ms in aggregator.clusters.values() for m in ms) == sorted(
+            aggregator.duplicates
+        )
+
+    def test_state_persists_per_workspace(self, tmp_path):
+        """测试状态按工作区保存并在下次调用时恢复"""
+        from src.tools import incremental_aggregator
+        from src.tools.defect_aggregator import aggregate_defects_tool
+
+        defects = self._defects()
+        with patch(
+            "src.tools.analysis_cache.get_agent_cache_dir",
+            side_effect=lambda *parts: tmp_path.joinpath(*parts),
+        ):
+            (tmp_path / "aggregator").mkdir()
+            first = json.loads(
+                aggregate_defects_tool.invoke(
+                    {"defects_json": json.dumps(defects), "workspace": str(tmp_path)}
+                )
+            )
+            # 模拟新进程：清空进程内的聚合器
+            incremental_aggregator._aggregators.clear()
+            second = json.loads(
+                aggregate_defects_tool.invoke(
+                    {"defects_json": json.dumps(defects), "workspace": str(tmp_path)}
+                )
+            )
+
+        assert first["success"] and second["success"]
+        assert second["result"]["incremental"] == {
+            "added": 0,
+            "removed": 0,
+            "rebuilt": False,
+        }
+        assert [c["cluster_id"] for c in second["result"]["clusters"]] == [
+            c["cluster_id"] for c in first["result"]["clusters"]
+        ]
+
+
+class TestDefectBaseline:
+    """测试缺陷指纹与基线"""
+
+    def _issue(self, line, message="unused variable 'tmp'", rule_id="W0612"):
+        return {
+            "file": "mod.py",
+            "tool": "pylint",
+            "type": "warning",
+            "severity": "low",
+            "message": message,
+            "line": line,
+            "rule_id": rule_id,
+        }
+
+    def _result(self, source, *lines, success=True):
+        from src.tools.multilang_code_analyzers import (AnalysisIssue,
+                                                        AnalysisResult)
+
+        return AnalysisResult(
+            file_path=str(source),
+            language="python",
+            tool_name="pylint",
+            success=success,
+            issues=[
+                AnalysisIssue(
+                    tool_name="pylint",
+                    issue_type="warning",
+                    severity="low",
+                    message=f"problem on {text}",
+                    line=line,
+                    rule_id="W0001",
+                )
+                for line, text in lines
+            ],
+            error=None if success else "Analysis timeout",
+        )
+
+    def test_fingerprint_survives_line_shift(self, tmp_path):
+        """测试在上方插入代码后指纹不变，且包含所在符号"""
+        from src.tools.defect_baseline import (SourceContext,
+                                               compute_fingerprints)
+
+        source = tmp_path / "mod.py"
+        source.write_text(
+            "class A:\n    def run(self):\n        tmp = 1\n", encoding="utf-8"
+        )
+        before = compute_fingerprints(source, [self._issue(3)])
+        assert SourceContext(source).enclosing_symbol(3) == "A.run"
+
+        source.write_text(
+            "import os\n\n\nclass A:\n    def run(self):\n        tmp = 1\n",
+            encoding="utf-8",
+        )
+        assert compute_fingerprints(source, [self._issue(6)]) == before
+
+        # 内容不同的行得到不同的指纹
+        source.write_text(
+            "class A:\n    def run(self):\n        tmp = 2\n", encoding="utf-8"
+        )
+        assert compute_fingerprints(source, [self._issue(3)]) != before
+
+    def test_compare_reports_new_fixed_unchanged(self, tmp_path):
+        """测试首次创建基线，之后报告新增、已修复和未变化的数量"""
+        from src.tools.defect_baseline import (DefectBaseline,
+                                               compare_with_baseline)
+
+        source = tmp_path / "mod.py"
+        source.write_text("a = 1\nb = 2\n", encoding="utf-8")
+        baseline = DefectBaseline(db_path=tmp_path / "baseline.db")
+        first = [self._issue(1, "name a"), self._issue(2, "name b")]
+
+        created = compare_with_baseline(source, first, baseline=baseline)
+        assert created["created"] and created["unchanged"] == 2
+
+        source.write_text("\nb = 2\nc = 3\n", encoding="utf-8")
+        second = [self._issue(2, "name b"), self._issue(3, "name c")]
+        comparison = compare_with_baseline(source, second, baseline=baseline)
+
+        assert comparison["new_indices"] == [1]
+        assert [row["message"] for row in comparison["fixed"]] == ["name a"]
+        assert comparison["unchanged"] == 1
+
+        # 未更新基线时结果不变，更新后新问题成为基线的一部分
+        compare_with_baseline(source, second, update=True, baseline=baseline)
+        after = compare_with_baseline(source, second, baseline=baseline)
+        assert after["new_indices"] == [] and after["fixed"] == []
+        baseline.close()
+
+    def test_analyze_code_defects_baseline_mode(self, tmp_path):
+        """测试基线模式只输出新增问题"""
+        from src.tools.defect_baseline import DefectBaseline
+        from src.tools.tools import analyze_code_defects
+
+        source = tmp_path / "mod.py"
+        source.write_text("a = 1\nb = 2\n", encoding="utf-8")
+        baseline = DefectBaseline(db_path=tmp_path / "baseline.db")
+
+        def result(*lines):
+            return self._result(source, *lines)
+
+        def run(analysis):
+            with (
+                patch(
+                    "src.tools.analysis_api.MultiLanguageAnalyzerFactory.analyze_file",
+                    return_value=analysis,
+                ),
+                patch(
+                    "src.tools.defect_baseline.get_defect_baseline",
+                    return_value=baseline,
+                ),
+            ):
+                return json.loads(
+                    analyze_code_defects.invoke(
+                        {"file_path": str(source), "baseline": True}
+                    )
+                )
+
+        first = run(result((1, "a"), (2, "b")))
+        assert first["baseline"]["created"]
+        assert first["analysis"]["issues"] == []
+
+        second = run(result((2, "b"), (2, "new")))
+        assert second["baseline"]["new"] == 1
+        assert second["baseline"]["fixed"] == 1
+        assert second["baseline"]["unchanged"] == 1
+        assert [i["message"] for i in second["analysis"]["issues"]] == [
+            "problem on new"
+        ]
+        baseline.close()
+
+    def test_baseline_combined_with_incremental(self, tmp_path):
+        """测试基线与增量模式同时使用时，基线仍按全部问题比较和更新"""
+        from src.tools.analysis_api import analyze_defects
+        from src.tools.defect_baseline import DefectBaseline
+
+        source = tmp_path / "mod.py"
+        source.write_text("a = 1\nb = 2\nc = 3\n", encoding="utf-8")
+        baseline = DefectBaseline(db_path=tmp_path / "baseline.db")
+
+        def result(*lines):
+            return self._result(source, *lines)
+
+        def run(analysis, **kwargs):
+            changes = {"base_ref": "HEAD", "changed": True, "ranges": [(3, 3)]}
+            with (
+                patch(
+                    "src.tools.analysis_api.MultiLanguageAnalyzerFactory.analyze_file",
+                    return_value=analysis,
+                ),
+                patch(
+                    "src.tools.defect_baseline.get_defect_baseline",
+                    return_value=baseline,
+                ),
+                patch(
+                    "src.tools.incremental_analysis.get_file_changes",
+                    return_value=changes,
+                ),
+            ):
+                return analyze_defects(str(source), baseline=True, **kwargs)
+
+        # 首次运行以全部问题创建基线，而不只是变更范围内的问题
+        run(result((1, "a"), (3, "c")), incremental=True)
+        report = run(
+            result((1, "a"), (3, "c"), (3, "new"), (2, "b")),
+            incremental=True,
+            update_baseline=True,
+        )
+        assert report.baseline["fixed"] == 0
+        assert report.baseline["unchanged"] == 2
+        assert report.baseline["new"] == 2
+        # 输出只包含变更范围内的新增问题
+        assert [row["message"] for row in report.issues] == ["problem on new"]
+
+        # 更新后的基线包含范围外的问题，完整运行时不再报告为新增
+        full = run(result((1, "a"), (3, "c"), (3, "new"), (2, "b")))
+        assert full.baseline["new"] == 0
+        assert full.baseline["fixed"] == 0
+        baseline.close()
+
+    def test_failed_analysis_keeps_baseline(self, tmp_path):
+        """测试分析失败时不与基线比较，也不覆盖或创建基线"""
+        from src.tools.analysis_api import analyze_defects
+        from src.tools.defect_baseline import DefectBaseline
+
+        source = tmp_path / "mod.py"
+        source.write_text("a = 1\n", encoding="utf-8")
+        baseline = DefectBaseline(db_path=tmp_path / "baseline.db")
+
+        def run(analysis):
+            with (
+                patch(
+                    "src.tools.analysis_api.MultiLanguageAnalyzerFactory.analyze_file",
+                    return_value=analysis,
+                ),
+                patch(
+                    "src.tools.defect_baseline.get_defect_baseline",
+                    return_value=baseline,
+                ),
+            ):
+                return analyze_defects(str(source), update_baseline=True)
+
+        # 首次运行失败时不创建空基线
+        failed = run(self._result(source, success=False))
+        assert "Analysis timeout" in failed.baseline["error"]
+        assert run(self._result(source, (1, "a"))).baseline["created"]
+
+        failed = run(self._result(source, success=False))
+        assert set(failed.baseline) == {"error"}
+
+        after = run(self._result(source, (1, "a")))
+        assert after.baseline["unchanged"] == 1
+        assert after.baseline["new"] == after.baseline["fixed"] == 0
+        baseline.close()
+
+
+class TestAnalysisApi:
+    """测试内部类型化分析API"""
+
+    def _analysis(self, path, count):
+        from src.tools.multilang_code_analyzers import (AnalysisIssue,
+                                                        AnalysisResult)
+
+        return AnalysisResult(
+            file_path=str(path),
+            language="python",
+            tool_name="pylint",
+            success=True,
+            issues=[
+                AnalysisIssue(
+                    tool_name="pylint",
+                    issue_type="warning",
+                    severity="low",
+                    message=f"unused variable v{i}",
+                    line=i + 1,
+                    rule_id="W0612",
+                )
+                for i in range(count)
+            ],
+        )
+
+    def test_analyze_defects_returns_objects(self, tmp_path):
+        """测试组合分析返回对象，聚合结果和问题视图可直接使用"""
+        from src.tools.analysis_api import (AggregationReport, DefectReport,
+                                            analyze_defects)
+
+        source = tmp_path / "mod.py"
+        source.write_text("x = 1\n", encoding="utf-8")
+        with patch(
+            "src.tools.analysis_api.MultiLanguageAnalyzerFactory.analyze_file",
+            return_value=self._analysis(source, 3),
+        ):
+            report = analyze_defects(str(source))
+
+        assert isinstance(report, DefectReport)
+        assert isinstance(report.aggregation, AggregationReport)
+        assert len(report.issues) == 3
+        assert report.aggregation.total_defects == 3
+
+        output = report.to_dict()
+        assert output["success"] is True
+        assert len(output["analysis"]["issues"]) == 3
+        assert output["metadata"]["language_detected"] == "python"
+
+    def test_analyze_defects_raises_for_unsupported_file(self, tmp_path):
+        """测试无法分析的文件抛出AnalysisError，工具包装返回错误结果"""
+        from src.tools.analysis_api import AnalysisError, analyze_defects
+        from src.tools.tools import analyze_code_defects
+
+        missing = str(tmp_path / "missing.py")
+        with pytest.raises(AnalysisError):
+            analyze_defects(missing)
+
+        result = json.loads(analyze_code_defects.invoke({"file_path": missing}))
+        assert result["success"] is False
+        assert "Cannot analyze file" in result["error"]
+
+    def test_tool_serializes_once(self, tmp_path):
+        """测试analyze_code_defects不经过JSON往返，只在输出时序列化一次"""
+        from src.tools.tools import analyze_code_defects
+
+        source = tmp_path / "mod.py"
+        source.write_text("x = 1\n", encoding="utf-8")
+        with (
+            patch(
+                "src.tools.analysis_api.MultiLanguageAnalyzerFactory.analyze_file",
+                return_value=self._analysis(source, 2),
+            ),
+            patch("json.dumps", wraps=json.dumps) as dumps,
+            patch("json.loads", wraps=json.loads) as loads,
+        ):
+            output = analyze_code_defects.invoke({"file_path": str(source)})
+
+        assert json.loads(output)["aggregation"]["total_defects"] == 2
+        assert dumps.call_count == 1
+        assert loads.call_count == 0
+
+    def test_extract_defects_and_aggregate(self):
+        """测试输入格式解析和聚合"""
+        from src.tools.analysis_api import aggregate, extract_defects
+
+        defects = [
+            {"file": "a.py", "line": i, "message": f"m{i}", "severity": "low"}
+            for i in range(3)
+        ]
+        assert extract_defects(defects) == defects
+        assert extract_defects({"defects_found": defects}) == defects
+        nested = {"analysis_results": {"analysis": {"defects_found": defects}}}
+        assert extract_defects(nested) == defects
+        with pytest.raises(ValueError):
+            extract_defects("not a list")
+
+        report = aggregate(defects)
+        assert report.incremental is False
+        assert report.total_defects == 3
+
+
+class TestAggregationBenchmark:
+    """测试缺陷聚合基准测试"""
+
+    def test_generator_is_deterministic_with_duplicates(self):
+        """测试生成器结果可复现，且包含重复报告"""
+        from benchmarks.defect_generator import generate_defects
+
+        first = generate_defects(500, seed=7)
+        second = generate_defects(500, seed=7)
+
+        assert len(first.defects) == 500
+        assert first.defects == second.defects
+        assert first.duplicate_count > 0
+        assert {d["tool"] for d in first.defects} == {"pylint", "eslint", "clang-tidy"}
+
+        clang = generate_defects(200, profile="clang", seed=7)
+        assert {d["tool"] for d in clang.defects} == {"clang-tidy"}
+        with pytest.raises(ValueError):
+            generate_defects(10, profile="unknown")
+
+    def test_evaluate_quality(self):
+        """测试去重和聚类质量的计算"""
+        from benchmarks.aggregation_benchmark import evaluate_quality
+        from benchmarks.defect_generator import SyntheticDefects
+
+        defects = [{"message": str(i)} for i in range(4)]
+        synthetic = SyntheticDefects(
+            defects=defects,
+            findings=[0, 0, 1, 2],
+            groups=[("a", "r"), ("a", "r"), ("a", "r"), ("b", "r")],
+        )
+        result = {
+            "clusters": [
+                {"defects": [defects[0], defects[2]]},
+                {"defects": [defects[3]]},
+            ]
+        }
+
+        quality = evaluate_quality(synthetic, result)
+        assert quality["duplicates"] == 1
+        assert quality["dedup_precision"] == 1.0
+        assert quality["dedup_recall"] == 1.0
+        assert quality["lost_findings"] == 0
+        assert quality["cluster_precision"] == 1.0
+        assert quality["cluster_recall"] == 1.0
+
+    def test_run_suite_and_compare(self):
+        """测试运行基准测试并检测退化"""
+        import copy
+
+        from benchmarks.aggregation_benchmark import compare_results, run_suite
+
+        report = run_suite([200], seed=3, log=None)
+        row = report["results"][0]
+        assert row["size"] == 200
+        assert row["peak_memory_mb"] > 0
+        assert 0 < row["total_defects"] <= 200
+        assert compare_results(report, report) == []
+
+        slower = copy.deepcopy(report)
+        slower["results"][0]["wall_time"] = row["wall_time"] * 3 + 1
+        slower["results"][0]["quality"]["dedup_recall"] -= 0.5
+        regressions = compare_results(slower, report)
+        assert len(regressions) == 2
+
+
+class TestClusterRanking:
+    """测试聚类的下标存储和前N个优先级选择"""
+
+    def _defects(self, count=300):
+        import random
+
+        rng = random.Random(5)
+        messages = [
+            "Undefined variable '{}'",
+            "Unused import {}",
+            "Missing function docstring in {}",
+            "Line too long in {}",
+        ]
+        return [
+            {
+                "file": f"m{rng.randrange(12)}.py",
+                "line": rng.randint(1, 300),
+                "message": rng.choice(messages).format(f"name{rng.randrange(40)}"),
+                "rule_id": rng.choice(["E0602", "W0611", "C0116", "C0301"]),
+                "category": "python_quality",
+                "severity": rng.choice(["error", "warning", "info"]),
+            }
+            for _ in range(count)
+        ]
+
+    def test_clusters_reference_shared_table(self):
+        """测试聚类只保存缺陷表中的下标"""
+        from src.tools.defect_aggregator import DefectAggregator
+
+        defects = self._defects()
+        aggregator = DefectAggregator()
+        unique = aggregator._deduplicate_defects(defects)
+        clusters = aggregator._cluster_defects(unique)
+
+        assert all(cluster.table is unique for cluster in clusters)
+        assert sorted(i for c in clusters for i in c.indices) == list(
+            range(len(unique))
+        )
+        assert all(c.defects[0] is unique[c.indices[0]] for c in clusters)
+
+    def test_top_n_matches_full_ranking(self):
+        """测试只输出前N个聚类时与完整排序的前N个一致，摘要仍统计全部聚类"""
+        from src.tools.defect_aggregator import DefectAggregator
+
+        defects = self._defects()
+        full = DefectAggregator().aggregate_defects(defects)
+        top = DefectAggregator().aggregate_defects(
+            defects, top_n=5, include_remaining=True
+        )
+
+        assert len(full["clusters"]) > 5
+        assert top["clusters"] == full["clusters"][:5]
+        assert top["omitted_clusters"] == len(full["clusters"]) - 5
+        assert top["summary"] == full["summary"]
+        assert top["recommendations"] == full["recommendations"]
+        assert [c["cluster_id"] for c in top["remaining_clusters"]] == [
+            c["cluster_id"] for c in full["clusters"][5:]
+        ]
+        assert "defects" not in top["remaining_clusters"][0]
+        assert "omitted_clusters" not in full
+
+    def test_tool_limits_rendered_clusters(self):
+        """测试聚合工具的max_clusters参数"""
+        from src.tools.defect_aggregator import aggregate_defects_tool
+
+        result = json.loads(
+            aggregate_defects_tool.invoke(
+                {"defects_json": json.dumps(self._defects()), "max_clusters": 3}
+            )
+        )["result"]
+
+        assert len(result["clusters"]) == 3
+        assert result["omitted_clusters"] == result["summary"]["total_clusters"] - 3
+        assert "remaining_clusters" not in result
+
+
+class TestWorkspaceIndex:
+    """测试共享的工作区文件索引"""
+
+    def _make_project(self, root: Path) -> None:
+        (root / "src").mkdir()
+        (root / "src" / "app.py").write_text("print('hi')\n")
+        (root / "tests").mkdir()
+        (root / "tests" / "test_app.py").write_text("def test_app():\n    pass\n")
+        (root / "node_modules" / "pkg").mkdir(parents=True)
+        (root / "node_modules" / "pkg" / "index.js").write_text("")
+        (root / "README.md").write_text("# demo\n")
+
+    def test_scan_applies_shared_excludes(self, temp_dir):
+        """测试索引记录语言和分类并跳过排除目录"""
+        from src.tools.workspace_index import WorkspaceIndex
+
+        self._make_project(temp_dir)
+        index = WorkspaceIndex(temp_dir)
+        files = {f.relative_path: f for f in index.files()}
+
+        assert set(files) == {"README.md", "src/app.py", "tests/test_app.py"}
+        assert files["src/app.py"].language == "python"
+        assert files["src/app.py"].category == "source"
+        assert files["tests/test_app.py"].category == "test"
+        assert files["README.md"].size == len("# demo\n")
+        assert index.directories() == ["src", "tests"]
+        assert [f.name for f in index.files(extensions={".py"})] == [
+            "app.py",
+            "test_app.py",
+        ]
+
+    def test_refresh_rescans_only_changed_directories(self, temp_dir):
+        """测试刷新时只重新列出修改时间变化的目录"""
+        from src.tools.workspace_index import WorkspaceIndex
+
+        self._make_project(temp_dir)
+        index = WorkspaceIndex(temp_dir, refresh_interval=0)
+        assert len(index) == 3
+        assert index.scanned_dirs == 3
+
+        assert not index.refresh()
+        assert index.scanned_dirs == 3
+
+        new_file = temp_dir / "src" / "util.py"
+        new_file.write_text("x = 1\n")
+        src_dir = temp_dir / "src"
+        stat_info = src_dir.stat()
+        os.utime(src_dir, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns + 10**9))
+
+        assert index.refresh()
+        assert index.scanned_dirs == 4
+        assert "src/util.py" in {f.relative_path for f in index.files()}
+
+    def test_consumers_share_index(self, temp_dir):
+        """测试项目探索、复杂度分析和上下文统计查询同一个索引"""
+        from src.tools.project_explorer import ProjectExplorer
+        from src.tools.workspace_index import (clear_workspace_indexes,
+                                               get_workspace_index)
+
+        self._make_project(temp_dir)
+        clear_workspace_indexes()
+        index = get_workspace_index(temp_dir)
+        assert get_workspace_index(str(temp_dir)) is index
+
+        analysis = ProjectExplorer().analyze_project(str(temp_dir))
+        assert sorted(f.relative_path for f in analysis.files) == [
+            "README.md",
+            "src/app.py",
+            "tests/test_app.py",
+        ]
+        assert analysis.directories == ["src", "tests"]
+
+        scanned = index.scanned_dirs
+        result = json.loads(
+            analyze_code_complexity.invoke({"project_path": str(temp_dir)})
+        )
+        assert result["files_analyzed"] == 2
+        assert index.stats()["file_count"] == 3
+        assert index.scanned_dirs == scanned
+
+
+class TestWorkspaceWatcher:
+    """测试文件事件驱动的工作区索引"""
+
+    def test_apply_event_updates_rows_and_notifies(self, temp_dir):
+        """测试事件只更新涉及的行和子树，并通知监听函数"""
+        from src.tools.workspace_index import IndexChange, WorkspaceIndex
+
+        (temp_dir / "src").mkdir()
+        (temp_dir / "src" / "a.py").write_text("a = 1\n")
+        index = WorkspaceIndex(temp_dir)
+        index.refresh(force=True)
+        index.live = True
+        scanned = index.scanned_dirs
+        changes = []
+        index.add_listener(changes.extend)
+
+        (temp_dir / "src" / "b.py").write_text("b = 2\n")
+        index.apply_event("created", temp_dir / "src" / "b.py")
+        (temp_dir / "src" / "a.py").write_text("a = 10\n")
+        index.apply_event("modified", temp_dir / "src" / "a.py")
+        (temp_dir / "pkg").mkdir()
+        (temp_dir / "pkg" / "c.py").write_text("")
+        index.apply_event("created", temp_dir / "pkg", is_directory=True)
+        (temp_dir / "node_modules").mkdir()
+        index.apply_event("created", temp_dir / "node_modules", is_directory=True)
+        (temp_dir / "pkg").rename(temp_dir / "lib")
+        index.apply_event(
+            "moved", temp_dir / "pkg", is_directory=True, dest_path=temp_dir / "lib"
+        )
+
+        assert [f.relative_path for f in index.files()] == [
+            "lib/c.py",
+            "src/a.py",
+            "src/b.py",
+        ]
+        assert index.directories() == ["lib", "src"]
+        assert changes == [
+            IndexChange("created", "src/b.py"),
+            IndexChange("modified", "src/a.py"),
+            IndexChange("created", "pkg/c.py"),
+            IndexChange("deleted", "pkg/c.py"),
+            IndexChange("created", "lib/c.py"),
+        ]
+        assert index.scanned_dirs == scanned + 2
+
+    def test_polling_watcher_keeps_index_live(self, temp_dir):
+        """测试轮询监视器更新索引，查询期间不再检查目录"""
+        import time
+
+        from src.tools.workspace_index import WorkspaceIndex
+        from src.tools.workspace_watcher import WorkspaceWatcher
+
+        (temp_dir / "a.py").write_text("")
+        index = WorkspaceIndex(temp_dir, refresh_interval=0)
+        watcher = WorkspaceWatcher(index, poll_interval=0.05, use_watchdog=False)
+        try:
+            assert watcher.start() == "polling"
+            assert watcher.wait_ready(5)
+            assert index.live
+
+            (temp_dir / "b.py").write_text("")
+            deadline = time.time() + 5
+            while len(index) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            assert len(index) == 2
+
+            watcher.stop()
+            with patch("src.tools.workspace_index.os.stat") as mock_stat:
+                index.live = True
+                list(index.files())
+            mock_stat.assert_not_called()
+        finally:
+            watcher.stop()
+
+        assert not index.live
+
+    def test_initial_scan_runs_in_background(self, temp_dir):
+        """测试首次建立索引不阻塞start，完成前索引不进入live状态"""
+        import threading
+
+        from src.tools.workspace_index import WorkspaceIndex
+        from src.tools.workspace_watcher import WorkspaceWatcher
+
+        (temp_dir / "a.py").write_text("")
+        index = WorkspaceIndex(temp_dir)
+        release = threading.Event()
+        refresh = index.refresh
+
+        def slow_refresh(*args, **kwargs):
+            release.wait(5)
+            return refresh(*args, **kwargs)
+
+        watcher = WorkspaceWatcher(index, poll_interval=60, use_watchdog=False)
+        try:
+            with patch.object(index, "refresh", side_effect=slow_refresh):
+                watcher.start()
+                assert not watcher.wait_ready(0.1)
+                assert not index.live
+                release.set()
+                assert watcher.wait_ready(5)
+            assert index.live
+            assert watcher.get_stats()["ready"] is True
+        finally:
+            watcher.stop()
+
+    def test_watch_enabled_by_default_only_with_watchdog(self, monkeypatch):
+        """测试未安装watchdog时默认不启用轮询监视，环境变量可以覆盖"""
+        from src.tools import workspace_watcher
+
+        monkeypatch.delenv("FIX_AGENT_WORKSPACE_WATCH", raising=False)
+        monkeypatch.setattr(workspace_watcher, "Observer", None)
+        assert not workspace_watcher.workspace_watch_enabled()
+        monkeypatch.setattr(workspace_watcher, "Observer", object)
+        assert workspace_watcher.workspace_watch_enabled()
+        monkeypatch.setenv("FIX_AGENT_WORKSPACE_WATCH", "0")
+        assert not workspace_watcher.workspace_watch_enabled()
+        monkeypatch.setattr(workspace_watcher, "Observer", None)
+        monkeypatch.setenv("FIX_AGENT_WORKSPACE_WATCH", "1")
+        assert workspace_watcher.workspace_watch_enabled()
+
+    def test_switch_workspace_follows_cd(self, temp_dir):
+        """测试切换工作目录后监视器跟随到新目录"""
+        from src.tools import workspace_watcher
+
+        (temp_dir / "old").mkdir()
+        (temp_dir / "new").mkdir()
+        workspace_watcher.stop_workspace_watchers()
+        # 会话未启用监视时不启动监视器
+        assert workspace_watcher.switch_workspace(temp_dir / "new") is None
+
+        old = workspace_watcher.watch_workspace(
+            temp_dir / "old", poll_interval=60, use_watchdog=False
+        )
+        try:
+            new = workspace_watcher.switch_workspace(temp_dir / "new")
+            assert new is not None and new is not old
+            assert new.index.root == (temp_dir / "new").resolve()
+            assert new.is_running
+            assert not old.is_running
+        finally:
+            workspace_watcher.stop_workspace_watchers()
+
+    def test_changes_drop_memoized_content_hashes(self, temp_dir):
+        """测试文件变化通知丢弃分析缓存记忆的内容哈希"""
+        from src.tools import analysis_cache
+
+        file_path = temp_dir / "a.py"
+        file_path.write_text("a = 1\n")
+        mtime_ns = os.stat(file_path).st_mtime_ns - 10 * 10**9
+        os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+        first = analysis_cache.hash_file_content(file_path)
+        assert os.path.abspath(file_path) in analysis_cache._content_hashes
+        with patch("builtins.open", side_effect=AssertionError("re-read")):
+            assert analysis_cache.hash_file_content(file_path) == first
+
+        analysis_cache.forget_content_hashes([file_path])
+        assert os.path.abspath(file_path) not in analysis_cache._content_hashes
+
+
+class TestIgnoreRules:
+    """测试.gitignore/.fixagentignore剪除"""
+
+    def test_gitignore_semantics(self):
+        """测试取反、锚定、只匹配目录和**"""
+        from src.tools.ignore_rules import IgnoreRules, parse_ignore_lines
+
+        rules = IgnoreRules(
+            parse_ignore_lines(
+                [
+                    "# comment\n",
+                    "*.log\n",
+                    "!keep.log\n",
+                    "build/\n",
+                    "/top.txt\n",
+                    "docs/**/gen\n",
+                    "\\#literal\n",
+                ]
+            )
+        )
+
+        assert rules.is_ignored("a/b/x.log")
+        assert not rules.is_ignored("a/keep.log")
+        assert rules.is_ignored("a/build", is_dir=True)
+        assert not rules.is_ignored("a/build")
+        assert rules.is_ignored("top.txt")
+        assert not rules.is_ignored("a/top.txt")
+        assert rules.is_ignored("docs/gen", is_dir=True)
+        assert rules.is_ignored("docs/x/y/gen", is_dir=True)
+        assert rules.is_ignored("#literal")
+
+        nested = rules.extend(parse_ignore_lines(["/local\n", "!x.log\n"], "pkg"))
+        assert nested.is_ignored("pkg/local", is_dir=True)
+        assert not nested.is_ignored("local", is_dir=True)
+        assert not nested.is_ignored("pkg/x.log")
+
+    def test_index_prunes_ignored_subtrees(self, temp_dir):
+        """测试索引剪除被忽略的子树，忽略文件原地修改后重新列出"""
+        from src.tools.workspace_index import WorkspaceIndex
+
+        (temp_dir / ".gitignore").write_text("data/\n*.log\n")
+        for name in ["src/a.py", "data/dump/d.py", "sub/s.py", "sub/t.tmp", "x.log"]:
+            (temp_dir / name).parent.mkdir(parents=True, exist_ok=True)
+            (temp_dir / name).write_text("")
+        (temp_dir / "sub" / ".fixagentignore").write_text("*.tmp\n")
+
+        index = WorkspaceIndex(temp_dir, refresh_interval=0)
+        assert [f.relative_path for f in index.files(extensions={".py", ".tmp"})] == [
+            "src/a.py",
+            "sub/s.py",
+        ]
+        assert "data" not in index.directories()
+        assert index.is_ignored("data/dump/new.py")
+        assert index.is_ignored("node_modules/pkg/index.js")
+        assert not index.is_ignored("src/new.py")
+
+        gitignore = temp_dir / ".gitignore"
+        gitignore.write_text("data/\n*.log\nsub/\n")
+        stat_info = gitignore.stat()
+        os.utime(gitignore, ns=(stat_info.st_atime_ns, stat_info.st_mtime_ns + 10**9))
+        index.refresh()
+        assert [f.relative_path for f in index.files(extensions={".py"})] == [
+            "src/a.py"
+        ]
+
+    def test_scanners_share_ignore_rules(self, temp_dir):
+        """测试批量格式化和增量分析文件过滤遵循忽略规则"""
+        from src.tools.professional_formatter import (
+            ProfessionalCodeFormatter, batch_format_professional)
+        from src.tools.project_defect_engine import ProjectDefectEngine
+
+        (temp_dir / ".fixagentignore").write_text("vendor/\n")
+        (temp_dir / "vendor").mkdir()
+        (temp_dir / "vendor" / "lib.py").write_text("x=1\n")
+        (temp_dir / "main.py").write_text("x = 1\n")
+        (temp_dir / "app.js").write_text("let x = 1;\n")
+
+        with patch.object(ProfessionalCodeFormatter, "format_file") as mock_format:
+            mock_format.return_value = Mock(
+                success=True, needs_formatting=False, to_dict=lambda: {}
+            )
+            result = json.loads(
+                batch_format_professional.invoke({"project_path": str(temp_dir)})
+            )
+
+        formatted = sorted(Path(c.args[0]).name for c in mock_format.call_args_list)
+        assert formatted == ["app.js", "main.py"]
+        assert result["summary"]["total_files"] == 2
+
+        groups = ProjectDefectEngine()._group_files(
+            temp_dir.resolve(),
+            [temp_dir.resolve() / "vendor" / "lib.py", temp_dir.resolve() / "main.py"],
+        )
+        assert [p.name for p in groups["python"]] == ["main.py"]
+
+
+class TestComplexityAnalyzer:
+    """测试基于语法树和词法单元的复杂度分析引擎"""
+
+    def test_python_function_metrics(self):
+        """测试Python函数的圈复杂度和认知复杂度"""
+        from src.tools.complexity_analyzer import analyze_python_source
+
+        source = (
+            "def nested(data):\n"
+            "    for item in data:\n"
+            "        if item:\n"
+            "            for i in item:\n"
+            "                print(i)\n"
+            "class Shape:\n"
+            "    def area(self, kind, size):\n"
+            "        if kind and size or kind:\n"
+            "            return self.area(kind, size - 1)\n"
+            "        elif kind:\n"
+            "            diff = format(size)\n"
+            "        else:\n"
+            "            diff = None\n"
+            "        return [s for s in size if s]\n"
+        )
+        result = analyze_python_source(source)
+
+        assert result.classes == 1
+        assert [tuple(f) for f in result.functions] == [
+            ("nested", 1, 4, 6),
+            ("Shape.area", 7, 7, 8),
+        ]
+        assert result.cyclomatic == 11
+        assert analyze_python_source("def f(:\n").error.startswith("SyntaxError")
+
+    def test_brace_languages_ignore_comments_and_strings(self):
+        """测试花括号语言按词法单元计分并跟踪函数边界"""
+        from src.tools.complexity_analyzer import analyze_brace_source
+
+        js = (
+            "// if (a) { for (;;) {} }\n"
+            'const label = "if while case";\n'
+            "function check(a, b) {\n"
+            "  if (a && b) {\n"
+            "    for (let i = 0; i < a; i++) {\n"
+            "      if (i % 2) { continue; } else if (b) { x(); } else { y(); }\n"
+            "    }\n"
+            "  }\n"
+            "  return items.map((x) => { return x ? 1 : 2; });\n"
+            "}\n"
+        )
+        result = analyze_brace_source(js, "javascript")
+        assert [tuple(f) for f in result.functions] == [
+            ("check", 3, 6, 9),
+            ("check.<lambda>", 9, 2, 1),
+        ]
+        assert result.cyclomatic == 8
+
+        go = (
+            "func (s *Server) Handle(r *Request) error {\n"
+            "\tif err := s.check(r); err != nil {\n"
+            "\t\treturn err\n"
+            "\t}\n"
+            "\tswitch r.Kind {\n"
+            "\tcase 1, 2:\n"
+            "\tcase 3:\n"
+            "\t}\n"
+            "\treturn nil\n"
+            "}\n"
+        )
+        assert [tuple(f) for f in analyze_brace_source(go, "go").functions] == [
+            ("Handle", 1, 4, 2)
+        ]
+
+    def test_brace_functions_with_qualified_types(self):
+        """测试形参和返回类型中的限定名不会让函数定义被忽略"""
+        from src.tools.complexity_analyzer import analyze_brace_source
+
+        go = (
+            "func handler(w http.ResponseWriter, r *http.Request) {\n"
+            "\tif r.Method == http.MethodGet {\n"
+            "\t\tw.WriteHeader(200)\n"
+            "\t}\n"
+            "}\n"
+            "func Run(ctx context.Context) error {\n"
+            "\treturn ctx.Err()\n"
+            "}\n"
+            "func F() *pkg.T {\n"
+            "\treturn nil\n"
+            "}\n"
+        )
+        assert [tuple(f) for f in analyze_brace_source(go, "go").functions] == [
+            ("handler", 1, 2, 1),
+            ("Run", 6, 1, 0),
+            ("F", 9, 1, 0),
+        ]
+
+        rust = (
+            "fn serve(req: http::Request, cfg: &config::Config) -> io::Result<()> {\n"
+            "    if req.is_ok() { Ok(()) } else { Err(cfg.error()) }\n"
+            "}\n"
+            "impl fmt::Display for Point {\n"
+            "    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {\n"
+            "        write!(f, \"{}\", self.x)\n"
+            "    }\n"
+            "}\n"
+        )
+        assert [tuple(f) for f in analyze_brace_source(rust, "rust").functions] == [
+            ("serve", 1, 2, 2),
+            ("fmt", 5, 1, 0),
+        ]
+
+        # 调用链中的f(x).g仍不是函数定义
+        js = "run(a).then(b);\nfunction later(x) { return x; }\n"
+        assert [
+            tuple(f) for f in analyze_brace_source(js, "javascript").functions
+        ] == [("later", 2, 1, 0)]
+
+    def test_whole_project_is_analyzed_and_cached(self, temp_dir):
+        """测试分析不再限制文件数量，内容未变化的文件直接使用缓存"""
+        from src.tools import complexity_analyzer
+        from src.tools.analysis_cache import AnalysisCache
+
+        body = "".join(f"    if x == {i}:\n        return {i}\n" for i in range(12))
+        (temp_dir / "branchy.py").write_text(f"def dispatch(x):\n{body}")
+        for i in range(24):
+            (temp_dir / f"m{i:02d}.py").write_text(
+                "".join(f"def f{i}_{j}(x):\n    return x\n" for j in range(6))
+            )
+        cache = AnalysisCache(db_path=temp_dir / "complexity.db")
+        complexity_analyzer.clear_complexity_memo()
+
+        with (
+            patch.object(complexity_analyzer, "MIN_PARALLEL_FILES", 4),
+            patch.object(
+                complexity_analyzer, "get_complexity_cache", return_value=cache
+            ),
+        ):
+            result = json.loads(
+                analyze_code_complexity.invoke({"project_path": str(temp_dir)})
+            )
+            assert result["files_analyzed"] == 25
+            assert result["functions_found"] == 24 * 6 + 1
+            assert result["complex_functions"] == [
+                {
+                    "file": "branchy.py",
+                    "function": "dispatch",
+                    "line": 1,
+                    "cyclomatic_complexity": 13,
+                    "cognitive_complexity": 12,
+                }
+            ]
+
+            # 进程内记忆清空后从持久化缓存读取，只重新分析修改过的文件
+            complexity_analyzer.clear_complexity_memo()
+            (temp_dir / "m00.py").write_text("def g(x):\n    return x or 1\n")
+            with patch.object(
+                complexity_analyzer, "_run", wraps=complexity_analyzer._run
+            ) as mock_run:
+                results = complexity_analyzer.analyze_files(
+                    sorted(temp_dir.glob("*.py"))
+                )
+
+        assert mock_run.call_args[0][0] == [(str(temp_dir / "m00.py"), "python")]
+        assert results[str(temp_dir / "m00.py")].cyclomatic == 2
+        assert cache.get_stats()["hits"] == 24
+        cache.close()
+
+
+class TestProjectSummary:
+    """测试大型仓库的流式目录汇总"""
+
+    def _make_project(self, root: Path) -> None:
+        (root / "src" / "core" / "deep").mkdir(parents=True)
+        (root / "src" / "web").mkdir()
+        (root / "docs").mkdir()
+        (root / "setup.py").write_text("from setuptools import setup\n")
+        (root / "src" / "main.py").write_text("print('hi')\n")
+        (root / "src" / "core" / "a.py").write_text("a = 1\n" * 10)
+        (root / "src" / "core" / "deep" / "b.py").write_text("b = 2\n" * 20)
+        (root / "src" / "web" / "app.ts").write_text("export {};\n")
+        (root / "docs" / "guide.md").write_text("# guide\n")
+
+    def test_large_project_returns_directory_tree(self, temp_dir):
+        """测试文件数超过预算时返回逐目录汇总的目录树"""
+        self._make_project(temp_dir)
+
+        result = json.loads(
+            explore_project_structure.invoke(
+                {"project_path": str(temp_dir), "max_files": 3, "depth": 1}
+            )
+        )
+
+        assert result["mode"] == "summary"
+        assert result["project_type"] == "python_package"
+        assert result["primary_language"] == "python"
+        assert result["metrics"]["total_files"] == 6
+        assert [f["relative_path"] for f in result["files"]] == ["setup.py"]
+
+        tree = result["tree"]
+        assert (tree["files"], tree["directories"]) == (6, 5)
+        assert [c["path"] for c in tree["children"]] == ["src", "docs"]
+        src = tree["children"][0]
+        assert src["files"] == 4
+        assert src["directories"] == 3
+        assert src["languages"] == {"python": 3, "typescript": 1}
+        assert src["size_bytes"] == 12 + 60 + 120 + 11
+        # depth=1时更深的目录汇总到上一层，不再展开
+        assert src["children"] == []
+
+    def test_cursor_drills_into_subtree(self, temp_dir):
+        """测试通过cursor展开子目录，且不再重复计算项目级信息"""
+        self._make_project(temp_dir)
+
+        result = json.loads(
+            explore_project_structure.invoke(
+                {"project_path": str(temp_dir), "cursor": "src", "depth": 2}
+            )
+        )
+
+        assert result["mode"] == "summary"
+        assert "project_type" not in result
+        assert [f["relative_path"] for f in result["files"]] == ["src/main.py"]
+        core = result["tree"]["children"][0]
+        assert (core["cursor"], core["files"]) == ("src/core", 2)
+        assert [c["cursor"] for c in core["children"]] == ["src/core/deep"]
+
+        missing = json.loads(
+            explore_project_structure.invoke(
+                {"project_path": str(temp_dir), "cursor": "nope"}
+            )
+        )
+        assert missing["success"] is False
+
+    def test_small_project_keeps_full_listing(self, temp_dir):
+        """测试文件数不超过预算时仍返回完整的文件列表"""
+        self._make_project(temp_dir)
+
+        result = json.loads(
+            explore_project_structure.invoke({"project_path": str(temp_dir)})
+        )
+
+        assert result["mode"] == "full"
+        assert len(result["files"]) == 6
+        assert "src/core/deep" in result["directories"]
+
+
+class TestDirectoryRollup:
+    """测试工作区索引的目录汇总树"""
+
+    def _make_project(self, root: Path) -> None:
+        (root / "src" / "core").mkdir(parents=True)
+        (root / "tests").mkdir()
+        (root / "src" / "app.py").write_text("app = 1\n")
+        (root / "src" / "core" / "util.py").write_text("util = 2\n")
+        (root / "tests" / "test_app.py").write_text("def test_app():\n    pass\n")
+        (root / "README.md").write_text("# demo\n")
+
+    def test_events_update_rollup_incrementally(self, temp_dir):
+        """测试文件事件沿上级目录更新汇总，结果与重新建立的汇总一致"""
+        from src.tools.workspace_index import WorkspaceIndex
+
+        self._make_project(temp_dir)
+        index = WorkspaceIndex(temp_dir, refresh_interval=0)
+        index.live = True
+        root = index.rollup()
+        assert (root.file_count, root.directory_count) == (4, 3)
+        assert root.categories == {"test": 1, "source": 2, "documentation": 1}
+        assert root.source_languages == {"python": 3}
+        assert index.rollup("src").file_count == 2
+
+        newest = temp_dir / "src" / "core" / "new.ts"
+        newest.write_text("export const x = 1;\n")
+        os.utime(newest, (4 * 10**9, 4 * 10**9))
+        index.apply_event("created", newest)
+        assert index.rollup().languages["typescript"] == 1
+        assert index.rollup("src").newest_mtime == 4 * 10**9
+
+        newest.unlink()
+        index.apply_event("deleted", newest)
+        (temp_dir / "docs").mkdir()
+        (temp_dir / "docs" / "guide.md").write_text("# guide\n")
+        index.apply_event("created", temp_dir / "docs", is_directory=True)
+
+        rebuilt = WorkspaceIndex(temp_dir)
+        for relative in ["", "src", "src/core", "tests", "docs"]:
+            assert index.rollup(relative) == rebuilt.rollup(relative)
+        assert index.rollup("src").newest_mtime < 4 * 10**9
+        assert [c.relative_path for c in index.rollup_children()] == [
+            "docs",
+            "src",
+            "tests",
+        ]
+        assert index.rollup("missing") is None
+
+    def test_tool_reports_subtree(self, temp_dir):
+        """测试目录汇总工具返回子树的汇总和可继续展开的子目录"""
+        self._make_project(temp_dir)
+
+        result = json.loads(
+            summarize_directory_tree.invoke(
+                {"project_path": str(temp_dir), "path": "src"}
+            )
+        )
+
+        assert result["success"] is True
+        assert result["categories"] == {"source": 2}
+        tree = result["tree"]
+        assert (tree["files"], tree["directories"]) == (2, 1)
+        assert [c["cursor"] for c in tree["children"]] == ["src/core"]
+
+        missing = json.loads(
+            summarize_directory_tree.invoke(
+                {"project_path": str(temp_dir), "path": "nope"}
+            )
+        )
+        assert missing["success"] is False
+
+
+@pytest.mark.skipif(os.name == "nt", reason="使用shell脚本模拟npx")
+class TestNodejsIncrementalCompile:
+    """测试Node.js项目的增量编译检查"""
+
+    def _fake_npx(self, bin_dir: Path, body: str) -> Path:
+        """在PATH中放入记录参数并输出tsc格式错误的npx"""
+        log = bin_dir / "npx.log"
+        script = bin_dir / "npx"
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import json, sys, time\n"
+            f"with open({str(log)!r}, 'a') as f:\n"
+            "    f.write(json.dumps(sys.argv[1:]) + '\\n')\n" + body
+        )
+        script.chmod(0o755)
+        return log
+
+    def _make_project(self, root: Path) -> None:
+        (root / "package.json").write_text('{"name": "demo"}\n')
+        (root / "tsconfig.json").write_text("{}\n")
+
+    def _compile(self, project: Path, build_config: Optional[str] = None) -> dict:
+        from src.tools.error_detector import get_toolchain_registry
+
+        with patch.object(
+            get_toolchain_registry(), "is_available", return_value=True
+        ):
+            return json.loads(
+                compile_project.invoke(
+                    {"project_path": str(project), "build_config": build_config}
+                )
+            )["compilation_result"]
+
+    def test_tsc_runs_incrementally_with_managed_buildinfo(
+        self, temp_dir, monkeypatch
+    ):
+        """测试tsc使用代理缓存目录中的tsbuildinfo，并解析多行错误消息"""
+        bin_dir = temp_dir / "bin"
+        bin_dir.mkdir()
+        project = temp_dir / "project"
+        project.mkdir()
+        self._make_project(project)
+        log = self._fake_npx(
+            bin_dir,
+            "print(\"src/a.ts(3,7): error TS2322: Type 'string' is not assignable.\")\n"
+            "print('  Types of property x are incompatible.')\n"
+            "sys.exit(2)\n",
+        )
+        monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv("HOME", str(temp_dir / "home"))
+
+        result = self._compile(project)
+
+        assert result["success"] is False
+        error = result["errors"][0]
+        assert (error["file_path"], error["line_number"], error["column_number"]) == (
+            "src/a.ts",
+            3,
+            7,
+        )
+        assert error["error_message"].endswith("Types of property x are incompatible.")
+        args = json.loads(log.read_text().splitlines()[0])
+        assert args[:2] == ["tsc", "--noEmit"]
+        assert "--incremental" in args
+        buildinfo = Path(args[args.index("--tsBuildInfoFile") + 1])
+        assert buildinfo.is_relative_to(temp_dir / "home" / ".deepagents")
+
+        self._compile(project, json.dumps({"incremental": False}))
+        args = json.loads(log.read_text().splitlines()[1])
+        assert "--incremental" not in args
+
+    def test_timeout_keeps_streamed_errors(self, temp_dir, monkeypatch):
+        """测试超时后仍保留已经输出的错误"""
+        bin_dir = temp_dir / "bin"
+        bin_dir.mkdir()
+        self._make_project(temp_dir)
+        self._fake_npx(
+            bin_dir,
+            "print('src/b.ts(1,1): error TS2307: Cannot find module.', flush=True)\n"
+            "time.sleep(30)\n",
+        )
+        monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+        monkeypatch.setenv("HOME", str(temp_dir / "home"))
+
+        result = self._compile(temp_dir, json.dumps({"timeout": 1}))
+
+        assert [e["error_type"] for e in result["errors"]] == [
+            "typescript_error",
+            "timeout",
+        ]
+        assert result["errors"][0]["error_code"] == "TS2307"
+
 # 运行测试的入口
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
@@ -262,7 +262,7 @@ class AIAdapter:
             # 流式响应
             for chunk in self.agent.stream(
                 {"messages": [{"role": "user", "content": full_input}]},
-                stream_mode=["messages", "updates"],
+                stream_mode=["messages", "updates", "custom"],
                 subgraphs=True,
                 config=config,
                 durability="exit",
@@ -400,6 +400,18 @@ class AIAdapter:
                                     self.pending_text += text_content
                                     self.last_chunk_time = current_time
 
+        elif stream_mode == "custom":
+            # 工具上报的分析进度，以状态消息推送给前端
+            if isinstance(data, dict) and data.get("type") == "analysis_progress":
+                results.append(
+                    {
+                        "type": "status",
+                        "content": f"正在分析 {data.get('completed')}/{data.get('total')} 个文件",
+                        "session_id": self.session_id,
+                        "metadata": {"state": "analyzing", **data},
+                    }
+                )
+
         elif stream_mode == "updates":
             # 处理更新消息（包括HITL中断）
             if isinstance(data, dict):
@@ -2,6 +2,7 @@
 
 import json
 import logging
+import time
 from typing import Any, Dict, List
 
 from fastapi import Depends, WebSocket, WebSocketDisconnect
@@ -11,6 +12,9 @@ from .connection_manager import manager
 
 logger = logging.getLogger(__name__)
 
+# Minimum interval (seconds) between analysis progress updates sent to the client
+PROGRESS_INTERVAL = 0.25
+
 
 class ChatHandler:
     """Handles WebSocket chat communication."""
@@ -161,7 +165,17 @@ class ChatHandler:
         try:
             # Stream AI response
             full_response = ""
+            last_progress_time = 0.0
             async for chunk in ai_adapter.stream_response(content, file_references):
+                # Throttle per-file analysis progress, always sending the final update
+                metadata = chunk.get("metadata") or {}
+                if metadata.get("state") == "analyzing":
+                    now = time.monotonic()
+                    is_last = metadata.get("completed") == metadata.get("total")
+                    if not is_last and now - last_progress_time < PROGRESS_INTERVAL:
+                        continue
+                    last_progress_time = now
+
                 # Send chunk to client
                 await manager.send_personal_message(chunk, websocket)
 